@@ -0,0 +1,226 @@
+"""
+Test windows, out-of-sample stitching and parameter stability of WalkForwardRunner
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from pandas import DataFrame, date_range
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData
+
+try:
+    from vnpy.app.cta_strategy import backtesting
+    from vnpy.app.cta_strategy.backtesting import OptimizationSetting, backtest_shared
+    from vnpy.app.cta_strategy.base import BacktestingMode
+    from vnpy.app.cta_strategy.template import CtaTemplate
+    from vnpy.app.cta_strategy.walk_forward import WalkForwardRunner
+except ImportError:
+    # dependencies of backtesting engine not installed
+    WalkForwardRunner = None
+    CtaTemplate = object
+
+
+class AsyncResult:
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class Pool:
+    """Run backtesting of out-of-sample window in current process"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def apply_async(self, func, args):
+        strategy_class, setting, parameters, trading_start = args
+        self.engine.trading_starts.append(trading_start)
+        self.engine.backtest_parameters.append(parameters)
+        index = date_range(parameters["start"].date(), parameters["end"].date()).date
+        return AsyncResult(DataFrame({"net_pnl": setting["x"], "trade_count": 1}, index=index))
+
+
+class Engine:
+    """
+    Fake backtesting engine, target of in-sample optimization is -abs(x - window number),
+    window numbers in empty_windows have no optimization results
+    """
+
+    def __init__(self, start, end, empty_windows=()):
+        self.start = start
+        self.end = end
+        self.mode = BacktestingMode.BAR if WalkForwardRunner else None
+        self.capital = 1000000
+        self.strategy_class = None
+        self.empty_windows = empty_windows
+        self.optimize_count = 0
+        self.backtest_parameters = []
+        self.trading_starts = []
+        self.pool = None
+        self.closed = False
+
+    def output(self, msg):
+        pass
+
+    def get_optimization_pool(self, max_workers=None):
+        self.pool = Pool(self)
+        return self.pool
+
+    def close_optimization_pool(self):
+        self.closed = True
+
+    def get_parameters(self):
+        return {"start": self.start, "end": self.end}
+
+    def optimize_settings(self, settings, target_name, **kwargs):
+        self.optimize_count += 1
+        if self.optimize_count in self.empty_windows:
+            return []
+
+        results = []
+        for setting in settings:
+            target = -abs(setting["x"] - self.optimize_count)
+            results.append((setting, (str(setting), target, {target_name: target})))
+        return results
+
+
+class HoldStrategy(CtaTemplate):
+    """Buy once trading starts and hold"""
+
+    def on_init(self):
+        self.load_bar(1)
+
+    def on_bar(self, bar: BarData):
+        if self.trading and self.pos == 0:
+            self.buy(bar.close_price + 10, 1)
+
+
+class SharedBars:
+    """Bars of whole period in worker"""
+
+    def __init__(self, bars):
+        self.bars = bars
+
+    def get_bars(self, start=None, end=None):
+        return [bar for bar in self.bars if start <= bar.datetime <= end]
+
+
+@unittest.skipIf(WalkForwardRunner is None, "cta_strategy dependencies not installed")
+class TestWalkForward(unittest.TestCase):
+
+    def setUp(self):
+        self.setting = OptimizationSetting()
+        self.setting.add_parameter("x", 1, 3, 1)
+        self.setting.set_target("total_net_pnl")
+
+    def create_runner(self, engine, **kwargs):
+        return WalkForwardRunner(engine, self.setting, in_sample_days=30, out_sample_days=10, **kwargs)
+
+    def test_rolling_windows(self):
+        start = datetime(2020, 1, 1)
+        runner = self.create_runner(Engine(start, datetime(2020, 3, 5)))
+        windows = runner.generate_windows()
+
+        self.assertEqual(len(windows), 4)
+        for i, (is_start, is_end, oos_start, oos_end) in enumerate(windows):
+            self.assertEqual(is_start, start + timedelta(days=10 * i))
+            self.assertEqual(is_end - is_start, timedelta(days=30))
+            self.assertEqual(oos_start, is_end)
+        # 最后的样本外窗口截止到回测结束时间
+        self.assertEqual(windows[-1][3], datetime(2020, 3, 5))
+        self.assertEqual(windows[-2][3], windows[-1][2])
+
+    def test_anchored_windows(self):
+        start = datetime(2020, 1, 1)
+        runner = self.create_runner(Engine(start, datetime(2020, 3, 5)), step_days=20, anchored=True)
+        windows = runner.generate_windows()
+
+        self.assertEqual([window[0] for window in windows], [start, start])
+        self.assertEqual([window[1] for window in windows], [datetime(2020, 1, 31), datetime(2020, 2, 20)])
+        self.assertEqual(windows[0][3], datetime(2020, 2, 10))
+        self.assertEqual(windows[1][3], datetime(2020, 3, 1))
+
+        # 回测区间不足一个样本内窗口
+        runner = self.create_runner(Engine(start, datetime(2020, 1, 31)))
+        self.assertEqual(runner.generate_windows(), [])
+
+    def test_run(self):
+        engine = Engine(datetime(2020, 1, 1), datetime(2020, 3, 5, 15))
+        runner = self.create_runner(engine, warmup_days=5)
+        results = runner.run(output=False)
+
+        self.assertTrue(engine.closed)
+        self.assertEqual([result["setting"]["x"] for result in results], [1, 2, 3, 3])
+        self.assertEqual([result["is_target"] for result in results], [0, 0, 0, -1])
+        self.assertEqual(engine.backtest_parameters[0]["start"], datetime(2020, 1, 26))
+        self.assertEqual(engine.trading_starts, [result["oos_start"] for result in results])
+
+        # 样本外窗口逐日结果不重叠，拼接后覆盖到回测结束日
+        df = runner.get_oos_df()
+        self.assertTrue(df.index.is_unique)
+        self.assertEqual(df.index[0], datetime(2020, 1, 31).date())
+        self.assertEqual(df.index[-1], datetime(2020, 3, 5).date())
+        self.assertEqual(len(df), 35)
+        self.assertEqual(list(df.groupby("window").size()), [10, 10, 10, 5])
+        self.assertEqual(df["balance"].iloc[-1], 1000000 + 10 * 1 + 10 * 2 + 10 * 3 + 5 * 3)
+
+    def test_warmup(self):
+        # 预热期只初始化策略，不产生跨入样本外窗口的持仓
+        bars = []
+        for i in range(60):
+            bars.append(BarData(
+                gateway_name="DB", symbol="rb2010", exchange=Exchange.SHFE, interval=Interval.MINUTE,
+                datetime=datetime(2020, 1, 1, 10) + timedelta(days=i), volume=10,
+                open_price=3000 + i * 10, high_price=3000 + i * 10, low_price=3000 + i * 10, close_price=3000 + i * 10
+            ))
+        backtesting.worker_shared_data = SharedBars(bars)
+        parameters = {
+            "vt_symbol": "rb2010.SHFE", "interval": "1m", "start": datetime(2020, 1, 2), "end": datetime(2020, 2, 20),
+            "rate": 0, "slippage": 0, "size": 10, "pricetick": 1, "capital": 1000000
+        }
+        trading_start = datetime(2020, 2, 1)
+
+        try:
+            df = backtest_shared(HoldStrategy, {}, parameters)
+            self.assertEqual(df.loc[trading_start.date(), "start_pos"], 1)
+
+            df = backtest_shared(HoldStrategy, {}, parameters, trading_start)
+        finally:
+            backtesting.worker_shared_data = None
+
+        self.assertEqual(df.index[0], trading_start.date())
+        self.assertEqual(df["start_pos"].iloc[0], 0)
+        self.assertEqual(df["trade_count"].sum(), 1)
+        self.assertEqual(df["end_pos"].iloc[-1], 1)
+
+    def test_empty_window(self):
+        engine = Engine(datetime(2020, 1, 1), datetime(2020, 3, 5), empty_windows=(2,))
+        runner = self.create_runner(engine)
+        results = runner.run(output=False)
+
+        self.assertTrue(engine.closed)
+        self.assertEqual([result["window"] for result in results], [1, 3, 4])
+        self.assertEqual(len(engine.backtest_parameters), 3)
+
+    def test_parameter_stability(self):
+        engine = Engine(datetime(2020, 1, 1), datetime(2020, 3, 5))
+        runner = self.create_runner(engine)
+        runner.run(output=False)
+
+        df = runner.get_parameter_stability()
+        self.assertEqual(list(df.index), ["x"])
+        row = df.loc["x"]
+        self.assertEqual(row["mean"], 2.25)
+        self.assertEqual(row["min"], 1)
+        self.assertEqual(row["max"], 3)
+        self.assertEqual(row["changes"], 2)
+        self.assertEqual(row["mode"], 3)
+        self.assertEqual(row["mode_ratio"], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
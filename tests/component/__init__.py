@@ -0,0 +1,13 @@
+from .test_cta_line_bar import *
+from .test_cta_ring_buffer import *
+from .test_cta_bar_feeder import *
+from .test_cta_tick_cache import *
+from .test_cta_day_prefetcher import *
+from .test_cta_order_book import *
+from .test_cta_fund_kline import *
+from .test_cta_position_queue import *
+from .test_cta_log import *
+from .test_cta_shared_bars import *
+from .test_cta_optimize_cache import *
+from .test_cta_prune import *
+from .test_cta_optimization import *
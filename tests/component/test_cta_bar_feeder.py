@@ -0,0 +1,80 @@
+"""
+Test if BarFeeder creates the same bars as bar_df.iterrows()
+"""
+import unittest
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from vnpy.component.cta_bar_feeder import BarFeeder
+from vnpy.trader.object import BarData
+from vnpy.trader.utility import extract_vt_symbol, get_trading_date
+
+
+def create_bar_df():
+    """两个合约的1分钟bar，合并为(datetime, vt_symbol)索引"""
+    bar_df_dict = {}
+    for vt_symbol, trading_day in [('rb2010.SHFE', '20200602'), ('j2009.DCE', np.nan)]:
+        index = pd.date_range('2020-06-01 21:01', periods=300, freq='min', name='datetime')
+        if vt_symbol == 'j2009.DCE':
+            index = index[::2]
+        count = len(index)
+        bar_df_dict[vt_symbol] = pd.DataFrame({
+            'open': np.arange(count, dtype=float),
+            'high': np.arange(count, dtype=float) + 2,
+            'low': np.arange(count, dtype=float) - 2,
+            'close': np.arange(count, dtype=float) + 1,
+            'volume': np.full(count, 10.0),
+            'open_interest': np.full(count, 1000.0),
+            'trading_day': [trading_day] * count
+        }, index=index)
+    return pd.concat(bar_df_dict, axis=0).swaplevel(0, 1).sort_index()
+
+
+class TestBarFeeder(unittest.TestCase):
+
+    def test_same_as_iterrows(self):
+        bar_df = create_bar_df()
+        feeder_bars = list(BarFeeder(bar_df, bar_interval_seconds=60))
+        self.assertEqual(len(feeder_bars), len(bar_df))
+
+        for ((dt, vt_symbol), bar_data), (feeder_dt, feeder_bar) in zip(bar_df.iterrows(), feeder_bars):
+            symbol, exchange = extract_vt_symbol(vt_symbol)
+            bar_datetime = dt - timedelta(seconds=60)
+            bar = BarData(gateway_name='backtesting', symbol=symbol, exchange=exchange, datetime=bar_datetime)
+            bar.open_price = float(bar_data['open'])
+            bar.close_price = float(bar_data['close'])
+            bar.high_price = float(bar_data['high'])
+            bar.low_price = float(bar_data['low'])
+            bar.volume = int(bar_data['volume'])
+            bar.open_interest = int(bar_data['open_interest'])
+            bar.date = bar_datetime.strftime('%Y-%m-%d')
+            bar.time = bar_datetime.strftime('%H:%M:%S')
+            str_td = str(bar_data['trading_day'])
+            if len(str_td) == 8:
+                bar.trading_day = str_td[0:4] + '-' + str_td[4:6] + '-' + str_td[6:8]
+            else:
+                bar.trading_day = get_trading_date(bar_datetime)
+
+            self.assertEqual(feeder_dt, dt)
+            self.assertEqual(feeder_bar.__dict__, bar.__dict__)
+
+    def test_same_datetime_group(self):
+        """同一时间的bar，dt为同一对象"""
+        bar_df = create_bar_df()
+        pre_dt = None
+        pre_bar = None
+        for dt, bar in BarFeeder(bar_df, date_from_bar_datetime=False, use_trading_date=False):
+            if pre_dt is not None and dt == pre_dt:
+                self.assertIs(dt, pre_dt)
+                self.assertNotEqual(bar.vt_symbol, pre_bar.vt_symbol)
+            pre_dt = dt
+            pre_bar = bar
+            # 交易日缺失时，使用bar.date
+            if bar.symbol == 'j2009':
+                self.assertEqual(bar.trading_day, bar.date)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Test if DayPrefetcher yields the same days and data as synchronous loading
+"""
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from functools import partial
+
+from vnpy.component.cta_day_prefetcher import DayPrefetcher
+from vnpy.component.cta_tick_cache import save_tick_cache, load_day_tick_df
+
+
+def square(day):
+    return day * day
+
+
+class TestDayPrefetcher(unittest.TestCase):
+
+    def test_order(self):
+        days = list(range(20))
+        expected = [(day, square(day)) for day in days]
+        for depth in [0, 1, 3]:
+            for use_process in [False, True]:
+                prefetcher = DayPrefetcher(square, days, depth=depth, use_process=use_process)
+                self.assertEqual(list(prefetcher), expected)
+
+    def test_bounded(self):
+        loaded = []
+
+        def load(day):
+            loaded.append(day)
+            return day
+
+        prefetcher = DayPrefetcher(load, list(range(20)), depth=2, use_process=False)
+        for day, data in prefetcher:
+            # 当前一天 + 预取的2天
+            self.assertLessEqual(len(loaded), day + 3)
+            if day == 5:
+                break
+        self.assertLessEqual(len(loaded), 8)
+
+    def test_load_day_tick_df(self):
+        with tempfile.TemporaryDirectory() as cache_folder:
+            days = [datetime(2020, 6, 1) + timedelta(days=i) for i in range(3)]
+            for day in days[:2]:
+                for symbol in ['rb2010', 'j2009']:
+                    ticks = [{'datetime': day + timedelta(seconds=i), 'price': float(i), 'volume': i}
+                             for i in range(100)]
+                    os.makedirs(os.path.join(cache_folder, day.strftime('%Y%m')), exist_ok=True)
+                    save_tick_cache(os.path.join(cache_folder, day.strftime('%Y%m'),
+                                                 '{}_{}'.format(symbol, day.strftime('%Y%m%d'))), ticks)
+
+            load_func = partial(load_day_tick_df, cache_folder, ['rb2010.SHFE', 'j2009.DCE'])
+            results = list(DayPrefetcher(load_func, days, depth=2, use_process=True))
+            self.assertEqual([day for day, _ in results], days)
+            self.assertIsNone(results[2][1])
+            for day, df in results[:2]:
+                self.assertTrue(df.equals(load_func(day)))
+                self.assertEqual(len(df), 200)
+                self.assertTrue(df.index.is_monotonic_increasing)
+
+            # 缺失的缓存文件随结果返回，由调用方输出日志
+            load_func = partial(load_day_tick_df, cache_folder, ['rb2010.SHFE', 'ag2012.SHFE'], missing=True)
+            results = list(DayPrefetcher(load_func, days, depth=2, use_process=True))
+            df, missing_files = results[0][1]
+            self.assertEqual(len(df), 100)
+            self.assertEqual(missing_files, [os.path.join(cache_folder, '202006', 'ag2012_20200601')])
+            df, missing_files = results[2][1]
+            self.assertIsNone(df)
+            self.assertEqual([os.path.basename(f) for f in missing_files], ['rb2010_20200603', 'ag2012_20200603'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Test if FundKline summary hold pnl equals the pnl of all position records
+"""
+import random
+import unittest
+from datetime import datetime, timedelta
+
+from vnpy.component.cta_fund_kline import FundKline
+from vnpy.trader.constant import Direction, Exchange, Offset
+from vnpy.trader.object import TradeData
+
+
+class FakeEngine(object):
+
+    def __init__(self):
+        self.prices = {}
+        self.sizes = {'rb2010.SHFE': 10, 'j2009.DCE': 100}
+
+    def get_price(self, vt_symbol):
+        return self.prices.get(vt_symbol, None)
+
+    def get_size(self, vt_symbol):
+        return self.sizes.get(vt_symbol, 1)
+
+    def write_log(self, msg, strategy_name=None):
+        pass
+
+    def write_error(self, msg, strategy_name=None):
+        pass
+
+
+def create_fund_kline(engine, sample_seconds=0):
+    setting = {'name': 'test_fund', 'para_ma1_len': 5, 'price_tick': 0.01,
+               'underlying_symbol': 'fund', 'sample_seconds': sample_seconds}
+    return FundKline(cta_engine=engine, setting=setting)
+
+
+class TestFundKline(unittest.TestCase):
+
+    def test_hold_pnl(self):
+        rnd = random.Random(0)
+        engine = FakeEngine()
+        fund_kline = create_fund_kline(engine)
+        fund_kline.inited = True
+
+        dt = datetime(2020, 6, 1, 9, 0, 0)
+        positions = {}
+        for i in range(500):
+            vt_symbol = rnd.choice(list(engine.sizes.keys()))
+            symbol, exchange = vt_symbol.split('.')
+            price = float(rnd.randint(3000, 3200))
+            engine.prices[vt_symbol] = price
+            direction = rnd.choice([Direction.LONG, Direction.SHORT])
+            key = (vt_symbol, direction)
+            # 有持仓时，随机平仓
+            offset = Offset.OPEN
+            volume = rnd.randint(1, 5)
+            if positions.get(key, 0) > 0 and rnd.random() < 0.5:
+                offset = Offset.CLOSE
+                volume = rnd.randint(1, positions[key])
+                direction = Direction.SHORT if direction == Direction.LONG else Direction.LONG
+            positions[key] = positions.get(key, 0) + (volume if offset == Offset.OPEN else -volume)
+
+            dt += timedelta(seconds=30)
+            trade = TradeData(gateway_name='backtesting', symbol=symbol, exchange=Exchange(exchange),
+                              orderid=str(i), tradeid=str(i), direction=direction, offset=offset,
+                              price=price, volume=volume, time=dt.strftime('%Y-%m-%d %H:%M:%S'))
+            fund_kline.update_trade(trade)
+
+            for vt_symbol in engine.sizes.keys():
+                engine.prices[vt_symbol] = engine.prices.get(vt_symbol, 3100) + rnd.randint(-5, 5)
+
+            fast_pnl, fast_holded = fund_kline.get_hold_pnl()
+            full_pnl, full_holded = fund_kline.get_hold_pnl(log=True)
+            self.assertAlmostEqual(fast_pnl, full_pnl, places=4)
+            self.assertEqual(fast_holded, full_holded)
+
+        for (vt_symbol, direction), volume in positions.items():
+            summary = fund_kline.long_pos_summary if direction == Direction.LONG else fund_kline.short_pos_summary
+            self.assertEqual(summary.get(vt_symbol, [0, 0, 0])[1], volume)
+
+    def test_sample_time(self):
+        fund_kline = create_fund_kline(FakeEngine(), sample_seconds=60)
+        dt = datetime(2020, 6, 1, 9, 0, 0)
+        self.assertTrue(fund_kline.is_sample_time(dt))
+        fund_kline.update_account(dt, 100000)
+        self.assertFalse(fund_kline.is_sample_time(dt + timedelta(seconds=59)))
+        self.assertTrue(fund_kline.is_sample_time(dt + timedelta(seconds=60)))
+
+        # 缺省每次都更新
+        fund_kline = create_fund_kline(FakeEngine())
+        fund_kline.update_account(dt, 100000)
+        self.assertTrue(fund_kline.is_sample_time(dt))
+
+
+if __name__ == '__main__':
+    unittest.main()
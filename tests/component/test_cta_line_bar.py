@@ -0,0 +1,241 @@
+"""
+Test if CtaLineBar incremental indicator kernels match talib
+"""
+import math
+import random
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+import talib as ta
+
+from vnpy.component.cta_indicator import MacdKernel
+from vnpy.component.cta_line_bar import CtaLineBar, CtaMinuteBar
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData
+from vnpy.trader.utility import round_to
+
+
+class FakeStrategy(object):
+    """K线所需的策略接口"""
+
+    def write_log(self, content):
+        pass
+
+
+def create_bars(count: int, seed: int = 1):
+    """生成随机游走的1分钟bar"""
+    rnd = random.Random(seed)
+    dt = datetime(2020, 1, 2, 9, 0)
+    price = 3000
+    bars = []
+    for i in range(count):
+        open_price = price
+        price = round(price + rnd.randint(-5, 5), 0)
+        bars.append(BarData(
+            gateway_name='',
+            symbol='rb2005',
+            exchange=Exchange.SHFE,
+            datetime=dt + timedelta(minutes=i),
+            trading_day='2020-01-02',
+            volume=rnd.randint(1, 100),
+            open_price=open_price,
+            high_price=max(open_price, price) + rnd.randint(0, 3),
+            low_price=min(open_price, price) - rnd.randint(0, 3),
+            close_price=price))
+    return bars
+
+
+def create_line_bar(use_talib: bool, **kwargs):
+    """创建1分钟K线"""
+    setting = {
+        'name': 'M1',
+        'interval': Interval.SECOND,
+        'bar_interval': 60,
+        'price_tick': 1,
+        'underly_symbol': 'RB',
+        'use_talib': use_talib,
+        'para_pre_len': 20,
+        'para_ma1_len': 5,
+        'para_ma2_len': 10,
+        'para_ma3_len': 60,
+        'para_ema1_len': 7,
+        'para_ema2_len': 21,
+        'para_ema3_len': 120,
+        'para_dmi_len': 14,
+        'para_dmi_max': 101,
+        'para_atr1_len': 10,
+        'para_atr2_len': 26,
+        'para_rsi1_len': 7,
+        'para_rsi2_len': 14,
+        'para_boll_len': 20,
+        'para_boll2_tb_len': 26,
+        'para_kdj_len': 9,
+        'para_macd_fast_len': 12,
+        'para_macd_slow_len': 26,
+        'para_macd_signal_len': 9,
+    }
+    setting.update(kwargs)
+    kline = CtaLineBar(strategy=FakeStrategy(), cb_on_bar=None, setting=setting)
+    kline.max_hold_bars = 300
+    return kline
+
+
+class TestCtaLineBarKernel(unittest.TestCase):
+
+    series_names = [
+        'line_pre_high', 'line_pre_low',
+        'line_ma1', 'line_ma2', 'line_ma3', 'line_ma1_atan',
+        'line_ema1', 'line_ema2', 'line_ema3',
+        'line_adx', 'line_adxr',
+        'line_atr1', 'line_atr2',
+        'line_rsi1', 'line_rsi2',
+        'line_boll_upper', 'line_boll_middle', 'line_boll_lower',
+        'line_boll2_upper', 'line_boll2_middle', 'line_boll2_lower',
+        'line_k', 'line_d', 'line_j',
+        'line_dif', 'line_dea', 'line_macd',
+    ]
+
+    def assert_parity(self, kline_talib, kline_kernel):
+        for name in self.series_names:
+            talib_values = getattr(kline_talib, name)
+            kernel_values = getattr(kline_kernel, name)
+            self.assertEqual(len(talib_values), len(kernel_values), name)
+            for a, b in zip(talib_values, kernel_values):
+                if isinstance(a, float) and math.isnan(a):
+                    self.assertTrue(math.isnan(b), name)
+                else:
+                    # 结果按round_n取整，允许最后一位的差异
+                    self.assertAlmostEqual(a, b, delta=2e-4, msg=name)
+
+    def test_kernel_parity(self):
+        kline_talib = create_line_bar(use_talib=True)
+        kline_kernel = create_line_bar(use_talib=False)
+        for bar in create_bars(800):
+            kline_talib.add_bar(bar)
+            kline_kernel.add_bar(bar)
+
+        self.assertEqual(kline_kernel.ma12_count, kline_talib.ma12_count)
+        self.assertEqual(kline_kernel.cur_macd_count, kline_talib.cur_macd_count)
+        self.assertEqual(kline_kernel.cur_kd_count, kline_talib.cur_kd_count)
+        self.assert_parity(kline_talib, kline_kernel)
+
+    def test_kernel_parity_after_restore(self):
+        bars = create_bars(400, seed=2)
+        kline_talib = create_line_bar(use_talib=True)
+        kline_kernel = create_line_bar(use_talib=False)
+        for bar in bars[:200]:
+            kline_talib.add_bar(bar)
+            kline_kernel.add_bar(bar)
+
+        # 模拟从pickle恢复，计算核需要用已有序列重新预热
+        kline_kernel.kernel_feeds = None
+        kline_kernel.kernels = {}
+
+        for bar in bars[200:]:
+            kline_talib.add_bar(bar)
+            kline_kernel.add_bar(bar)
+        self.assert_parity(kline_talib, kline_kernel)
+
+
+class TestMacdKernel(unittest.TestCase):
+
+    def test_window(self):
+        """收盘价窗口填满后，与talib在滑动窗口上的计算一致（不取整）"""
+        closes = np.array([bar.close_price for bar in create_bars(1000, seed=3)], dtype=float)
+        for window in [30, 40, 100, 300, 500]:
+            kernel = MacdKernel(12, 26, 9, window)
+            for i, close in enumerate(closes):
+                kernel.append(close)
+                dif, dea, macd = ta.MACD(closes[max(i + 1 - window, 0):i + 1], 12, 26, 9)
+                for a, b in [(dif[-1], kernel.dif), (dea[-1], kernel.dea), (macd[-1], kernel.macd)]:
+                    if math.isnan(a):
+                        self.assertTrue(math.isnan(b), window)
+                    else:
+                        self.assertAlmostEqual(a, b, delta=1e-9, msg=window)
+
+        # 窗口较短时在窗口上重新取种子，较长时直接递推
+        self.assertIsNotNone(MacdKernel(12, 26, 9, 300).closes)
+        self.assertIsNone(MacdKernel(12, 26, 9, 2000).closes)
+
+
+class TestCtaLineBarPlan(unittest.TestCase):
+
+    def test_plan_only_declared(self):
+        """只计算已设置参数的指标"""
+        kline = CtaLineBar(strategy=FakeStrategy(), cb_on_bar=None, setting={
+            'name': 'M1',
+            'interval': Interval.SECOND,
+            'bar_interval': 60,
+            'price_tick': 1,
+            'para_ma1_len': 5,
+            'para_active_atan': False,
+            'para_golden_n': 20
+        })
+        for bar in create_bars(100):
+            kline.add_bar(bar)
+
+        func_names = [func_name for func_name, _ in kline.indicator_plan]
+        self.assertIn('_CtaLineBar__count_ma', func_names)
+        self.assertNotIn('_CtaLineBar__count_boll', func_names)
+        self.assertNotIn('_CtaLineBar__count_macd', func_names)
+        self.assertGreater(len(kline.line_ma1), 0)
+        self.assertEqual(len(kline.line_ma1_atan), 0)
+        self.assertEqual(len(kline.line_boll_middle), 0)
+
+        # 黄金分割在读取时计算
+        self.assertIsNotNone(kline.golden_pending_len)
+        hhv = max(kline.high_array[-20:])
+        llv = min(kline.low_array[-20:])
+        self.assertEqual(kline.cur_p500, round_to((hhv + llv) / 2, 1))
+        self.assertIsNone(kline.golden_pending_len)
+        self.assertEqual(kline.cur_p192, round_to(hhv - (hhv - llv) * 0.192, 1))
+
+
+class TestCtaLineBarAddBars(unittest.TestCase):
+
+    def assert_same_state(self, kline_replay, kline_bulk):
+        """批量加载与逐根add_bar的K线状态一致"""
+        self.assertEqual(len(kline_replay.line_bar), len(kline_bulk.line_bar))
+        for bar_replay, bar_bulk in zip(kline_replay.line_bar, kline_bulk.line_bar):
+            self.assertEqual(bar_replay.__dict__, bar_bulk.__dict__)
+        for name in TestCtaLineBarKernel.series_names:
+            self.assertEqual(list(getattr(kline_replay, name)), list(getattr(kline_bulk, name)), name)
+        for name in ['cur_price', 'cur_datetime', 'cur_trading_day', 'bar_len',
+                     'ma12_count', 'cur_macd_count', 'cur_kd_count']:
+            self.assertEqual(getattr(kline_replay, name), getattr(kline_bulk, name), name)
+
+    def test_add_bars_parity(self):
+        kline_replay = create_line_bar(use_talib=False, interval=Interval.MINUTE, bar_interval=5)
+        kline_bulk = create_line_bar(use_talib=False, interval=Interval.MINUTE, bar_interval=5)
+        for bar in create_bars(2000):
+            kline_replay.add_bar(bar)
+        bars = create_bars(2000)
+        kline_bulk.add_bars(bars[:500])
+        kline_bulk.add_bars(bars[500:])
+        self.assert_same_state(kline_replay, kline_bulk)
+
+    def test_minute_bar_add_bars_parity(self):
+        setting = {
+            'name': 'M15',
+            'bar_interval': 15,
+            'price_tick': 1,
+            'underly_symbol': 'RB',
+            'para_ma1_len': 5,
+            'para_ma2_len': 10,
+            'para_kdj_len': 9,
+            'para_macd_fast_len': 12,
+            'para_macd_slow_len': 26,
+            'para_macd_signal_len': 9
+        }
+        kline_replay = CtaMinuteBar(strategy=FakeStrategy(), cb_on_bar=None, setting=dict(setting))
+        kline_bulk = CtaMinuteBar(strategy=FakeStrategy(), cb_on_bar=None, setting=dict(setting))
+        for bar in create_bars(2000):
+            kline_replay.add_bar(bar)
+        kline_bulk.add_bars(create_bars(2000))
+        self.assert_same_state(kline_replay, kline_bulk)
+        self.assertEqual(kline_replay.bars_count, kline_bulk.bars_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
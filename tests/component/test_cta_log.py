@@ -0,0 +1,81 @@
+"""
+Test level-gated logging helpers and the jsonl trade journal
+"""
+import json
+import logging
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from vnpy.component.cta_line_bar import CtaLineBar
+from vnpy.component.cta_log import LOG_SILENT, TradeJournal, format_log, get_log_level, to_record
+from vnpy.trader.constant import Direction, Exchange, Offset
+from vnpy.trader.object import TradeData
+
+
+class LogStrategy(object):
+    """只记录INFO以上级别日志的策略"""
+
+    def __init__(self, log_level):
+        self.log_level = log_level
+        self.logs = []
+
+    def is_log_enabled(self, level=logging.INFO):
+        return level >= self.log_level
+
+    def write_log(self, msg, level=logging.INFO):
+        if self.is_log_enabled(level):
+            self.logs.append(format_log(msg))
+
+
+class TestCtaLog(unittest.TestCase):
+
+    def test_log_level(self):
+        self.assertEqual(get_log_level('info'), logging.INFO)
+        self.assertEqual(get_log_level('silent'), LOG_SILENT)
+        self.assertEqual(get_log_level(None, default=logging.ERROR), logging.ERROR)
+        self.assertEqual(get_log_level(logging.WARNING), logging.WARNING)
+
+    def test_line_bar_lazy_log(self):
+        calls = []
+
+        def build_msg():
+            calls.append(1)
+            return 'msg'
+
+        strategy = LogStrategy(logging.ERROR)
+        kline = CtaLineBar(strategy=strategy, cb_on_bar=lambda bar: None, setting={'name': 'M1', 'bar_interval': 1})
+        kline.write_log(build_msg)
+        self.assertEqual(calls, [])
+        self.assertEqual(strategy.logs, [])
+
+        strategy.log_level = logging.DEBUG
+        kline.write_log(build_msg)
+        self.assertEqual(calls, [1])
+        self.assertEqual(strategy.logs[-1], '[M1]msg')
+
+    def test_trade_journal(self):
+        trade = TradeData(gateway_name='backtesting', symbol='rb2010', exchange=Exchange.SHFE, orderid='1',
+                          tradeid='1', direction=Direction.LONG, offset=Offset.OPEN, price=3500.0, volume=2,
+                          time='2020-06-01 09:00:00', datetime=datetime(2020, 6, 1, 9))
+        record = to_record(trade)
+        self.assertEqual(record['exchange'], 'SHFE')
+        self.assertEqual(record['direction'], Direction.LONG.value)
+        self.assertEqual(record['datetime'], '2020-06-01T09:00:00')
+
+        with tempfile.TemporaryDirectory() as folder:
+            file_name = os.path.join(folder, 'test_trade.jsonl')
+            journal = TradeJournal(file_name)
+            for _ in range(3):
+                journal.write(to_record(trade, ['vt_symbol', 'price', 'volume', 'offset']))
+            journal.close()
+            with open(file_name, encoding='utf8') as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[0], {'vt_symbol': 'rb2010.SHFE', 'price': 3500.0, 'volume': 2,
+                                      'offset': Offset.OPEN.value})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+"""
+Test portfolio optimizer: parameter scoping, target extraction, result ordering
+and running through the process pool with fork/spawn start methods
+"""
+import multiprocessing
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import pandas as pd
+
+from vnpy.component.cta_prune import Pruner
+
+try:
+    from vnpy.app.cta_strategy_pro import optimization
+    from vnpy.app.cta_strategy_pro.spread_testing import SpreadTestingEngine
+except ImportError:
+    # 组合回测引擎依赖的包未安装
+    optimization = None
+
+STRATEGY_SETTING = {
+    'rb_turtle': {'class_name': 'TurtleStrategy', 'vt_symbol': 'rb2010.SHFE',
+                  'setting': {'x': 1, 'y': 1, 'window': {'fast': 5, 'slow': 20}}},
+    'rb.j_spread': {'class_name': 'SpreadStrategy', 'vt_symbol': 'rb2010-j2009.SPD',
+                    'setting': {'x': 2}},
+    'hc_turtle': {'class_name': 'TurtleStrategy', 'vt_symbol': 'hc2010.SHFE'}
+}
+
+
+class FakeEngine(object):
+    """
+    测试用组合回测引擎
+    目标值 profit = x * 10 - y（rb_turtle）
+    x == 0 回测异常，x == 4 被剪枝，y == 99 统计数据没有profit
+    """
+
+    def __init__(self):
+        self.shared_bar_df_dict = {}
+        self.test_setting = None
+        self.strategy_setting = None
+        self.pruner = None
+        self.net_capital = 1000000
+        self.daily_max_drawdown_rate = 5
+
+    def prepare_env(self, test_setting: dict):
+        self.test_setting = test_setting
+
+    def load_all_bar_df(self):
+        df = pd.DataFrame({'close': [1.0, 2.0, 3.0]})
+        return {'rb2010.SHFE': df}.items()
+
+    def run_portfolio_test(self, strategy_setting: dict):
+        self.strategy_setting = strategy_setting
+        setting = strategy_setting['rb_turtle']['setting']
+        if setting['x'] == 0:
+            raise ValueError('bad x')
+        if setting['x'] == 4:
+            self.pruner = Pruner({})
+            self.pruner.pruned = True
+            self.pruner.reason = 'test'
+
+    def get_result(self):
+        setting = self.strategy_setting['rb_turtle']['setting']
+        d = {
+            'drawdown_list': [0, -3, -1],
+            'pnl_list': [1, 2],
+            'shared_bars': len(self.shared_bar_df_dict.get('rb2010.SHFE', [])),
+            'silent': self.test_setting.get('silent')
+        }
+        if setting['y'] != 99:
+            d['profit'] = setting['x'] * 10 - setting['y']
+        return d, [], []
+
+
+@unittest.skipIf(optimization is None, 'cta_strategy_pro dependencies not installed')
+class TestApplyParameters(unittest.TestCase):
+
+    def test_scope(self):
+        new_setting = optimization.apply_parameters(STRATEGY_SETTING, {
+            'x': 3,
+            'rb_turtle.y': 7,
+            'rb.j_spread.z': 9,
+            'other.y': 1
+        })
+        # 全局参数更新所有策略实例，没有setting的策略实例自动创建
+        self.assertEqual([s['setting']['x'] for s in new_setting.values()], [3, 3, 3])
+        # 指定策略实例（实例名含'.'）
+        self.assertEqual(new_setting['rb_turtle']['setting']['y'], 7)
+        self.assertEqual(new_setting['rb.j_spread']['setting']['z'], 9)
+        self.assertNotIn('z', new_setting['rb_turtle']['setting'])
+        # 前缀不是策略实例名的，作为全局参数名
+        self.assertEqual([s['setting']['other.y'] for s in new_setting.values()], [1, 1, 1])
+        # 嵌套配置保留，原配置不变
+        self.assertEqual(new_setting['rb_turtle']['setting']['window'], {'fast': 5, 'slow': 20})
+        self.assertIsNot(new_setting['rb_turtle']['setting']['window'], STRATEGY_SETTING['rb_turtle']['setting']['window'])
+        self.assertEqual(STRATEGY_SETTING['rb_turtle']['setting'], {'x': 1, 'y': 1, 'window': {'fast': 5, 'slow': 20}})
+        self.assertNotIn('setting', STRATEGY_SETTING['hc_turtle'])
+
+    def test_replace_nested(self):
+        new_setting = optimization.apply_parameters(STRATEGY_SETTING, {'rb_turtle.window': {'fast': 10}})
+        self.assertEqual(new_setting['rb_turtle']['setting']['window'], {'fast': 10})
+        self.assertEqual(STRATEGY_SETTING['rb_turtle']['setting']['window'], {'fast': 5, 'slow': 20})
+
+
+@unittest.skipIf(optimization is None, 'cta_strategy_pro dependencies not installed')
+class TestOptimize(unittest.TestCase):
+
+    def optimize(self, parameters):
+        test_setting = optimization.get_test_setting({'name': 'test', 'save_mongo': True})
+        return optimization.optimize(FakeEngine, test_setting, STRATEGY_SETTING, parameters, 'profit')
+
+    def test_target(self):
+        parameters, target, statistics = self.optimize({'rb_turtle.x': 2, 'rb_turtle.y': 3})
+        self.assertEqual(parameters, {'rb_turtle.x': 2, 'rb_turtle.y': 3})
+        self.assertEqual(target, 17)
+        self.assertEqual(statistics['max_drawdown'], -3)
+        self.assertEqual(statistics['max_drawdown_rate'], 5)
+        self.assertEqual(statistics['net_capital'], 1000000)
+        self.assertTrue(statistics['silent'])
+        self.assertNotIn('pnl_list', statistics)
+        self.assertNotIn('drawdown_list', statistics)
+
+    def test_missing_target(self):
+        # 统计数据没有优化目标
+        _, target, statistics = self.optimize({'rb_turtle.y': 99})
+        self.assertIsNone(target)
+        self.assertNotIn('profit', statistics)
+
+        # 回测异常
+        _, target, statistics = self.optimize({'rb_turtle.x': 0})
+        self.assertIsNone(target)
+        self.assertEqual(statistics['error'], 'bad x')
+
+    def test_sort(self):
+        results = [self.optimize({'rb_turtle.x': x}) for x in [1, 0, 4, 3, 2]]
+        ranked = [result[0]['rb_turtle.x'] for result in optimization.sort_results(results)]
+        # 未剪枝的按目标值，没有目标值的在后，被剪枝的最后
+        self.assertEqual(ranked, [3, 2, 1, 0, 4])
+
+        df = optimization.PortfolioOptimizer({}, STRATEGY_SETTING).get_result_df(optimization.sort_results(results))
+        self.assertEqual(list(df.index), [1, 2, 3, 4, 5])
+        self.assertEqual(list(df['rb_turtle.x']), [3, 2, 1, 0, 4])
+        self.assertEqual(df.loc[1, 'target'], 29)
+
+
+@unittest.skipIf(optimization is None, 'cta_strategy_pro dependencies not installed')
+class TestPortfolioOptimizer(unittest.TestCase):
+
+    def run_optimizer(self):
+        optimizer = optimization.PortfolioOptimizer({'name': 'test'}, STRATEGY_SETTING,
+                                                    engine_class=FakeEngine, max_workers=2)
+        optimizer.output = lambda msg: None
+        setting = optimization.OptimizationSetting()
+        setting.add_parameter('rb_turtle.x', 1, 4, 1)
+        setting.add_values('y', [1, 99])
+        setting.set_target('profit')
+        return optimizer.run_optimization(setting, output=False)
+
+    def check_results(self, results):
+        self.assertEqual(len(results), 8)
+        self.assertEqual(results[0][0], {'rb_turtle.x': 3, 'y': 1})
+        self.assertEqual(results[0][1], 29)
+        self.assertEqual([result[1] for result in results[3:6]], [None] * 3)
+        self.assertTrue(all(optimization.is_pruned(result) for result in results[6:]))
+        # 每个工作进程都收到父进程预先加载的bar数据
+        self.assertTrue(all(result[2]['shared_bars'] == 3 for result in results))
+        self.assertEqual(optimization.worker_bar_df_dict, {})
+
+    @unittest.skipIf('fork' not in multiprocessing.get_all_start_methods(), 'fork not supported')
+    def test_fork(self):
+        self.check_results(self.run_optimizer())
+
+    def test_spawn(self):
+        with mock.patch.object(optimization.multiprocessing, 'get_all_start_methods', return_value=['spawn']):
+            self.check_results(self.run_optimizer())
+
+
+@unittest.skipIf(optimization is None, 'cta_strategy_pro dependencies not installed')
+class TestSpreadTestingPrune(unittest.TestCase):
+
+    def test_prune(self):
+        """价差回测引擎每个交易日结束后检查剪枝规则"""
+        engine = SpreadTestingEngine()
+        engine.write_log = lambda *args, **kwargs: None
+        engine.output = lambda msg: None
+        engine.pruner = Pruner({'check_days': 1, 'min_capital': 10 ** 12})
+        engine.data_start_date = datetime(2020, 6, 1)
+        engine.data_end_date = datetime(2020, 6, 5)
+
+        def get_day_tick_df(test_day):
+            tick = {'datetime': test_day.replace(hour=10), 'vt_symbol': 'rb2010.SHFE',
+                    'trading_day': test_day.strftime('%Y-%m-%d'), 'last_price': 3000, 'volume': 1,
+                    'ask_price_1': 3001, 'ask_volume_1': 1, 'bid_price_1': 2999, 'bid_volume_1': 1}
+            return pd.DataFrame([tick]).set_index(['datetime', 'vt_symbol'])
+
+        engine.get_day_tick_df = get_day_tick_df
+        engine.run_tick_test()
+
+        self.assertTrue(engine.pruner.pruned)
+        self.assertEqual(engine.pruner.prune_date, datetime(2020, 6, 1))
+        self.assertEqual(engine.pruner.days, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
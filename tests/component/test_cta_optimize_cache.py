@@ -0,0 +1,64 @@
+"""
+Test optimization result cache keyed by strategy/parameters fingerprint
+"""
+import os
+import tempfile
+import unittest
+from datetime import date, datetime
+
+import numpy as np
+
+from vnpy.component.cta_optimize_cache import OptimizationCache, get_fingerprint
+from vnpy.trader.constant import Interval
+
+
+class CacheStrategy(object):
+    """测试用策略类"""
+    pass
+
+
+class TestOptimizationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.parameters = {'vt_symbol': 'rb2010.SHFE', 'interval': Interval.MINUTE,
+                           'start': datetime(2020, 1, 1), 'end': datetime(2020, 6, 30),
+                           'rate': 0.0001, 'slippage': 1, 'size': 10, 'pricetick': 1}
+
+    def test_fingerprint(self):
+        fingerprint = get_fingerprint(CacheStrategy, self.parameters)
+        self.assertEqual(fingerprint, get_fingerprint(CacheStrategy, dict(self.parameters)))
+
+        # 数据范围、引擎参数、策略类不同，指纹不同
+        for name, value in [('end', datetime(2020, 7, 31)), ('slippage', 2)]:
+            parameters = dict(self.parameters)
+            parameters[name] = value
+            self.assertNotEqual(fingerprint, get_fingerprint(CacheStrategy, parameters))
+        self.assertNotEqual(fingerprint, get_fingerprint(TestOptimizationCache, self.parameters))
+
+    def test_get_set(self):
+        fingerprint = get_fingerprint(CacheStrategy, self.parameters)
+        statistics = {'start_date': date(2020, 1, 2), 'total_net_pnl': np.float64(1234.5),
+                      'total_trade_count': np.int64(12), 'sharpe_ratio': np.nan_to_num(1.5)}
+
+        with tempfile.TemporaryDirectory() as folder:
+            file_name = os.path.join(folder, 'optimization.db')
+            cache = OptimizationCache(file_name)
+            self.assertIsNone(cache.get(fingerprint, {'fast_window': 5, 'slow_window': 30}))
+            cache.set(fingerprint, {'fast_window': 5, 'slow_window': 30}, statistics)
+            cache.close()
+
+            # 重新打开，参数顺序不同也能读取
+            cache = OptimizationCache(file_name)
+            result = cache.get(fingerprint, {'slow_window': 30, 'fast_window': 5})
+            self.assertEqual(result, {'start_date': '2020-01-02', 'total_net_pnl': 1234.5,
+                                      'total_trade_count': 12, 'sharpe_ratio': 1.5})
+            self.assertIsNone(cache.get('other', {'fast_window': 5, 'slow_window': 30}))
+            self.assertEqual(cache.count(fingerprint), 1)
+
+            cache.clear(fingerprint)
+            self.assertEqual(cache.count(fingerprint), 0)
+            cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+Test if BacktestOrderBook selects the same orders as scanning the whole dict
+"""
+import copy
+import random
+import unittest
+
+from vnpy.component.cta_order_book import BacktestOrderBook, StopOrderBook
+from vnpy.trader.constant import Direction, Exchange, Offset
+from vnpy.trader.object import OrderData
+
+
+def create_order(orderid, symbol, direction, price):
+    return OrderData(gateway_name='backtesting', symbol=symbol, exchange=Exchange.SHFE, orderid=orderid,
+                     direction=direction, offset=Offset.OPEN, price=price, volume=1)
+
+
+def scan_crossed(orders, vt_symbol, buy_cross_price, sell_cross_price):
+    """原有的撮合遍历方式"""
+    return [vt_orderid for vt_orderid, order in orders.items()
+            if order.vt_symbol == vt_symbol
+            and ((order.direction == Direction.LONG and order.price >= buy_cross_price)
+                 or (order.direction == Direction.SHORT and order.price <= sell_cross_price))]
+
+
+class TestBacktestOrderBook(unittest.TestCase):
+
+    def test_crossed(self):
+        rnd = random.Random(0)
+        book = BacktestOrderBook()
+        orders = {}
+        for i in range(2000):
+            order = create_order(str(i), rnd.choice(['rb2010', 'j2009', 'ag2012']),
+                                 rnd.choice([Direction.LONG, Direction.SHORT, Direction.NET]),
+                                 float(rnd.randint(90, 110)))
+            book[order.vt_orderid] = order
+            orders[order.vt_orderid] = order
+
+            # 随机撤单
+            if rnd.random() < 0.3:
+                vt_orderid = rnd.choice(list(orders.keys()))
+                if rnd.random() < 0.5:
+                    del book[vt_orderid]
+                else:
+                    book.pop(vt_orderid)
+                orders.pop(vt_orderid)
+
+            if i % 50 == 0:
+                low = float(rnd.randint(90, 110))
+                high = low + rnd.randint(0, 5)
+                for vt_symbol in ['rb2010.SHFE', 'j2009.SHFE', 'ag2012.SHFE', 'cu2010.SHFE']:
+                    # 限价单: 买单价格 >= 穿越价，卖单价格 <= 穿越价
+                    self.assertEqual(book.get_crossed(vt_symbol, long_low=low, short_high=high),
+                                     scan_crossed(orders, vt_symbol, low, high))
+
+        self.assertEqual(dict(book), orders)
+        self.assertEqual(list(book.keys()), list(orders.keys()))
+
+    def test_stop_crossed(self):
+        book = BacktestOrderBook()
+        for i, (direction, price) in enumerate([(Direction.LONG, 100), (Direction.SHORT, 100),
+                                                (Direction.LONG, 95), (Direction.SHORT, 105)]):
+            order = create_order(str(i), 'rb2010', direction, float(price))
+            book[order.vt_orderid] = order
+        # 停止单: 买单价格 <= 触发价，卖单价格 >= 触发价
+        self.assertEqual(book.get_crossed('rb2010.SHFE', long_high=98, short_low=102),
+                         ['backtesting.2', 'backtesting.3'])
+        self.assertEqual(book.get_orders('rb2010.SHFE', Direction.LONG), ['backtesting.2', 'backtesting.0'])
+
+    def test_copy(self):
+        book = BacktestOrderBook()
+        order = create_order('1', 'rb2010', Direction.LONG, 100.0)
+        book[order.vt_orderid] = order
+        for new_book in [copy.deepcopy(book), book.copy()]:
+            self.assertEqual(new_book.get_crossed('rb2010.SHFE', long_low=99), ['backtesting.1'])
+        book.clear()
+        self.assertEqual(book.get_crossed('rb2010.SHFE', long_low=99), [])
+
+
+class TestStopOrderBook(unittest.TestCase):
+
+    def test_triggered(self):
+        rnd = random.Random(1)
+        book = StopOrderBook()
+        orders = {}
+        last_prices = {'rb2010.SHFE': 100.0, 'j2009.SHFE': 100.0}
+        for i in range(3000):
+            vt_symbol = rnd.choice(list(last_prices.keys()))
+            order = create_order(str(i), vt_symbol.split('.')[0], rnd.choice([Direction.LONG, Direction.SHORT]),
+                                 last_prices[vt_symbol] + rnd.randint(-20, 20))
+            book[order.vt_orderid] = order
+            orders[order.vt_orderid] = order
+
+            if rnd.random() < 0.3:
+                vt_orderid = rnd.choice(list(orders.keys()))
+                book.pop(vt_orderid)
+                orders.pop(vt_orderid)
+
+            last_prices[vt_symbol] += rnd.randint(-3, 3)
+            last_price = last_prices[vt_symbol]
+            # 原check_stop_order的触发条件
+            expected = [vt_orderid for vt_orderid, o in orders.items()
+                        if o.vt_symbol == vt_symbol
+                        and ((o.direction == Direction.LONG and last_price >= o.price)
+                             or (o.direction == Direction.SHORT and last_price <= o.price))]
+            triggered = book.get_triggered(vt_symbol, last_price)
+            self.assertEqual(triggered, expected)
+            # 部分发单成功，从簿中移除
+            for vt_orderid in triggered[::2]:
+                book.pop(vt_orderid)
+                orders.pop(vt_orderid)
+
+        self.assertEqual(list(book.keys()), list(orders.keys()))
+        # 失效项已被清理
+        for vt_symbol, heaps in book.heaps.items():
+            self.assertLessEqual(sum(len(heap) for heap in heaps.values()), 2 * book.live_counts[vt_symbol] + 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
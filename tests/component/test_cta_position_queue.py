@@ -0,0 +1,87 @@
+"""
+Test if PositionQueue matches open trades the same way as scanning the position list
+"""
+import random
+import unittest
+
+from vnpy.component.cta_position_queue import PositionQueue
+
+
+class OpenTrade(object):
+
+    def __init__(self, tradeid, strategy_name, vt_symbol, volume):
+        self.tradeid = tradeid
+        self.strategy_name = strategy_name
+        self.vt_symbol = vt_symbol
+        self.volume = volume
+
+
+def list_close(position_list, strategy_name, vt_symbol, close_volume):
+    """原有的平仓撮合方式：查找第一笔同策略、同合约的开仓单，部分平仓后放回末尾"""
+    matched = []
+    while close_volume > 0:
+        pop_indexs = [i for i, val in enumerate(position_list) if
+                      val.vt_symbol == vt_symbol and val.strategy_name == strategy_name]
+        open_trade = position_list.pop(pop_indexs[0])
+        if close_volume >= open_trade.volume:
+            matched.append((open_trade.tradeid, open_trade.volume))
+            close_volume -= open_trade.volume
+        else:
+            matched.append((open_trade.tradeid, close_volume))
+            open_trade.volume -= close_volume
+            position_list.append(open_trade)
+            close_volume = 0
+    return matched
+
+
+def queue_close(queue, strategy_name, vt_symbol, close_volume):
+    matched = []
+    while close_volume > 0:
+        open_trade = queue.popleft(strategy_name, vt_symbol)
+        if close_volume >= open_trade.volume:
+            matched.append((open_trade.tradeid, open_trade.volume))
+            close_volume -= open_trade.volume
+        else:
+            matched.append((open_trade.tradeid, close_volume))
+            open_trade.volume -= close_volume
+            queue.append(open_trade)
+            close_volume = 0
+    return matched
+
+
+class TestPositionQueue(unittest.TestCase):
+
+    def test_fifo(self):
+        rnd = random.Random(0)
+        position_list = []
+        queue = PositionQueue()
+        for i in range(3000):
+            strategy_name = rnd.choice(['s1', 's2'])
+            vt_symbol = rnd.choice(['rb2010.SHFE', 'j2009.DCE', 'ag2012.SHFE'])
+            holding = sum(t.volume for t in position_list
+                          if t.strategy_name == strategy_name and t.vt_symbol == vt_symbol)
+            self.assertEqual(holding, sum(queue.get_volumes(strategy_name, vt_symbol)))
+            self.assertEqual(queue.count(strategy_name, vt_symbol),
+                             sum(1 for t in position_list
+                                 if t.strategy_name == strategy_name and t.vt_symbol == vt_symbol))
+
+            if holding > 0 and rnd.random() < 0.4:
+                close_volume = rnd.randint(1, holding)
+                self.assertEqual(list_close(position_list, strategy_name, vt_symbol, close_volume),
+                                 queue_close(queue, strategy_name, vt_symbol, close_volume))
+            else:
+                volume = rnd.randint(1, 5)
+                position_list.append(OpenTrade(str(i), strategy_name, vt_symbol, volume))
+                queue.append(OpenTrade(str(i), strategy_name, vt_symbol, volume))
+
+            # 遍历顺序一致
+            self.assertEqual([(t.tradeid, t.volume) for t in position_list],
+                             [(t.tradeid, t.volume) for t in queue])
+            self.assertEqual(len(position_list), len(queue))
+
+        self.assertIsNone(queue.popleft('s3', 'rb2010.SHFE'))
+        self.assertEqual(queue.count('s3', 'rb2010.SHFE'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
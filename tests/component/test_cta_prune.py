@@ -0,0 +1,80 @@
+"""
+Test prune rules, halving windows and optimization result ordering
+"""
+import unittest
+from datetime import date, datetime, timedelta
+
+from vnpy.component.cta_prune import Pruner, get_halving_ends, get_survivor_count, sort_key
+
+
+def no_profit_rule(checkpoint):
+    """自定义规则：检查点净值不高于期初"""
+    if checkpoint['days'] >= 3 and checkpoint['balance'] <= 100:
+        return 'no profit'
+
+
+class TestPruner(unittest.TestCase):
+
+    def run_days(self, pruner, balances, trade_counts=None):
+        trade_counts = trade_counts or [0] * len(balances)
+        d = date(2020, 1, 1)
+        for i, (balance, trade_count) in enumerate(zip(balances, trade_counts)):
+            if pruner.on_day(d + timedelta(days=i), balance, trade_count):
+                return i
+        return None
+
+    def test_drawdown_rate(self):
+        pruner = Pruner({'check_days': 2, 'max_drawdown_rate': 20})
+        # 第4天回撤25%，第4天为检查点
+        self.assertEqual(self.run_days(pruner, [100, 120, 110, 90, 130, 140]), 3)
+        self.assertTrue(pruner.pruned)
+        self.assertEqual(pruner.prune_date, date(2020, 1, 4))
+        self.assertEqual(len(pruner.checkpoints), 2)
+        self.assertEqual(pruner.checkpoints[-1]['max_drawdown'], 30)
+        statistics = pruner.get_statistics()
+        self.assertTrue(statistics['pruned'])
+        self.assertEqual(statistics['prune_days'], 4)
+
+    def test_check_days(self):
+        # 回撤发生在检查点之间，由检查点的期间最大回撤触发
+        pruner = Pruner({'check_days': 3, 'max_drawdown': 15})
+        self.assertEqual(self.run_days(pruner, [100, 80, 100, 100]), 2)
+
+        # 未到最少交易日，不检查
+        pruner = Pruner({'check_days': 1, 'min_days': 3, 'min_capital': 90})
+        self.assertEqual(self.run_days(pruner, [80, 80, 95, 85]), 3)
+
+    def test_trade_count(self):
+        pruner = Pruner({'check_days': 1, 'min_trade_count': 2, 'trade_count_days': 3})
+        self.assertIsNone(self.run_days(pruner, [100] * 5, [0, 0, 2, 2, 3]))
+        pruner = Pruner({'check_days': 1, 'min_trade_count': 2, 'trade_count_days': 3})
+        self.assertEqual(self.run_days(pruner, [100] * 5, [0, 0, 1, 2, 3]), 2)
+
+    def test_custom_rule(self):
+        pruner = Pruner({'check_days': 1, 'rules': [no_profit_rule]})
+        self.assertEqual(self.run_days(pruner, [100, 105, 100, 110]), 2)
+        self.assertEqual(pruner.reason, 'no profit')
+
+    def test_halving(self):
+        start = datetime(2018, 1, 1)
+        end = datetime(2020, 4, 1)
+        ends = get_halving_ends(start, end, rungs=3, eta=3)
+        self.assertEqual(len(ends), 3)
+        self.assertEqual(ends[0], start + (end - start) / 9)
+        self.assertEqual(ends[1], start + (end - start) / 3)
+        self.assertEqual(ends[2], end)
+        self.assertEqual(get_survivor_count(10, 3), 4)
+        self.assertEqual(get_survivor_count(2, 3), 1)
+
+    def test_sort(self):
+        results = [
+            ('a', 10, {'pruned': True}),
+            ('b', 5, {}),
+            ('c', None, {}),
+            ('d', 8, {'pruned': False})
+        ]
+        self.assertEqual([r[0] for r in sorted(results, key=sort_key, reverse=True)], ['d', 'b', 'c', 'a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
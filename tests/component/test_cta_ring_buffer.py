@@ -0,0 +1,56 @@
+"""
+Test if RingBuffer behaves like the fixed numpy array / list it replaces
+"""
+import pickle
+import unittest
+
+import numpy as np
+
+from vnpy.component.cta_ring_buffer import RingBuffer
+
+
+class TestRingBuffer(unittest.TestCase):
+
+    def test_fixed_array(self):
+        """定长数组：与 arr[:-1] = arr[1:]; arr[-1] = x 平移结果一致"""
+        ring = RingBuffer(5, fixed=True, fill=np.nan)
+        array = np.zeros(5)
+        array[:] = np.nan
+        for i in range(12):
+            ring.append(i)
+            array[:-1] = array[1:]
+            array[-1] = i
+            np.testing.assert_array_equal(ring.array, array)
+        self.assertEqual(len(ring), 5)
+        self.assertEqual(ring[-1], 11)
+        self.assertEqual(ring[0], 7)
+
+    def test_list_compatible(self):
+        """指标序列：与list的 append / del x[0] / pop(0) / 切片 一致"""
+        ring = RingBuffer(4)
+        data = []
+        for i in range(20):
+            ring.append(i)
+            data.append(i)
+            if len(data) > 6:
+                del ring[0]
+                del data[0]
+            if i % 5 == 0:
+                self.assertEqual(ring.pop(0), data.pop(0))
+            self.assertEqual(ring, data)
+            self.assertEqual(ring[-3:], data[-3:])
+            self.assertEqual(list(reversed(ring)), list(reversed(data)))
+
+        ring[-1] = 100
+        data[-1] = 100
+        self.assertEqual(ring, data)
+        self.assertEqual([0] * 2 + ring, [0] * 2 + data)
+
+        ring = pickle.loads(pickle.dumps(ring))
+        ring.append(21)
+        data.append(21)
+        self.assertEqual(ring, data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Test if SharedBarData restores the same bars in this process and in spawned worker processes
+"""
+import multiprocessing
+import pickle
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from vnpy.component.cta_shared_bars import SharedBarData
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData
+
+
+def create_bars(tz=None, count=500):
+    dt = datetime(2020, 6, 1, 9, 0, 0, 500, tzinfo=tz)
+    bars = []
+    for i in range(count):
+        bars.append(BarData(gateway_name='DB', symbol='rb2010', exchange=Exchange.SHFE,
+                            datetime=dt + timedelta(minutes=i), trading_day='2020-06-01',
+                            interval=Interval.MINUTE, volume=100 + i, open_interest=1000 + i,
+                            open_price=3500 + i, high_price=3510 + i, low_price=3490 + i,
+                            close_price=3505.5 + i))
+    return bars
+
+
+def get_worker_bars(shared: SharedBarData):
+    """工作进程内挂接共享内存，返回bar的属性"""
+    bars = shared.get_bars()
+    result = [bar.__dict__.copy() for bar in bars]
+    shared.close()
+    return result
+
+
+class TestSharedBarData(unittest.TestCase):
+
+    def assert_same_bars(self, bars, shared_bars):
+        self.assertEqual(len(bars), len(shared_bars))
+        for bar, shared_bar in zip(bars, shared_bars):
+            shared_dict = shared_bar if isinstance(shared_bar, dict) else shared_bar.__dict__
+            self.assertEqual(bar.__dict__, shared_dict)
+
+    def test_restore(self):
+        for tz in [None, timezone(timedelta(hours=8))]:
+            bars = create_bars(tz)
+            shared = SharedBarData.from_bars(bars)
+            try:
+                self.assert_same_bars(bars, shared.get_bars())
+                # 挂接方只接收名称与元数据
+                attached = pickle.loads(pickle.dumps(shared))
+                self.assertIsNone(attached.shm)
+                self.assertFalse(attached.owner)
+                self.assert_same_bars(bars, attached.get_bars())
+                self.assertIs(attached.get_bars(), attached.get_bars())
+                attached.close()
+            finally:
+                shared.unlink()
+
+    def test_spawn_worker(self):
+        bars = create_bars(count=2000)
+        shared = SharedBarData.from_bars(bars)
+        try:
+            ctx = multiprocessing.get_context('spawn')
+            with ctx.Pool(2) as pool:
+                results = pool.map(get_worker_bars, [shared, shared])
+            for result in results:
+                self.assert_same_bars(bars, result)
+        finally:
+            shared.unlink()
+
+    def test_window(self):
+        for tz in [None, timezone(timedelta(hours=8))]:
+            bars = create_bars(tz)
+            shared = SharedBarData.from_bars(bars)
+            try:
+                end = datetime(2020, 6, 1, 10, 0, 0, 500)
+                self.assert_same_bars(bars[:61], shared.get_bars(end=end))
+                self.assertIs(shared.get_bars(end=datetime(2021, 1, 1)), shared.get_bars())
+                self.assertEqual(shared.get_bars(end=datetime(2020, 1, 1)), [])
+                self.assert_same_bars(bars[30:61], shared.get_bars(start=datetime(2020, 6, 1, 9, 30), end=end))
+                self.assertIs(shared.get_bars(start=datetime(2020, 1, 1)), shared.get_bars())
+            finally:
+                shared.unlink()
+
+    def test_empty(self):
+        with self.assertRaises(ValueError):
+            SharedBarData.from_bars([])
+
+
+if __name__ == '__main__':
+    unittest.main()
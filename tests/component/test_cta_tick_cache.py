@@ -0,0 +1,87 @@
+"""
+Test if the columnar tick cache round-trips bz2 pickle tick caches
+"""
+import os
+import bz2
+import pickle
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from vnpy.component.cta_tick_cache import (
+    save_tick_cache,
+    load_tick_cache,
+    load_tick_array,
+    array_to_ticks,
+    array_to_df,
+    convert_cache_folder,
+    get_codecs
+)
+
+
+def create_ticks(count: int = 500):
+    """tdx分笔成交格式的tick"""
+    start = datetime(2020, 6, 1, 21, 0, 0)
+    return [{
+        'hour': 21,
+        'minute': i // 60,
+        'price': 3500 + i * 0.5,
+        'volume': i % 7,
+        'zengcang': i % 3 - 1,
+        'nature_name': '多开' if i % 2 else '空平',
+        'datetime': start + timedelta(seconds=i // 2)
+    } for i in range(count)]
+
+
+class TestCtaTickCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_folder = self.temp_dir.name
+        self.ticks = create_ticks()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def save_bz2(self, file_name):
+        folder = os.path.join(self.cache_folder, '202006')
+        os.makedirs(folder, exist_ok=True)
+        with bz2.BZ2File(os.path.join(folder, file_name), 'wb') as f:
+            pickle.dump(self.ticks, f)
+
+    def test_round_trip(self):
+        for compress in [None] + list(get_codecs().keys()):
+            file_path = save_tick_cache(os.path.join(self.cache_folder, 'rb2010_20200601'), self.ticks,
+                                        compress=compress)
+            array = load_tick_cache(file_path)
+            self.assertEqual(array_to_ticks(array), self.ticks)
+
+            array = load_tick_cache(file_path, fields=['datetime', 'price'])
+            self.assertEqual(array.dtype.names, ('price', 'datetime'))
+            self.assertEqual(array['price'].tolist(), [t['price'] for t in self.ticks])
+
+    def test_convert_and_load(self):
+        self.save_bz2('rb2010_20200601.pkz2')
+        bz2_array = load_tick_array(self.cache_folder, 'rb2010', '20200601')
+
+        new_files = convert_cache_folder(self.cache_folder)
+        self.assertEqual([os.path.basename(f) for f in new_files], ['rb2010_20200601.npy'])
+        self.assertEqual(convert_cache_folder(self.cache_folder), [])
+
+        array = load_tick_array(self.cache_folder, 'rb2010', '20200601')
+        self.assertIsInstance(array, np.memmap)
+        self.assertTrue(np.array_equal(array, bz2_array))
+        self.assertIsNone(load_tick_array(self.cache_folder, 'rb2010', '20200602'))
+
+    def test_array_to_df(self):
+        file_path = save_tick_cache(os.path.join(self.cache_folder, 'rb2010_20200601'), self.ticks)
+        df = array_to_df(load_tick_cache(file_path))
+        self.assertEqual(len(df), len({t['datetime'] for t in self.ticks}))
+        self.assertEqual(df.index[1].to_pydatetime(), self.ticks[2]['datetime'])
+        self.assertEqual(df['price'].iloc[1], self.ticks[2]['price'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,4 @@
+from .test_metrics import *
+from .test_engine_shard import *
+from .test_engine_conflate import *
+from .test_engine_priority import *
@@ -0,0 +1,89 @@
+"""
+Test conflating lane of event engine
+"""
+import unittest
+from time import sleep
+
+from vnpy.event import Event, EventEngine
+
+
+class Tick:
+
+    def __init__(self, vt_symbol: str, seq: int, last_volume: float = 1):
+        self.vt_symbol = vt_symbol
+        self.seq = seq
+        self.volume = seq
+        self.last_volume = last_volume
+
+
+def wait_empty(event_engine: EventEngine):
+    for _ in range(100):
+        if event_engine.get_queue_size() == 0:
+            break
+        sleep(0.05)
+    sleep(0.1)
+
+
+class TestEventEngineConflate(unittest.TestCase):
+
+    def test_conflate(self):
+        event_engine = EventEngine(metrics=True)
+        latest = []
+        every = []
+
+        event_engine.register("eTick.", lambda event: latest.append(event.data), conflate=True)
+        event_engine.register("eTick.rb2010.SHFE", lambda event: every.append(event.data))
+
+        # 引擎未启动，行情积压
+        for seq in range(100):
+            for vt_symbol in ["rb2010.SHFE", "j2009.DCE"]:
+                event_engine.put(Event("eTick.", Tick(vt_symbol, seq)))
+            event_engine.put(Event("eTick.rb2010.SHFE", Tick("rb2010.SHFE", seq)))
+        event_engine.put(Event("eOrder."))
+
+        # 每个合约只保留一个最新tick，逐笔处理的handler不受影响
+        self.assertEqual(event_engine.get_queue_size(), 2 + 100 + 1)
+        self.assertEqual(event_engine.get_conflated_counts(), {"eTick.": 198})
+
+        event_engine.start()
+        wait_empty(event_engine)
+
+        self.assertEqual(len(latest), 2)
+        for tick in latest:
+            self.assertEqual(tick.seq, 99)
+            self.assertEqual(tick.volume, 99)
+            self.assertEqual(tick.last_volume, 100)
+        self.assertEqual([tick.seq for tick in every], list(range(100)))
+        self.assertTrue(all(tick.last_volume == 1 for tick in every))
+
+        # 处理后新的tick重新进入队列
+        event_engine.put(Event("eTick.", Tick("rb2010.SHFE", 100)))
+        wait_empty(event_engine)
+        event_engine.stop()
+
+        self.assertEqual(len(latest), 3)
+        self.assertEqual(latest[-1].last_volume, 1)
+
+        data = event_engine.get_metrics(reset=True)
+        self.assertEqual(data["conflated"], {"eTick.": 198})
+        self.assertEqual(data["events"]["eTick."]["count"], 103)
+        self.assertEqual(event_engine.get_conflated_counts(), {})
+
+    def test_unregister(self):
+        event_engine = EventEngine()
+
+        def on_tick(event):
+            pass
+
+        event_engine.register("eTick.", on_tick, conflate=True)
+        for seq in range(10):
+            event_engine.put(Event("eTick.", Tick("rb2010.SHFE", seq)))
+        self.assertEqual(event_engine.get_queue_size(), 1)
+
+        event_engine.unregister("eTick.", on_tick)
+        event_engine.put(Event("eTick.", Tick("rb2010.SHFE", 10)))
+        self.assertEqual(event_engine.get_queue_size(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+Test priority lanes of event engine
+"""
+import unittest
+from queue import Empty
+from time import sleep
+
+from vnpy.event import Event, EventEngine, PriorityLanes
+
+PRIORITIES = {"eOrder.": 0, "eTrade.": 0, "eTick.": 1}
+
+
+class TestPriorityLanes(unittest.TestCase):
+
+    def test_level(self):
+        lanes = PriorityLanes({"eTick.": 1, "eTick.rb2010.SHFE": 0, "eOrder.": 0})
+        self.assertEqual(lanes.get_level("eTick."), 1)
+        self.assertEqual(lanes.get_level("eTick.j2009.DCE"), 1)
+        self.assertEqual(lanes.get_level("eTick.rb2010.SHFE"), 0)
+        self.assertEqual(lanes.get_level("eOrder."), 0)
+        self.assertEqual(lanes.get_level("eTimer"), 2)
+        self.assertEqual(len(lanes.lanes), 3)
+
+    def test_get(self):
+        lanes = PriorityLanes(PRIORITIES, starve_limit=1000)
+        for i in range(3):
+            lanes.put(Event("eTimer", i))
+            lanes.put(Event("eTick.", i))
+            lanes.put(Event("eOrder.", i))
+        self.assertEqual(lanes.qsize(), 9)
+        self.assertEqual(lanes.get_lane_sizes(), [3, 3, 3])
+
+        result = [(event.type, event.data) for event in (lanes.get(block=False) for _ in range(9))]
+        expected = [(type, i) for type in ["eOrder.", "eTick.", "eTimer"] for i in range(3)]
+        self.assertEqual(result, expected)
+        self.assertTrue(lanes.empty())
+        with self.assertRaises(Empty):
+            lanes.get(timeout=0.01)
+
+    def test_starve(self):
+        lanes = PriorityLanes(PRIORITIES, starve_limit=10)
+        lanes.put(Event("eTimer"))
+        for i in range(100):
+            lanes.put(Event("eOrder.", i))
+
+        types = [lanes.get().type for _ in range(101)]
+        # 定时事件被跳过10次后处理一次
+        self.assertEqual(types.index("eTimer"), 10)
+        self.assertEqual(lanes.starved, [0, 0, 1])
+
+
+class TestEventEngineLanes(unittest.TestCase):
+
+    def test_engine(self):
+        event_engine = EventEngine(priorities=PRIORITIES)
+        result = []
+        event_engine.register_general(lambda event: result.append(event.type))
+
+        for _ in range(100):
+            event_engine.put(Event("eTick."))
+        event_engine.put(Event("eTrade."))
+        event_engine.put(Event("eOrder."))
+
+        event_engine.start()
+        sleep(0.5)
+        event_engine.stop()
+
+        self.assertEqual(result[:3], ["eTrade.", "eOrder.", "eTick."])
+        self.assertEqual(result.count("eTick."), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
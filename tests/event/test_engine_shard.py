@@ -0,0 +1,84 @@
+"""
+Test sharded dispatch of event engine
+"""
+import random
+import threading
+import unittest
+from collections import defaultdict
+from time import sleep
+
+from vnpy.event import Event, EventEngine
+
+
+class Data:
+
+    def __init__(self, vt_symbol: str, seq: int):
+        self.vt_symbol = vt_symbol
+        self.seq = seq
+
+
+class TestEventEngineShard(unittest.TestCase):
+
+    def test_order(self):
+        event_engine = EventEngine(shards=4)
+        vt_symbols = [f"rb{2000 + i}.SHFE" for i in range(20)]
+        ticks = defaultdict(list)
+        tick_threads = defaultdict(set)
+        orders = []
+        order_threads = set()
+
+        def on_tick(event):
+            # 随机耗时，打乱不同合约之间的处理顺序
+            if random.random() < 0.05:
+                sleep(0.0005)
+            ticks[event.data.vt_symbol].append(event.data.seq)
+            tick_threads[event.data.vt_symbol].add(threading.get_ident())
+
+        def on_order(event):
+            orders.append(event.data.seq)
+            order_threads.add(threading.get_ident())
+
+        event_engine.register("eTick.", on_tick)
+        event_engine.register("eOrder.", on_order)
+
+        for seq in range(200):
+            for vt_symbol in vt_symbols:
+                event_engine.put(Event("eTick.", Data(vt_symbol, seq)))
+            event_engine.put(Event("eOrder.", Data(vt_symbols[seq % 20], seq)))
+
+        event_engine.start()
+        for _ in range(100):
+            if event_engine.get_queue_size() == 0:
+                break
+            sleep(0.1)
+        sleep(0.1)
+        event_engine.stop()
+
+        # 同一合约的行情按顺序在同一线程处理
+        for vt_symbol in vt_symbols:
+            self.assertEqual(ticks[vt_symbol], list(range(200)))
+            self.assertEqual(len(tick_threads[vt_symbol]), 1)
+        self.assertGreater(len(set.union(*tick_threads.values())), 1)
+
+        # 委托事件在全局通道按顺序处理
+        self.assertEqual(orders, list(range(200)))
+        self.assertEqual(len(order_threads), 1)
+        self.assertFalse(order_threads & set.union(*tick_threads.values()))
+
+    def test_no_shard(self):
+        event_engine = EventEngine()
+        event_engine.put(Event("eTick.", Data("rb2010.SHFE", 0)))
+        event_engine.put(Event("eOrder."))
+        self.assertEqual(event_engine._queue.qsize(), 2)
+        self.assertEqual(event_engine.get_queue_size(), 2)
+
+        event_engine = EventEngine(shards=2)
+        event_engine.put(Event("eTick.", Data("rb2010.SHFE", 0)))
+        event_engine.put(Event("eBar.rb2010.SHFE"))
+        event_engine.put(Event("eOrder."))
+        self.assertEqual(event_engine._queue.qsize(), 1)
+        self.assertEqual(event_engine.get_queue_size(), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
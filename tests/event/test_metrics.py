@@ -0,0 +1,110 @@
+"""
+Test event engine metrics collector
+"""
+import io
+import random
+import unittest
+from contextlib import redirect_stderr
+from time import sleep
+
+from vnpy.event import Event, EventEngine, EVENT_METRICS
+from vnpy.event.engine import ConflatedEvent
+from vnpy.event.metrics import LatencyHistogram, get_bucket_index, get_bucket_upper
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_bucket(self):
+        for value in list(range(1000)) + [random.randint(0, 10 ** 9) for _ in range(1000)]:
+            index = get_bucket_index(value)
+            self.assertLessEqual(value, get_bucket_upper(index))
+            if index > 0:
+                self.assertGreater(value, get_bucket_upper(index - 1))
+            # 相对误差 < 1/8
+            self.assertLessEqual(get_bucket_upper(index) - value, value / 8)
+
+    def test_percentile(self):
+        values = list(range(1, 10001))
+        random.shuffle(values)
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(value)
+
+        summary = histogram.summary()
+        self.assertEqual(summary["count"], 10000)
+        self.assertEqual(summary["min_us"], 1)
+        self.assertEqual(summary["max_us"], 10000)
+        self.assertAlmostEqual(summary["mean_us"], 5000.5)
+        for percent in [50, 90, 99]:
+            self.assertAlmostEqual(histogram.percentile(percent), percent * 100, delta=percent * 100 / 8)
+
+
+class TestEventEngineMetrics(unittest.TestCase):
+
+    def test_snapshot(self):
+        event_engine = EventEngine(metrics=True, metrics_interval=1)
+        published = []
+
+        def on_tick(event):
+            sleep(0.001)
+
+        event_engine.register("eTick.rb2010.SHFE", on_tick)
+        event_engine.register("eTick.j2009.DCE", on_tick)
+        event_engine.register(EVENT_METRICS, lambda event: published.append(event.data))
+
+        for _ in range(50):
+            event_engine.put(Event("eTick.rb2010.SHFE"))
+            event_engine.put(Event("eTick.j2009.DCE"))
+
+        event_engine.start()
+        sleep(2.5)
+        event_engine.stop()
+
+        data = event_engine.get_metrics()
+        self.assertGreaterEqual(data["queue_high_water"], 100)
+        tick_data = data["events"]["eTick."]
+        self.assertEqual(tick_data["count"], 100)
+        self.assertEqual(tick_data["latency"]["count"], 100)
+        handler_data = tick_data["handlers"]["TestEventEngineMetrics.test_snapshot.<locals>.on_tick"]
+        self.assertEqual(handler_data["count"], 100)
+        self.assertGreaterEqual(handler_data["min_us"], 1000)
+        self.assertGreaterEqual(data["events"]["eTimer"]["count"], 1)
+        self.assertTrue(published)
+
+        event_engine.get_metrics(reset=True)
+        self.assertEqual(event_engine.get_metrics()["events"], {})
+
+        event_engine.disable_metrics()
+        self.assertEqual(event_engine.get_metrics(), {})
+
+    def test_debug(self):
+        # 调试模式下，收集统计时同样捕获处理函数异常
+        event_engine = EventEngine(debug=True, metrics=True)
+        received = []
+
+        def on_error(event):
+            raise ValueError("bad tick")
+
+        event_engine.register("eTick.rb2010.SHFE", on_error)
+        event_engine.register("eTick.rb2010.SHFE", received.append)
+        event_engine.register("eTick.rb2010.SHFE", on_error, conflate=True)
+        event_engine.register("eTick.rb2010.SHFE", received.append, conflate=True)
+
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            event_engine.put(Event("eTick.rb2010.SHFE"))
+            while event_engine.get_queue_size():
+                event = event_engine._queue.get()
+                if isinstance(event, ConflatedEvent):
+                    event_engine._process_conflated(event)
+                else:
+                    event_engine._process_metrics(event)
+
+        self.assertEqual(len(received), 2)
+        self.assertEqual(stderr.getvalue().count("bad tick"), 2)
+        handlers = event_engine.get_metrics()["events"]["eTick."]["handlers"]
+        self.assertEqual(handlers["TestEventEngineMetrics.test_debug.<locals>.on_error"]["count"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,2 +1,5 @@
 from .test_database import *
 from .test_settings import *
+from .test_object import *
+from .test_oms_engine import *
+from .test_tick_time import *
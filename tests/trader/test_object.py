@@ -0,0 +1,66 @@
+"""
+Test if compact (slotted) tick/bar behave like TickData/BarData and use less memory
+"""
+import pickle
+import tracemalloc
+import unittest
+from datetime import datetime
+
+from vnpy.trader.constant import Exchange
+from vnpy.trader.object import BarData, CompactBarData, CompactTickData, TickData
+
+
+def measure(create, count: int = 10000):
+    """创建count个对象，返回 (平均每个对象占用的字节数, 对象列表)"""
+    tracemalloc.start()
+    objs = [create(i) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / count, objs
+
+
+def create_tick(tick_class, i: int = 0):
+    return tick_class(
+        gateway_name='backtesting',
+        symbol='rb2010',
+        exchange=Exchange.SHFE,
+        datetime=datetime(2020, 6, 1, 9, 0, 0, i % 1000000),
+        last_price=3500.0 + i,
+        volume=i
+    )
+
+
+class TestCompactData(unittest.TestCase):
+
+    def test_compatible(self):
+        tick = create_tick(TickData)
+        compact = create_tick(CompactTickData)
+        self.assertFalse(hasattr(compact, '__dict__'))
+        self.assertEqual(compact.vt_symbol, tick.vt_symbol)
+        for name in tick.__dict__.keys():
+            self.assertEqual(getattr(compact, name), getattr(tick, name), name)
+
+        self.assertEqual(pickle.loads(pickle.dumps(compact)), compact)
+        copied = compact.copy()
+        copied.last_price = 1
+        self.assertEqual(compact.last_price, 3500.0)
+
+        bar = CompactBarData(gateway_name='', symbol='rb2010', exchange=Exchange.SHFE,
+                             datetime=datetime(2020, 6, 1, 9), close_price=3500)
+        self.assertEqual(bar.vt_symbol, 'rb2010.SHFE')
+        self.assertEqual(bar.copy(), bar)
+
+    def test_memory(self):
+        tick_size, _ = measure(lambda i: create_tick(TickData, i))
+        compact_size, _ = measure(lambda i: create_tick(CompactTickData, i))
+        print(f'TickData: {tick_size:.0f} bytes, CompactTickData: {compact_size:.0f} bytes')
+        self.assertLess(compact_size, tick_size)
+
+        bar_size, _ = measure(lambda i: BarData('', 'rb2010', Exchange.SHFE, datetime(2020, 6, 1), close_price=i))
+        compact_size, _ = measure(lambda i: CompactBarData('', 'rb2010', Exchange.SHFE, datetime(2020, 6, 1), close_price=i))
+        print(f'BarData: {bar_size:.0f} bytes, CompactBarData: {compact_size:.0f} bytes')
+        self.assertLess(compact_size, bar_size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Test secondary indexes of OmsEngine
+"""
+import gc
+import os
+import tempfile
+import unittest
+
+from vnpy.event import Event, EventEngine
+from vnpy.trader.constant import Direction, Exchange, Product, Status
+from vnpy.trader.engine import OmsEngine
+from vnpy.trader.event import EVENT_CONTRACT, EVENT_ORDER, EVENT_POSITION
+from vnpy.trader.object import ContractData, OrderData, PositionData
+
+
+class MainEngine:
+    """只接收OmsEngine添加的查询函数"""
+
+
+class TestOmsEngine(unittest.TestCase):
+
+    def setUp(self):
+        # OmsEngine 在当前目录读写合约缓存文件
+        self.cwd = os.getcwd()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.temp_dir.name)
+        self.event_engine = EventEngine()
+        self.main_engine = MainEngine()
+        self.oms = OmsEngine(self.main_engine, self.event_engine)
+
+    def tearDown(self):
+        # 析构时保存合约缓存文件到临时目录
+        del self.oms
+        del self.main_engine
+        del self.event_engine
+        gc.collect()
+        os.chdir(self.cwd)
+        self.temp_dir.cleanup()
+
+    def put_order(self, orderid, symbol, gateway_name='CTP', status=Status.NOTTRADED):
+        order = OrderData(gateway_name=gateway_name, symbol=symbol, exchange=Exchange.SHFE,
+                          orderid=orderid, status=status, volume=1)
+        self.oms.process_order_event(Event(EVENT_ORDER, order))
+        return order
+
+    def put_position(self, symbol, direction, volume, gateway_name='CTP', exchange=Exchange.SHFE, price=100):
+        position = PositionData(gateway_name=gateway_name, symbol=symbol, exchange=exchange,
+                                direction=direction, volume=volume, price=price)
+        self.oms.process_position_event(Event(EVENT_POSITION, position))
+        return position
+
+    def test_active_orders(self):
+        self.put_order('1', 'rb2010')
+        self.put_order('2', 'rb2010', gateway_name='CTP2')
+        self.put_order('3', 'j2009')
+
+        view = self.main_engine.get_active_orders_view('rb2010.SHFE')
+        self.assertEqual(sorted(view), ['CTP.1', 'CTP2.2'])
+        self.assertEqual(len(self.main_engine.get_all_active_orders('rb2010.SHFE')), 2)
+        self.assertEqual(sorted(self.main_engine.get_active_orders_view(gateway_name='CTP')), ['CTP.1', 'CTP.3'])
+        self.assertEqual(list(self.main_engine.get_active_orders_view('rb2010.SHFE', 'CTP2')), ['CTP2.2'])
+        self.assertEqual(len(self.main_engine.get_active_orders_view()), 3)
+        with self.assertRaises(TypeError):
+            view['CTP.4'] = None
+
+        # 视图随委托事件更新
+        self.put_order('1', 'rb2010', status=Status.ALLTRADED)
+        self.assertEqual(list(view), ['CTP2.2'])
+        self.put_order('2', 'rb2010', gateway_name='CTP2', status=Status.CANCELLED)
+        self.assertEqual(len(self.main_engine.get_active_orders_view('rb2010.SHFE')), 0)
+        self.assertEqual(self.main_engine.get_all_active_orders('rb2010.SHFE'), [])
+        self.assertNotIn('rb2010.SHFE', self.oms.symbol_active_orders)
+        self.assertNotIn('CTP2', self.oms.gateway_active_orders)
+
+    def test_positions(self):
+        position = self.put_position('rb2010', Direction.LONG, 3)
+        self.assertIs(self.main_engine.get_symbol_position('rb2010.SHFE', Direction.LONG), position)
+        position2 = self.put_position('rb2010', Direction.LONG, 2, gateway_name='CTP2')
+
+        self.assertIs(self.main_engine.get_symbol_position('rb2010.SHFE', Direction.LONG, 'CTP'), position)
+        self.assertIs(self.main_engine.get_symbol_position('rb2010.SHFE', Direction.LONG, 'CTP2'), position2)
+        # 多个账号持有时，未指定网关不返回任意一个账号的持仓
+        self.assertIsNone(self.main_engine.get_symbol_position('rb2010.SHFE', Direction.LONG))
+        self.assertIsNone(self.main_engine.get_symbol_position('rb2010.SHFE', Direction.SHORT))
+        view = self.main_engine.get_positions_view('rb2010.SHFE', Direction.LONG)
+        self.assertEqual(sorted(view), ['CTP', 'CTP2'])
+
+        position = self.put_position('rb2010', Direction.LONG, 0)
+        self.assertEqual(view['CTP'].volume, 0)
+
+    def test_spd_position(self):
+        for symbol in ['rb2010', 'rb2101']:
+            contract = ContractData(gateway_name='CTP', symbol=symbol, exchange=Exchange.SHFE, name=symbol,
+                                    product=Product.FUTURES, size=10, pricetick=1)
+            self.oms.process_contract_event(Event(EVENT_CONTRACT, contract))
+        contract = ContractData(gateway_name='CTP', symbol='rb2010-1-rb2101-1-CJ', exchange=Exchange.SPD,
+                                name='spd', product=Product.SPREAD, size=10, pricetick=1)
+        self.oms.process_contract_event(Event(EVENT_CONTRACT, contract))
+
+        self.oms.custom_settings['rb2010-1-rb2101-1-CJ'] = {
+            'leg1_symbol': 'rb2010', 'leg2_symbol': 'rb2101', 'leg1_ratio': 1, 'leg2_ratio': 1, 'is_spread': True
+        }
+        self.oms.symbol_spd_maping = {'rb2010': ['rb2010-1-rb2101-1-CJ'], 'rb2101': ['rb2010-1-rb2101-1-CJ']}
+
+        self.put_position('rb2010', Direction.LONG, 3, price=3600)
+        self.assertEqual(self.event_engine.get_queue_size(), 0)
+        self.put_position('rb2101', Direction.SHORT, 2, price=3500)
+        self.assertEqual(self.event_engine.get_queue_size(), 1)
+
+        spd_pos = self.event_engine._queue.get().data
+        self.assertEqual(spd_pos.direction, Direction.LONG)
+        self.assertEqual(spd_pos.volume, 2)
+        self.assertEqual(spd_pos.price, 100)
+        self.assertIn(('rb2010', Direction.LONG), self.oms.spd_position_keys)
+        self.assertIn(('rb2101', Direction.SHORT), self.oms.spd_position_keys)
+        k1, k2, k3 = self.oms.spd_position_keys[('rb2101', Direction.SHORT)][0][3:6]
+        self.assertEqual((k1, k2, k3), ('CTP.rb2010.SHFE.多', 'CTP.rb2101.SHFE.空', 'CTP.rb2010-1-rb2101-1-CJ.SPD.多'))
+
+        # 合约更新后重新生成
+        self.oms.process_contract_event(Event(EVENT_CONTRACT, contract))
+        self.assertEqual(self.oms.spd_position_keys, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
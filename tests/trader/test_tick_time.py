@@ -0,0 +1,53 @@
+"""
+Test if TickTimeDecoder gives the same result as strptime/strftime in CTP gateways
+"""
+import random
+import unittest
+from datetime import datetime
+
+from vnpy.trader.utility import TickTimeDecoder, get_trading_date
+
+
+def random_update_time(rnd):
+    return f'{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}:{rnd.randint(0, 59):02d}'
+
+
+class TestTickTimeDecoder(unittest.TestCase):
+
+    def test_action_day(self):
+        rnd = random.Random(0)
+        decoder = TickTimeDecoder()
+        for _ in range(10000):
+            update_time = random_update_time(rnd)
+            update_millisec = rnd.choice([0, 100, 499, 500, 999])
+            action_day = f'2020{rnd.randint(1, 12):02d}{rnd.randint(1, 28):02d}'
+
+            timestamp = f"{action_day} {update_time}.{int(update_millisec / 100)}"
+            dt = datetime.strptime(timestamp, "%Y%m%d %H:%M:%S.%f")
+            self.assertEqual(decoder.get_datetime(update_time, update_millisec, action_day), dt)
+            self.assertEqual(
+                decoder.decode(update_time, update_millisec, action_day),
+                (dt, dt.strftime('%Y-%m-%d'), dt.strftime('%H:%M:%S.%f'), get_trading_date(dt))
+            )
+
+    def test_local_date(self):
+        decoder = TickTimeDecoder()
+        dt, s_date, s_time, trading_day = decoder.decode('21:05:09', 500)
+        now = datetime.now()
+        self.assertEqual(s_date, now.strftime('%Y-%m-%d'))
+        self.assertEqual(dt, datetime(now.year, now.month, now.day, 21, 5, 9, 500000))
+        self.assertEqual(s_time, '21:05:09.500000')
+        self.assertEqual(trading_day, get_trading_date(dt))
+        self.assertGreater(decoder.local_date_expire, now.timestamp())
+
+    def test_trading_day(self):
+        decoder = TickTimeDecoder()
+        # 周五夜盘 => 下周一，周五日盘 => 当天
+        self.assertEqual(decoder.decode('21:00:00', 0, '20200605')[3], '2020-06-08')
+        self.assertEqual(decoder.decode('22:00:00', 0, '20200605')[3], '2020-06-08')
+        self.assertEqual(decoder.decode('09:00:00', 0, '20200605')[3], '2020-06-05')
+        self.assertEqual(len(decoder.trading_days), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -413,8 +413,7 @@ class AlgoEngine(BaseEngine):
             contract = self.main_engine.get_contract(vt_symbol)
             if contract and contract.gateway_name:
                 gateway_name = contract.gateway_name
-        vt_position_id = f"{gateway_name}.{vt_symbol}.{direction.value}"
-        return self.main_engine.get_position(vt_position_id)
+        return self.main_engine.get_symbol_position(vt_symbol, direction, gateway_name)
 
     def get_position_holding(self, vt_symbol: str, gateway_name: str = ''):
         """ 查询合约在账号的持仓（包含多空）"""
@@ -13,13 +13,11 @@ import gc
 import pandas as pd
 import traceback
 import random
-from datetime import datetime, timedelta
+from datetime import datetime
 from time import sleep
 
 from vnpy.trader.object import (
     TickData,
-    BarData,
-    RenkoBarData,
 )
 from vnpy.trader.constant import (
     Exchange,
@@ -29,6 +27,8 @@ from vnpy.trader.utility import (
     extract_vt_symbol,
 )
 
+from vnpy.component.cta_bar_feeder import BarFeeder
+
 from .back_testing import BackTestingEngine
 
 
@@ -203,53 +203,11 @@ class PortfolioTestingEngine(BackTestingEngine):
         gc_collect_days = 0
 
         try:
-            for (dt, vt_symbol), bar_data in self.bar_df.iterrows():
-                symbol, exchange = extract_vt_symbol(vt_symbol)
-                if symbol.startswith('future_renko'):
-                    bar_datetime = dt
-                    bar = RenkoBarData(
-                        gateway_name='backtesting',
-                        symbol=symbol,
-                        exchange=exchange,
-                        datetime=bar_datetime
-                    )
-                    bar.seconds = float(bar_data.get('seconds', 0))
-                    bar.high_seconds = float(bar_data.get('high_seconds', 0))  # 当前Bar的上限秒数
-                    bar.low_seconds = float(bar_data.get('low_seconds', 0))  # 当前bar的下限秒数
-                    bar.height = float(bar_data.get('height', 0))  # 当前Bar的高度限制
-                    bar.up_band = float(bar_data.get('up_band', 0))  # 高位区域的基线
-                    bar.down_band = float(bar_data.get('down_band', 0))  # 低位区域的基线
-                    bar.low_time = bar_data.get('low_time', None)  # 最后一次进入低位区域的时间
-                    bar.high_time = bar_data.get('high_time', None)  # 最后一次进入高位区域的时间
-                else:
-                    bar_datetime = dt - timedelta(seconds=self.bar_interval_seconds)
-
-                    bar = BarData(
-                        gateway_name='backtesting',
-                        symbol=symbol,
-                        exchange=exchange,
-                        datetime=bar_datetime
-                    )
-                if 'open' in bar_data:
-                    bar.open_price = float(bar_data['open'])
-                    bar.close_price = float(bar_data['close'])
-                    bar.high_price = float(bar_data['high'])
-                    bar.low_price = float(bar_data['low'])
-                else:
-                    bar.open_price = float(bar_data['open_price'])
-                    bar.close_price = float(bar_data['close_price'])
-                    bar.high_price = float(bar_data['high_price'])
-                    bar.low_price = float(bar_data['low_price'])
-
-                bar.volume = int(bar_data['volume'])
-                bar.date = dt.strftime('%Y-%m-%d')
-                bar.time = dt.strftime('%H:%M:%S')
-                str_td = str(bar_data.get('trading_day', ''))
-                if len(str_td) == 8:
-                    bar.trading_day = str_td[0:4] + '-' + str_td[4:6] + '-' + str_td[6:8]
-                else:
-                    bar.trading_day = bar.date
-
+            for dt, bar in BarFeeder(self.bar_df,
+                                     bar_interval_seconds=self.bar_interval_seconds,
+                                     date_from_bar_datetime=False,
+                                     use_trading_date=False,
+                                     with_open_interest=False):
                 if last_trading_day != bar.trading_day:
                     self.output(u'回测数据日期:{},资金:{}'.format(bar.trading_day, self.net_capital))
                     if self.strategy_start_date > bar.datetime:
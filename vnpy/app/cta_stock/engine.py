@@ -78,6 +78,7 @@ from .base import (
 )
 from .template import CtaTemplate
 from vnpy.component.cta_position import CtaPosition
+from vnpy.component.cta_order_book import StopOrderBook
 
 STOP_STATUS_MAP = {
     Status.SUBMITTING: StopOrderStatus.WAITING,
@@ -142,7 +143,7 @@ class CtaEngine(BaseEngine):
             set)  # strategy_name: orderid list
 
         self.stop_order_count = 0  # for generating stop_orderid
-        self.stop_orders = {}  # stop_orderid: stop_order
+        self.stop_orders = StopOrderBook()  # stop_orderid: stop_order
 
         self.thread_executor = ThreadPoolExecutor(max_workers=1)  # 异步线程任务执行
         self.thread_tasks = []
@@ -420,8 +421,10 @@ class CtaEngine(BaseEngine):
 
     def check_stop_order(self, tick: TickData):
         """"""
-        for stop_order in list(self.stop_orders.values()):
-            if stop_order.vt_symbol != tick.vt_symbol:
+        # 只取出最新价触发的停止单（按合约、价格堆索引）
+        for stop_orderid in self.stop_orders.get_triggered(tick.vt_symbol, tick.last_price):
+            stop_order = self.stop_orders.get(stop_orderid, None)
+            if stop_order is None:
                 continue
 
             long_triggered = stop_order.direction == Direction.LONG and tick.last_price >= stop_order.price
@@ -893,8 +896,7 @@ class CtaEngine(BaseEngine):
             if contract.gateway_name and not gateway_name:
                 gateway_name = contract.gateway_name
 
-        vt_position_id = f"{gateway_name}.{vt_symbol}.{direction.value}"
-        return self.main_engine.get_position(vt_position_id)
+        return self.main_engine.get_symbol_position(vt_symbol, direction, gateway_name)
 
     def get_engine_type(self):
         """"""
@@ -19,6 +19,7 @@ from vnpy.trader.utility import virtual, append_data, extract_vt_symbol, get_und
 from .base import StopOrder,EngineType
 from vnpy.component.cta_grid_trade import CtaGrid, CtaGridTrade
 from vnpy.component.cta_position import CtaPosition
+from vnpy.component.cta_log import format_log
 from vnpy.component.cta_policy import CtaPolicy
 
 class CtaTemplate(ABC):
@@ -321,11 +322,21 @@ class CtaTemplate(ABC):
         if tick.ask_price_1 == tick.limit_down:
             return True
 
+    def is_log_enabled(self, level: int = INFO):
+        """
+        Return whether log message of the level will be written.
+        """
+        is_enabled = getattr(self.cta_engine, 'is_log_enabled', None)
+        return is_enabled is None or is_enabled(level)
+
     def write_log(self, msg: str, level: int = INFO):
         """
         Write a log message.
+        msg can be a function returning the message, called only when the level is enabled.
         """
-        self.cta_engine.write_log(msg=msg, strategy_name=self.strategy_name, level=level)
+        if not self.is_log_enabled(level):
+            return
+        self.cta_engine.write_log(msg=format_log(msg), strategy_name=self.strategy_name, level=level)
 
     def write_error(self, msg: str):
         """write error log message"""
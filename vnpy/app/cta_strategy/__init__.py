@@ -8,6 +8,7 @@ from vnpy.trader.utility import BarGenerator, ArrayManager
 from .base import APP_NAME, StopOrder
 from .engine import CtaEngine
 from .backtesting import BacktestingEngine, OptimizationSetting
+from .walk_forward import WalkForwardRunner
 from .template import CtaTemplate, CtaSignal, TargetPosTemplate
 
 
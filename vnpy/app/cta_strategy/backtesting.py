@@ -2,8 +2,9 @@ from collections import defaultdict
 from datetime import date, datetime, timedelta
 from typing import Callable
 from itertools import product
-from functools import lru_cache
+from functools import lru_cache, partial
 from time import time
+import importlib.util
 import multiprocessing
 import random
 import traceback
@@ -19,6 +20,8 @@ from vnpy.trader.constant import (Direction, Offset, Exchange,
 from vnpy.trader.database import database_manager
 from vnpy.trader.object import OrderData, TradeData, BarData, TickData
 from vnpy.trader.utility import round_to
+from vnpy.component.cta_optimize_cache import OptimizationCache, get_fingerprint
+from vnpy.component.cta_prune import Pruner, get_halving_ends, get_survivor_count, is_pruned, sort_key
 
 from .base import (
     BacktestingMode,
@@ -129,6 +132,7 @@ class BacktestingEngine:
 
         self.interval = None
         self.days = 0
+        self.trading_start = None   # strategy starts trading at this time instead of after [days]
         self.callback = None
         self.history_data = []
 
@@ -148,6 +152,19 @@ class BacktestingEngine:
         self.daily_results = {}
         self.daily_df = None
 
+        # Early stopping of bad settings in optimization
+        self.prune_setting = None
+        self.pruner = None
+        self.prune_trade_count = 0
+        self.prune_trades = []      # trades not yet checked by pruner
+        self.prune_pos = 0
+        self.prune_cash = 0
+
+        # Persistent optimization workers attached to shared bar data
+        self.optimization_pool = None
+        self.shared_data = None
+        self.shared_data_key = None
+
     def clear_data(self):
         """
         Clear all data of last backtesting.
@@ -171,6 +188,8 @@ class BacktestingEngine:
         self.logs.clear()
         self.daily_results.clear()
 
+        self.set_prune_setting(self.prune_setting)
+
     def set_parameters(
         self,
         vt_symbol: str,
@@ -210,6 +229,62 @@ class BacktestingEngine:
             self, strategy_class.__name__, self.vt_symbol, setting
         )
 
+    def set_prune_setting(self, prune_setting: dict):
+        """
+        Set rules for stopping backtesting early, see vnpy.component.cta_prune.Pruner
+        """
+        self.prune_setting = prune_setting
+        self.pruner = Pruner(prune_setting) if prune_setting else None
+        self.prune_trade_count = 0
+        self.prune_trades = []      # trades not yet checked by pruner
+        self.prune_pos = 0
+        self.prune_cash = 0
+
+    def set_trading_start(self, trading_start: datetime):
+        """
+        Keep strategy initializing with history data before trading_start,
+        instead of the first [days] set by load_bar.
+        """
+        self.trading_start = trading_start
+
+    def check_prune(self):
+        """
+        Update balance of last trading day to pruner, return True if pruned.
+        Balance is marked to market the same way as DailyResult.
+        """
+        daily_result = self.daily_results.get(self.datetime.date(), None)
+        if not daily_result:
+            return False
+
+        # Trades since last check
+        if self.prune_trades:
+            for trade in self.prune_trades:
+                if trade.direction == Direction.LONG:
+                    pos_change = trade.volume
+                else:
+                    pos_change = -trade.volume
+                self.prune_pos += pos_change
+
+                if not self.inverse:
+                    turnover = trade.volume * self.size * trade.price
+                    self.prune_cash -= pos_change * trade.price * self.size
+                    slippage = trade.volume * self.size * self.slippage
+                else:
+                    turnover = trade.volume * self.size / trade.price
+                    self.prune_cash += pos_change * self.size / trade.price
+                    slippage = trade.volume * self.size * self.slippage / (trade.price ** 2)
+                self.prune_cash -= turnover * self.rate + slippage
+            self.prune_trade_count += len(self.prune_trades)
+            self.prune_trades.clear()
+
+        close_price = daily_result.close_price
+        if not self.inverse:
+            balance = self.capital + self.prune_cash + self.prune_pos * close_price * self.size
+        else:
+            balance = self.capital + self.prune_cash - self.prune_pos * self.size / close_price
+
+        return self.pruner.on_day(daily_result.date, balance, self.prune_trade_count)
+
     def load_data(self):
         """"""
         self.output("开始加载历史数据")
@@ -277,7 +352,10 @@ class BacktestingEngine:
         ix = 0
 
         for ix, data in enumerate(self.history_data):
-            if self.datetime and data.datetime.day != self.datetime.day:
+            if self.trading_start:
+                if data.datetime >= self.trading_start:
+                    break
+            elif self.datetime and data.datetime.day != self.datetime.day:
                 day_count += 1
                 if day_count >= self.days:
                     break
@@ -299,7 +377,13 @@ class BacktestingEngine:
         self.output("开始回放历史数据")
 
         # Use the rest of history data for running backtesting
+        pruner = self.pruner
         for data in self.history_data[ix:]:
+            # Check prune rules at the start of new trading day
+            if pruner and data.datetime.date() != self.datetime.date() and self.check_prune():
+                self.output(f"触发剪枝，回测终止：{pruner.reason}")
+                return
+
             try:
                 func(data)
             except Exception:
@@ -516,6 +600,9 @@ class BacktestingEngine:
                 value = 0
             statistics[key] = np.nan_to_num(value)
 
+        if self.pruner:
+            statistics.update(self.pruner.get_statistics())
+
         self.output("策略统计指标计算完成")
         return statistics
 
@@ -549,8 +636,198 @@ class BacktestingEngine:
 
         plt.show()
 
-    def run_optimization(self, optimization_setting: OptimizationSetting, output=True):
-        """"""
+    def get_parameters(self):
+        """
+        Get backtesting parameters for creating engine in worker process.
+        """
+        return {
+            "vt_symbol": self.vt_symbol,
+            "interval": self.interval,
+            "start": self.start,
+            "rate": self.rate,
+            "slippage": self.slippage,
+            "size": self.size,
+            "pricetick": self.pricetick,
+            "capital": self.capital,
+            "end": self.end,
+            "mode": self.mode,
+            "inverse": self.inverse
+        }
+
+    def get_optimization_pool(self, max_workers: int = None):
+        """
+        Load bar data once into shared memory and start persistent worker
+        processes attached to it. The pool is reused by later optimizations
+        on the same data, until close_optimization_pool is called.
+        """
+        if not self.end:
+            self.end = datetime.now()
+
+        data_key = (self.vt_symbol, self.interval, self.start, self.end)
+        if self.optimization_pool and data_key == self.shared_data_key:
+            return self.optimization_pool
+
+        if not is_shared_memory_available():
+            raise RuntimeError("共享数据需要multiprocessing.shared_memory（Python 3.8及以上版本）")
+
+        # Imported here, so that importing backtesting works without shared_memory
+        from vnpy.component.cta_shared_bars import SharedBarData
+
+        self.close_optimization_pool()
+
+        self.load_data()
+        if not self.history_data:
+            self.output("历史数据为空，无法创建共享数据")
+            return None
+
+        self.shared_data = SharedBarData.from_bars(self.history_data)
+        self.shared_data_key = data_key
+
+        ctx = multiprocessing.get_context("spawn")
+        self.optimization_pool = ctx.Pool(
+            max_workers or multiprocessing.cpu_count(),
+            initializer=init_shared_worker,
+            initargs=(self.shared_data,)
+        )
+        self.output(f"共享数据创建完成，数据量：{len(self.shared_data)}")
+        return self.optimization_pool
+
+    def check_share_data(self, share_data: bool, fallback: str = "使用独立加载数据方式") -> bool:
+        """
+        Bar data can be shared only in bar mode with multiprocessing.shared_memory
+        (Python 3.8+), otherwise fall back to the non-shared way.
+        """
+        if not share_data:
+            return False
+
+        if self.mode == BacktestingMode.TICK:
+            self.output(f"Tick模式不支持共享数据，{fallback}")
+            return False
+
+        if not is_shared_memory_available():
+            self.output(f"当前Python版本不支持共享内存，{fallback}")
+            return False
+
+        return True
+
+    def get_optimization_cache(self, cache_file: str, prune_setting: dict = None):
+        """
+        Get result cache and fingerprint of strategy class, data range and
+        engine parameters. Set end of backtesting before using cache, otherwise
+        end is now and fingerprint changes on every run.
+        """
+        if not self.end:
+            self.end = datetime.now()
+
+        parameters = self.get_parameters()
+        if prune_setting:
+            parameters["prune_setting"] = prune_setting
+
+        cache = OptimizationCache(cache_file)
+        fingerprint = get_fingerprint(self.strategy_class, parameters)
+        return cache, fingerprint
+
+    def close_optimization_pool(self):
+        """
+        Stop persistent worker processes and release shared bar data.
+        """
+        if self.optimization_pool:
+            self.optimization_pool.close()
+            self.optimization_pool.join()
+            self.optimization_pool = None
+
+        if self.shared_data:
+            self.shared_data.unlink()
+            self.shared_data = None
+            self.shared_data_key = None
+
+    def optimize_settings(
+        self,
+        settings: list,
+        target_name: str,
+        share_data=False,
+        max_workers: int = None,
+        end: datetime = None,
+        prune_setting: dict = None,
+        callback: Callable = None,
+        start: datetime = None
+    ):
+        """
+        Run backtesting of settings in multiprocessing pool, return list of
+        (setting, result). Backtesting runs in [start, end] if provided, and
+        is pruned early by prune_setting if provided.
+        """
+        if not settings:
+            return []
+
+        start = start or self.start
+        end = end or self.end
+
+        if share_data:
+            # Persistent workers reuse bars attached from shared memory
+            pool = self.get_optimization_pool(max_workers)
+            if not pool:
+                return []
+
+            parameters = self.get_parameters()
+            parameters["start"] = start
+            parameters["end"] = end
+            results = [
+                pool.apply_async(optimize_shared, (
+                    target_name,
+                    self.strategy_class,
+                    setting,
+                    parameters,
+                    prune_setting
+                ), callback=partial(callback, setting) if callback else None)
+                for setting in settings
+            ]
+        else:
+            # Use multiprocessing pool for running backtesting with different setting
+            # Force to use spawn method to create new process (instead of fork on Linux)
+            ctx = multiprocessing.get_context("spawn")
+            pool = ctx.Pool(max_workers or multiprocessing.cpu_count())
+
+            results = []
+            for setting in settings:
+                result = (pool.apply_async(optimize, (
+                    target_name,
+                    self.strategy_class,
+                    setting,
+                    self.vt_symbol,
+                    self.interval,
+                    start,
+                    self.rate,
+                    self.slippage,
+                    self.size,
+                    self.pricetick,
+                    self.capital,
+                    end,
+                    self.mode,
+                    self.inverse,
+                    prune_setting
+                ), callback=partial(callback, setting) if callback else None))
+                results.append(result)
+
+            pool.close()
+            pool.join()
+
+        return [(setting, result.get()) for setting, result in zip(settings, results)]
+
+    def run_optimization(
+        self,
+        optimization_setting: OptimizationSetting,
+        output=True,
+        share_data=False,
+        max_workers: int = None,
+        cache_file: str = None,
+        prune_setting: dict = None
+    ):
+        """
+        share_data: load bars once into shared memory for persistent workers (bar mode only)
+        cache_file: sqlite file for caching results, only settings not cached are computed
+        prune_setting: rules for stopping bad settings early, see vnpy.component.cta_prune.Pruner
+        """
         # Get optimization setting and target
         settings = optimization_setting.generate_setting()
         target_name = optimization_setting.target_name
@@ -563,47 +840,138 @@ class BacktestingEngine:
             self.output("优化目标未设置，请检查")
             return
 
-        # Use multiprocessing pool for running backtesting with different setting
-        # Force to use spawn method to create new process (instead of fork on Linux)
-        ctx = multiprocessing.get_context("spawn")
-        pool = ctx.Pool(multiprocessing.cpu_count())
+        share_data = self.check_share_data(share_data)
 
-        results = []
-        for setting in settings:
-            result = (pool.apply_async(optimize, (
-                target_name,
-                self.strategy_class,
-                setting,
-                self.vt_symbol,
-                self.interval,
-                self.start,
-                self.rate,
-                self.slippage,
-                self.size,
-                self.pricetick,
-                self.capital,
-                self.end,
-                self.mode,
-                self.inverse
-            )))
-            results.append(result)
+        # Load cached results, save new result as soon as it is finished
+        cached_values = []
+        cache = None
 
-        pool.close()
-        pool.join()
+        def save_result(setting, result):
+            """"""
+            if cache:
+                cache.set(fingerprint, setting, result[2])
+
+        if cache_file:
+            cache, fingerprint = self.get_optimization_cache(cache_file, prune_setting)
+
+            # Cached statistics without target (saved by optimization of another target) are recalculated
+            new_settings = []
+            for setting in settings:
+                statistics = cache.get(fingerprint, setting)
+                target_value = statistics.get(target_name) if statistics else None
+                if target_value is None:
+                    new_settings.append(setting)
+                else:
+                    cached_values.append((str(setting), target_value, statistics))
+
+            self.output(f"缓存结果：{len(cached_values)}，需计算：{len(new_settings)}")
+            settings = new_settings
+
+        results = self.optimize_settings(
+            settings,
+            target_name,
+            share_data,
+            max_workers,
+            prune_setting=prune_setting,
+            callback=save_result
+        )
 
         # Sort results and output
-        result_values = [result.get() for result in results]
-        result_values.sort(reverse=True, key=lambda result: result[1])
+        result_values = cached_values + [result for _, result in results]
+        result_values.sort(reverse=True, key=sort_key)
+
+        if cache:
+            cache.close()
 
         if output:
             for value in result_values:
                 msg = f"参数：{value[0]}, 目标：{value[1]}"
+                if is_pruned(value):
+                    msg += f", 剪枝：{value[2]['prune_reason']}"
                 self.output(msg)
 
         return result_values
 
-    def run_ga_optimization(self, optimization_setting: OptimizationSetting, population_size=100, ngen_size=30, output=True):
-        """"""
+    def run_halving_optimization(
+        self,
+        optimization_setting: OptimizationSetting,
+        rungs: int = 3,
+        eta: int = 3,
+        output=True,
+        share_data=False,
+        max_workers: int = None,
+        prune_setting: dict = None
+    ):
+        """
+        Successive halving: backtest all settings on first 1/eta**(rungs-1) of
+        the period, keep top 1/eta settings for the next longer period, until
+        the survivors are backtested on the whole period.
+        """
+        settings = optimization_setting.generate_setting()
+        target_name = optimization_setting.target_name
+
+        if not settings:
+            self.output("优化参数组合为空，请检查")
+            return
+
+        if not target_name:
+            self.output("优化目标未设置，请检查")
+            return
+
+        share_data = self.check_share_data(share_data)
+
+        if not self.end:
+            self.end = datetime.now()
+
+        ends = get_halving_ends(self.start, self.end, rungs, eta)
+        for i, end in enumerate(ends):
+            self.output(f"第{i + 1}级优化：{len(settings)}组参数，回测至{end}")
+
+            results = self.optimize_settings(
+                settings,
+                target_name,
+                share_data,
+                max_workers,
+                end=end,
+                prune_setting=prune_setting
+            )
+            results.sort(reverse=True, key=lambda item: sort_key(item[1]))
+
+            if i < len(ends) - 1:
+                survivors = [item for item in results if not is_pruned(item[1])]
+                survivors = survivors[:get_survivor_count(len(results), eta)]
+                settings = [setting for setting, _ in survivors]
+                if not settings:
+                    self.output("所有参数组合均被剪枝，优化终止")
+                    break
+
+        result_values = [result for _, result in results]
+
+        if output:
+            for value in result_values:
+                msg = f"参数：{value[0]}, 目标：{value[1]}"
+                if is_pruned(value):
+                    msg += f", 剪枝：{value[2]['prune_reason']}"
+                self.output(msg)
+
+        return result_values
+
+    def run_ga_optimization(
+        self,
+        optimization_setting: OptimizationSetting,
+        population_size=100,
+        ngen_size=30,
+        output=True,
+        share_data=False,
+        max_workers: int = None,
+        cache_file: str = None,
+        prune_setting: dict = None
+    ):
+        """
+        share_data: evaluate individuals in persistent workers attached to shared bar data (bar mode only)
+        cache_file: sqlite file for caching results, only individuals not cached are evaluated
+        prune_setting: rules for stopping bad individuals early, pruned individuals get fitness -inf
+        """
         # Get optimization setting and target
         settings = optimization_setting.generate_setting_ga()
         target_name = optimization_setting.target_name
@@ -645,6 +1013,7 @@ class BacktestingEngine:
         global ga_end
         global ga_mode
         global ga_inverse
+        global ga_prune_setting
 
         ga_target_name = target_name
         ga_strategy_class = self.strategy_class
@@ -660,6 +1029,7 @@ class BacktestingEngine:
         ga_end = self.end
         ga_mode = self.mode
         ga_inverse = self.inverse
+        ga_prune_setting = prune_setting
 
         # Set up genetic algorithem
         toolbox = base.Toolbox()
@@ -689,9 +1059,60 @@ class BacktestingEngine:
         stats.register("min", np.min, axis=0)
         stats.register("max", np.max, axis=0)
 
-        # Multiprocessing is not supported yet.
-        # pool = multiprocessing.Pool(multiprocessing.cpu_count())
-        # toolbox.register("map", pool.map)
+        share_data = self.check_share_data(share_data, "使用单进程优化")
+
+        # Evaluate new individuals of each generation (in persistent workers
+        # if share_data), fitness of evaluated parameters is cached in main process.
+        fitness_cache = {}
+        pool = None
+        cache = None
+
+        if share_data:
+            pool = self.get_optimization_pool(max_workers)
+            if not pool:
+                return
+
+            evaluate = partial(
+                ga_optimize_shared,
+                target_name,
+                self.strategy_class,
+                self.get_parameters(),
+                prune_setting
+            )
+        else:
+            evaluate = ga_optimize_result
+
+        if cache_file:
+            cache, fingerprint = self.get_optimization_cache(cache_file, prune_setting)
+            self.output(f"缓存结果：{cache.count(fingerprint)}")
+
+        def cached_map(func, individuals):
+            """"""
+            keys = [tuple(individual) for individual in individuals]
+            new_keys = list(dict.fromkeys(key for key in keys if key not in fitness_cache))
+
+            if cache:
+                for key in new_keys:
+                    statistics = cache.get(fingerprint, dict(key))
+                    target_value = statistics.get(target_name) if statistics else None
+                    if target_value is not None:
+                        fitness_cache[key] = get_fitness((key, target_value, statistics))
+                new_keys = [key for key in new_keys if key not in fitness_cache]
+
+            if pool:
+                new_results = pool.map(func, new_keys)
+            else:
+                new_results = [func(key) for key in new_keys]
+
+            for key, result in zip(new_keys, new_results):
+                fitness_cache[key] = get_fitness(result)
+                if cache:
+                    cache.set(fingerprint, dict(key), result[2])
+
+            return [fitness_cache[key] for key in keys]
+
+        toolbox.register("map", cached_map)
+        toolbox.register("evaluate", evaluate)
 
         # Run ga optimization
         self.output(f"参数优化空间：{total_size}")
@@ -720,12 +1141,15 @@ class BacktestingEngine:
 
         self.output(f"遗传算法优化完成，耗时{cost}秒")
 
+        if cache:
+            cache.close()
+
         # Return result list
         results = []
 
         for parameter_values in hof:
             setting = dict(parameter_values)
-            target_value = ga_optimize(parameter_values)[0]
+            target_value = fitness_cache[tuple(parameter_values)][0]
             results.append((setting, target_value, {}))
 
         return results
@@ -834,6 +1258,8 @@ class BacktestingEngine:
             self.strategy.on_trade(trade)
 
             self.trades[trade.vt_tradeid] = trade
+            if self.pruner:
+                self.prune_trades.append(trade)
 
     def cross_stop_order(self):
         """
@@ -908,6 +1334,8 @@ class BacktestingEngine:
             trade.datetime = self.datetime
 
             self.trades[trade.vt_tradeid] = trade
+            if self.pruner:
+                self.prune_trades.append(trade)
 
             # Update stop order.
             stop_order.vt_orderids.append(order.vt_orderid)
@@ -1208,12 +1636,14 @@ def optimize(
     capital: int,
     end: datetime,
     mode: BacktestingMode,
-    inverse: bool
+    inverse: bool,
+    prune_setting: dict = None
 ):
     """
     Function for running in multiprocessing.pool
     """
     engine = BacktestingEngine()
+    engine.set_prune_setting(prune_setting)
 
     engine.set_parameters(
         vt_symbol=vt_symbol,
@@ -1239,6 +1669,91 @@ def optimize(
     return (str(setting), target_value, statistics)
 
 
+def is_shared_memory_available() -> bool:
+    """
+    multiprocessing.shared_memory is only available since Python 3.8.
+    """
+    return importlib.util.find_spec("multiprocessing.shared_memory") is not None
+
+
+def init_shared_worker(shared_data):
+    """
+    Initializer of persistent optimization worker, attach shared bar data
+    (vnpy.component.cta_shared_bars.SharedBarData) once.
+    """
+    global worker_shared_data
+    worker_shared_data = shared_data
+    worker_shared_data.get_bars()
+
+
+def optimize_shared(
+    target_name: str,
+    strategy_class: CtaTemplate,
+    setting: dict,
+    parameters: dict,
+    prune_setting: dict = None
+):
+    """
+    Function for running in persistent worker, using bars from shared memory
+    instead of loading data from database.
+    """
+    engine = BacktestingEngine()
+    engine.set_parameters(**parameters)
+    engine.set_prune_setting(prune_setting)
+    engine.add_strategy(strategy_class, setting)
+    engine.history_data = worker_shared_data.get_bars(start=parameters["start"], end=parameters["end"])
+    engine.run_backtesting()
+    engine.calculate_result()
+    statistics = engine.calculate_statistics(output=False)
+
+    target_value = statistics[target_name]
+    return (str(setting), target_value, statistics)
+
+
+def backtest_shared(
+    strategy_class: CtaTemplate,
+    setting: dict,
+    parameters: dict,
+    trading_start: datetime = None
+):
+    """
+    Function for running in persistent worker, return daily result
+    DataFrame (without trades) of one setting, using bars from shared memory.
+    Bars before trading_start are only used for initializing strategy.
+    """
+    engine = BacktestingEngine()
+    engine.set_parameters(**parameters)
+    engine.set_trading_start(trading_start)
+    engine.add_strategy(strategy_class, setting)
+    engine.history_data = worker_shared_data.get_bars(start=parameters["start"], end=parameters["end"])
+    engine.run_backtesting()
+
+    df = engine.calculate_result()
+    if df is None:
+        return DataFrame(columns=DAILY_COLUMNS)
+    return df[DAILY_COLUMNS]
+
+
+def ga_optimize_shared(
+    target_name: str,
+    strategy_class: CtaTemplate,
+    parameters: dict,
+    prune_setting: dict,
+    parameter_values: tuple
+):
+    """"""
+    return optimize_shared(target_name, strategy_class, dict(parameter_values), parameters, prune_setting)
+
+
+def get_fitness(result: tuple):
+    """
+    Fitness of optimization result, pruned result gets -inf.
+    """
+    if is_pruned(result):
+        return (-np.inf,)
+    return (result[1],)
+
+
 @lru_cache(maxsize=1000000)
 def _ga_optimize(parameter_values: tuple):
     """"""
@@ -1258,13 +1773,21 @@ def _ga_optimize(parameter_values: tuple):
         ga_capital,
         ga_end,
         ga_mode,
-        ga_inverse
+        ga_inverse,
+        ga_prune_setting
     )
-    return (result[1],)
+    return result
 
 
 def ga_optimize(parameter_values: list):
     """"""
+    return (_ga_optimize(tuple(parameter_values))[1],)
+
+
+def ga_optimize_result(parameter_values: tuple):
+    """
+    Return (setting, target, statistics) of ga parameter values.
+    """
     return _ga_optimize(tuple(parameter_values))
 
 
@@ -1309,3 +1832,23 @@ ga_slippage = None
 ga_size = None
 ga_pricetick = None
 ga_capital = None
+ga_prune_setting = None
+
+# Shared bar data attached in optimization worker
+worker_shared_data = None
+
+# Columns of daily result returned from worker
+DAILY_COLUMNS = [
+    "close_price",
+    "pre_close",
+    "trade_count",
+    "start_pos",
+    "end_pos",
+    "turnover",
+    "commission",
+    "slippage",
+    "trading_pnl",
+    "holding_pnl",
+    "total_pnl",
+    "net_pnl"
+]
@@ -0,0 +1,265 @@
+"""
+Walk-forward analysis on top of BacktestingEngine.
+
+Bars of the whole period are loaded once into shared memory, every rolling
+window slices them in the persistent optimization workers:
+- in-sample window: run optimization of all settings in parallel
+- out-of-sample window: backtest the best in-sample setting, strategy is
+  initialized (not trading) with bars of warmup days before the window
+Daily results of out-of-sample windows are stitched into one equity curve.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import count
+
+from pandas import DataFrame, concat
+
+from vnpy.component.cta_prune import is_pruned, sort_key
+
+from .backtesting import BacktestingEngine, OptimizationSetting, backtest_shared
+from .base import BacktestingMode
+
+
+class WalkForwardRunner:
+    """
+    runner = WalkForwardRunner(engine, optimization_setting, in_sample_days=360, out_sample_days=90)
+    runner.run()
+    runner.calculate_statistics()
+    runner.get_parameter_stability()
+    """
+
+    def __init__(
+        self,
+        engine: BacktestingEngine,
+        optimization_setting: OptimizationSetting,
+        in_sample_days: int,
+        out_sample_days: int,
+        step_days: int = None,
+        warmup_days: int = 30,
+        anchored: bool = False,
+        max_workers: int = None,
+        prune_setting: dict = None
+    ):
+        """
+        engine: backtesting engine with parameters of the whole period and strategy class added
+        step_days: days between windows, default is out_sample_days
+        warmup_days: days of bars before out-of-sample window for initializing strategy
+        anchored: in-sample windows all start from the beginning of the whole period
+        """
+        self.engine = engine
+        self.optimization_setting = optimization_setting
+        self.in_sample_days = in_sample_days
+        self.out_sample_days = out_sample_days
+        self.step_days = step_days or out_sample_days
+        self.warmup_days = warmup_days
+        self.anchored = anchored
+        self.max_workers = max_workers
+        self.prune_setting = prune_setting
+
+        self.window_results = []
+        self.oos_df = None
+
+    def output(self, msg):
+        """"""
+        self.engine.output(msg)
+
+    def generate_windows(self):
+        """
+        Generate list of (is_start, is_end, oos_start, oos_end).
+        """
+        start = self.engine.start
+        end = self.engine.end or datetime.now()
+        in_delta = timedelta(days=self.in_sample_days)
+        out_delta = timedelta(days=self.out_sample_days)
+        step_delta = timedelta(days=self.step_days)
+
+        windows = []
+        for i in count():
+            offset = step_delta * i
+            is_start = start if self.anchored else start + offset
+            is_end = start + offset + in_delta
+            if is_end >= end:
+                break
+
+            oos_end = min(is_end + out_delta, end)
+            windows.append((is_start, is_end, is_end, oos_end))
+
+        return windows
+
+    def run(self, output=True):
+        """
+        Run optimization of every in-sample window and backtesting of the best
+        setting in following out-of-sample window.
+        The optimization pool of engine is closed before returning.
+        """
+        engine = self.engine
+        settings = self.optimization_setting.generate_setting()
+        target_name = self.optimization_setting.target_name
+
+        if not settings:
+            self.output("优化参数组合为空，请检查")
+            return
+
+        if not target_name:
+            self.output("优化目标未设置，请检查")
+            return
+
+        if engine.mode == BacktestingMode.TICK:
+            self.output("滚动优化只支持Bar模式")
+            return
+
+        windows = self.generate_windows()
+        if not windows:
+            self.output("回测区间不足一个样本内窗口，请检查")
+            return
+
+        # Bars of the whole period are loaded once and shared by all windows,
+        # worker processes and shared memory are released when finished
+        pool = engine.get_optimization_pool(self.max_workers)
+        if not pool:
+            return
+
+        try:
+            self.run_windows(pool, windows, settings, target_name, output)
+        finally:
+            engine.close_optimization_pool()
+
+        return self.window_results
+
+    def run_windows(self, pool, windows: list, settings: list, target_name: str, output: bool):
+        """"""
+        engine = self.engine
+        self.window_results = []
+        for i, (is_start, is_end, oos_start, oos_end) in enumerate(windows):
+            self.output(f"窗口{i + 1}/{len(windows)}，样本内：{is_start} ~ {is_end}，样本外：{oos_start} ~ {oos_end}")
+
+            results = engine.optimize_settings(
+                settings,
+                target_name,
+                share_data=True,
+                max_workers=self.max_workers,
+                start=is_start,
+                end=is_end - timedelta(microseconds=1),
+                prune_setting=self.prune_setting
+            )
+            if not results:
+                self.output(f"窗口{i + 1}样本内优化没有结果，跳过")
+                continue
+
+            results.sort(reverse=True, key=lambda item: sort_key(item[1]))
+            setting, result = results[0]
+
+            self.window_results.append({
+                "window": i + 1,
+                "is_start": is_start,
+                "is_end": is_end,
+                "oos_start": oos_start,
+                "oos_end": oos_end,
+                "setting": setting,
+                "is_target": result[1],
+                "is_pruned": is_pruned(result)
+            })
+
+        # Backtest out-of-sample windows in parallel, strategy is initialized with bars
+        # of warmup days and starts trading at the beginning of window, so that no
+        # position is carried into the window
+        async_results = []
+        for window_result in self.window_results:
+            parameters = engine.get_parameters()
+            parameters["start"] = max(window_result["oos_start"] - timedelta(days=self.warmup_days), engine.start)
+            parameters["end"] = window_result["oos_end"] - timedelta(microseconds=1)
+            async_results.append(pool.apply_async(backtest_shared, (
+                engine.strategy_class,
+                window_result["setting"],
+                parameters,
+                window_result["oos_start"]
+            )))
+
+        dfs = []
+        for window_result, async_result in zip(self.window_results, async_results):
+            df = async_result.get()
+            start_date = window_result["oos_start"].date()
+            end_date = window_result["oos_end"].date()
+            if window_result is self.window_results[-1]:
+                df = df[(df.index >= start_date) & (df.index <= end_date)]
+            else:
+                df = df[(df.index >= start_date) & (df.index < end_date)]
+
+            df = df.copy()
+            df["window"] = window_result["window"]
+            dfs.append(df)
+
+            window_result["oos_net_pnl"] = df["net_pnl"].sum()
+            window_result["oos_trade_count"] = df["trade_count"].sum()
+
+        self.oos_df = concat(dfs) if dfs else None
+
+        if output:
+            for window_result in self.window_results:
+                self.output(
+                    f"窗口{window_result['window']}，参数：{window_result['setting']}，"
+                    f"样本内目标：{window_result['is_target']}，样本外盈亏：{window_result['oos_net_pnl']:,.2f}"
+                )
+
+    def get_oos_df(self):
+        """
+        Stitched daily results of out-of-sample windows, with balance and drawdown.
+        """
+        if self.oos_df is None:
+            return None
+
+        df = self.oos_df.copy()
+        df["balance"] = df["net_pnl"].cumsum() + self.engine.capital
+        df["highlevel"] = df["balance"].cummax()
+        df["drawdown"] = df["balance"] - df["highlevel"]
+        return df
+
+    def calculate_statistics(self, output=True):
+        """
+        Statistics of stitched out-of-sample equity.
+        """
+        if self.oos_df is None or self.oos_df.empty:
+            self.output("样本外逐日盈亏为空，无法计算")
+            return {}
+
+        return self.engine.calculate_statistics(df=self.oos_df.copy(), output=output)
+
+    def get_window_df(self):
+        """
+        Chosen parameters and results of every window.
+        """
+        rows = []
+        for window_result in self.window_results:
+            row = {k: v for k, v in window_result.items() if k != "setting"}
+            row.update(window_result["setting"])
+            rows.append(row)
+        return DataFrame(rows).set_index("window")
+
+    def get_parameter_stability(self):
+        """
+        Stability of chosen parameters across windows:
+        mean/std/min/max, times of change between windows, most chosen value and its ratio.
+        """
+        rows = []
+        names = self.optimization_setting.params.keys()
+        for name in names:
+            values = [window_result["setting"][name] for window_result in self.window_results]
+            if not values:
+                continue
+
+            value_counts = Counter(values)
+            mode_value, mode_count = value_counts.most_common(1)[0]
+            series = DataFrame({"value": values})["value"]
+
+            rows.append({
+                "parameter": name,
+                "mean": series.mean(),
+                "std": series.std(ddof=0),
+                "min": series.min(),
+                "max": series.max(),
+                "changes": sum(1 for a, b in zip(values, values[1:]) if a != b),
+                "mode": mode_value,
+                "mode_ratio": mode_count / len(values)
+            })
+
+        return DataFrame(rows).set_index("parameter") if rows else DataFrame()
@@ -35,6 +35,11 @@ from .base import (
 from .template import CtaTemplate
 
 from vnpy.component.cta_fund_kline import FundKline
+from vnpy.component.cta_position_queue import PositionQueue
+from vnpy.component.cta_log import (
+    LOG_SILENT, JOURNAL_CSV, JOURNAL_JSONL, TradeJournal, format_log, get_log_level, to_record)
+from vnpy.component.cta_order_book import BacktestOrderBook
+from vnpy.component.cta_prune import Pruner
 
 from vnpy.trader.object import (
     BarData,
@@ -83,6 +88,9 @@ class BackTestingEngine(object):
         self.event_engine = event_engine
 
         self.mode = 'bar'  # 'bar': 根据1分钟k线进行回测， 'tick'，根据分笔tick进行回测
+        self.compact_tick = False  # tick回测时，使用__slots__的CompactTickData，减少内存占用
+        self.prefetch_days = 2  # tick回测时，后台预取的天数，0: 不预取
+        self.prefetch_process = False  # tick回测时，使用进程池预取（需要 if __name__ == '__main__' 保护），False: 线程池
 
         # 引擎类型为回测
         self.engine_type = EngineType.BACKTESTING
@@ -119,11 +127,11 @@ class BackTestingEngine(object):
 
         self.stop_order_count = 0  # 本地停止单编号
         self.stop_orders = {}  # 本地停止单
-        self.active_stop_orders = {}  # 活动本地停止单
+        self.active_stop_orders = BacktestOrderBook()  # 活动本地停止单（按合约、价格索引）
 
         self.limit_order_count = 0  # 限价单编号
         self.limit_orders = OrderedDict()  # 限价单字典
-        self.active_limit_orders = OrderedDict()  # 活动限价单字典，用于进行撮合用
+        self.active_limit_orders = BacktestOrderBook()  # 活动限价单字典，用于进行撮合用（按合约、价格索引）
 
         self.order_strategy_dict = {}  # orderid 与 strategy的映射
 
@@ -136,8 +144,8 @@ class BackTestingEngine(object):
         self.trades = OrderedDict()  # 记录所有得成交记录
         self.trade_pnl_list = []  # 交易记录列表
 
-        self.long_position_list = []  # 多单持仓
-        self.short_position_list = []  # 空单持仓
+        self.long_position_list = PositionQueue()  # 多单持仓
+        self.short_position_list = PositionQueue()  # 空单持仓
 
         self.holdings = {}  # 多空持仓
 
@@ -197,6 +205,11 @@ class BackTestingEngine(object):
         self.logger = None
         self.strategy_loggers = {}
         self.debug = False
+        self.log_level = logging.ERROR  # 生效的日志级别，低于该级别的日志不生成、不输出
+        self.silent = False  # 静默模式（参数优化），不输出日志
+        self.trade_journal = JOURNAL_CSV  # 成交记录方式: csv/jsonl/None
+        self.trade_journals = {}  # 策略名 => 成交流水TradeJournal
+        self.pruner = None  # 参数优化剪枝，触发剪枝规则时回测提前终止
 
         self.is_7x24 = False
         self.logs_path = None
@@ -204,6 +217,7 @@ class BackTestingEngine(object):
 
         self.fund_kline_dict = {}
         self.active_fund_kline = False
+        self.fund_kline_sample_seconds = 0  # 资金曲线采样间隔秒数，0: 每个tick/bar都更新
 
         # 回测任务/回测结果，保存在数据库中
         self.mongo_api = None
@@ -230,6 +244,7 @@ class BackTestingEngine(object):
             # 使用砖图，高度是资金的千分之一
             setting['height'] = self.init_capital * 0.001
             setting['use_renko'] = True
+        setting['sample_seconds'] = self.fund_kline_sample_seconds
 
         fund_kline = FundKline(cta_engine=self, setting=setting)
         self.fund_kline_dict.update({name: fund_kline})
@@ -451,6 +466,17 @@ class BackTestingEngine(object):
 
         self.debug = test_setting.get('debug', False)
 
+        # 日志级别，缺省debug时为DEBUG，否则为ERROR；静默模式不输出日志
+        self.silent = test_setting.get('silent', False)
+        self.log_level = LOG_SILENT if self.silent else get_log_level(
+            test_setting.get('log_level'), default=logging.DEBUG if self.debug else logging.ERROR)
+        # 成交记录方式: csv（缺省）/jsonl；静默模式缺省不记录
+        self.trade_journal = test_setting.get('trade_journal', None if self.silent else JOURNAL_CSV)
+
+        # 剪枝规则（参数优化），见 vnpy.component.cta_prune.Pruner
+        prune_setting = test_setting.get('prune_setting', None)
+        self.pruner = Pruner(prune_setting) if prune_setting else None
+
         if 'using_99_contract' in test_setting:
             self.using_99_contract = test_setting.get('using_99_contract')
             self.write_log(f'是否使用指数合约:{self.using_99_contract}')
@@ -510,6 +536,9 @@ class BackTestingEngine(object):
 
         if self.mode == 'tick':
             self.tick_path = test_setting.get('tick_path', None)
+            self.compact_tick = test_setting.get('compact_tick', False)
+            self.prefetch_days = test_setting.get('prefetch_days', 2)
+            self.prefetch_process = test_setting.get('prefetch_process', False)
 
         # 设置bar文件的时间间隔秒数
         if 'bar_interval_seconds' in test_setting:
@@ -518,6 +547,7 @@ class BackTestingEngine(object):
 
         # 资金曲线
         self.active_fund_kline = test_setting.get('active_fund_kline', False)
+        self.fund_kline_sample_seconds = test_setting.get('fund_kline_sample_seconds', 0)
         if self.active_fund_kline:
             # 创建资金K线
             self.create_fund_kline(self.test_name, use_renko=test_setting.get('use_renko', False))
@@ -576,13 +606,14 @@ class BackTestingEngine(object):
 
         # 更新账号级别资金曲线(只有持仓时，才更新)
         fund_kline = self.get_fund_kline(self.test_name)
-        if fund_kline is not None and (len(self.long_position_list) > 0 or len(self.short_position_list) > 0):
+        if fund_kline is not None and (len(self.long_position_list) > 0 or len(self.short_position_list) > 0) \
+                and fund_kline.is_sample_time(self.last_dt):
             fund_kline.update_account(self.last_dt, self.net_capital)
 
         for strategy in self.symbol_strategy_map.get(tick.vt_symbol, []):
             # 更新策略的资金K线
             fund_kline = self.fund_kline_dict.get(strategy.strategy_name, None)
-            if fund_kline:
+            if fund_kline and fund_kline.is_sample_time(self.last_dt):
                 hold_pnl, _ = fund_kline.get_hold_pnl()
                 if hold_pnl != 0:
                     fund_kline.update_strategy(dt=self.last_dt, hold_pnl=hold_pnl)
@@ -607,13 +638,14 @@ class BackTestingEngine(object):
 
         # 更新账号的资金曲线(只有持仓时，才更新)
         fund_kline = self.get_fund_kline(self.test_name)
-        if fund_kline is not None and (len(self.long_position_list) > 0 or len(self.short_position_list) > 0):
+        if fund_kline is not None and (len(self.long_position_list) > 0 or len(self.short_position_list) > 0) \
+                and fund_kline.is_sample_time(self.last_dt):
             fund_kline.update_account(self.last_dt, self.net_capital)
 
         for strategy in self.symbol_strategy_map.get(bar.vt_symbol, []):
             # 更新策略的资金K线
             fund_kline = self.fund_kline_dict.get(strategy.strategy_name, None)
-            if fund_kline:
+            if fund_kline and fund_kline.is_sample_time(self.last_dt):
                 hold_pnl, _ = fund_kline.get_hold_pnl()
                 if hold_pnl != 0:
                     fund_kline.update_strategy(dt=self.last_dt, hold_pnl=hold_pnl)
@@ -874,7 +906,7 @@ class BackTestingEngine(object):
         self.limit_orders[order.vt_orderid] = order
         self.order_strategy_dict.update({order.vt_orderid: strategy})
 
-        self.write_log(f'创建限价单:{order.__dict__}')
+        self.write_log(lambda: f'创建限价单:{order.__dict__}')
 
         return [order.vt_orderid]
 
@@ -901,7 +933,7 @@ class BackTestingEngine(object):
             stop_orderid=f"{STOPORDER_PREFIX}.{self.stop_order_count}",
             strategy_name=strategy.strategy_name,
         )
-        self.write_log(f'创建本地停止单:{stop_order.__dict__}')
+        self.write_log(lambda: f'创建本地停止单:{stop_order.__dict__}')
         self.order_strategy_dict.update({stop_order.stop_orderid: strategy})
 
         self.active_stop_orders[stop_order.stop_orderid] = stop_order
@@ -1024,32 +1056,31 @@ class BackTestingEngine(object):
         """
         vt_symbol = bar.vt_symbol if bar else tick.vt_symbol
 
-        for stop_orderid in list(self.active_stop_orders.keys()):
-            stop_order = self.active_stop_orders[stop_orderid]
+        # 若买入方向停止单价格高于等于该价格，则会触发
+        if bar:
+            price_tick = self.get_price_tick(vt_symbol)
+            long_cross_price = round_to(value=bar.low_price, target=price_tick) - price_tick
+            # 若卖出方向停止单价格低于等于该价格，则会触发
+            short_cross_price = round_to(value=bar.high_price, target=price_tick) + price_tick
+            # 在当前时间点前发出的买入委托可能的最优成交价
+            long_best_price = round_to(value=bar.open_price, target=price_tick) + price_tick
+            # 在当前时间点前发出的卖出委托可能的最优成交价
+            short_best_price = round_to(value=bar.open_price, target=price_tick) - price_tick
+        else:
+            long_cross_price = tick.last_price
+            short_cross_price = tick.last_price
+            long_best_price = tick.last_price
+            short_best_price = tick.last_price
+
+        # 只遍历触发价被穿越的停止单（按委托先后顺序）
+        for stop_orderid in self.active_stop_orders.get_crossed(vt_symbol,
+                                                                long_high=long_cross_price,
+                                                                short_low=short_cross_price):
+            stop_order = self.active_stop_orders.get(stop_orderid, None)
             strategy = self.order_strategy_dict.get(stop_orderid, None)
-            if stop_order.vt_symbol != vt_symbol or stop_order is None or strategy is None:
+            if stop_order is None or strategy is None:
                 continue
 
-            # 若买入方向停止单价格高于等于该价格，则会触发
-            if bar:
-                long_cross_price = round_to(value=bar.low_price, target=self.get_price_tick(vt_symbol))
-                long_cross_price -= self.get_price_tick(vt_symbol)
-                # 若卖出方向停止单价格低于等于该价格，则会触发
-                short_cross_price = round_to(value=bar.high_price, target=self.get_price_tick(vt_symbol))
-                short_cross_price += self.get_price_tick(vt_symbol)
-                # 在当前时间点前发出的买入委托可能的最优成交价
-                long_best_price = round_to(value=bar.open_price,
-                                           target=self.get_price_tick(vt_symbol)) + self.get_price_tick(vt_symbol)
-
-                # 在当前时间点前发出的卖出委托可能的最优成交价
-                short_best_price = round_to(value=bar.open_price,
-                                            target=self.get_price_tick(vt_symbol)) - self.get_price_tick(vt_symbol)
-            else:
-                long_cross_price = tick.last_price
-                short_cross_price = tick.last_price
-                long_best_price = tick.last_price
-                short_best_price = tick.last_price
-
             # Check whether stop order can be triggered.
             long_cross = stop_order.direction == Direction.LONG and stop_order.price <= long_cross_price
 
@@ -1073,7 +1104,7 @@ class BackTestingEngine(object):
                 gateway_name=self.gateway_name,
             )
             order.datetime = self.last_dt
-            self.write_log(f'停止单被触发:\n{stop_order.__dict__}\n=>委托单{order.__dict__}')
+            self.write_log(lambda: f'停止单被触发:\n{stop_order.__dict__}\n=>委托单{order.__dict__}')
             self.limit_orders[order.vt_orderid] = order
 
             # Create trade data.
@@ -1099,7 +1130,7 @@ class BackTestingEngine(object):
             )
             trade.strategy_name = strategy.strategy_name
             trade.datetime = self.last_dt
-            self.write_log(f'停止单触发成交:{trade.__dict__}')
+            self.write_log(lambda: f'停止单触发成交:{trade.__dict__}')
             self.trade_dict[trade.vt_tradeid] = trade
             self.trades[trade.vt_tradeid] = copy.copy(trade)
 
@@ -1122,34 +1153,35 @@ class BackTestingEngine(object):
 
         vt_symbol = bar.vt_symbol if bar else tick.vt_symbol
 
-        # 遍历限价单字典中的所有限价单
-        for vt_orderid in list(self.active_limit_orders.keys()):
+        # 买入/卖出的穿越价，同一合约的所有限价单相同
+        if bar:
+            price_tick = self.get_price_tick(vt_symbol)
+
+            buy_cross_price = round_to(value=bar.low_price, target=price_tick) + price_tick  # 若买入方向限价单价格高于该价格，则会成交
+            sell_cross_price = round_to(value=bar.high_price,
+                                        target=price_tick) - price_tick  # 若卖出方向限价单价格低于该价格，则会成交
+            buy_best_cross_price = round_to(value=bar.open_price,
+                                            target=price_tick) + price_tick  # 在当前时间点前发出的买入委托可能的最优成交价
+            sell_best_cross_price = round_to(value=bar.open_price,
+                                             target=price_tick) - price_tick  # 在当前时间点前发出的卖出委托可能的最优成交价
+        else:
+            buy_cross_price = tick.last_price
+            sell_cross_price = tick.last_price
+            buy_best_cross_price = tick.last_price
+            sell_best_cross_price = tick.last_price
+
+        # 只遍历价格被穿越的限价单（按委托先后顺序）
+        for vt_orderid in self.active_limit_orders.get_crossed(vt_symbol,
+                                                               long_low=buy_cross_price,
+                                                               short_high=sell_cross_price):
             order = self.active_limit_orders.get(vt_orderid, None)
-            if order.vt_symbol != vt_symbol:
+            if order is None:
                 continue
 
             strategy = self.order_strategy_dict.get(order.vt_orderid, None)
             if strategy is None:
                 self.write_error(u'找不到vt_orderid:{}对应的策略'.format(order.vt_orderid))
                 continue
-            if bar:
-                buy_cross_price = round_to(value=bar.low_price,
-                                           target=self.get_price_tick(vt_symbol)) + self.get_price_tick(
-                    vt_symbol)  # 若买入方向限价单价格高于该价格，则会成交
-                sell_cross_price = round_to(value=bar.high_price,
-                                            target=self.get_price_tick(vt_symbol)) - self.get_price_tick(
-                    vt_symbol)  # 若卖出方向限价单价格低于该价格，则会成交
-                buy_best_cross_price = round_to(value=bar.open_price,
-                                                target=self.get_price_tick(vt_symbol)) + self.get_price_tick(
-                    vt_symbol)  # 在当前时间点前发出的买入委托可能的最优成交价
-                sell_best_cross_price = round_to(value=bar.open_price,
-                                                 target=self.get_price_tick(vt_symbol)) - self.get_price_tick(
-                    vt_symbol)  # 在当前时间点前发出的卖出委托可能的最优成交价
-            else:
-                buy_cross_price = tick.last_price
-                sell_cross_price = tick.last_price
-                buy_best_cross_price = tick.last_price
-                sell_best_cross_price = tick.last_price
 
             # 判断是否会成交
             buy_cross = order.direction == Direction.LONG and order.price >= buy_cross_price
@@ -1203,9 +1235,8 @@ class BackTestingEngine(object):
                     # 更新持仓缓存数据
                     holding = self.get_position_holding(cov_trade.vt_symbol, self.gateway_name)
                     holding.update_trade(cov_trade)
-                    self.write_log(u'{} : crossLimitOrder: TradeId:{},  posBuffer = {}'.format(cov_trade.strategy_name,
-                                                                                               cov_trade.tradeid,
-                                                                                               holding.to_str()))
+                    self.write_log(lambda: u'{} : crossLimitOrder: TradeId:{},  posBuffer = {}'.format(
+                        cov_trade.strategy_name, cov_trade.tradeid, holding.to_str()))
 
                     # 写入交易记录
                     self.append_trade(cov_trade)
@@ -1345,7 +1376,7 @@ class BackTestingEngine(object):
             print(u'create logger:{}'.format(filename))
             self.logger = setup_logger(file_name=filename,
                                        name=self.test_name,
-                                       log_level=logging.DEBUG if debug else logging.ERROR,
+                                       log_level=logging.DEBUG if debug else min(self.log_level, logging.ERROR),
                                        backtesing=True)
         else:
             filename = os.path.abspath(
@@ -1353,14 +1384,25 @@ class BackTestingEngine(object):
             print(u'create logger:{}'.format(filename))
             self.strategy_loggers[strategy_name] = setup_logger(file_name=filename,
                                                                 name=str(strategy_name),
-                                                                log_level=logging.DEBUG if debug else logging.ERROR,
+                                                                log_level=logging.DEBUG if debug else min(self.log_level, logging.ERROR),
                                                                 backtesing=True)
 
+    def is_log_enabled(self, level: int = logging.DEBUG):
+        """该级别的日志是否输出"""
+        return level >= self.log_level
+
     def write_log(self, msg: str, strategy_name: str = None, level: int = logging.DEBUG):
-        """记录日志"""
+        """
+        记录日志
+        :param msg: 日志内容，或生成日志内容的函数（级别启用时才调用）
+        """
         # log = str(self.datetime) + ' ' + content
         # self.logList.append(log)
 
+        if level < self.log_level:
+            return
+        msg = format_log(msg)
+
         if strategy_name is None:
             # 写入本地log日志
             if self.logger:
@@ -1396,6 +1438,8 @@ class BackTestingEngine(object):
 
     def output(self, content):
         """输出内容"""
+        if self.silent:
+            return
         print(self.test_name + "\t" + content)
 
     def realtime_calculate(self):
@@ -1441,23 +1485,17 @@ class BackTestingEngine(object):
                         raise Exception(u'异常!没有空单持仓，不能cover')
                         return
 
-                    cur_short_pos_list = [s_pos.volume for s_pos in self.short_position_list]
+                    self.write_log(lambda: u'{}当前空单:{}'.format(
+                        trade.vt_symbol, self.short_position_list.get_volumes(trade.strategy_name, trade.vt_symbol)))
 
-                    self.write_log(u'{}当前空单:{}'.format(trade.vt_symbol, cur_short_pos_list))
+                    # 来自同一策略，同一合约才能撮合，从未平仓的空头交易，取最早的一笔
+                    open_trade = self.short_position_list.popleft(trade.strategy_name, trade.vt_symbol)
 
-                    # 来自同一策略，同一合约才能撮合
-                    pop_indexs = [i for i, val in enumerate(self.short_position_list) if
-                                  val.vt_symbol == trade.vt_symbol and val.strategy_name == trade.strategy_name]
-
-                    if len(pop_indexs) < 1:
+                    if open_trade is None:
                         self.write_error(u'异常，{}没有对应symbol:{}的空单持仓'.format(trade.strategy_name, trade.vt_symbol))
                         raise Exception(u'realtimeCalculate2() Exception,没有对应symbol:{0}的空单持仓'.format(trade.vt_symbol))
                         return
 
-                    pop_index = pop_indexs[0]
-                    # 从未平仓的空头交易
-                    open_trade = self.short_position_list.pop(pop_index)
-
                     # 开空volume，不大于平仓volume
                     if cover_volume >= open_trade.volume:
                         self.write_log(f'cover volume:{cover_volume}, 满足:{open_trade.volume}')
@@ -1573,8 +1611,8 @@ class BackTestingEngine(object):
                         open_trade.volume = remain_volume
                         self.write_log(u'更新（减少）开仓单的volume,重新推进开仓单列表中:{}'.format(open_trade.volume))
                         self.short_position_list.append(open_trade)
-                        cur_short_pos_list = [s_pos.volume for s_pos in self.short_position_list]
-                        self.write_log(u'当前空单:{}'.format(cur_short_pos_list))
+                        self.write_log(lambda: u'当前空单:{}'.format(
+                            self.short_position_list.get_volumes(trade.strategy_name, trade.vt_symbol)))
 
                         cover_volume = 0
                         result_list.append(result)
@@ -1609,20 +1647,17 @@ class BackTestingEngine(object):
                         raise RuntimeError(u'realtimeCalculate2() Exception,没有开多单')
                         return
 
-                    pop_indexs = [i for i, val in enumerate(self.long_position_list) if
-                                  val.vt_symbol == trade.vt_symbol and val.strategy_name == trade.strategy_name]
-                    if len(pop_indexs) < 1:
+                    if self.long_position_list.count(trade.strategy_name, trade.vt_symbol) < 1:
                         self.write_error(f'没有{trade.strategy_name}对应的symbol{trade.vt_symbol}多单数据,')
                         raise RuntimeError(
                             f'realtimeCalculate2() Exception,没有对应的symbol{trade.vt_symbol}多单数据,')
                         return
 
-                    cur_long_pos_list = [s_pos.volume for s_pos in self.long_position_list]
+                    self.write_log(lambda: u'{}当前多单:{}'.format(
+                        trade.vt_symbol, self.long_position_list.get_volumes(trade.strategy_name, trade.vt_symbol)))
 
-                    self.write_log(u'{}当前多单:{}'.format(trade.vt_symbol, cur_long_pos_list))
-
-                    pop_index = pop_indexs[0]
-                    open_trade = self.long_position_list.pop(pop_index)
+                    # 来自同一策略，同一合约才能撮合，取最早的一笔多单
+                    open_trade = self.long_position_list.popleft(trade.strategy_name, trade.vt_symbol)
                     # 开多volume，不大于平仓volume
                     if sell_volume >= open_trade.volume:
                         self.write_log(f'{open_trade.vt_symbol},Sell Volume:{sell_volume} 满足:{open_trade.volume}')
@@ -1866,6 +1901,21 @@ class BackTestingEngine(object):
         self.available = self.net_capital - occupy_money
         self.percent = round(float(occupy_money * 100 / self.net_capital), 2)
 
+    def check_prune(self, d):
+        """
+        交易日结束（已保存每日数据）后，检查剪枝规则
+        :param d: 交易日，datetime
+        :return: True: 触发剪枝，回测应终止
+        """
+        if self.pruner is None:
+            return False
+
+        if self.pruner.on_day(d, self.net_capital, self.trade_count):
+            self.write_log(f'触发剪枝，回测停止:{self.pruner.reason}', level=logging.WARNING)
+            self.output(f'触发剪枝，回测停止:{self.pruner.reason}')
+            return True
+        return False
+
     def saving_daily_data(self, d, c, m, commission, benchmark=0):
         """保存每日数据"""
         data = {}
@@ -2093,6 +2143,7 @@ class BackTestingEngine(object):
 
     def show_backtesting_result(self):
         """显示回测结果"""
+        self.close_trade_journals()
 
         d, daily_net_capital, daily_capital = self.get_result()
 
@@ -2296,6 +2347,9 @@ class BackTestingEngine(object):
         :param trade:
         :return:
         """
+        if not self.trade_journal:
+            return
+
         strategy_name = getattr(trade, 'strategy_name', self.test_name)
         trade_fields = ['symbol', 'exchange', 'vt_symbol', 'tradeid',
                         'vt_tradeid', 'orderid', 'vt_orderid',
@@ -2304,6 +2358,16 @@ class BackTestingEngine(object):
 
         d = OrderedDict()
         try:
+            # 写入成交流水 logs\test_name\strategy_name_trade.jsonl（文件保持打开）
+            if self.trade_journal == JOURNAL_JSONL:
+                journal = self.trade_journals.get(strategy_name, None)
+                if journal is None:
+                    journal = TradeJournal(os.path.abspath(
+                        os.path.join(self.get_logs_path(), '{}_trade.jsonl'.format(strategy_name))))
+                    self.trade_journals[strategy_name] = journal
+                journal.write(to_record(trade, trade_fields))
+                return
+
             for k in trade_fields:
                 if k in ['exchange', 'direction', 'offset']:
                     d[k] = getattr(trade, k).value
@@ -2315,6 +2379,12 @@ class BackTestingEngine(object):
         except Exception as ex:
             self.write_error(u'写入交易记录csv出错：{},{}'.format(str(ex), traceback.format_exc()))
 
+    def close_trade_journals(self):
+        """关闭成交流水文件"""
+        for journal in self.trade_journals.values():
+            journal.close()
+        self.trade_journals.clear()
+
     #  保存记录相关
     def append_data(self, file_name: str, dict_data: OrderedDict, field_names: list = None):
         """
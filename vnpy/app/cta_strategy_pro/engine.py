@@ -78,6 +78,7 @@ from .base import (
 from .template import CtaTemplate
 from vnpy.component.base import MARKET_DAY_ONLY
 from vnpy.component.cta_position import CtaPosition
+from vnpy.component.cta_order_book import StopOrderBook
 
 STOP_STATUS_MAP = {
     Status.SUBMITTING: StopOrderStatus.WAITING,
@@ -149,7 +150,7 @@ class CtaEngine(BaseEngine):
             set)  # strategy_name: orderid list
 
         self.stop_order_count = 0  # for generating stop_orderid
-        self.stop_orders = {}  # stop_orderid: stop_order
+        self.stop_orders = StopOrderBook()  # stop_orderid: stop_order
 
         self.thread_executor = ThreadPoolExecutor(max_workers=1)
         self.thread_tasks = []
@@ -425,8 +426,10 @@ class CtaEngine(BaseEngine):
 
     def check_stop_order(self, tick: TickData):
         """"""
-        for stop_order in list(self.stop_orders.values()):
-            if stop_order.vt_symbol != tick.vt_symbol:
+        # 只取出最新价触发的停止单（按合约、价格堆索引）
+        for stop_orderid in self.stop_orders.get_triggered(tick.vt_symbol, tick.last_price):
+            stop_order = self.stop_orders.get(stop_orderid, None)
+            if stop_order is None:
                 continue
 
             long_triggered = stop_order.direction == Direction.LONG and tick.last_price >= stop_order.price
@@ -895,8 +898,7 @@ class CtaEngine(BaseEngine):
             contract = self.main_engine.get_contract(vt_symbol)
             if contract and contract.gateway_name:
                 gateway_name = contract.gateway_name
-        vt_position_id = f"{gateway_name}.{vt_symbol}.{direction.value}"
-        return self.main_engine.get_position(vt_position_id)
+        return self.main_engine.get_symbol_position(vt_symbol, direction, gateway_name)
 
     def get_position_holding(self, vt_symbol: str, gateway_name: str = ''):
         """ 查询合约在账号的持仓（包含多空）"""
@@ -0,0 +1,488 @@
+# encoding: UTF-8
+
+'''
+组合回测的参数优化
+针对 PortfolioTestingEngine / SpreadTestingEngine：
+- 穷举优化 run_optimization：参数网格的所有组合
+- 遗传算法优化 run_ga_optimization：需安装deap
+- 逐级减半优化 run_halving_optimization：先以较短的回测区间筛选，保留排名靠前的参数组合回测更长的区间
+剪枝：test_setting['prune_setting'] 配置剪枝规则（见 vnpy.component.cta_prune.Pruner），
+回撤超限、净值过低等参数组合提前终止回测，排在结果表的最后
+每个参数组合，在进程池中执行一次完整的组合回测（缺省静默模式，不输出日志），
+收集 get_result() 的统计数据，按优化目标排序，汇总为一张结果表。
+bar方式回测时，父进程预先加载所有bar csv => DataFrame：
+- fork方式(linux)：工作进程直接继承父进程的数据（写时复制），不再逐个参数组合读取csv
+- spawn方式(windows)：每个工作进程初始化时接收一次数据
+
+参数名称：
+    'para_x'：更新所有策略实例的 setting['para_x']
+    '策略实例名.para_x'：只更新该策略实例的 setting['para_x']
+'''
+import sys
+import copy
+import multiprocessing
+import random
+import traceback
+from datetime import datetime
+from itertools import product
+from time import time
+
+import pandas as pd
+
+from vnpy.component.cta_prune import get_halving_ends, get_survivor_count, is_pruned, sort_key
+from .portfolio_testing import PortfolioTestingEngine
+
+PARAM_SEPARATOR = '.'
+
+# 不放入结果表的列表字段
+RESULT_LIST_FIELDS = ['time_list', 'pnl_list', 'capital_list', 'drawdown_list', 'drawdown_rate_list']
+
+# 工作进程共享的bar数据 vt_symbol: df
+worker_bar_df_dict = {}
+
+
+class OptimizationSetting:
+    """
+    参数优化设置
+    """
+
+    def __init__(self):
+        """"""
+        self.params = {}
+        self.target_name = ""
+
+    def add_parameter(
+        self, name: str, start: float, end: float = None, step: float = None
+    ):
+        """
+        添加优化参数: 起始值、结束值、步进
+        """
+        if not end and not step:
+            self.params[name] = [start]
+            return
+
+        if start >= end:
+            print("参数优化起始点必须小于终止点")
+            return
+
+        if step <= 0:
+            print("参数优化步进必须大于0")
+            return
+
+        value = start
+        value_list = []
+
+        while value <= end:
+            value_list.append(value)
+            value += step
+
+        self.params[name] = value_list
+
+    def add_values(self, name: str, values: list):
+        """
+        添加优化参数: 取值清单（可以是非数值参数）
+        """
+        self.params[name] = list(values)
+
+    def set_target(self, target_name: str):
+        """
+        优化目标，get_result()的统计字段，如 profit, sharpe, winning_rate
+        """
+        self.target_name = target_name
+
+    def generate_setting(self):
+        """"""
+        keys = self.params.keys()
+        values = self.params.values()
+        products = list(product(*values))
+
+        settings = []
+        for p in products:
+            setting = dict(zip(keys, p))
+            settings.append(setting)
+
+        return settings
+
+    def generate_setting_ga(self):
+        """"""
+        settings_ga = []
+        settings = self.generate_setting()
+        for d in settings:
+            param = [tuple(i) for i in d.items()]
+            settings_ga.append(param)
+        return settings_ga
+
+
+def apply_parameters(strategy_setting: dict, parameters: dict):
+    """
+    把一组优化参数更新到策略配置中
+    :param strategy_setting: {策略实例名: {'class_name': xxx, 'vt_symbol': xxx, 'setting': {}}}
+    :param parameters: {参数名称: 参数值}
+    :return: 新的策略配置
+    """
+    new_setting = copy.deepcopy(strategy_setting)
+    for name, value in parameters.items():
+        strategy_name, _, para_name = name.rpartition(PARAM_SEPARATOR)
+        if strategy_name in new_setting:
+            strategy_names = [strategy_name]
+        else:
+            strategy_names = list(new_setting.keys())
+            para_name = name
+        for strategy_name in strategy_names:
+            new_setting[strategy_name].setdefault('setting', {})[para_name] = value
+    return new_setting
+
+
+def get_test_setting(test_setting: dict):
+    """参数优化的回测配置：缺省静默模式，不保存到mongo"""
+    setting = copy.copy(test_setting)
+    setting.setdefault('silent', True)
+    setting.pop('save_mongo', None)
+    return setting
+
+
+def get_statistics(engine):
+    """回测引擎的统计结果（不含逐笔列表）"""
+    d, _, _ = engine.get_result()
+    statistics = {k: v for k, v in d.items() if k not in RESULT_LIST_FIELDS}
+    if d:
+        statistics['max_drawdown'] = min(d['drawdown_list'])
+        statistics['max_drawdown_rate'] = engine.daily_max_drawdown_rate
+    statistics['net_capital'] = engine.net_capital
+    if engine.pruner:
+        statistics.update(engine.pruner.get_statistics())
+    return statistics
+
+
+def init_worker(bar_df_dict: dict):
+    """工作进程初始化（spawn方式），接收共享的bar数据"""
+    global worker_bar_df_dict
+    worker_bar_df_dict = bar_df_dict
+
+
+def optimize(engine_class, test_setting: dict, strategy_setting: dict, parameters: dict, target_name: str):
+    """
+    执行一个参数组合的组合回测（在进程池中执行）
+    :return: (参数, 目标值, 统计数据)，回测异常或没有交易结果时，目标值为None
+    """
+    try:
+        engine = engine_class()
+        engine.shared_bar_df_dict = worker_bar_df_dict
+        engine.prepare_env(test_setting)
+        engine.run_portfolio_test(apply_parameters(strategy_setting, parameters))
+        statistics = get_statistics(engine)
+    except Exception as ex:
+        print(f'参数{parameters}回测异常:{str(ex)}', file=sys.stderr)
+        traceback.print_exc()
+        statistics = {'error': str(ex)}
+
+    return parameters, statistics.get(target_name, None), statistics
+
+
+def sort_results(results: list):
+    """按目标值从大到小排序，被剪枝的、没有目标值的排在最后"""
+    return sorted(results, key=sort_key, reverse=True)
+
+
+class PortfolioOptimizer(object):
+    """
+    组合回测参数优化
+    optimizer = PortfolioOptimizer(test_setting, strategy_setting)
+    results = optimizer.run_optimization(optimization_setting)
+    optimizer.save_result(results, 'xxx_optimization.csv')
+    """
+
+    def __init__(self,
+                 test_setting: dict,
+                 strategy_setting: dict,
+                 engine_class=PortfolioTestingEngine,
+                 max_workers: int = None,
+                 share_data: bool = True):
+        """
+        :param test_setting: 组合回测配置（同single_test）
+        :param strategy_setting: 策略配置（同single_test），优化参数在此基础上更新
+        :param engine_class: PortfolioTestingEngine / SpreadTestingEngine
+        :param max_workers: 工作进程数量，缺省为cpu数量
+        :param share_data: bar方式回测时，是否由父进程预先加载bar数据，供所有参数组合共享
+        """
+        self.test_setting = get_test_setting(test_setting)
+        self.strategy_setting = strategy_setting
+        self.engine_class = engine_class
+        self.max_workers = max_workers or multiprocessing.cpu_count()
+        self.share_data = share_data
+        self.bar_df_dict = None
+
+    def output(self, msg):
+        """输出内容"""
+        print(f"{datetime.now()}\t{msg}")
+
+    def get_bar_df_dict(self):
+        """父进程预先加载的bar数据，只在bar方式回测的PortfolioTestingEngine中使用"""
+        if self.bar_df_dict is None:
+            self.bar_df_dict = {}
+            if self.share_data and self.test_setting.get('mode', 'bar') == 'bar' \
+                    and hasattr(self.engine_class, 'load_all_bar_df'):
+                engine = self.engine_class()
+                engine.prepare_env(self.test_setting)
+                self.bar_df_dict = dict(engine.load_all_bar_df())
+                self.output(f'预先加载bar数据:{list(self.bar_df_dict.keys())}')
+        return self.bar_df_dict
+
+    def create_pool(self):
+        """创建进程池，fork方式时工作进程直接继承共享的bar数据"""
+        global worker_bar_df_dict
+        bar_df_dict = self.get_bar_df_dict()
+        if 'fork' in multiprocessing.get_all_start_methods():
+            worker_bar_df_dict = bar_df_dict
+            return multiprocessing.get_context('fork').Pool(self.max_workers)
+
+        return multiprocessing.get_context('spawn').Pool(self.max_workers,
+                                                         initializer=init_worker,
+                                                         initargs=(bar_df_dict,))
+
+    def release_pool(self, pool):
+        """关闭进程池"""
+        global worker_bar_df_dict
+        pool.close()
+        pool.join()
+        worker_bar_df_dict = {}
+
+    def run_optimization(self, optimization_setting: OptimizationSetting, output=True):
+        """
+        穷举优化
+        :return: [(参数, 目标值, 统计数据)]，按目标值从大到小排序
+        """
+        settings = optimization_setting.generate_setting()
+        target_name = optimization_setting.target_name
+
+        if not settings:
+            self.output("优化参数组合为空，请检查")
+            return
+
+        if not target_name:
+            self.output("优化目标未设置，请检查")
+            return
+
+        self.output(f"参数优化空间：{len(settings)}，工作进程数：{self.max_workers}")
+        start = time()
+
+        pool = self.create_pool()
+        try:
+            async_results = [pool.apply_async(optimize, (self.engine_class,
+                                                         self.test_setting,
+                                                         self.strategy_setting,
+                                                         setting,
+                                                         target_name))
+                             for setting in settings]
+        finally:
+            self.release_pool(pool)
+
+        results = sort_results([result.get() for result in async_results])
+
+        self.output(f"穷举优化完成，耗时{int(time() - start)}秒")
+        if output:
+            for value in results:
+                self.output(f"参数：{value[0]}, 目标：{value[1]}")
+
+        return results
+
+    def run_ga_optimization(self, optimization_setting: OptimizationSetting, population_size=100, ngen_size=30,
+                            output=True):
+        """
+        遗传算法优化
+        每一代中未计算过的参数组合，在进程池中并行回测；计算过的参数组合直接使用结果
+        :return: 所有计算过的 [(参数, 目标值, 统计数据)]，按目标值从大到小排序
+        """
+        from deap import algorithms, base, creator, tools
+        import numpy as np
+
+        settings = optimization_setting.generate_setting_ga()
+        target_name = optimization_setting.target_name
+
+        if not settings:
+            self.output("优化参数组合为空，请检查")
+            return
+
+        if not target_name:
+            self.output("优化目标未设置，请检查")
+            return
+
+        if not hasattr(creator, 'FitnessMax'):
+            creator.create("FitnessMax", base.Fitness, weights=(1.0,))
+        if not hasattr(creator, 'Individual'):
+            creator.create("Individual", list, fitness=creator.FitnessMax)
+
+        def generate_parameter():
+            """"""
+            return random.choice(settings)
+
+        def mutate_individual(individual, indpb):
+            """"""
+            size = len(individual)
+            paramlist = generate_parameter()
+            for i in range(size):
+                if random.random() < indpb:
+                    individual[i] = paramlist[i]
+            return individual,
+
+        cache = {}  # 参数组合tuple => (参数, 目标值, 统计数据)
+        pool = self.create_pool()
+
+        def evaluate(individual):
+            """"""
+            result = cache[tuple(individual)]
+            if result[1] is None or is_pruned(result):
+                return (float('-inf'),)
+            return (result[1],)
+
+        def evaluate_map(func, individuals):
+            """先在进程池中回测本代新的参数组合，再逐个评估"""
+            individuals = list(individuals)
+            new_keys = list(dict.fromkeys(tuple(ind) for ind in individuals if tuple(ind) not in cache))
+            if new_keys:
+                new_results = pool.starmap(optimize, [(self.engine_class,
+                                                       self.test_setting,
+                                                       self.strategy_setting,
+                                                       dict(key),
+                                                       target_name)
+                                                      for key in new_keys])
+                cache.update(zip(new_keys, new_results))
+            return [func(ind) for ind in individuals]
+
+        toolbox = base.Toolbox()
+        toolbox.register("individual", tools.initIterate, creator.Individual, generate_parameter)
+        toolbox.register("population", tools.initRepeat, list, toolbox.individual)
+        toolbox.register("mate", tools.cxTwoPoint)
+        toolbox.register("mutate", mutate_individual, indpb=1)
+        toolbox.register("evaluate", evaluate)
+        toolbox.register("select", tools.selNSGA2)
+        toolbox.register("map", evaluate_map)
+
+        total_size = len(settings)
+        pop_size = population_size  # number of individuals in each generation
+        lambda_ = pop_size  # number of children to produce at each generation
+        mu = int(pop_size * 0.8)  # number of individuals to select for the next generation
+
+        cxpb = 0.95  # probability that an offspring is produced by crossover
+        mutpb = 1 - cxpb  # probability that an offspring is produced by mutation
+        ngen = ngen_size  # number of generation
+
+        pop = toolbox.population(pop_size)
+        hof = tools.ParetoFront()  # end result of pareto front
+
+        stats = tools.Statistics(lambda ind: ind.fitness.values)
+        np.set_printoptions(suppress=True)
+        stats.register("mean", np.mean, axis=0)
+        stats.register("std", np.std, axis=0)
+        stats.register("min", np.min, axis=0)
+        stats.register("max", np.max, axis=0)
+
+        self.output(f"参数优化空间：{total_size}，工作进程数：{self.max_workers}")
+        self.output(f"每代族群总数：{pop_size}")
+        self.output(f"优良筛选个数：{mu}")
+        self.output(f"迭代次数：{ngen}")
+        self.output(f"交叉概率：{cxpb:.0%}")
+        self.output(f"突变概率：{mutpb:.0%}")
+
+        start = time()
+        try:
+            algorithms.eaMuPlusLambda(
+                pop,
+                toolbox,
+                mu,
+                lambda_,
+                cxpb,
+                mutpb,
+                ngen,
+                stats,
+                halloffame=hof
+            )
+        finally:
+            self.release_pool(pool)
+
+        self.output(f"遗传算法优化完成，耗时{int(time() - start)}秒，回测参数组合：{len(cache)}")
+
+        results = sort_results(list(cache.values()))
+        if output:
+            for parameter_values in hof:
+                value = cache[tuple(parameter_values)]
+                self.output(f"最优参数：{value[0]}, 目标：{value[1]}")
+
+        return results
+
+    def run_halving_optimization(self, optimization_setting: OptimizationSetting, rungs: int = 3, eta: int = 3,
+                                 output=True):
+        """
+        逐级减半优化
+        第1级回测 start_date 至 1/eta**(rungs-1) 处，保留未剪枝、排名前1/eta的参数组合进入下一级，
+        每级回测区间扩大eta倍，最后一级为完整回测区间
+        :return: 最后一级的 [(参数, 目标值, 统计数据)]，按目标值从大到小排序
+        """
+        settings = optimization_setting.generate_setting()
+        target_name = optimization_setting.target_name
+
+        if not settings:
+            self.output("优化参数组合为空，请检查")
+            return
+
+        if not target_name:
+            self.output("优化目标未设置，请检查")
+            return
+
+        start_date = datetime.strptime(self.test_setting['start_date'], '%Y%m%d')
+        end_date = self.test_setting.get('end_date', None)
+        end_date = datetime.strptime(end_date, '%Y%m%d') if end_date else datetime.now()
+        ends = get_halving_ends(start_date, end_date, rungs, eta)
+
+        self.output(f"参数优化空间：{len(settings)}，工作进程数：{self.max_workers}，级数：{len(ends)}")
+        start = time()
+
+        pool = self.create_pool()
+        try:
+            for i, end in enumerate(ends):
+                test_setting = dict(self.test_setting, end_date=end.strftime('%Y%m%d'))
+                self.output(f"第{i + 1}级优化：{len(settings)}组参数，回测至{test_setting['end_date']}")
+                results = sort_results(pool.starmap(optimize, [(self.engine_class,
+                                                                test_setting,
+                                                                self.strategy_setting,
+                                                                setting,
+                                                                target_name)
+                                                               for setting in settings]))
+                if i == len(ends) - 1:
+                    break
+
+                survivors = [result for result in results if not is_pruned(result)]
+                settings = [result[0] for result in survivors[:get_survivor_count(len(results), eta)]]
+                if not settings:
+                    self.output("所有参数组合均被剪枝，优化终止")
+                    break
+        finally:
+            self.release_pool(pool)
+
+        self.output(f"逐级减半优化完成，耗时{int(time() - start)}秒")
+        if output:
+            for value in results:
+                self.output(f"参数：{value[0]}, 目标：{value[1]}")
+
+        return results
+
+    def get_result_df(self, results: list):
+        """
+        优化结果 => 排序后的结果表
+        列：参数 + 目标值(target) + 统计数据
+        """
+        rows = []
+        for parameters, target_value, statistics in results:
+            row = dict(parameters)
+            row['target'] = target_value
+            row.update(statistics)
+            rows.append(row)
+        df = pd.DataFrame(rows)
+        df.index = range(1, len(df) + 1)
+        df.index.name = 'rank'
+        return df
+
+    def save_result(self, results: list, file_name: str):
+        """保存优化结果表到csv"""
+        self.get_result_df(results).to_csv(file_name, encoding='utf8')
+        self.output(f'优化结果保存至:{file_name}')
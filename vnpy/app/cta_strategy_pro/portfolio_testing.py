@@ -13,28 +13,32 @@ import gc
 import pandas as pd
 import traceback
 import random
-import bz2
-import pickle
 
 from datetime import datetime, timedelta
+from functools import partial
 from time import sleep
 
 from vnpy.trader.object import (
     TickData,
-    BarData,
-    RenkoBarData,
+    CompactTickData,
 )
 from vnpy.trader.constant import (
     Exchange,
 )
 
 from vnpy.trader.utility import (
-    get_trading_date,
     extract_vt_symbol,
 )
 
+from vnpy.component.cta_bar_feeder import BarFeeder
+from vnpy.component.cta_tick_cache import load_day_tick_df
+from vnpy.component.cta_day_prefetcher import DayPrefetcher
+
 from .back_testing import BackTestingEngine
 
+# tick回测读取的缓存字段
+TICK_FIELDS = ['datetime', 'price', 'volume']
+
 
 class PortfolioTestingEngine(BackTestingEngine):
     """
@@ -53,6 +57,7 @@ class PortfolioTestingEngine(BackTestingEngine):
         self.bar_csv_file = {}
         self.bar_df_dict = {}  # 历史数据的df，回测用
         self.bar_df = None  # 历史数据的df，时间+symbol作为组合索引
+        self.shared_bar_df_dict = {}  # 参数优化时，父进程预先加载的历史数据df，vt_symbol: df
         self.bar_interval_seconds = 60  # bar csv文件，属于K线类型，K线的周期（秒数）,缺省是1分钟
 
         self.tick_path = None  # tick级别回测， 路径
@@ -63,6 +68,12 @@ class PortfolioTestingEngine(BackTestingEngine):
         if vt_symbol in self.bar_df_dict:
             return True
 
+        # 参数优化时，直接使用父进程预先加载的数据（逐级减半优化时按本次回测的结束日期裁剪）
+        if vt_symbol in self.shared_bar_df_dict:
+            symbol_df = self.shared_bar_df_dict[vt_symbol].loc[self.test_start_date:self.test_end_date]
+            self.bar_df_dict.update({vt_symbol: symbol_df})
+            return True
+
         if bar_file is None or not os.path.exists(bar_file):
             self.write_error(u'回测时，{}对应的csv bar文件{}不存在'.format(vt_symbol, bar_file))
             return False
@@ -124,6 +135,17 @@ class PortfolioTestingEngine(BackTestingEngine):
 
         return True
 
+    def load_all_bar_df(self):
+        """
+        加载所有配置了bar文件的合约数据
+        参数优化时，父进程预先加载一次，供所有回测共享
+        :return: {vt_symbol: df}
+        """
+        for symbol, bar_file in self.bar_csv_file.items():
+            vt_symbol = '.'.join([symbol, self.get_exchange(symbol).value])
+            self.load_bar_csv_to_df(vt_symbol, bar_file)
+        return self.bar_df_dict
+
     def comine_bar_df(self):
         """
         合并所有回测合约的bar DataFrame =》集中的DataFrame
@@ -243,50 +265,7 @@ class PortfolioTestingEngine(BackTestingEngine):
         gc_collect_days = 0
 
         try:
-            for (dt, vt_symbol), bar_data in self.bar_df.iterrows():
-                symbol, exchange = extract_vt_symbol(vt_symbol)
-                if symbol.startswith('future_renko'):
-                    bar_datetime = dt
-                    bar = RenkoBarData(
-                        gateway_name='backtesting',
-                        symbol=symbol,
-                        exchange=exchange,
-                        datetime=bar_datetime
-                    )
-                    bar.seconds = float(bar_data.get('seconds', 0))
-                    bar.high_seconds = float(bar_data.get('high_seconds', 0))  # 当前Bar的上限秒数
-                    bar.low_seconds = float(bar_data.get('low_seconds', 0))  # 当前bar的下限秒数
-                    bar.height = float(bar_data.get('height', 0))  # 当前Bar的高度限制
-                    bar.up_band = float(bar_data.get('up_band', 0))  # 高位区域的基线
-                    bar.down_band = float(bar_data.get('down_band', 0))  # 低位区域的基线
-                    bar.low_time = bar_data.get('low_time', None)  # 最后一次进入低位区域的时间
-                    bar.high_time = bar_data.get('high_time', None)  # 最后一次进入高位区域的时间
-                else:
-                    bar_datetime = dt - timedelta(seconds=self.bar_interval_seconds)
-
-                    bar = BarData(
-                        gateway_name='backtesting',
-                        symbol=symbol,
-                        exchange=exchange,
-                        datetime=bar_datetime
-                    )
-
-                bar.open_price = float(bar_data['open'])
-                bar.close_price = float(bar_data['close'])
-                bar.high_price = float(bar_data['high'])
-                bar.low_price = float(bar_data['low'])
-                bar.volume = int(bar_data['volume'])
-                bar.open_interest = int(bar_data.get('open_interest', 0))
-                bar.date = bar_datetime.strftime('%Y-%m-%d')
-                bar.time = bar_datetime.strftime('%H:%M:%S')
-                str_td = str(bar_data.get('trading_day', ''))
-                if len(str_td) == 8:
-                    bar.trading_day = str_td[0:4] + '-' + str_td[4:6] + '-' + str_td[6:8]
-                elif len(str_td) == 10:
-                    bar.trading_day = str_td
-                else:
-                    bar.trading_day = get_trading_date(bar_datetime)
-
+            for dt, bar in BarFeeder(self.bar_df, bar_interval_seconds=self.bar_interval_seconds):
                 if last_trading_day != bar.trading_day:
                     self.output(u'回测数据日期:{},资金:{}'.format(bar.trading_day, self.net_capital))
                     if self.strategy_start_date > bar.datetime:
@@ -310,8 +289,11 @@ class PortfolioTestingEngine(BackTestingEngine):
                 if self.strategy_start_date <= dt <= self.data_end_date:
                     if last_trading_day != bar.trading_day:
                         if last_trading_day is not None:
-                            self.saving_daily_data(datetime.strptime(last_trading_day, '%Y-%m-%d'), self.cur_capital,
+                            last_day = datetime.strptime(last_trading_day, '%Y-%m-%d')
+                            self.saving_daily_data(last_day, self.cur_capital,
                                                    self.max_net_capital, self.total_commission)
+                            if self.check_prune(last_day):
+                                return
                         last_trading_day = bar.trading_day
 
                         # 第二个交易日,撤单
@@ -323,7 +305,8 @@ class PortfolioTestingEngine(BackTestingEngine):
                         if gc_collect_days >= 10:
                             # 执行内存回收
                             gc.collect()
-                            sleep(1)
+                            if not self.silent:
+                                sleep(1)
                             gc_collect_days = 0
 
                 if self.net_capital < 0:
@@ -342,55 +325,27 @@ class PortfolioTestingEngine(BackTestingEngine):
             traceback.print_exc()
             return
 
-    def load_bz2_cache(self, cache_folder, cache_symbol, cache_date):
-        """加载缓存数据"""
-        if not os.path.exists(cache_folder):
-            self.write_error('缓存目录:{}不存在,不能读取'.format(cache_folder))
-            return None
-        cache_folder_year_month = os.path.join(cache_folder, cache_date[:6])
-        if not os.path.exists(cache_folder_year_month):
-            self.write_error('缓存目录:{}不存在,不能读取'.format(cache_folder_year_month))
-            return None
-
-        cache_file = os.path.join(cache_folder_year_month, '{}_{}.pkb2'.format(cache_symbol, cache_date))
-        if not os.path.isfile(cache_file):
-            cache_file = os.path.join(cache_folder_year_month, '{}_{}.pkz2'.format(cache_symbol, cache_date))
-            if not os.path.isfile(cache_file):
-                self.write_error('缓存文件:{}不存在,不能读取'.format(cache_file))
-                return None
-
-        with bz2.BZ2File(cache_file, 'rb') as f:
-            data = pickle.load(f)
-            return data
-
-        return None
-
     def get_day_tick_df(self, test_day):
         """获取某一天得所有合约tick"""
-        tick_data_dict = {}
-
-        for vt_symbol in list(self.symbol_strategy_map.keys()):
-            symbol, exchange = extract_vt_symbol(vt_symbol)
-            tick_list = self.load_bz2_cache(cache_folder=self.tick_path,
-                                            cache_symbol=symbol,
-                                            cache_date=test_day.strftime('%Y%m%d'))
-            if not tick_list or len(tick_list) == 0:
-                continue
-
-            symbol_tick_df = pd.DataFrame(tick_list)
-            # 缓存文件中，datetime字段，已经是datetime格式
-            # 暂时根据时间去重，没有汇总volume
-            symbol_tick_df.drop_duplicates(subset=['datetime'], keep='first', inplace=True)
-            symbol_tick_df.set_index('datetime', inplace=True)
-
-            tick_data_dict.update({vt_symbol: symbol_tick_df})
-
-        if len(tick_data_dict) == 0:
-            return None
+        tick_df, missing_files = self.get_day_tick_loader()(test_day)
+        self.write_missing_files(missing_files)
+        return tick_df
 
-        tick_df = pd.concat(tick_data_dict, axis=0).swaplevel(0, 1).sort_index()
+    def get_day_tick_loader(self):
+        """
+        按日加载tick的函数，供DayPrefetcher使用
+        使用可pickle的模块级函数，进程池/线程池通用，返回 (DataFrame, 缺失的缓存文件清单)
+        """
+        return partial(load_day_tick_df,
+                       self.tick_path,
+                       list(self.symbol_strategy_map.keys()),
+                       fields=TICK_FIELDS,
+                       missing=True)
 
-        return tick_df
+    def write_missing_files(self, missing_files: list):
+        """输出缺失的缓存文件（加载函数可能在子进程中执行，不能直接输出日志）"""
+        for cache_file in missing_files:
+            self.write_error('缓存文件:{}(.npy/.npc/.pkb2/.pkz2)不存在,不能读取'.format(cache_file))
 
     def run_tick_test(self):
         """运行tick级别组合回测"""
@@ -402,19 +357,33 @@ class PortfolioTestingEngine(BackTestingEngine):
 
         gc_collect_days = 0
 
-        # 循环每一天
-        for i in range(0, testdays):
-            test_day = self.data_start_date + timedelta(days=i)
+        # 后台预取后续交易日的数据
+        test_days = [self.data_start_date + timedelta(days=i) for i in range(0, testdays)]
+        prefetcher = DayPrefetcher(load_func=self.get_day_tick_loader(),
+                                   days=test_days,
+                                   depth=self.prefetch_days,
+                                   use_process=self.prefetch_process)
 
-            combined_df = self.get_day_tick_df(test_day)
+        # 循环每一天
+        for test_day, (combined_df, missing_files) in prefetcher:
+            self.write_missing_files(missing_files)
 
             if combined_df is None:
                 continue
 
+            tick_class = CompactTickData if self.compact_tick else TickData
             try:
-                for (dt, vt_symbol), tick_data in combined_df.iterrows():
-                    symbol, exchange = extract_vt_symbol(vt_symbol)
-                    tick = TickData(
+                # 按列读取，避免iterrows逐行构造Series
+                dts = combined_df.index.get_level_values(0).to_pydatetime()
+                vt_symbols = combined_df.index.get_level_values(1).tolist()
+                prices = combined_df['price'].tolist()
+                volumes = combined_df['volume'].tolist()
+                symbol_cache = {}
+                for dt, vt_symbol, price, volume in zip(dts, vt_symbols, prices, volumes):
+                    if vt_symbol not in symbol_cache:
+                        symbol_cache[vt_symbol] = extract_vt_symbol(vt_symbol)
+                    symbol, exchange = symbol_cache[vt_symbol]
+                    tick = tick_class(
                         gateway_name='backtesting',
                         symbol=symbol,
                         exchange=exchange,
@@ -422,8 +391,8 @@ class PortfolioTestingEngine(BackTestingEngine):
                         date=dt.strftime('%Y-%m-%d'),
                         time=dt.strftime('%H:%M:%S.%f'),
                         trading_day=test_day.strftime('%Y-%m-%d'),
-                        last_price=tick_data['price'],
-                        volume=tick_data['volume']
+                        last_price=price,
+                        volume=volume
                     )
 
                     self.new_tick(tick)
@@ -433,6 +402,8 @@ class PortfolioTestingEngine(BackTestingEngine):
                                        self.cur_capital,
                                        self.max_net_capital,
                                        self.total_commission)
+                if self.check_prune(test_day):
+                    return
 
                 self.cancel_orders()
                 # 更新持仓缓存
@@ -442,7 +413,8 @@ class PortfolioTestingEngine(BackTestingEngine):
                 if gc_collect_days >= 10:
                     # 执行内存回收
                     gc.collect()
-                    sleep(1)
+                    if not self.silent:
+                        sleep(1)
                     gc_collect_days = 0
 
                 if self.net_capital < 0:
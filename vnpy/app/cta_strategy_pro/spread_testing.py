@@ -33,6 +33,8 @@ from vnpy.trader.utility import (
     import_module_by_str
 )
 
+from vnpy.component.cta_day_prefetcher import DayPrefetcher
+
 from .back_testing import BackTestingEngine
 
 # vnpy交易所，与淘宝数据tick目录得对应关系
@@ -398,11 +400,16 @@ class SpreadTestingEngine(BackTestingEngine):
 
         gc_collect_days = 0
 
-        # 循环每一天
-        for i in range(0, testdays):
-            test_day = self.data_start_date + timedelta(days=i)
+        # 后台预取后续交易日的数据
+        # csv读取使用引擎的方法（含日志输出），不能在进程池中执行，使用线程池
+        test_days = [self.data_start_date + timedelta(days=i) for i in range(0, testdays)]
+        prefetcher = DayPrefetcher(load_func=self.get_day_tick_df,
+                                   days=test_days,
+                                   depth=self.prefetch_days,
+                                   use_process=False)
 
-            combined_df = self.get_day_tick_df(test_day)
+        # 循环每一天
+        for test_day, combined_df in prefetcher:
 
             if combined_df is None:
                 continue
@@ -433,6 +440,8 @@ class SpreadTestingEngine(BackTestingEngine):
                                        self.cur_capital,
                                        self.max_net_capital,
                                        self.total_commission)
+                if self.check_prune(test_day):
+                    return
 
                 self.cancel_orders()
                 # 更新持仓缓存
@@ -442,7 +451,8 @@ class SpreadTestingEngine(BackTestingEngine):
                 if gc_collect_days >= 10:
                     # 执行内存回收
                     gc.collect()
-                    sleep(1)
+                    if not self.silent:
+                        sleep(1)
                     gc_collect_days = 0
 
                 if self.net_capital < 0:
@@ -0,0 +1,161 @@
+# encoding: UTF-8
+
+# 组合回测的bar数据回放器
+# 替代 bar_df.iterrows() 逐行创建BarData：
+# - 各列预先一次性转换为list，不再为每一行构造Series
+# - 相同时间的bar（按索引边界分组）只计算一次 datetime/date/time/缺省交易日
+# - 交易日字符串按原值缓存转换结果
+# cta_strategy_pro/cta_crypto/cta_stock 的组合回测引擎共用
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from vnpy.trader.object import BarData, RenkoBarData
+from vnpy.trader.utility import extract_vt_symbol, get_trading_date
+
+RENKO_FIELDS = ['seconds', 'high_seconds', 'low_seconds', 'height', 'up_band', 'down_band']
+
+
+class BarFeeder(object):
+    """
+    bar数据回放器
+    for dt, bar in BarFeeder(bar_df): 与 for (dt, vt_symbol), bar_data in bar_df.iterrows() 的顺序一致，
+    同一时间的bar，dt为同一个对象
+    """
+
+    def __init__(self,
+                 bar_df: pd.DataFrame,
+                 bar_interval_seconds: int = 60,
+                 date_from_bar_datetime: bool = True,
+                 use_trading_date: bool = True,
+                 with_open_interest: bool = True,
+                 gateway_name: str = 'backtesting'):
+        """
+        :param bar_df: 合并后的bar数据，索引为(datetime, vt_symbol)
+        :param bar_interval_seconds: bar文件的时间间隔秒数，bar.datetime = 索引时间 - 间隔（renko bar除外）
+        :param date_from_bar_datetime: True: bar.date/bar.time 取自bar.datetime; False: 取自索引时间
+        :param use_trading_date: 交易日字段缺失时，True: 根据bar.datetime计算交易日; False: 使用bar.date
+        :param with_open_interest: 是否读取open_interest字段
+        :param gateway_name:
+        """
+        self.bar_interval_seconds = bar_interval_seconds
+        self.date_from_bar_datetime = date_from_bar_datetime
+        self.use_trading_date = use_trading_date
+        self.with_open_interest = with_open_interest
+        self.gateway_name = gateway_name
+
+        self.count = len(bar_df)
+        if self.count == 0:
+            return
+
+        # 同一时间的bar分组：[group_starts[i], group_starts[i+1])
+        index_dts = bar_df.index.get_level_values(0)
+        dt_values = index_dts.values
+        self.group_starts = np.flatnonzero(np.r_[True, dt_values[1:] != dt_values[:-1]]).tolist()
+        self.group_dts = pd.DatetimeIndex(dt_values[self.group_starts]).to_pydatetime().tolist()
+
+        self.vt_symbols = bar_df.index.get_level_values(1).tolist()
+
+        def column(names, default=0):
+            for name in names:
+                if name in bar_df.columns:
+                    return bar_df[name].tolist()
+            return [default] * self.count
+
+        self.opens = column(['open', 'open_price'])
+        self.highs = column(['high', 'high_price'])
+        self.lows = column(['low', 'low_price'])
+        self.closes = column(['close', 'close_price'])
+        self.volumes = column(['volume'])
+        self.open_interests = column(['open_interest'])
+        self.trading_days = column(['trading_day'], default='')
+        self.renko_columns = {name: column([name]) for name in RENKO_FIELDS}
+        self.renko_columns.update({name: column([name], default=None) for name in ['low_time', 'high_time']})
+
+    def __len__(self):
+        return self.count
+
+    def format_trading_day(self, value):
+        """交易日字段 => 'YYYY-mm-dd'，不能识别时返回None"""
+        str_td = str(value)
+        if len(str_td) == 8:
+            return str_td[0:4] + '-' + str_td[4:6] + '-' + str_td[6:8]
+        if len(str_td) == 10 and self.use_trading_date:
+            return str_td
+        return None
+
+    def __iter__(self):
+        if self.count == 0:
+            return
+
+        interval = timedelta(seconds=self.bar_interval_seconds)
+        symbol_cache = {}  # vt_symbol => (symbol, exchange, is_renko)
+        trading_day_cache = {}  # 交易日原值 => 'YYYY-mm-dd' / None
+        gateway_name = self.gateway_name
+
+        bounds = self.group_starts + [self.count]
+        for group_index, dt in enumerate(self.group_dts):
+            # 同一时间的bar，只计算一次
+            group_cache = {}
+            for i in range(bounds[group_index], bounds[group_index + 1]):
+                vt_symbol = self.vt_symbols[i]
+                symbol_info = symbol_cache.get(vt_symbol)
+                if symbol_info is None:
+                    symbol, exchange = extract_vt_symbol(vt_symbol)
+                    symbol_info = (symbol, exchange, symbol.startswith('future_renko'))
+                    symbol_cache[vt_symbol] = symbol_info
+                symbol, exchange, is_renko = symbol_info
+
+                dt_info = group_cache.get(is_renko)
+                if dt_info is None:
+                    bar_datetime = dt if is_renko else dt - interval
+                    date_dt = bar_datetime if self.date_from_bar_datetime else dt
+                    date = date_dt.strftime('%Y-%m-%d')
+                    default_trading_day = get_trading_date(bar_datetime) if self.use_trading_date else date
+                    dt_info = (bar_datetime, date, date_dt.strftime('%H:%M:%S'), default_trading_day)
+                    group_cache[is_renko] = dt_info
+                bar_datetime, date, time, default_trading_day = dt_info
+
+                if is_renko:
+                    bar = RenkoBarData(
+                        gateway_name=gateway_name,
+                        symbol=symbol,
+                        exchange=exchange,
+                        datetime=bar_datetime
+                    )
+                    bar.seconds = float(self.renko_columns['seconds'][i])
+                    bar.high_seconds = float(self.renko_columns['high_seconds'][i])  # 当前Bar的上限秒数
+                    bar.low_seconds = float(self.renko_columns['low_seconds'][i])  # 当前bar的下限秒数
+                    bar.height = float(self.renko_columns['height'][i])  # 当前Bar的高度限制
+                    bar.up_band = float(self.renko_columns['up_band'][i])  # 高位区域的基线
+                    bar.down_band = float(self.renko_columns['down_band'][i])  # 低位区域的基线
+                    bar.low_time = self.renko_columns['low_time'][i]  # 最后一次进入低位区域的时间
+                    bar.high_time = self.renko_columns['high_time'][i]  # 最后一次进入高位区域的时间
+                else:
+                    bar = BarData(
+                        gateway_name=gateway_name,
+                        symbol=symbol,
+                        exchange=exchange,
+                        datetime=bar_datetime
+                    )
+
+                bar.open_price = float(self.opens[i])
+                bar.close_price = float(self.closes[i])
+                bar.high_price = float(self.highs[i])
+                bar.low_price = float(self.lows[i])
+                bar.volume = int(self.volumes[i])
+                if self.with_open_interest:
+                    bar.open_interest = int(self.open_interests[i])
+                bar.date = date
+                bar.time = time
+
+                raw_trading_day = self.trading_days[i]
+                trading_day = trading_day_cache.get(raw_trading_day, '')
+                if trading_day == '':
+                    trading_day = self.format_trading_day(raw_trading_day)
+                    trading_day_cache[raw_trading_day] = trading_day
+                bar.trading_day = trading_day if trading_day else default_trading_day
+
+                yield dt, bar
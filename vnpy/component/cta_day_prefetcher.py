@@ -0,0 +1,70 @@
+# encoding: UTF-8
+
+# tick回测的按日数据预取
+# 回放第N天的同时，后台准备第N+1 ~ N+k天的数据（读取缓存、解压、合并排序），
+# 使回放循环不再等待数据加载。
+# - 线程池（缺省）：可使用引擎的绑定方法，bz2/zlib解压、numpy读取、pandas读csv时释放GIL
+# - 进程池（需指定）：加载函数及其参数需可pickle（模块级函数/functools.partial），适合解压、合并等CPU密集的加载
+#   spawn方式（Windows）的子进程会重新导入__main__，回测脚本需有 if __name__ == '__main__' 保护
+#   子进程中不能调用引擎的日志方法，需要输出的信息（如缺失的缓存文件）应随结果返回
+# 在multiprocessing.Pool的工作进程（daemon进程，如批量优化）中，不能再创建子进程，自动改用线程池
+
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class DayPrefetcher(object):
+    """
+    按日数据预取
+    for day, data in DayPrefetcher(load_func, days, depth=2):
+    与 for day in days: data = load_func(day) 的结果、顺序一致
+    """
+
+    def __init__(self,
+                 load_func,
+                 days: list,
+                 depth: int = 2,
+                 use_process: bool = False,
+                 workers: int = None):
+        """
+        :param load_func: 加载函数 load_func(day) => data
+        :param days: 日期清单
+        :param depth: 预取的天数（等待回放的数据最多depth天），0: 不预取，同步加载
+        :param use_process: True: 进程池; False: 线程池
+        :param workers: 工作进程/线程数量，缺省为depth（不超过cpu数量）
+        """
+        self.load_func = load_func
+        self.days = list(days)
+        self.depth = max(int(depth or 0), 0)
+        self.use_process = use_process and not multiprocessing.current_process().daemon
+        self.workers = workers or min(max(self.depth, 1), multiprocessing.cpu_count())
+
+    def __len__(self):
+        return len(self.days)
+
+    def __iter__(self):
+        if self.depth == 0:
+            for day in self.days:
+                yield day, self.load_func(day)
+            return
+
+        executor_class = ProcessPoolExecutor if self.use_process else ThreadPoolExecutor
+        executor = executor_class(max_workers=self.workers)
+        pending = deque()  # (day, future)，按日期顺序
+        next_index = 0
+        try:
+            while next_index < len(self.days) or pending:
+                # 当前回放的一天 + 预取的depth天
+                while next_index < len(self.days) and len(pending) <= self.depth:
+                    day = self.days[next_index]
+                    pending.append((day, executor.submit(self.load_func, day)))
+                    next_index += 1
+
+                day, future = pending.popleft()
+                yield day, future.result()
+        finally:
+            # 回放提前结束（如净值低于0），取消未开始的加载
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
@@ -56,6 +56,11 @@ class FundKline(object):
         self.onbar_callback = self.setting.pop('onbar_callback', None)
 
         self.use_renko = self.setting.pop('use_renko', False)
+
+        # 资金曲线的采样间隔秒数，0: 每次更新都推送（回测时每个tick/bar）
+        self.sample_seconds = self.setting.pop('sample_seconds', 0)
+        self.last_sample_dt = None
+
         if self.use_renko:
             self.write_log(u'使用CtaRenkoBar')
             self.kline = CtaRenkoBar(strategy=self, cb_on_bar=self.on_bar, setting=self.setting)
@@ -68,6 +73,12 @@ class FundKline(object):
         self.long_pos_dict = {}
         self.short_pos_dict = {}
 
+        # 按合约汇总的持仓 vt_symbol: [持仓记录数, 持仓数量, 开仓成本(sum(开仓价*数量))]
+        # 每次持仓记录变化时更新，get_hold_pnl 只需按合约计算
+        self.long_pos_summary = {}
+        self.short_pos_summary = {}
+        self.symbol_size_dict = {}  # vt_symbol: 合约乘数
+
         # 记载历史k线
         if use_cache:
             self.load()
@@ -266,12 +277,45 @@ class FundKline(object):
                 self.write_error(u'{}发生异常:{}'.format(self.kline_name, str(ex)))
                 pass
 
+        for vt_symbol in list(self.long_pos_dict.keys()) + list(self.short_pos_dict.keys()):
+            self.update_pos_summary(vt_symbol)
+
         self.write_log(u'{}加载历史交易数据完毕'.format(self.kline_name))
         if len(self.long_pos_dict) > 0:
             self.write_log(u'记录得持仓多单:{}'.format(self.long_pos_dict))
         if len(self.short_pos_dict) > 0:
             self.write_log(u'记录得持仓空单:{}'.format(self.short_pos_dict))
 
+    def update_pos_summary(self, vt_symbol):
+        """根据持仓记录，重新汇总某合约的多、空持仓"""
+        for pos_dict, summary in [(self.long_pos_dict, self.long_pos_summary),
+                                  (self.short_pos_dict, self.short_pos_summary)]:
+            trade_list = pos_dict.get(vt_symbol, [])
+            if len(trade_list) == 0:
+                summary.pop(vt_symbol, None)
+                continue
+            volume = 0
+            cost = 0
+            for pos_trade in trade_list:
+                pos_volume = pos_trade.get('volume')
+                volume += pos_volume
+                cost += pos_trade.get('price', 0) * pos_volume
+            summary[vt_symbol] = [len(trade_list), volume, cost]
+
+    def get_symbol_size(self, vt_symbol):
+        """合约乘数（缓存）"""
+        size = self.symbol_size_dict.get(vt_symbol)
+        if size is None:
+            size = self.cta_engine.get_size(vt_symbol)
+            self.symbol_size_dict[vt_symbol] = size
+        return size
+
+    def is_sample_time(self, dt):
+        """是否到达资金曲线的采样时间"""
+        if not self.sample_seconds or self.last_sample_dt is None or dt is None:
+            return True
+        return (dt - self.last_sample_dt).total_seconds() >= self.sample_seconds
+
     def get_hold_pnl(self, log=False, update_list=False):
         """
         获取持仓收益
@@ -279,6 +323,9 @@ class FundKline(object):
         :param: update_list: 更新self.holding_list
         :return:
         """
+        if not log and not update_list:
+            return self.get_summary_hold_pnl()
+
         all_holding_profit = 0.0
         holded = False
 
@@ -341,6 +388,24 @@ class FundKline(object):
                 self.write_log(u'{}空单单持仓收益:{}'.format(vt_symbol, short_holding_profit), strategy_name=self.kline_name)
         return all_holding_profit, holded
 
+    def get_summary_hold_pnl(self):
+        """
+        根据按合约汇总的持仓，计算持仓收益
+        多单: (当前价 * 持仓数量 - 开仓成本) * 合约乘数
+        空单: (开仓成本 - 当前价 * 持仓数量) * 合约乘数
+        :return:
+        """
+        all_holding_profit = 0.0
+        holded = False
+        for summary, sign in [(self.long_pos_summary, 1), (self.short_pos_summary, -1)]:
+            for vt_symbol, (count, volume, cost) in summary.items():
+                cur_price = self.cta_engine.get_price(vt_symbol)
+                if cur_price is None:
+                    continue
+                all_holding_profit += sign * (cur_price * volume - cost) * self.get_symbol_size(vt_symbol)
+                holded = True
+        return all_holding_profit, holded
+
     def on_bar(self, *args, **kwargs):
         if self.onbar_callback and (len(args) > 0 or len(kwargs) > 0):
             try:
@@ -374,6 +439,7 @@ class FundKline(object):
 
         if self.inited:
             self.kline.on_tick(tick)
+        self.last_sample_dt = dt
 
         # 如果是从账号更新，无法更新持仓盈亏
         self.closed_profit = balance
@@ -392,6 +458,7 @@ class FundKline(object):
                 exist_buy_list = self.long_pos_dict.get(trade.vt_symbol, [])
                 exist_buy_list.append({'volume': trade.volume, 'price': trade.price, 'open_time': trade.time})
                 self.long_pos_dict.update({trade.vt_symbol: exist_buy_list})
+                self.update_pos_summary(trade.vt_symbol)
                 self.write_log(u'更新{}的持仓记录:{}'.format(trade.vt_symbol, exist_buy_list))
                 return
 
@@ -399,6 +466,7 @@ class FundKline(object):
                 exist_short_list = self.short_pos_dict.get(trade.vt_symbol, [])
                 exist_short_list.append({'volume': trade.volume, 'price': trade.price, 'open_time': trade.time})
                 self.short_pos_dict.update({trade.vt_symbol: exist_short_list})
+                self.update_pos_summary(trade.vt_symbol)
                 self.write_log(u'更新{}的持仓记录:{}'.format(trade.vt_symbol, exist_short_list))
                 return
 
@@ -412,6 +480,7 @@ class FundKline(object):
                     if len(exist_buy_list) == 0:
                         self.write_error(
                             u'{}没有足够的{}多单记录，数据不齐全.{}'.format(self.kline_name, trade.vt_symbol, trade.__dict__))
+                        self.update_pos_summary(trade.vt_symbol)
                         return
                     buy_trade = exist_buy_list.pop(0)
                     buy_volume = buy_trade.get('volume', 0)
@@ -449,6 +518,8 @@ class FundKline(object):
                                      }
                     self.profit_list.append(profit_record)
 
+                self.update_pos_summary(trade.vt_symbol)
+
                 trade_dt = datetime.now()
                 if len(trade.time) > 8 and ' ' in trade.time:
                     try:
@@ -476,6 +547,7 @@ class FundKline(object):
                     if len(exist_short_list) == 0:
                         self.write_error(u'{}没有足够的{}空单，数据不齐全,数据需要补全.{}'
                                          .format(self.kline_name, trade.vt_symbol, trade.__dict__))
+                        self.update_pos_summary(trade.vt_symbol)
                         return
                     short_trade = exist_short_list.pop(0)
                     short_volume = short_trade.get('volume', 0)
@@ -513,6 +585,8 @@ class FundKline(object):
                                      }
                     self.profit_list.append(profit_record)
 
+                self.update_pos_summary(trade.vt_symbol)
+
                 cur_openIntesting = self.kline.line_bar[-1].open_interest if len(
                     self.kline.line_bar) > 0 else close_profit
                 self.write_log(f'{self.kline_name} {open_time} {trade.vt_symbol}空单 => '
@@ -567,6 +641,7 @@ class FundKline(object):
 
         if self.inited:
             self.kline.on_tick(tick)
+        self.last_sample_dt = dt
 
         self.closed_profit = open_interest
         self.holding_profit = hold_pnl
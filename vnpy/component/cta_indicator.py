@@ -0,0 +1,347 @@
+# encoding: UTF-8
+
+# 增量指标计算核
+# CtaLineBar/CtaRenkoBar 在每根bar完结时，只需把新的开高低收推入计算核，
+# 即可O(1)得到最新的指标值，而不需要对整个序列重新调用talib。
+# 计算口径与原有的talib调用保持一致（包括截取窗口、种子均值等细节），
+# talib计算方式保留为校验模式（K线参数 use_talib = True）
+
+import math
+from collections import deque
+
+NAN = float('nan')
+
+
+def seeded_smooth(values, period, alpha):
+    """
+    与talib一致的"种子均值+递推平滑"（EMA/ATR/RSI均为此类计算）
+    前period个数据的简单均值作为种子，其后逐个递推
+    :param values: 数据序列
+    :param period: 种子周期
+    :param alpha: 平滑系数，EMA为2/(n+1)，Wilder平滑(ATR/RSI)为1/n
+    :return: 最后一个平滑值，数据不足时返回nan
+    """
+    if period <= 0 or len(values) < period:
+        return NAN
+    value = sum(values[:period]) / period
+    for x in values[period:]:
+        value = (x - value) * alpha + value
+    return value
+
+
+class RollingWindow(object):
+    """
+    定长滑动窗口
+    维护窗口内数据的累计和、平方和，O(1)获得均值/标准差（MA、BOLL）
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.update_count = 0  # 距离上一次重新求和的更新次数
+
+    def append(self, value: float):
+        """推入新数据"""
+        if len(self.values) == self.size:
+            old = self.values[0]
+            self.sum -= old
+            self.sum_sq -= old * old
+
+        self.values.append(value)
+        self.sum += value
+        self.sum_sq += value * value
+
+        # 每滑动一整个窗口，重新求和一次，消除浮点累计误差
+        self.update_count += 1
+        if self.update_count >= self.size:
+            self.sum = math.fsum(self.values)
+            self.sum_sq = math.fsum(v * v for v in self.values)
+            self.update_count = 0
+
+    def tail(self, n: int):
+        """最近n个数据"""
+        return list(self.values)[-n:]
+
+    def mean(self, n: int = None):
+        """
+        最近n个数据的均值
+        n与窗口数据数量一致时O(1)，否则（预热阶段）直接计算
+        """
+        n = n or self.size
+        count = len(self.values)
+        if n <= 0 or n > count:
+            return NAN
+        if n == count:
+            return self.sum / n
+        return sum(self.tail(n)) / n
+
+    def std(self, n: int = None, ddof: int = 0):
+        """最近n个数据的标准差, ddof=0 与 talib.BBANDS一致，ddof=1 与 np.std(ddof=1)一致"""
+        n = n or self.size
+        count = len(self.values)
+        if n <= ddof or n > count:
+            return NAN
+        if n == count:
+            mean = self.sum / n
+            var = (self.sum_sq - n * mean * mean) / (n - ddof)
+        else:
+            data = self.tail(n)
+            mean = sum(data) / n
+            var = sum((x - mean) ** 2 for x in data) / (n - ddof)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class RollingExtreme(object):
+    """
+    滑动窗口最高/最低值（单调队列），O(1)获得窗口内的最大值或最小值（前高前低、KDJ）
+    """
+
+    def __init__(self, size: int, is_max: bool = True):
+        self.size = size
+        self.is_max = is_max
+        self.count = 0  # 已推入数据的总数量
+        self.queue = deque()  # (序号，数值)，队首为窗口内的极值
+        self.values = deque(maxlen=size)
+
+    def append(self, value: float):
+        """推入新数据"""
+        queue = self.queue
+        if self.is_max:
+            while queue and queue[-1][1] <= value:
+                queue.pop()
+        else:
+            while queue and queue[-1][1] >= value:
+                queue.pop()
+        queue.append((self.count, value))
+        self.values.append(value)
+        self.count += 1
+
+        # 移除已离开窗口的极值
+        expired = self.count - self.size
+        while queue[0][0] < expired:
+            queue.popleft()
+
+    def value(self, n: int = None):
+        """最近n个数据的极值，数据不足时返回nan"""
+        n = n or self.size
+        if n <= 0 or n > len(self.values):
+            return NAN
+        if n == self.size:
+            return self.queue[0][1]
+        data = list(self.values)[-n:]
+        return max(data) if self.is_max else min(data)
+
+
+class SeededSmoother(object):
+    """
+    滑动窗口上的"种子均值+递推平滑"，与talib EMA/ATR/RSI在截取窗口上的计算一致：
+    取最近window个数据，前period个数据的简单均值作为种子，其后 v = alpha * x + (1 - alpha) * v
+    窗口未满时，与talib跳过前导nan后的计算一致；窗口满后每次更新为O(1)：
+        value = beta^k * 种子均值 + sum(alpha * beta^j * x[t-j]), j = 0..k-1, k = window - period
+    """
+
+    def __init__(self, period: int, alpha: float, window: int):
+        self.period = period
+        self.alpha = alpha
+        self.beta = 1 - alpha
+        self.window = max(window, period)
+
+        self.buffer = [0.0] * self.window  # 环形缓存
+        self.count = 0  # 已推入数据的总数量
+        self.seed_sum = 0.0  # 窗口前period个数据之和
+        self.smooth = 0.0  # 种子之后数据的加权和
+        self.decay = 1.0  # beta ^ (种子之后的数据数量)
+        self.update_count = 0
+
+    def append(self, x: float):
+        """推入新数据"""
+        window = self.window
+        if self.count < window:
+            self.buffer[self.count] = x
+            if self.count < self.period:
+                self.seed_sum += x
+            else:
+                self.smooth = self.alpha * x + self.beta * self.smooth
+                self.decay *= self.beta
+        else:
+            pos = self.count % window
+            leave = self.buffer[pos]
+            # 递推段中最早的数据，滑入种子段
+            enter = self.buffer[(pos + self.period) % window]
+            self.buffer[pos] = x
+            self.seed_sum += enter - leave
+            self.smooth = self.alpha * x + self.beta * self.smooth - self.alpha * self.decay * enter
+
+            self.update_count += 1
+            if self.update_count >= window:
+                self.seed_sum = math.fsum(self.buffer[(pos + 1 + i) % window] for i in range(self.period))
+                self.update_count = 0
+
+        self.count += 1
+
+    def tail(self, n: int):
+        """最近n个数据"""
+        n = min(n, self.count, self.window)
+        end = self.count
+        return [self.buffer[i % self.window] for i in range(end - n, end)]
+
+    @property
+    def value(self):
+        """当前窗口的平滑值，数据不足时返回nan"""
+        if self.count < self.period:
+            return NAN
+        return self.decay * self.seed_sum / self.period + self.smooth
+
+
+class EmaKernel(SeededSmoother):
+    """
+    EMA，等价于 ta.EMA(close_array[-window:], n)[-1]
+    """
+
+    def __init__(self, n: int, window: int):
+        super().__init__(period=n, alpha=2 / (n + 1), window=window)
+
+
+class AtrKernel(object):
+    """
+    ATR，等价于 ta.ATR(high[-2n:], low[-2n:], close[-2n:], n)[-1]
+    2n根bar对应2n-1个真实波幅(TR)，前n个TR均值作为种子，其后Wilder平滑
+    """
+
+    def __init__(self, n: int):
+        self.n = n
+        self.pre_close = None
+        self.tr = SeededSmoother(period=n, alpha=1 / n, window=2 * n - 1)
+
+    def append(self, high: float, low: float, close: float):
+        """推入新bar"""
+        if self.pre_close is not None:
+            self.tr.append(max(high - low, abs(high - self.pre_close), abs(low - self.pre_close)))
+        self.pre_close = close
+
+    def value(self, n: int = None):
+        """
+        周期n的ATR，n与计算核周期一致时O(1)
+        预热阶段（n较小）按最近2n根bar直接计算
+        """
+        n = n or self.n
+        if n == self.n:
+            return self.tr.value
+        return seeded_smooth(self.tr.tail(2 * n - 1), n, 1 / n)
+
+
+class RsiKernel(object):
+    """
+    RSI，等价于 ta.RSI(close[-2n:], n)[-1]
+    涨幅、跌幅分别做Wilder平滑
+    """
+
+    def __init__(self, n: int):
+        self.n = n
+        self.pre_close = None
+        self.gain = SeededSmoother(period=n, alpha=1 / n, window=2 * n - 1)
+        self.loss = SeededSmoother(period=n, alpha=1 / n, window=2 * n - 1)
+
+    def append(self, close: float):
+        """推入新的收盘价"""
+        if self.pre_close is not None:
+            diff = close - self.pre_close
+            self.gain.append(diff if diff > 0 else 0.0)
+            self.loss.append(-diff if diff < 0 else 0.0)
+        self.pre_close = close
+
+    @property
+    def value(self):
+        gain = self.gain.value
+        loss = self.loss.value
+        if math.isnan(gain) or math.isnan(loss):
+            return NAN
+        if gain + loss == 0:
+            return 0.0
+        return 100 * gain / (gain + loss)
+
+
+class MacdKernel(object):
+    """
+    MACD，等价于 ta.MACD(close_array[-window:], fast, slow, signal) 的最后一个值
+    慢线以前slow个收盘价均值为种子，快线以第slow个收盘价前的fast个收盘价均值为种子，
+    dea以前signal个dif的均值为种子，与talib的对齐方式一致。
+    窗口填满后talib在每个滑动窗口上重新取种子：
+    - 种子在窗口末端的残留权重 max(慢线, dea衰减系数)^(window - slow - signal) 小于1e-12时，
+      与直接延续递推的差异在浮点误差内，每次更新为O(1)
+    - 否则（窗口较短）按窗口内的收盘价重新取种子计算，每次更新为O(window)
+    """
+
+    def __init__(self, fast: int, slow: int, signal: int, window: int = None):
+        """
+        :param window: talib计算使用的收盘价数量，None为不截取窗口
+        """
+        if slow < fast:
+            fast, slow = slow, fast
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+        self.fast_k = 2 / (fast + 1)
+        self.slow_k = 2 / (slow + 1)
+        self.signal_k = 2 / (signal + 1)
+
+        self.window = window
+        self.closes = None  # 需要按窗口重新取种子时，窗口内的收盘价
+        if window:
+            seed_weight = max(1 - self.slow_k, 1 - self.signal_k) ** max(window - slow - signal, 0)
+            if seed_weight >= 1e-12:
+                self.closes = deque(maxlen=window)
+
+        self.seed_closes = []  # 种子阶段的收盘价
+        self.seed_difs = []  # 种子阶段的dif
+        self.fast_ema = None
+        self.slow_ema = None
+        self.dea_ema = None
+
+        self.dif = NAN
+        self.dea = NAN
+        self.macd = NAN  # dif - dea (talib口径，未乘2)
+
+    def append(self, close: float):
+        """推入新的收盘价"""
+        closes = self.closes
+        if closes is not None:
+            closes.append(close)
+            if len(closes) == self.window:
+                # 窗口已满，在窗口上重新取种子
+                kernel = MacdKernel(self.fast, self.slow, self.signal)
+                for x in closes:
+                    kernel.update(x)
+                self.dif, self.dea, self.macd = kernel.dif, kernel.dea, kernel.macd
+                return
+
+        self.update(close)
+
+    def update(self, close: float):
+        """递推计算"""
+        if self.slow_ema is None:
+            self.seed_closes.append(close)
+            if len(self.seed_closes) < self.slow:
+                return
+            self.slow_ema = sum(self.seed_closes) / self.slow
+            self.fast_ema = sum(self.seed_closes[-self.fast:]) / self.fast
+            self.seed_closes = []
+        else:
+            self.fast_ema = (close - self.fast_ema) * self.fast_k + self.fast_ema
+            self.slow_ema = (close - self.slow_ema) * self.slow_k + self.slow_ema
+
+        dif = self.fast_ema - self.slow_ema
+        if self.dea_ema is None:
+            self.seed_difs.append(dif)
+            if len(self.seed_difs) < self.signal:
+                return
+            self.dea_ema = sum(self.seed_difs) / self.signal
+            self.seed_difs = []
+        else:
+            self.dea_ema = (dif - self.dea_ema) * self.signal_k + self.dea_ema
+
+        self.dif = dif
+        self.dea = self.dea_ema
+        self.macd = dif - self.dea_ema
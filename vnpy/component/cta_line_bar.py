@@ -17,6 +17,7 @@ import csv
 
 from collections import OrderedDict
 from datetime import datetime, timedelta
+from logging import INFO
 from pykalman import KalmanFilter
 
 from vnpy.component.base import (
@@ -27,8 +28,17 @@ from vnpy.component.base import (
     NIGHT_MARKET_SQ2,
     MARKET_ZJ)
 from vnpy.component.cta_period import CtaPeriod, Period
+from vnpy.component.cta_ring_buffer import RingBuffer
+from vnpy.component.cta_log import format_log
+from vnpy.component.cta_indicator import (
+    RollingWindow,
+    RollingExtreme,
+    EmaKernel,
+    AtrKernel,
+    RsiKernel,
+    MacdKernel)
 from vnpy.trader.object import BarData, TickData
-from vnpy.trader.constant import Interval, Color
+from vnpy.trader.constant import Interval, Color, Exchange
 from vnpy.trader.utility import round_to, get_trading_date, get_underlying_symbol
 
 
@@ -173,24 +183,19 @@ class CtaLineBar(object):
         self.bar_len = 0  # 当前K线得真实数量(包含已经合成以及正在合成的bar)
         self.max_hold_bars = 2000
         self.is_first_tick = False  # K线的第一条Tick数据
+        self.use_talib = False  # True: 每根bar使用talib全量计算指标(校验模式)； False: 使用增量计算核
 
         # (实时运行时，或者addbar小于bar得周期时，不包含最后一根正在合成的Bar）
         # 目标bar合成成功后，才会更新以下序列
-        self.open_array = np.zeros(self.max_hold_bars)  # 与lineBar一致得开仓价清单
-        self.open_array[:] = np.nan
-        self.high_array = np.zeros(self.max_hold_bars)  # 与lineBar一致得最高价清单
-        self.high_array[:] = np.nan
-        self.low_array = np.zeros(self.max_hold_bars)  # 与lineBar一致得最低价清单
-        self.low_array[:] = np.nan
-        self.close_array = np.zeros(self.max_hold_bars)  # 与lineBar一致得收盘价清单
-        self.close_array[:] = np.nan
-
-        self.mid3_array = np.zeros(self.max_hold_bars)  # 收盘价/最高/最低价 的平均价
-        self.mid3_array[:] = np.nan
-        self.mid4_array = np.zeros(self.max_hold_bars)  # 收盘价*2/最高/最低价 的平均价
-        self.mid4_array[:] = np.nan
-        self.mid5_array = np.zeros(self.max_hold_bars)  # 收盘价*2/开仓价/最高/最低价 的平均价
-        self.mid5_array[:] = np.nan
+        # 定长环形缓冲区，初始值为nan，通过 open_array/high_array... 属性获取按时间排列的numpy数组
+        self.open_buffer = RingBuffer(self.max_hold_bars, fixed=True, fill=np.nan)  # 与lineBar一致得开仓价清单
+        self.high_buffer = RingBuffer(self.max_hold_bars, fixed=True, fill=np.nan)  # 与lineBar一致得最高价清单
+        self.low_buffer = RingBuffer(self.max_hold_bars, fixed=True, fill=np.nan)  # 与lineBar一致得最低价清单
+        self.close_buffer = RingBuffer(self.max_hold_bars, fixed=True, fill=np.nan)  # 与lineBar一致得收盘价清单
+
+        self.mid3_buffer = RingBuffer(self.max_hold_bars, fixed=True, fill=np.nan)  # 收盘价/最高/最低价 的平均价
+        self.mid4_buffer = RingBuffer(self.max_hold_bars, fixed=True, fill=np.nan)  # 收盘价*2/最高/最低价 的平均价
+        self.mid5_buffer = RingBuffer(self.max_hold_bars, fixed=True, fill=np.nan)  # 收盘价*2/开仓价/最高/最低价 的平均价
         # 导出到CSV文件 的目录名 和 要导出的 字段
         self.export_filename = None  # 数据要导出的目标文件夹
         self.export_fields = []  # 定义要导出的数据字段
@@ -226,7 +231,7 @@ class CtaLineBar(object):
             if self.price_tick < 1:
                 exponent = decimal.Decimal(str(self.price_tick))
                 self.round_n = max(abs(exponent.as_tuple().exponent) + 2, 4)
-                self.write_log(f'round_n: {self.round_n}')
+                self.write_log(lambda: f'round_n: {self.round_n}')
 
             # 导入卡尔曼过滤器
             if self.para_active_kf:
@@ -257,6 +262,7 @@ class CtaLineBar(object):
         self.paramList.append('is_7x24') #是否为7X24小时运行的bar（一般为数字货币)
         self.paramList.append('price_tick') # 最小跳动，用于处理指数等不一致的价格
         self.paramList.append('underly_symbol')  # 短合约，
+        self.paramList.append('use_talib')  # 使用talib全量计算指标（校验模式）
 
         # ----------  下方为指标输入参数     ---------------
         self.paramList.append('para_pre_len')  # 唐其安通道的长度（前高/前低）
@@ -319,6 +325,7 @@ class CtaLineBar(object):
         self.paramList.append('para_golden_n')  # 黄金分割
 
         self.paramList.append('para_active_area')
+        self.paramList.append('para_active_atan')  # 是否计算均线、布林的斜率
 
         self.paramList.append('para_bias_len')
         self.paramList.append('para_bias2_len')
@@ -359,11 +366,59 @@ class CtaLineBar(object):
     def __setstate__(self, state):
         """Pickle load()"""
         self.__dict__.update(state)
+        self.restore_buffers()
 
     def restore(self, state):
         """从Pickle中恢复数据"""
         for key in state.__dict__.keys():
             self.__dict__[key] = state.__dict__[key]
+        self.restore_buffers()
+
+    def restore_buffers(self):
+        """兼容旧版本的Pickle数据：把numpy序列、指标list转换为环形缓冲区"""
+        for name in ['open', 'high', 'low', 'close', 'mid3', 'mid4', 'mid5']:
+            legacy_array = self.__dict__.pop(f'{name}_array', None)
+            if legacy_array is not None:
+                self.__dict__[f'{name}_buffer'] = RingBuffer.from_array(legacy_array, fixed=True)
+
+        for key, value in list(self.__dict__.items()):
+            if key.startswith('line_') and key != 'line_bar' and isinstance(value, list):
+                self.__dict__[key] = RingBuffer.from_array(value, capacity=max(len(value), self.max_hold_bars + 1))
+
+    @property
+    def open_array(self):
+        """开盘价序列（numpy数组视图，长度为max_hold_bars，不足部分为nan）"""
+        return self.open_buffer.array
+
+    @property
+    def high_array(self):
+        """最高价序列"""
+        return self.high_buffer.array
+
+    @property
+    def low_array(self):
+        """最低价序列"""
+        return self.low_buffer.array
+
+    @property
+    def close_array(self):
+        """收盘价序列"""
+        return self.close_buffer.array
+
+    @property
+    def mid3_array(self):
+        """(收盘价+最高+最低价)/3 序列"""
+        return self.mid3_buffer.array
+
+    @property
+    def mid4_array(self):
+        """(收盘价*2+最高+最低价)/4 序列"""
+        return self.mid4_buffer.array
+
+    @property
+    def mid5_array(self):
+        """(收盘价*2+开盘价+最高+最低价)/5 序列"""
+        return self.mid5_buffer.array
 
     def init_indicators(self):
         """ 初始化定义所有的指标输入参数，以及指标生成的数据 """
@@ -433,6 +488,7 @@ class CtaLineBar(object):
         self.para_golden_n = 0  # 黄金分割的观测周期（一般设置为60，或120）
 
         self.para_active_area = False  # 是否激活区域划分
+        self.para_active_atan = True  # 是否计算MA、BOLL的斜率(line_ma1_atan, line_upper_atan等)
 
         self.para_bias_len = 0  # 乖离率观测周期1
         self.para_bias2_len = 0  # 乖离率观测周期2
@@ -440,19 +496,24 @@ class CtaLineBar(object):
 
         self.para_bd_len = 0   # 波段买卖观测长度
 
+        # 增量指标计算核
+        self.kernels = {}  # 名称 => 计算核
+        self.kernel_feeds = None  # [(bar字段, 计算核)]，第一根bar时根据参数创建
+        self.indicator_plan = None  # [(指标计算方法名, 是否传入bar)]，第一根bar时根据参数生成
+
         # --------------- K 线的指标相关计算结果数据 ----------------
-        self.line_pre_high = []  # K线的前para_pre_len的的最高
-        self.line_pre_low = []  # K线的前para_pre_len的的最低
+        self.line_pre_high = RingBuffer(self.max_hold_bars + 1)  # K线的前para_pre_len的的最高
+        self.line_pre_low = RingBuffer(self.max_hold_bars + 1)  # K线的前para_pre_len的的最低
 
-        self.line_ma1 = []  # K线的MA(para_ma1_len)均线，不包含未走完的bar
-        self.line_ma2 = []  # K线的MA(para_ma2_len)均线，不包含未走完的bar
-        self.line_ma3 = []  # K线的MA(para_ma3_len)均线，不包含未走完的bar
+        self.line_ma1 = RingBuffer(self.max_hold_bars + 1)  # K线的MA(para_ma1_len)均线，不包含未走完的bar
+        self.line_ma2 = RingBuffer(self.max_hold_bars + 1)  # K线的MA(para_ma2_len)均线，不包含未走完的bar
+        self.line_ma3 = RingBuffer(self.max_hold_bars + 1)  # K线的MA(para_ma3_len)均线，不包含未走完的bar
         self._rt_ma1 = None  # K线的实时MA(para_ma1_len)
         self._rt_ma2 = None  # K线的实时MA(para_ma2_len)
         self._rt_ma3 = None  # K线的实时MA(para_ma3_len)
-        self.line_ma1_atan = []  # K线的MA(para_ma2_len)均线斜率
-        self.line_ma2_atan = []  # K线的MA(para_ma2_len)均线斜率
-        self.line_ma3_atan = []  # K线的MA(para_ma2_len)均线斜率
+        self.line_ma1_atan = RingBuffer(self.max_hold_bars + 1)  # K线的MA(para_ma2_len)均线斜率
+        self.line_ma2_atan = RingBuffer(self.max_hold_bars + 1)  # K线的MA(para_ma2_len)均线斜率
+        self.line_ma3_atan = RingBuffer(self.max_hold_bars + 1)  # K线的MA(para_ma2_len)均线斜率
         self._rt_ma1_atan = None
         self._rt_ma2_atan = None
         self._rt_ma3_atan = None
@@ -461,9 +522,9 @@ class CtaLineBar(object):
         self.ma13_count = 0  # ma1 与 ma3 ,金叉/死叉后第几根bar，金叉正数，死叉负数
         self.ma23_count = 0  # ma2 与 ma3 ,金叉/死叉后第几根bar，金叉正数，死叉负数
 
-        self.line_ema1 = []  # K线的EMA1均线，周期是para_ema1_len1，不包含当前bar
-        self.line_ema2 = []  # K线的EMA2均线，周期是para_ema1_len2，不包含当前bar
-        self.line_ema3 = []  # K线的EMA3均线，周期是para_ema1_len3，不包含当前bar
+        self.line_ema1 = RingBuffer(self.max_hold_bars + 1)  # K线的EMA1均线，周期是para_ema1_len1，不包含当前bar
+        self.line_ema2 = RingBuffer(self.max_hold_bars + 1)  # K线的EMA2均线，周期是para_ema1_len2，不包含当前bar
+        self.line_ema3 = RingBuffer(self.max_hold_bars + 1)  # K线的EMA3均线，周期是para_ema1_len3，不包含当前bar
 
         self._rt_ema1 = None  # K线的实时EMA(para_ema1_len)
         self._rt_ema2 = None  # K线的实时EMA(para_ema2_len)
@@ -473,14 +534,14 @@ class CtaLineBar(object):
         self.cur_pdi = 0  # bar内的升动向指标，即做多的比率
         self.cur_mdi = 0  # bar内的下降动向指标，即做空的比率
 
-        self.line_pdi = []  # 升动向指标，即做多的比率
-        self.line_mdi = []  # 下降动向指标，即做空的比率
+        self.line_pdi = RingBuffer(self.max_hold_bars + 1)  # 升动向指标，即做多的比率
+        self.line_mdi = RingBuffer(self.max_hold_bars + 1)  # 下降动向指标，即做空的比率
 
-        self.line_dx = []  # 趋向指标列表，最大长度为inputM*2
+        self.line_dx = RingBuffer(self.max_hold_bars + 1)  # 趋向指标列表，最大长度为inputM*2
         self.cur_adx = 0  # Bar内计算的平均趋向指标
-        self.line_adx = []  # 平均趋向指标
+        self.line_adx = RingBuffer(self.max_hold_bars + 1)  # 平均趋向指标
         self.cur_adxr = 0  # 趋向平均值，为当日ADX值与M日前的ADX值的均值
-        self.line_adxr = []  # 平均趋向变化指标
+        self.line_adxr = RingBuffer(self.max_hold_bars + 1)  # 平均趋向变化指标
 
         # K线的基于DMI、ADX计算的结果
         self.cur_adx_trend = 0  # ADX值持续高于前一周期时，市场行情将维持原趋势
@@ -490,20 +551,20 @@ class CtaLineBar(object):
         self.signal_adx_short = False  # 空过滤器条件,做空趋势的判断，ADXR高于前一天，下降动向> inputMM
 
         # K线的ATR技术数据
-        self.line_atr1 = []  # K线的ATR1,周期为para_atr1_len
-        self.line_atr2 = []  # K线的ATR2,周期为para_atr2_len
-        self.line_atr3 = []  # K线的ATR3,周期为para_atr3_len
+        self.line_atr1 = RingBuffer(self.max_hold_bars + 1)  # K线的ATR1,周期为para_atr1_len
+        self.line_atr2 = RingBuffer(self.max_hold_bars + 1)  # K线的ATR2,周期为para_atr2_len
+        self.line_atr3 = RingBuffer(self.max_hold_bars + 1)  # K线的ATR3,周期为para_atr3_len
 
         self.cur_atr1 = 0
         self.cur_atr2 = 0
         self.cur_atr3 = 0
 
         # K线的交易量平均
-        self.line_vol_ma = []  # K 线的交易量平均
+        self.line_vol_ma = RingBuffer(self.max_hold_bars + 1)  # K 线的交易量平均
 
         # K线的RSI计算数据
-        self.line_rsi1 = []  # 记录K线对应的RSI数值，只保留para_rsi1_len*8
-        self.line_rsi2 = []  # 记录K线对应的RSI数值，只保留para_rsi2_len*8
+        self.line_rsi1 = RingBuffer(self.max_hold_bars + 1)  # 记录K线对应的RSI数值，只保留para_rsi1_len*8
+        self.line_rsi2 = RingBuffer(self.max_hold_bars + 1)  # 记录K线对应的RSI数值，只保留para_rsi2_len*8
 
         self.para_rsi_low = 30  # RSI的最低线
         self.para_rsi_high = 70  # RSI的最高线
@@ -513,17 +574,17 @@ class CtaLineBar(object):
         self.cur_rsi_top_buttom = {}  # 最近的一个波峰/波谷
 
         # K线的CMI计算数据
-        self.line_cmi = []  # 记录K线对应的Cmi数值，只保留para_cmi_len*8
+        self.line_cmi = RingBuffer(self.max_hold_bars + 1)  # 记录K线对应的Cmi数值，只保留para_cmi_len*8
 
         # K线的布林特计算数据
-        self.line_boll_upper = []  # 上轨
-        self.line_boll_middle = []  # 中线
-        self.line_boll_lower = []  # 下轨
-        self.line_boll_std = []  # 标准差
-
-        self.line_upper_atan = []
-        self.line_middle_atan = []
-        self.line_lower_atan = []
+        self.line_boll_upper = RingBuffer(self.max_hold_bars + 1)  # 上轨
+        self.line_boll_middle = RingBuffer(self.max_hold_bars + 1)  # 中线
+        self.line_boll_lower = RingBuffer(self.max_hold_bars + 1)  # 下轨
+        self.line_boll_std = RingBuffer(self.max_hold_bars + 1)  # 标准差
+
+        self.line_upper_atan = RingBuffer(self.max_hold_bars + 1)
+        self.line_middle_atan = RingBuffer(self.max_hold_bars + 1)
+        self.line_lower_atan = RingBuffer(self.max_hold_bars + 1)
         self._rt_upper = None
         self._rt_middle = None
         self._rt_lower = None
@@ -535,14 +596,14 @@ class CtaLineBar(object):
         self.cur_middle = 0  # 最后一根K的Boll中轨数值（与price_tick取整）
         self.cur_lower = 0  # 最后一根K的Boll下轨数值（与price_tick取整+1）
 
-        self.line_boll2_upper = []  # 上轨
-        self.line_boll2_middle = []  # 中线
-        self.line_boll2_lower = []  # 下轨
-        self.line_boll2_std = []  # 标准差
+        self.line_boll2_upper = RingBuffer(self.max_hold_bars + 1)  # 上轨
+        self.line_boll2_middle = RingBuffer(self.max_hold_bars + 1)  # 中线
+        self.line_boll2_lower = RingBuffer(self.max_hold_bars + 1)  # 下轨
+        self.line_boll2_std = RingBuffer(self.max_hold_bars + 1)  # 标准差
 
-        self.line_upper2_atan = []
-        self.line_middle2_atan = []
-        self.line_lower2_atan = []
+        self.line_upper2_atan = RingBuffer(self.max_hold_bars + 1)
+        self.line_middle2_atan = RingBuffer(self.max_hold_bars + 1)
+        self.line_lower2_atan = RingBuffer(self.max_hold_bars + 1)
 
         self._rt_upper2 = None
         self._rt_middle2 = None
@@ -556,12 +617,12 @@ class CtaLineBar(object):
         self.cur_lower2 = 0  # 最后一根K的Boll2下轨数值（与price_tick取整+1）
 
         # K线的KDJ指标计算数据
-        self.line_k = []  # K为快速指标
-        self.line_d = []  # D为慢速指标
-        self.line_j = []  #
+        self.line_k = RingBuffer(self.max_hold_bars + 1)  # K为快速指标
+        self.line_d = RingBuffer(self.max_hold_bars + 1)  # D为慢速指标
+        self.line_j = RingBuffer(self.max_hold_bars + 1)  #
         self.kdj_top_list = []  # 记录KDJ最高峰，只保留 para_kdj_len个
         self.kdj_buttom_list = []  # 记录KDJ的最低谷，只保留 para_kdj_len个
-        self.line_rsv = []  # RSV
+        self.line_rsv = RingBuffer(self.max_hold_bars + 1)  # RSV
         self.cur_kdj_top_buttom = {}  # 最近的一个波峰/波谷
         self.cur_k = 0  # bar内计算时，最后一个未关闭的bar的实时K值
         self.cur_d = 0  # bar内计算时，最后一个未关闭的bar的实时值
@@ -572,9 +633,9 @@ class CtaLineBar(object):
         self.cur_kd_cross_price = 0  # 最近一次发生金叉/死叉的价格
 
         # K线的MACD计算数据(26,12,9)
-        self.line_dif = []  # DIF = EMA12 - EMA26，即为talib-MACD返回值macd
-        self.line_dea = []  # DEA = （前一日DEA X 8/10 + 今日DIF X 2/10），即为talib-MACD返回值
-        self.line_macd = []  # (dif-dea)*2，但是talib中MACD的计算是bar = (dif-dea)*1,国内一般是乘以2
+        self.line_dif = RingBuffer(self.max_hold_bars + 1)  # DIF = EMA12 - EMA26，即为talib-MACD返回值macd
+        self.line_dea = RingBuffer(self.max_hold_bars + 1)  # DEA = （前一日DEA X 8/10 + 今日DIF X 2/10），即为talib-MACD返回值
+        self.line_macd = RingBuffer(self.max_hold_bars + 1)  # (dif-dea)*2，但是talib中MACD的计算是bar = (dif-dea)*1,国内一般是乘以2
         self.macd_segment_list = []  # macd 金叉/死叉的段列表，记录价格的最高/最低，Dif的最高，最低，Macd的最高/最低，Macd面接
         self._rt_dif = None
         self._rt_dea = None
@@ -591,8 +652,8 @@ class CtaLineBar(object):
         self.macd_buttom_divergence = False  # mcad 面积 与price 底背离
 
         # K 线的CCI计算数据
-        self.line_cci = []
-        self.line_cci_ema = []
+        self.line_cci = RingBuffer(self.max_hold_bars + 1)
+        self.line_cci_ema = RingBuffer(self.max_hold_bars + 1)
         self.cur_cci = None
         self.cur_cci_ema = None
         self._rt_cci = None
@@ -600,36 +661,36 @@ class CtaLineBar(object):
 
         # 卡尔曼过滤器
         self.kf = None
-        self.line_state_mean = []  # 卡尔曼均线
-        self.line_state_upper = []  # 卡尔曼均线+2标准差
-        self.line_state_lower = [] # 卡尔曼均线-2标准差
-        self.line_state_covar = []  # 方差
+        self.line_state_mean = RingBuffer(self.max_hold_bars + 1)  # 卡尔曼均线
+        self.line_state_upper = RingBuffer(self.max_hold_bars + 1)  # 卡尔曼均线+2标准差
+        self.line_state_lower = RingBuffer(self.max_hold_bars + 1) # 卡尔曼均线-2标准差
+        self.line_state_covar = RingBuffer(self.max_hold_bars + 1)  # 方差
         self.cur_state_std = None
 
         # SAR 抛物线
         self.cur_sar_direction = ''  # up/down
-        self.line_sar = []
-        self.line_sar_top = []
-        self.line_sar_buttom = []
-        self.line_sar_sr_up = []
-        self.line_sar_ep_up = []
-        self.line_sar_af_up = []
-        self.line_sar_sr_down = []
-        self.line_sar_ep_down = []
-        self.line_sar_af_down = []
+        self.line_sar = RingBuffer(self.max_hold_bars + 1)
+        self.line_sar_top = RingBuffer(self.max_hold_bars + 1)
+        self.line_sar_buttom = RingBuffer(self.max_hold_bars + 1)
+        self.line_sar_sr_up = RingBuffer(self.max_hold_bars + 1)
+        self.line_sar_ep_up = RingBuffer(self.max_hold_bars + 1)
+        self.line_sar_af_up = RingBuffer(self.max_hold_bars + 1)
+        self.line_sar_sr_down = RingBuffer(self.max_hold_bars + 1)
+        self.line_sar_ep_down = RingBuffer(self.max_hold_bars + 1)
+        self.line_sar_af_down = RingBuffer(self.max_hold_bars + 1)
         self.cur_sar_count = 0  # SAR 上升下降变化后累加
 
         # 周期
         self.cur_atan = None
-        self.line_atan = []
+        self.line_atan = RingBuffer(self.max_hold_bars + 1)
         self.cur_period = None  # 当前所在周期
         self.period_list = []
 
         # 优化的多空动量线
-        self.line_skd_rsi = []  # 参照的RSI
-        self.line_skd_sto = []  # 根据RSI演算的STO
-        self.line_sk = []  # 快线
-        self.line_sd = []  # 慢线
+        self.line_skd_rsi = RingBuffer(self.max_hold_bars + 1)  # 参照的RSI
+        self.line_skd_sto = RingBuffer(self.max_hold_bars + 1)  # 根据RSI演算的STO
+        self.line_sk = RingBuffer(self.max_hold_bars + 1)  # 快线
+        self.line_sd = RingBuffer(self.max_hold_bars + 1)  # 慢线
 
         self.cur_skd_count = 0  # 当前金叉/死叉后累加
         self._rt_sk = None  # 实时SK值
@@ -644,16 +705,13 @@ class CtaLineBar(object):
         self.rt_skd_cross_price = 0  # 发生实时金叉死叉时的价格
 
         # 多空趋势线
-        self.line_yb = []
+        self.line_yb = RingBuffer(self.max_hold_bars + 1)
         self.cur_yb_count = 0  # 当前黄/蓝累加
         self._rt_yb = None
 
-        # 黄金分割
-        self.cur_p192 = None  # HH-(HH-LL) * 0.192;
-        self.cur_p382 = None  # HH-(HH-LL) * 0.382;
-        self.cur_p500 = None  # (HH+LL)/2;
-        self.cur_p618 = None  # HH-(HH-LL) * 0.618;
-        self.cur_p809 = None  # HH-(HH-LL) * 0.809;
+        # 黄金分割，读取cur_p192等属性时才计算
+        self.golden_section = (None, None, None, None, None)  # (p192, p382, p500, p618, p809)
+        self.golden_pending_len = None  # 待计算的黄金分割观测bar数量，None: 已计算
 
         # 智能划分区域
         self.area_list = []
@@ -661,9 +719,9 @@ class CtaLineBar(object):
         self.pre_area = None
 
         # BIAS
-        self.line_bias = []  # BIAS1
-        self.line_bias2 = []  # BIAS2
-        self.line_bias3 = []  # BIAS3
+        self.line_bias = RingBuffer(self.max_hold_bars + 1)  # BIAS1
+        self.line_bias2 = RingBuffer(self.max_hold_bars + 1)  # BIAS2
+        self.line_bias3 = RingBuffer(self.max_hold_bars + 1)  # BIAS3
         self.cur_bias = 0  # 最后一个bar的BIAS1值
         self.cur_bias2 = 0  # 最后一个bar的BIAS2值
         self.cur_bias3 = 0  # 最后一个bar的BIAS3值
@@ -672,16 +730,16 @@ class CtaLineBar(object):
         self._rt_bias3 = None
 
         # 波段买卖指标
-        self.line_bd_fast = []  # 波段快线
-        self.line_bd_slow = []  # 波段慢线
+        self.line_bd_fast = RingBuffer(self.max_hold_bars + 1)  # 波段快线
+        self.line_bd_slow = RingBuffer(self.max_hold_bars + 1)  # 波段慢线
         self.cur_bd_count = 0  # 当前波段快线慢线金叉死叉， +金叉计算， - 死叉技术
 
         self._bd_fast = 0
         self._bd_slow = 0
 
         # SKDJ
-        self.line_skdj_k = []
-        self.line_skdj_d = []
+        self.line_skdj_k = RingBuffer(self.max_hold_bars + 1)
+        self.line_skdj_d = RingBuffer(self.max_hold_bars + 1)
         self.cur_skdj_k = 0
         self.cur_skdj_d = 0
 
@@ -702,11 +760,11 @@ class CtaLineBar(object):
         """
         # Tick 有效性检查
         if not self.is_7x24 and (tick.datetime.hour == 8 or tick.datetime.hour == 20):
-            self.write_log(u'竞价排名tick时间:{0}'.format(tick.datetime))
+            self.write_log(lambda: u'竞价排名tick时间:{0}'.format(tick.datetime))
             return
         self.cur_datetime = tick.datetime
 
-        self.cur_tick = copy.copy(tick)
+        self.cur_tick = tick.copy()
 
         # 兼容 标准套利合约，它没有last_price
         if self.cur_tick.last_price is None or self.cur_tick.last_price == 0:
@@ -719,7 +777,7 @@ class CtaLineBar(object):
             self.cur_price = self.cur_tick.last_price
 
         # 3.生成x K线，若形成新Bar，则触发OnBar事件
-        self.generate_bar(copy.copy(self.cur_tick))
+        self.generate_bar(self.cur_tick.copy())
 
         # 更新curPeriod的High，low
         if self.cur_period is not None:
@@ -741,7 +799,7 @@ class CtaLineBar(object):
         self.cur_datetime = bar.datetime + timedelta(minutes=bar_freq)
 
         if self.bar_len == 0:
-            new_bar = copy.deepcopy(bar)
+            new_bar = bar.copy()
             self.line_bar.append(new_bar)
             self.cur_trading_day = bar.trading_day
             self.on_bar(bar)
@@ -787,7 +845,7 @@ class CtaLineBar(object):
 
         if is_new_bar:
             # 添加新的bar
-            new_bar = copy.deepcopy(bar)
+            new_bar = bar.copy()
             self.line_bar.append(new_bar)
             # 将上一个Bar推送至OnBar事件
             self.on_bar(lastBar)
@@ -805,6 +863,182 @@ class CtaLineBar(object):
             # 实时计算
             self.rt_executed = False
 
+    def add_bars(self, bars, bar_is_completed: bool = False, bar_freq: int = 1):
+        """
+        批量增加历史bar（策略初始化），结果与逐根调用add_bar一致
+        - 一次性计算每根bar是否开启新的K线，并用numpy按K线周期聚合开高低收、成交量
+        - 只对合成完的K线调用on_bar计算指标，不再逐根更新合成中的bar
+        子类的K线合成判断无法批量计算时(count_new_bar_flags返回None)，逐根调用add_bar
+        :param bars: list of BarData，或 DataFrame(datetime, open, high, low, close, volume, open_interest, trading_day, symbol)
+        :param bar_is_completed: 插入的bar，其周期与K线周期一致，就设为True
+        :param bar_freq: 插入的bar，其分钟周期数
+        :return:
+        """
+        data = self.bars_to_arrays(bars)
+        count = len(data['close'])
+        if count == 0:
+            return
+
+        # 第一根bar走add_bar，保持原有的首根bar处理方式
+        start = 0
+        if len(self.line_bar) == 0:
+            self.add_bar(self.get_array_bar(data, 0), bar_is_completed=bar_is_completed, bar_freq=bar_freq)
+            start = 1
+            if count == 1:
+                return
+            for key in data.keys():
+                data[key] = data[key][1:]
+
+        flags = self.count_new_bar_flags(data, bar_is_completed, bar_freq)
+        if flags is None:
+            for i in range(count - start):
+                self.add_bar(self.get_array_bar(data, i), bar_is_completed=bar_is_completed, bar_freq=bar_freq)
+            return
+
+        # 每个分段：[begin, end)，第一个分段(若不是新bar)合并到当前正在合成的bar
+        starts = np.flatnonzero(flags).tolist()
+        bounds = starts + [len(flags)]
+        if len(starts) == 0 or starts[0] > 0:
+            self.merge_array_bar(self.line_bar[-1], data, 0, bounds[0])
+
+        for begin, end in zip(bounds[:-1], bounds[1:]):
+            last_bar = self.line_bar[-1]
+            new_bar = self.get_array_bar(data, begin).copy()
+            self.line_bar.append(new_bar)
+            # on_bar时的最新价格、时间等，与逐根add_bar一致
+            self.update_array_state(data, begin, bar_freq)
+            self.on_bar(last_bar)
+            if end - begin > 1:
+                self.merge_array_bar(new_bar, data, begin + 1, end)
+
+        self.update_array_state(data, len(flags) - 1, bar_freq)
+        self.bar_len = len(self.line_bar)
+
+    def count_new_bar_flags(self, data: dict, bar_is_completed: bool, bar_freq: int):
+        """
+        批量计算每根bar是否开启新的K线（判断逻辑与add_bar一致），并更新add_bar维护的状态
+        :param data: bars_to_arrays 生成的数组
+        :return: numpy bool数组，不支持批量计算时返回None
+        """
+        count = len(data['close'])
+        dts = data['datetime']
+        flags = np.full(count, bar_is_completed, dtype=bool)
+        trading_days = data['trading_day']
+        last_bar = self.line_bar[-1]
+
+        if self.interval in [Interval.SECOND, Interval.HOUR]:
+            # 与当前合成中bar(开始时间)比较，需逐根计算
+            group_dt = last_bar.datetime
+            for i, dt in enumerate(dts):
+                if self.interval == Interval.SECOND:
+                    is_new_bar = (dt - group_dt).seconds >= self.bar_interval
+                elif self.bar_interval == 1:
+                    is_new_bar = dt.hour != group_dt.hour
+                elif self.bar_interval == 2 and dt.hour != group_dt.hour and dt.hour in {1, 9, 11, 13, 15, 21, 23}:
+                    is_new_bar = True
+                elif self.bar_interval == 4 and dt.hour != group_dt.hour and dt.hour in {1, 9, 13, 21}:
+                    is_new_bar = True
+                else:
+                    is_new_bar = int(dt.hour / self.bar_interval) != int(group_dt.hour / self.bar_interval)
+                if is_new_bar or flags[i]:
+                    flags[i] = True
+                    group_dt = dt
+
+        elif self.interval == Interval.MINUTE:
+            # 当日第几个bar，与前一根bar比较（同一K线内的bar序号相同）
+            seconds = self.get_day_seconds(dts + [last_bar.datetime])
+            bar_minutes = (seconds / 60 / self.bar_interval).astype(int)
+            flags |= bar_minutes[:-1] != np.concatenate([bar_minutes[-1:], bar_minutes[:-2]])
+
+        elif self.interval == Interval.DAILY:
+            pre_trading_days = [last_bar.trading_day] + trading_days[:-1]
+            flags |= np.array([a != b for a, b in zip(trading_days, pre_trading_days)], dtype=bool)
+
+        return flags
+
+    def update_array_state(self, data: dict, index: int, bar_freq: int):
+        """更新add_bar维护的最新价格、时间、交易日等状态（第index根bar加入后）"""
+        self.cur_price = float(data['close'][index])
+        self.cur_datetime = data['datetime'][index] + timedelta(minutes=bar_freq)
+        self.cur_trading_day = data['trading_day'][index]
+
+    def bars_to_arrays(self, bars):
+        """把list of BarData 或 DataFrame 转换为 字段 => 数组"""
+        if isinstance(bars, pd.DataFrame):
+            df = bars
+            dts = df['datetime'].tolist()
+            if len(dts) > 0 and isinstance(dts[0], str):
+                dts = pd.to_datetime(df['datetime']).dt.to_pydatetime().tolist()
+            else:
+                dts = [pd.Timestamp(dt).to_pydatetime() for dt in dts]
+            count = len(df)
+            data = {
+                'bar': [None] * count,
+                'datetime': dts,
+                'open': df['open'].to_numpy(dtype=float),
+                'high': df['high'].to_numpy(dtype=float),
+                'low': df['low'].to_numpy(dtype=float),
+                'close': df['close'].to_numpy(dtype=float),
+                'volume': df['volume'].to_numpy(dtype=float),
+                'open_interest': df['open_interest'].to_numpy(dtype=float) if 'open_interest' in df else np.zeros(count),
+                'trading_day': df['trading_day'].tolist() if 'trading_day' in df else [None] * count,
+                'symbol': df['symbol'].tolist() if 'symbol' in df else [self.underly_symbol] * count
+            }
+        else:
+            data = {
+                'bar': list(bars),
+                'datetime': [bar.datetime for bar in bars],
+                'open': np.array([bar.open_price for bar in bars], dtype=float),
+                'high': np.array([bar.high_price for bar in bars], dtype=float),
+                'low': np.array([bar.low_price for bar in bars], dtype=float),
+                'close': np.array([bar.close_price for bar in bars], dtype=float),
+                'volume': [bar.volume for bar in bars],
+                'open_interest': [bar.open_interest for bar in bars],
+                'trading_day': [bar.trading_day for bar in bars],
+                'symbol': [bar.symbol for bar in bars]
+            }
+        return data
+
+    def get_array_bar(self, data: dict, index: int):
+        """获取数组中的第index根bar（DataFrame数据时创建BarData）"""
+        bar = data['bar'][index]
+        if bar is None:
+            bar = BarData(
+                gateway_name='',
+                symbol=data['symbol'][index],
+                exchange=Exchange.LOCAL,
+                datetime=data['datetime'][index],
+                trading_day=data['trading_day'][index],
+                open_price=float(data['open'][index]),
+                high_price=float(data['high'][index]),
+                low_price=float(data['low'][index]),
+                close_price=float(data['close'][index]),
+                volume=float(data['volume'][index]),
+                open_interest=float(data['open_interest'][index])
+            )
+        return bar
+
+    def merge_array_bar(self, bar: BarData, data: dict, begin: int, end: int):
+        """把数组中[begin, end)的bar，合并到正在合成的bar"""
+        if end <= begin:
+            return
+        bar.close_price = float(data['close'][end - 1])
+        bar.high_price = max(bar.high_price, float(data['high'][begin:end].max()))
+        bar.low_price = min(bar.low_price, float(data['low'][begin:end].min()))
+        volume = bar.volume
+        for v in data['volume'][begin:end]:
+            volume += v
+        bar.volume = volume
+        bar.open_interest = data['open_interest'][end - 1]
+        # 实时计算
+        self.rt_executed = False
+
+    @staticmethod
+    def get_day_seconds(dts: list):
+        """datetime列表 => 当日已过去的秒数"""
+        times = np.array(dts, dtype='datetime64[us]')
+        return (times - times.astype('datetime64[D]')) / np.timedelta64(1, 's')
+
     def on_bar(self, bar: BarData):
         """OnBar事件"""
         # 将上一根bar合成完结了，触发本on_bar事件(缓存开高收低等序列，计算各个指标)
@@ -817,27 +1051,17 @@ class CtaLineBar(object):
         bar_mid4 = round((2 * bar.close_price + bar.high_price + bar.low_price) / 4, self.round_n)
         bar_mid5 = round((2 * bar.close_price + bar.open_price + bar.high_price + bar.low_price) / 5, self.round_n)
 
-        # 扩展open,close,high,low numpy array列表 平移更新序列最新值
-        self.open_array[:-1] = self.open_array[1:]
-        self.open_array[-1] = bar.open_price
-
-        self.high_array[:-1] = self.high_array[1:]
-        self.high_array[-1] = bar.high_price
-
-        self.low_array[:-1] = self.low_array[1:]
-        self.low_array[-1] = bar.low_price
+        # 扩展open,close,high,low 环形缓冲区，追加序列最新值
+        self.open_buffer.append(bar.open_price)
+        self.high_buffer.append(bar.high_price)
+        self.low_buffer.append(bar.low_price)
+        self.close_buffer.append(bar.close_price)
+        self.mid3_buffer.append(bar_mid3)
+        self.mid4_buffer.append(bar_mid4)
+        self.mid5_buffer.append(bar_mid5)
 
-        self.close_array[:-1] = self.close_array[1:]
-        self.close_array[-1] = bar.close_price
-
-        self.mid3_array[:-1] = self.mid3_array[1:]
-        self.mid3_array[-1] = bar_mid3
-
-        self.mid4_array[:-1] = self.mid4_array[1:]
-        self.mid4_array[-1] = bar_mid4
-
-        self.mid5_array[:-1] = self.mid5_array[1:]
-        self.mid5_array[-1] = bar_mid5
+        # 更新增量指标计算核
+        self.update_kernels(bar)
 
         # 计算当前self.line_bar长度，并维持self.line_bar序列在max_hold_bars长度
         self.bar_len = len(self.line_bar)   # 当前K线得真实数量(包含已经合成以及正在合成的bar)
@@ -845,29 +1069,15 @@ class CtaLineBar(object):
             del self.line_bar[0]
             self.bar_len = self.bar_len - 1  # 删除了最前面的bar，bar长度少一位
 
-        self.__count_pre_high_low()
-        self.__count_ma()
-        self.__count_ema()
-        self.__count_dmi()
-        self.__count_atr()
-        self.__count_vol_ma()
-        self.__count_rsi()
-        self.__count_cmi()
-        self.__count_kdj()
-        self.__count_kdj_tb()
-        self.__count_boll()
-        self.__count_macd()
-        self.__count_cci()
-        self.__count_kf()
-        self.__count_period(bar)
-        self.__count_skd()
-        self.__count_yb()
-        self.__count_sar()
-        self.__count_golden_section()
-        self.__count_area(bar)
-        self.__count_bias()
-        self.__count_bd()
-        self.__count_skdj()
+        # 只计算已设置参数的指标
+        if self.indicator_plan is None:
+            self.init_indicator_plan()
+        for func_name, with_bar in self.indicator_plan:
+            if with_bar:
+                getattr(self, func_name)(bar)
+            else:
+                getattr(self, func_name)()
+
         self.export_to_csv(bar)
 
         self.rt_executed = False  # 是否 启动实时计算得函数
@@ -876,6 +1086,120 @@ class CtaLineBar(object):
         if self.cb_on_bar:
             self.cb_on_bar(bar=bar)
 
+    def init_indicator_plan(self):
+        """根据已设置的指标参数，生成on_bar时的指标计算计划（按原有的计算顺序）"""
+        plan = []
+
+        def add_plan(name, active, with_bar=False):
+            if active:
+                # 私有方法名 __count_xxx => _CtaLineBar__count_xxx
+                plan.append((f'_CtaLineBar__count_{name}', with_bar))
+
+        has_boll = self.para_boll_len > 0 or self.para_boll2_len > 0 \
+            or self.para_boll_tb_len > 0 or self.para_boll2_tb_len > 0
+
+        add_plan('pre_high_low', self.para_pre_len > 0)
+        add_plan('ma', self.para_ma1_len > 0 or self.para_ma2_len > 0 or self.para_ma3_len > 0)
+        add_plan('ema', self.para_ema1_len > 0 or self.para_ema2_len > 0 or self.para_ema3_len > 0)
+        add_plan('dmi', self.para_dmi_len > 0)
+        add_plan('atr', max(self.para_atr1_len, self.para_atr2_len, self.para_atr3_len) > 0)
+        add_plan('vol_ma', self.para_vol_len > 0)
+        add_plan('rsi', self.para_rsi1_len > 0 or self.para_rsi2_len > 0)
+        add_plan('cmi', self.para_cmi_len > 0)
+        add_plan('kdj', self.para_kdj_len > 0)
+        add_plan('kdj_tb', self.para_kdj_tb_len > 0)
+        add_plan('boll', has_boll)
+        add_plan('macd', self.para_macd_fast_len > 0 and self.para_macd_slow_len > 0 and self.para_macd_signal_len > 0)
+        add_plan('cci', self.para_cci_len > 0)
+        add_plan('kf', self.para_active_kf)
+        add_plan('period', self.para_rsi1_len > 0 and (self.para_active_kf or has_boll), with_bar=True)
+        add_plan('skd', self.para_active_skd)
+        add_plan('yb', self.para_active_yb)
+        add_plan('sar', self.para_sar_step > 0 or self.para_sar_limit > self.para_sar_step)
+        add_plan('golden_section_pending', self.para_golden_n >= 0)
+        add_plan('area', self.para_active_area, with_bar=True)
+        add_plan('bias', self.para_bias_len > 0 or self.para_bias2_len > 0 or self.para_bias3_len > 0)
+        add_plan('bd', self.para_bd_len > 0)
+        add_plan('skdj', self.para_skdj_m > 0 and self.para_skdj_n > 0)
+
+        self.indicator_plan = plan
+
+    def init_kernels(self):
+        """根据已设置的指标参数，创建增量指标计算核"""
+        self.kernels = {}
+        self.kernel_feeds = []
+
+        def add_kernel(key, kernel, fields):
+            """添加计算核，相同的计算核只创建一个"""
+            if key not in self.kernels:
+                self.kernels[key] = kernel
+                self.kernel_feeds.append((fields, kernel))
+
+        if self.para_pre_len > 0:
+            add_kernel(f'high_max_{self.para_pre_len}', RollingExtreme(self.para_pre_len, True), ('high_price',))
+            add_kernel(f'low_min_{self.para_pre_len}', RollingExtreme(self.para_pre_len, False), ('low_price',))
+
+        for ma_len in [self.para_ma1_len, self.para_ma2_len, self.para_ma3_len]:
+            if ma_len > 0:
+                add_kernel(f'close_window_{ma_len}', RollingWindow(ma_len), ('close_price',))
+
+        for ema_len in [self.para_ema1_len, self.para_ema2_len, self.para_ema3_len]:
+            if ema_len > 0:
+                add_kernel(f'ema_{ema_len}', EmaKernel(ema_len, min(ema_len * 4, ema_len + 40)), ('close_price',))
+
+        for atr_len in [self.para_atr1_len, self.para_atr2_len, self.para_atr3_len]:
+            if atr_len > 0:
+                add_kernel(f'atr_{atr_len}', AtrKernel(atr_len), ('high_price', 'low_price', 'close_price'))
+
+        for rsi_len in [self.para_rsi1_len, self.para_rsi2_len]:
+            if rsi_len > 0:
+                add_kernel(f'rsi_{rsi_len}', RsiKernel(rsi_len), ('close_price',))
+
+        # 布林(文华方式)使用para_boll_len窗口，TB方式使用2倍窗口
+        for boll_len in [self.para_boll_len, self.para_boll2_len, self.para_boll_tb_len * 2, self.para_boll2_tb_len * 2]:
+            if boll_len > 0:
+                add_kernel(f'close_window_{boll_len}', RollingWindow(boll_len), ('close_price',))
+
+        for kdj_len in [self.para_kdj_len, self.para_kdj_tb_len]:
+            if kdj_len > 0:
+                add_kernel(f'high_max_{kdj_len}', RollingExtreme(kdj_len, True), ('high_price',))
+                add_kernel(f'low_min_{kdj_len}', RollingExtreme(kdj_len, False), ('low_price',))
+
+        if self.para_macd_fast_len > 0 and self.para_macd_slow_len > 0 and self.para_macd_signal_len > 0:
+            add_kernel('macd',
+                       MacdKernel(self.para_macd_fast_len, self.para_macd_slow_len, self.para_macd_signal_len,
+                                  self.close_buffer.capacity),
+                       ('close_price',))
+
+        # ADX的输入为dx序列，在计算DMI时推入
+        if self.para_dmi_len > 0:
+            self.kernels['adx'] = EmaKernel(self.para_dmi_len, self.max_hold_bars + 1)
+            for dx in self.line_dx:
+                self.kernels['adx'].append(dx)
+
+        # 使用已有的开高低收序列预热（例如从pickle恢复的K线）
+        arrays = {
+            'open_price': self.open_array,
+            'high_price': self.high_array,
+            'low_price': self.low_array,
+            'close_price': self.close_array
+        }
+        valid = ~np.isnan(self.close_array)
+        for fields, kernel in self.kernel_feeds:
+            for values in zip(*[arrays[field][valid].tolist() for field in fields]):
+                kernel.append(*values)
+
+    def update_kernels(self, bar: BarData):
+        """bar完结时，推入各个增量计算核"""
+        if self.use_talib:
+            return
+        if self.kernel_feeds is None:
+            # 首次创建时，已包含当前bar
+            self.init_kernels()
+            return
+        for fields, kernel in self.kernel_feeds:
+            kernel.append(*[getattr(bar, field) for field in fields])
+
     def check_rt_funcs(self, func):
         """
         1.检查调用函数名是否在实时计算函数清单中，如果没有，则添加
@@ -884,7 +1208,7 @@ class CtaLineBar(object):
         :return:
         """
         if func not in self.rt_funcs:
-            self.write_log(u'{}添加{}到实时函数中'.format(self.name, str(func.__name__)))
+            self.write_log(lambda: u'{}添加{}到实时函数中'.format(self.name, str(func.__name__)))
             self.rt_funcs.add(func)
 
         self.run_rt_count()
@@ -1298,8 +1622,12 @@ class CtaLineBar(object):
 
         # 2.计算前self.para_pre_len周期内的Bar高点和低点(不包含当前周期，因为当前正在合成的bar
         # 还未触发on_bar，不会存入开高低收序列）
-        preHigh = max(self.high_array[-count_len:])
-        preLow = min(self.low_array[-count_len:])
+        if self.use_talib:
+            preHigh = max(self.high_array[-count_len:])
+            preLow = min(self.low_array[-count_len:])
+        else:
+            preHigh = self.kernels[f'high_max_{self.para_pre_len}'].value(count_len)
+            preLow = self.kernels[f'low_min_{self.para_pre_len}'].value(count_len)
         if np.isnan(preHigh) or np.isnan(preLow):
             return
         # 保存前高值到 前高序列
@@ -1408,9 +1736,9 @@ class CtaLineBar(object):
                 # self.write_log('lineSarTop={}, lineSarButtom={}, len={}'.format(self.lineSarTop[-1], self.lineSarButtom[-1],len(self.lineSarSrUp)))
                 self.line_sar_top.append(self.line_bar[-2].high_price)
                 self.line_sar_buttom.append(self.line_bar[-2].low_price)
-                self.line_sar_sr_up = []
-                self.line_sar_ep_up = []
-                self.line_sar_af_up = []
+                self.line_sar_sr_up.clear()
+                self.line_sar_ep_up.clear()
+                self.line_sar_af_up.clear()
                 sr0 = self.line_sar_sr_down[-1]
                 ep0 = self.low_array[-1]  # 文华使用前一个K线的最低价
                 af0 = min(self.para_sar_limit,
@@ -1448,9 +1776,9 @@ class CtaLineBar(object):
                 # self.write_log('lineSarTop={}, lineSarButtom={}, len={}'.format(self.lineSarTop[-1], self.lineSarButtom[-1],len(self.lineSarSrDown)))
                 self.line_sar_top.append(self.line_bar[-2].high_price)
                 self.line_sar_buttom.append(self.line_bar[-2].low_price)
-                self.line_sar_sr_down = []
-                self.line_sar_ep_down = []
-                self.line_sar_af_down = []
+                self.line_sar_sr_down.clear()
+                self.line_sar_ep_down.clear()
+                self.line_sar_af_down.clear()
                 sr0 = self.line_sar_sr_up[-1]
                 ep0 = self.high_array[-1]  # 文华使用前一个K线的最高价
                 af0 = min(self.para_sar_limit,
@@ -1461,7 +1789,7 @@ class CtaLineBar(object):
                 self.line_sar_af_up.append(af0)
                 self.line_sar.append(sr)
                 self.cur_sar_count = 0
-                self.write_log('Up: sr0={},ep0={},af0={},sr={}'.format(sr0, ep0, af0, sr))
+                self.write_log(lambda: 'Up: sr0={},ep0={},af0={},sr={}'.format(sr0, ep0, af0, sr))
 
         # 更新抛物线的最高值和最低值
         if self.line_sar_top[-1] < self.high_array[-1]:
@@ -1480,7 +1808,7 @@ class CtaLineBar(object):
 
         # 1、lineBar满足长度才执行计算
         if self.bar_len < min(7, self.para_ma1_len, self.para_ma2_len, self.para_ma3_len) + 2:
-            self.write_log(u'数据未充分,当前Bar数据数量：{0}，计算MA需要：{1}'.
+            self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}，计算MA需要：{1}'.
                            format(self.bar_len,
                                   min(7, self.para_ma1_len, self.para_ma2_len, self.para_ma3_len) + 2))
             return
@@ -1489,7 +1817,10 @@ class CtaLineBar(object):
         if self.para_ma1_len > 0:
             count_len = min(self.para_ma1_len, self.bar_len - 1)
 
-            barMa1 = ta.MA(self.close_array[-count_len:], count_len)[-1]
+            if self.use_talib:
+                barMa1 = ta.MA(self.close_array[-count_len:], count_len)[-1]
+            else:
+                barMa1 = self.kernels[f'close_window_{self.para_ma1_len}'].mean(count_len)
             if np.isnan(barMa1):
                 return
             barMa1 = round(barMa1, self.round_n)
@@ -1499,7 +1830,7 @@ class CtaLineBar(object):
             self.line_ma1.append(barMa1)
 
             # 计算斜率
-            if len(self.line_ma1) > 2 and self.line_ma1[-2] != 0:
+            if self.para_active_atan and len(self.line_ma1) > 2 and self.line_ma1[-2] != 0:
                 ma1_atan = math.atan((self.line_ma1[-1] / self.line_ma1[-2] - 1) * 100) * 180 / math.pi
                 ma1_atan = round(ma1_atan, self.round_n)
                 if len(self.line_ma1_atan) > self.max_hold_bars:
@@ -1509,7 +1840,10 @@ class CtaLineBar(object):
         # 计算第二条MA均线
         if self.para_ma2_len > 0:
             count_len = min(self.para_ma2_len, self.bar_len - 1)
-            barMa2 = ta.MA(self.close_array[-count_len:], count_len)[-1]
+            if self.use_talib:
+                barMa2 = ta.MA(self.close_array[-count_len:], count_len)[-1]
+            else:
+                barMa2 = self.kernels[f'close_window_{self.para_ma2_len}'].mean(count_len)
             if np.isnan(barMa2):
                 return
             barMa2 = round(barMa2, self.round_n)
@@ -1519,7 +1853,7 @@ class CtaLineBar(object):
             self.line_ma2.append(barMa2)
 
             # 计算斜率
-            if len(self.line_ma2) > 2 and self.line_ma2[-2] != 0:
+            if self.para_active_atan and len(self.line_ma2) > 2 and self.line_ma2[-2] != 0:
                 ma2_atan = math.atan((self.line_ma2[-1] / self.line_ma2[-2] - 1) * 100) * 180 / math.pi
                 ma2_atan = round(ma2_atan, self.round_n)
                 if len(self.line_ma2_atan) > self.max_hold_bars:
@@ -1529,7 +1863,10 @@ class CtaLineBar(object):
         # 计算第三条MA均线
         if self.para_ma3_len > 0:
             count_len = min(self.para_ma3_len, self.bar_len - 1)
-            barMa3 = ta.MA(self.close_array[-count_len:], count_len)[-1]
+            if self.use_talib:
+                barMa3 = ta.MA(self.close_array[-count_len:], count_len)[-1]
+            else:
+                barMa3 = self.kernels[f'close_window_{self.para_ma3_len}'].mean(count_len)
             if np.isnan(barMa3):
                 return
             barMa3 = round(barMa3, self.round_n)
@@ -1539,7 +1876,7 @@ class CtaLineBar(object):
             self.line_ma3.append(barMa3)
 
             # 计算斜率
-            if len(self.line_ma3) > 2 and self.line_ma3[-2] != 0:
+            if self.para_active_atan and len(self.line_ma3) > 2 and self.line_ma3[-2] != 0:
                 ma3_atan = math.atan((self.line_ma3[-1] / self.line_ma3[-2] - 1) * 100) * 180 / math.pi
                 ma3_atan = round(ma3_atan, self.round_n)
                 if len(self.line_ma3_atan) > self.max_hold_bars:
@@ -1719,7 +2056,7 @@ class CtaLineBar(object):
         max_data_len = max(ema1_data_len, ema2_data_len, ema3_data_len)
         # 1、lineBar满足长度才执行计算
         if self.bar_len < max_data_len:
-            self.write_log(u'数据未充分,当前Bar数据数量：{0}，计算EMA需要：{1}'.
+            self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}，计算EMA需要：{1}'.
                            format(len(self.line_bar), max_data_len))
             return
 
@@ -1728,7 +2065,10 @@ class CtaLineBar(object):
             count_len = min(self.para_ema1_len, self.bar_len - 1)
 
             # 3、获取前InputN周期(不包含当前周期）的K线
-            barEma1 = ta.EMA(self.close_array[-ema1_data_len:], count_len)[-1]
+            if self.use_talib:
+                barEma1 = ta.EMA(self.close_array[-ema1_data_len:], count_len)[-1]
+            else:
+                barEma1 = self.kernels[f'ema_{self.para_ema1_len}'].value
             if np.isnan(barEma1):
                 return
             barEma1 = round(float(barEma1), self.round_n)
@@ -1743,7 +2083,10 @@ class CtaLineBar(object):
 
             # 3、获取前InputN周期(不包含当前周期）的自适应均线
 
-            barEma2 = ta.EMA(self.close_array[-ema2_data_len:], count_len)[-1]
+            if self.use_talib:
+                barEma2 = ta.EMA(self.close_array[-ema2_data_len:], count_len)[-1]
+            else:
+                barEma2 = self.kernels[f'ema_{self.para_ema2_len}'].value
             if np.isnan(barEma2):
                 return
             barEma2 = round(float(barEma2), self.round_n)
@@ -1757,7 +2100,10 @@ class CtaLineBar(object):
             count_len = min(self.bar_len - 1, self.para_ema3_len)
 
             # 3、获取前InputN周期(不包含当前周期）的自适应均线
-            barEma3 = ta.EMA(self.close_array[-ema3_data_len:], count_len)[-1]
+            if self.use_talib:
+                barEma3 = ta.EMA(self.close_array[-ema3_data_len:], count_len)[-1]
+            else:
+                barEma3 = self.kernels[f'ema_{self.para_ema3_len}'].value
             if np.isnan(barEma3):
                 return
             barEma3 = round(float(barEma3), self.round_n)
@@ -1840,7 +2186,7 @@ class CtaLineBar(object):
 
         # 1、lineMx满足长度才执行计算
         if len(self.line_bar) < self.para_dmi_len + 1:
-            self.write_log(u'数据未充分,当前Bar数据数量：{0}，计算DMI需要：{1}'.format(len(self.line_bar), self.para_dmi_len + 1))
+            self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}，计算DMI需要：{1}'.format(len(self.line_bar), self.para_dmi_len + 1))
             return
 
         # 2、根据当前High，Low，(不包含当前周期）重新计算TR1，PDM，MDM和ATR
@@ -1907,12 +2253,17 @@ class CtaLineBar(object):
             del self.line_dx[0]
 
         self.line_dx.append(dx)
+        if not self.use_talib:
+            self.kernels['adx'].append(dx)
 
         # 平均趋向指标，MA计算
         if len(self.line_dx) < self.para_dmi_len + 1:
             self.cur_adx = dx
         else:
-            self.cur_adx = ta.EMA(np.array(self.line_dx, dtype=float), self.para_dmi_len)[-1]
+            if self.use_talib:
+                self.cur_adx = ta.EMA(np.array(self.line_dx, dtype=float), self.para_dmi_len)[-1]
+            else:
+                self.cur_adx = self.kernels['adx'].value
 
         # 保存Adx值
         if len(self.line_adx) > self.max_hold_bars:
@@ -1950,7 +2301,7 @@ class CtaLineBar(object):
         # 多过滤器条件,做多趋势，ADX高于前一天，上升动向> inputDmiMax
         if self.cur_pdi > self.cur_mdi and self.cur_adx_trend and self.cur_adxr_trend and self.cur_pdi >= self.para_dmi_max:
             self.signal_adx_long = True
-            self.write_log(u'{0}[DEBUG]Buy Signal On Bar,Pdi:{1}>Mdi:{2},adx[-1]:{3}>Adx[-2]:{4}'
+            self.write_log(lambda: u'{0}[DEBUG]Buy Signal On Bar,Pdi:{1}>Mdi:{2},adx[-1]:{3}>Adx[-2]:{4}'
                            .format(self.cur_tick.datetime, self.cur_pdi, self.cur_mdi, self.line_adx[-1],
                                    self.line_adx[-2]))
         else:
@@ -1960,7 +2311,7 @@ class CtaLineBar(object):
         if self.cur_pdi < self.cur_mdi and self.cur_adx_trend and self.cur_adxr_trend and self.cur_mdi >= self.para_dmi_max:
             self.signal_adx_short = True
 
-            self.write_log(u'{0}[DEBUG]Short Signal On Bar,Pdi:{1}<Mdi:{2},adx[-1]:{3}>Adx[-2]:{4}'
+            self.write_log(lambda: u'{0}[DEBUG]Short Signal On Bar,Pdi:{1}<Mdi:{2},adx[-1]:{3}>Adx[-2]:{4}'
                            .format(self.cur_tick.datetime, self.cur_pdi, self.cur_mdi, self.line_adx[-1],
                                    self.line_adx[-2]))
         else:
@@ -1976,34 +2327,43 @@ class CtaLineBar(object):
         data_need_len = min(7, maxAtrLen)
 
         if self.bar_len < data_need_len:
-            self.write_log(u'数据未充分,当前Bar数据数量：{0}，计算ATR需要：{1}'.
+            self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}，计算ATR需要：{1}'.
                            format(self.bar_len, data_need_len))
             return
 
         # 计算 ATR
         if self.para_atr1_len > 0:
             count_len = min(self.bar_len - 1, self.para_atr1_len)
-            cur_atr1 = ta.ATR(self.high_array[-count_len * 2:], self.low_array[-count_len * 2:],
-                              self.close_array[-count_len * 2:], count_len)
-            self.cur_atr1 = round(cur_atr1[-1], self.round_n)
+            if self.use_talib:
+                cur_atr1 = ta.ATR(self.high_array[-count_len * 2:], self.low_array[-count_len * 2:],
+                                  self.close_array[-count_len * 2:], count_len)[-1]
+            else:
+                cur_atr1 = self.kernels[f'atr_{self.para_atr1_len}'].value(count_len)
+            self.cur_atr1 = round(cur_atr1, self.round_n)
             if len(self.line_atr1) > self.max_hold_bars:
                 del self.line_atr1[0]
             self.line_atr1.append(self.cur_atr1)
 
         if self.para_atr2_len > 0:
             count_len = min(self.bar_len - 1, self.para_atr2_len)
-            cur_atr2 = ta.ATR(self.high_array[-count_len * 2:], self.low_array[-count_len * 2:],
-                              self.close_array[-count_len * 2:], count_len)
-            self.cur_atr2 = round(cur_atr2[-1], self.round_n)
+            if self.use_talib:
+                cur_atr2 = ta.ATR(self.high_array[-count_len * 2:], self.low_array[-count_len * 2:],
+                                  self.close_array[-count_len * 2:], count_len)[-1]
+            else:
+                cur_atr2 = self.kernels[f'atr_{self.para_atr2_len}'].value(count_len)
+            self.cur_atr2 = round(cur_atr2, self.round_n)
             if len(self.line_atr2) > self.max_hold_bars:
                 del self.line_atr2[0]
             self.line_atr2.append(self.cur_atr2)
 
         if self.para_atr3_len > 0:
             count_len = min(self.bar_len - 1, self.para_atr3_len)
-            cur_atr3 = ta.ATR(self.high_array[-count_len * 2:], self.low_array[-count_len * 2:],
-                              self.close_array[-count_len * 2:], count_len)
-            self.cur_atr3 = round(cur_atr3[-1], self.round_n)
+            if self.use_talib:
+                cur_atr3 = ta.ATR(self.high_array[-count_len * 2:], self.low_array[-count_len * 2:],
+                                  self.close_array[-count_len * 2:], count_len)[-1]
+            else:
+                cur_atr3 = self.kernels[f'atr_{self.para_atr3_len}'].value(count_len)
+            self.cur_atr3 = round(cur_atr3, self.round_n)
 
             if len(self.line_atr3) > self.max_hold_bars:
                 del self.line_atr3[0]
@@ -2032,14 +2392,17 @@ class CtaLineBar(object):
 
         # 1、lineBar满足长度才执行计算
         if len(self.line_bar) < self.para_rsi1_len + 2:
-            self.write_log(u'数据未充分,当前Bar数据数量：{0}，计算RSI需要：{1}'.
+            self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}，计算RSI需要：{1}'.
                            format(len(self.line_bar), self.para_rsi1_len + 2))
             return
 
         # 计算第1根RSI曲线
         # 3、inputRsi1Len(包含当前周期）的相对强弱
 
-        barRsi = ta.RSI(self.close_array[-2 * self.para_rsi1_len:], self.para_rsi1_len)[-1]
+        if self.use_talib:
+            barRsi = ta.RSI(self.close_array[-2 * self.para_rsi1_len:], self.para_rsi1_len)[-1]
+        else:
+            barRsi = self.kernels[f'rsi_{self.para_rsi1_len}'].value
         barRsi = round(float(barRsi), self.round_n)
 
         if len(self.line_rsi1) > self.max_hold_bars:
@@ -2078,7 +2441,10 @@ class CtaLineBar(object):
             if self.bar_len < self.para_rsi2_len + 2:
                 return
 
-            barRsi = ta.RSI(self.close_array[-2 * self.para_rsi2_len:], self.para_rsi2_len)[-1]
+            if self.use_talib:
+                barRsi = ta.RSI(self.close_array[-2 * self.para_rsi2_len:], self.para_rsi2_len)[-1]
+            else:
+                barRsi = self.kernels[f'rsi_{self.para_rsi2_len}'].value
             barRsi = round(float(barRsi), self.round_n)
 
             if len(self.line_rsi2) > self.max_hold_bars:
@@ -2102,7 +2468,7 @@ class CtaLineBar(object):
 
         # 1、lineBar满足长度才执行计算
         if self.bar_len < self.para_cmi_len:
-            self.write_log(u'数据未充分,当前Bar数据数量：{0}，计算CMI需要：{1}'.
+            self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}，计算CMI需要：{1}'.
                            format(len(self.line_bar), self.para_cmi_len))
             return
 
@@ -2131,16 +2497,15 @@ class CtaLineBar(object):
 
         if self.para_boll_len > 0:
             if self.bar_len < min(20, self.para_boll_len):
-                self.write_log(u'数据未充分,当前Bar数据数量：{0}，计算Boll需要：{1}'.
+                self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}，计算Boll需要：{1}'.
                                format(len(self.line_bar), min(14, self.para_boll_len) + 1))
             else:
                 bollLen = min(self.bar_len - 1, self.para_boll_len)
 
                 # 不包含当前最新的Bar
-                upper_list, middle_list, lower_list = ta.BBANDS(self.close_array,
-                                                                timeperiod=bollLen, nbdevup=self.para_boll_std_rate,
-                                                                nbdevdn=self.para_boll_std_rate, matype=0)
-                if np.isnan(upper_list[-1]):
+                upper_value, middle_value, lower_value = self.__count_bbands(self.para_boll_len, bollLen,
+                                                                               self.para_boll_std_rate)
+                if np.isnan(upper_value):
                     return
 
                 if len(self.line_boll_upper) > self.max_hold_bars:
@@ -2153,36 +2518,36 @@ class CtaLineBar(object):
                     del self.line_boll_std[0]
 
                 # 1标准差
-                std = (upper_list[-1] - lower_list[-1]) / (self.para_boll_std_rate * 2)
+                std = (upper_value - lower_value) / (self.para_boll_std_rate * 2)
                 self.line_boll_std.append(std)
 
-                upper = round(upper_list[-1], self.round_n)
+                upper = round(upper_value, self.round_n)
                 self.line_boll_upper.append(upper)  # 上轨
                 self.cur_upper = upper  # 上轨
 
-                middle = round(middle_list[-1], self.round_n)
+                middle = round(middle_value, self.round_n)
                 self.line_boll_middle.append(middle)  # 中轨
                 self.cur_middle = middle  # 中轨
 
-                lower = round(lower_list[-1], self.round_n)
+                lower = round(lower_value, self.round_n)
                 self.line_boll_lower.append(lower)  # 下轨
                 self.cur_lower = lower  # 下轨
 
                 # 计算斜率
-                if len(self.line_boll_upper) > 2 and self.line_boll_upper[-2] != 0:
+                if self.para_active_atan and len(self.line_boll_upper) > 2 and self.line_boll_upper[-2] != 0:
                     up_atan = math.atan((self.line_boll_upper[-1] / self.line_boll_upper[-2] - 1) * 100) * 180 / math.pi
                     up_atan = round(up_atan, self.round_n)
                     if len(self.line_upper_atan) > self.max_hold_bars:
                         del self.line_upper_atan[0]
                     self.line_upper_atan.append(up_atan)
-                if len(self.line_boll_middle) > 2 and self.line_boll_middle[-2] != 0:
+                if self.para_active_atan and len(self.line_boll_middle) > 2 and self.line_boll_middle[-2] != 0:
                     mid_atan = math.atan(
                         (self.line_boll_middle[-1] / self.line_boll_middle[-2] - 1) * 100) * 180 / math.pi
                     mid_atan = round(mid_atan, self.round_n)
                     if len(self.line_middle_atan) > self.max_hold_bars:
                         del self.line_middle_atan[0]
                     self.line_middle_atan.append(mid_atan)
-                if len(self.line_boll_lower) > 2 and self.line_boll_lower[-2] != 0:
+                if self.para_active_atan and len(self.line_boll_lower) > 2 and self.line_boll_lower[-2] != 0:
                     low_atan = math.atan(
                         (self.line_boll_lower[-1] / self.line_boll_lower[-2] - 1) * 100) * 180 / math.pi
                     low_atan = round(low_atan, self.round_n)
@@ -2192,16 +2557,15 @@ class CtaLineBar(object):
 
         if self.para_boll2_len > 0:
             if self.bar_len < min(14, self.para_boll2_len) + 1:
-                self.write_log(u'数据未充分,当前Bar数据数量：{0}，计算Boll2需要：{1}'.
+                self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}，计算Boll2需要：{1}'.
                                format(len(self.line_bar), min(14, self.para_boll2_len) + 1))
             else:
                 boll2Len = min(self.bar_len - 1, self.para_boll2_len)
 
                 # 不包含当前最新的Bar
-                upper_list, middle_list, lower_list = ta.BBANDS(self.close_array,
-                                                                timeperiod=boll2Len, nbdevup=self.para_boll2_std_rate,
-                                                                nbdevdn=self.para_boll2_std_rate, matype=0)
-                if np.isnan(upper_list[-1]):
+                upper_value, middle_value, lower_value = self.__count_bbands(self.para_boll2_len, boll2Len,
+                                                                               self.para_boll2_std_rate)
+                if np.isnan(upper_value):
                     return
                 if len(self.line_boll2_upper) > self.max_hold_bars:
                     del self.line_boll2_upper[0]
@@ -2213,37 +2577,37 @@ class CtaLineBar(object):
                     del self.line_boll2_std[0]
 
                 # 1标准差
-                std = (upper_list[-1] - lower_list[-1]) / (self.para_boll2_std_rate * 2)
+                std = (upper_value - lower_value) / (self.para_boll2_std_rate * 2)
                 self.line_boll2_std.append(std)
 
-                upper = round(upper_list[-1], self.round_n)
+                upper = round(upper_value, self.round_n)
                 self.line_boll2_upper.append(upper)  # 上轨
                 self.cur_upper2 = upper  # 上轨
 
-                middle = round(middle_list[-1], self.round_n)
+                middle = round(middle_value, self.round_n)
                 self.line_boll2_middle.append(middle)  # 中轨
                 self.cur_middle2 = middle  # 中轨
 
-                lower = round(lower_list[-1], self.round_n)
+                lower = round(lower_value, self.round_n)
                 self.line_boll2_lower.append(lower)  # 下轨
                 self.cur_lower2 = lower  # 下轨
 
                 # 计算斜率
-                if len(self.line_boll2_upper) > 2 and self.line_boll2_upper[-2] != 0:
+                if self.para_active_atan and len(self.line_boll2_upper) > 2 and self.line_boll2_upper[-2] != 0:
                     up_atan = math.atan(
                         (self.line_boll2_upper[-1] / self.line_boll2_upper[-2] - 1) * 100) * 180 / math.pi
                     up_atan = round(up_atan, self.round_n)
                     if len(self.line_upper2_atan) > self.max_hold_bars:
                         del self.line_upper2_atan[0]
                     self.line_upper2_atan.append(up_atan)
-                if len(self.line_boll2_middle) > 2 and self.line_boll2_middle[-2] != 0:
+                if self.para_active_atan and len(self.line_boll2_middle) > 2 and self.line_boll2_middle[-2] != 0:
                     mid_atan = math.atan(
                         (self.line_boll2_middle[-1] / self.line_boll2_middle[-2] - 1) * 100) * 180 / math.pi
                     mid_atan = round(mid_atan, self.round_n)
                     if len(self.line_middle2_atan) > self.max_hold_bars:
                         del self.line_middle2_atan[0]
                     self.line_middle2_atan.append(mid_atan)
-                if len(self.line_boll2_lower) > 2 and self.line_boll2_lower[-2] != 0:
+                if self.para_active_atan and len(self.line_boll2_lower) > 2 and self.line_boll2_lower[-2] != 0:
                     low_atan = math.atan(
                         (self.line_boll2_lower[-1] / self.line_boll2_lower[-2] - 1) * 100) * 180 / math.pi
                     low_atan = round(low_atan, self.round_n)
@@ -2253,7 +2617,7 @@ class CtaLineBar(object):
 
         if self.para_boll_tb_len > 0:
             if self.bar_len < min(14, self.para_boll_tb_len) + 1:
-                self.write_log(u'数据未充分,当前Bar数据数量：{0}，计算Boll需要：{1}'.
+                self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}，计算Boll需要：{1}'.
                                format(len(self.line_bar), min(14, self.para_boll_tb_len) + 1))
             else:
                 bollLen = min(self.bar_len - 1, self.para_boll_tb_len)
@@ -2270,10 +2634,15 @@ class CtaLineBar(object):
                     del self.line_boll_std[0]
 
                 # 1标准差
-                std = np.std(self.close_array[-2 * bollLen:], ddof=1)
+                if self.use_talib:
+                    std = np.std(self.close_array[-2 * bollLen:], ddof=1)
+                    middle = np.mean(self.close_array[-2 * bollLen:])
+                else:
+                    window = self.kernels[f'close_window_{self.para_boll_tb_len * 2}']
+                    std = window.std(2 * bollLen, ddof=1)
+                    middle = window.mean(2 * bollLen)
                 self.line_boll_std.append(std)
 
-                middle = np.mean(self.close_array[-2 * bollLen:])
                 self.line_boll_middle.append(middle)  # 中轨
                 self.cur_middle = middle - middle % self.price_tick  # 中轨取整
 
@@ -2286,20 +2655,20 @@ class CtaLineBar(object):
                 self.cur_lower = lower - lower % self.price_tick  # 下轨取整
 
                 # 计算斜率
-                if len(self.line_boll_upper) > 2 and self.line_boll_upper[-2] != 0:
+                if self.para_active_atan and len(self.line_boll_upper) > 2 and self.line_boll_upper[-2] != 0:
                     up_atan = math.atan((self.line_boll_upper[-1] / self.line_boll_upper[-2] - 1) * 100) * 180 / math.pi
                     up_atan = round(up_atan, self.round_n)
                     if len(self.line_upper_atan) > self.max_hold_bars:
                         del self.line_upper_atan[0]
                     self.line_upper_atan.append(up_atan)
-                if len(self.line_boll_middle) > 2 and self.line_boll_middle[-2] != 0:
+                if self.para_active_atan and len(self.line_boll_middle) > 2 and self.line_boll_middle[-2] != 0:
                     mid_atan = math.atan(
                         (self.line_boll_middle[-1] / self.line_boll_middle[-2] - 1) * 100) * 180 / math.pi
                     mid_atan = round(mid_atan, self.round_n)
                     if len(self.line_middle_atan) > self.max_hold_bars:
                         del self.line_middle_atan[0]
                     self.line_middle_atan.append(mid_atan)
-                if len(self.line_boll_lower) > 2 and self.line_boll_lower[-2] != 0:
+                if self.para_active_atan and len(self.line_boll_lower) > 2 and self.line_boll_lower[-2] != 0:
                     low_atan = math.atan(
                         (self.line_boll_lower[-1] / self.line_boll_lower[-2] - 1) * 100) * 180 / math.pi
                     low_atan = round(low_atan, self.round_n)
@@ -2309,7 +2678,7 @@ class CtaLineBar(object):
 
         if self.para_boll2_tb_len > 0:
             if self.bar_len < min(14, self.para_boll2_tb_len) + 1:
-                self.write_log(u'数据未充分,当前Bar数据数量：{0}，计算Boll2需要：{1}'.
+                self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}，计算Boll2需要：{1}'.
                                format(len(self.line_bar), min(14, self.para_boll2_tb_len) + 1))
             else:
                 boll2Len = min(self.bar_len - 1, self.para_boll2_tb_len)
@@ -2324,10 +2693,15 @@ class CtaLineBar(object):
                     del self.line_boll2_std[0]
 
                 # 1标准差
-                std = np.std(self.close_array[-2 * boll2Len:], ddof=1)
+                if self.use_talib:
+                    std = np.std(self.close_array[-2 * boll2Len:], ddof=1)
+                    middle = np.mean(self.close_array[-2 * boll2Len:])
+                else:
+                    window = self.kernels[f'close_window_{self.para_boll2_tb_len * 2}']
+                    std = window.std(2 * boll2Len, ddof=1)
+                    middle = window.mean(2 * boll2Len)
                 self.line_boll2_std.append(std)
 
-                middle = np.mean(self.close_array[-2 * boll2Len:])
                 self.line_boll2_middle.append(middle)  # 中轨
                 self.cur_middle2 = middle  # 中轨取整
 
@@ -2340,21 +2714,21 @@ class CtaLineBar(object):
                 self.cur_lower2 = lower  # 下轨取整
 
                 # 计算斜率
-                if len(self.line_boll2_upper) > 2 and self.line_boll2_upper[-2] != 0:
+                if self.para_active_atan and len(self.line_boll2_upper) > 2 and self.line_boll2_upper[-2] != 0:
                     up_atan = math.atan(
                         (self.line_boll2_upper[-1] / self.line_boll2_upper[-2] - 1) * 100) * 180 / math.pi
                     up_atan = round(up_atan, self.round_n)
                     if len(self.line_upper2_atan) > self.max_hold_bars:
                         del self.line_upper2_atan[0]
                     self.line_upper2_atan.append(up_atan)
-                if len(self.line_boll2_middle) > 2 and self.line_boll2_middle[-2] != 0:
+                if self.para_active_atan and len(self.line_boll2_middle) > 2 and self.line_boll2_middle[-2] != 0:
                     mid_atan = math.atan(
                         (self.line_boll2_middle[-1] / self.line_boll2_middle[-2] - 1) * 100) * 180 / math.pi
                     mid_atan = round(mid_atan, self.round_n)
                     if len(self.line_middle2_atan) > self.max_hold_bars:
                         del self.line_middle2_atan[0]
                     self.line_middle2_atan.append(mid_atan)
-                if len(self.line_boll2_lower) > 2 and self.line_boll2_lower[-2] != 0:
+                if self.para_active_atan and len(self.line_boll2_lower) > 2 and self.line_boll2_lower[-2] != 0:
                     low_atan = math.atan(
                         (self.line_boll2_lower[-1] / self.line_boll2_lower[-2] - 1) * 100) * 180 / math.pi
                     low_atan = round(low_atan, self.round_n)
@@ -2362,6 +2736,25 @@ class CtaLineBar(object):
                         del self.line_lower2_atan[0]
                     self.line_lower2_atan.append(low_atan)
 
+    def __count_bbands(self, para_len, boll_len, std_rate):
+        """
+        计算最后一根bar的布林上中下轨（文华方式）
+        :param para_len: 布林参数周期
+        :param boll_len: 实际计算周期（数据不足时小于参数周期）
+        :param std_rate: 标准差倍率
+        :return: upper, middle, lower
+        """
+        if self.use_talib:
+            upper_list, middle_list, lower_list = ta.BBANDS(self.close_array,
+                                                            timeperiod=boll_len, nbdevup=std_rate,
+                                                            nbdevdn=std_rate, matype=0)
+            return upper_list[-1], middle_list[-1], lower_list[-1]
+
+        window = self.kernels[f'close_window_{para_len}']
+        middle = window.mean(boll_len)
+        std = window.std(boll_len)
+        return middle + std_rate * std, middle, middle - std_rate * std
+
     def rt_count_boll(self):
         """实时计算布林上下轨，斜率"""
         boll_01_len = max(self.para_boll_len, self.para_boll_tb_len)
@@ -2557,7 +2950,7 @@ class CtaLineBar(object):
             return
 
         if len(self.line_bar) < self.para_kdj_len + 1:
-            self.write_log(u'数据未充分,当前Bar数据数量：{0}，计算KDJ需要：{1}'.format(len(self.line_bar), self.para_kdj_len + 1))
+            self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}，计算KDJ需要：{1}'.format(len(self.line_bar), self.para_kdj_len + 1))
             return
 
         if self.para_kdj_slow_len == 0:
@@ -2567,8 +2960,12 @@ class CtaLineBar(object):
 
         inputKdjLen = min(self.para_kdj_len, self.bar_len - 1)
 
-        hhv = max(self.high_array[-inputKdjLen:])
-        llv = min(self.low_array[-inputKdjLen:])
+        if self.use_talib:
+            hhv = max(self.high_array[-inputKdjLen:])
+            llv = min(self.low_array[-inputKdjLen:])
+        else:
+            hhv = self.kernels[f'high_max_{self.para_kdj_len}'].value(inputKdjLen)
+            llv = self.kernels[f'low_min_{self.para_kdj_len}'].value(inputKdjLen)
         if np.isnan(hhv) or np.isnan(llv):
             return
         if len(self.line_k) > 0:
@@ -2682,8 +3079,12 @@ class CtaLineBar(object):
 
         data_len = min(self.bar_len - 1, self.para_kdj_tb_len)
 
-        hhv = max(self.high_array[-data_len:])
-        llv = min(self.low_array[-data_len:])
+        if self.use_talib:
+            hhv = max(self.high_array[-data_len:])
+            llv = min(self.low_array[-data_len:])
+        else:
+            hhv = self.kernels[f'high_max_{self.para_kdj_tb_len}'].value(data_len)
+            llv = self.kernels[f'low_min_{self.para_kdj_tb_len}'].value(data_len)
         if np.isnan(hhv) or np.isnan(llv):
             return
 
@@ -2811,12 +3212,16 @@ class CtaLineBar(object):
         # maxLen = maxLen * 3  # 注：数据长度需要足够，才能准确。测试过，3倍长度才可以与国内的文华等软件一致
 
         if self.bar_len - 1 < maxLen:
-            self.write_log(u'数据未充分,当前Bar数据数量：{0}，计算MACD需要：{1}'.format(self.bar_len - 1, maxLen))
+            self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}，计算MACD需要：{1}'.format(self.bar_len - 1, maxLen))
             return
 
-        dif_list, dea_list, macd_list = ta.MACD(self.close_array, fastperiod=self.para_macd_fast_len,
-                                                slowperiod=self.para_macd_slow_len,
-                                                signalperiod=self.para_macd_signal_len)
+        if self.use_talib:
+            dif_list, dea_list, macd_list = ta.MACD(self.close_array, fastperiod=self.para_macd_fast_len,
+                                                    slowperiod=self.para_macd_slow_len,
+                                                    signalperiod=self.para_macd_signal_len)
+        else:
+            macd_kernel = self.kernels['macd']
+            dif_list, dea_list, macd_list = [macd_kernel.dif], [macd_kernel.dea], [macd_kernel.macd]
         if np.isnan(dif_list[-1]) or np.isnan(dea_list[-1]) or np.isnan(macd_list[-1]):
             return
         # dif, dea, macd = ta.MACDEXT(np.array(listClose, dtype=float),
@@ -3116,7 +3521,7 @@ class CtaLineBar(object):
 
         # 1、lineBar满足长度才执行计算
         if len(self.line_bar) < self.para_cci_len + 2:
-            self.write_log(u'数据未充分,当前Bar数据数量：{0}，计算CCI需要：{1}'.
+            self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}，计算CCI需要：{1}'.
                            format(len(self.line_bar), self.para_cci_len + 2))
             return
 
@@ -3167,7 +3572,7 @@ class CtaLineBar(object):
 
         # 1、lineBar满足长度才执行计算
         if len(self.line_bar) < self.para_cci_len + 2:
-            self.write_log(u'数据未充分,当前Bar数据数量：{0}，计算CCI需要：{1}'.
+            self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}，计算CCI需要：{1}'.
                            format(len(self.line_bar), self.para_cci_len + 2))
             return
 
@@ -3297,7 +3702,7 @@ class CtaLineBar(object):
                     self.cur_period = CtaPeriod(mode=Period.SHORT_EXTREME, price=bar.close_price, pre_mode=Period.SHORT,
                                                 dt=bar.datetime)
                     self.period_list.append(self.cur_period)
-                    self.write_log(u'{} 角度向下,Atan:{},周期{}=》{}'.
+                    self.write_log(lambda: u'{} 角度向下,Atan:{},周期{}=》{}'.
                                    format(bar.datetime, self.cur_atan, self.cur_period.pre_mode, self.cur_period.mode))
                     if self.cb_on_period:
                         self.cb_on_period(self.cur_period)
@@ -3307,7 +3712,7 @@ class CtaLineBar(object):
                     self.cur_period = CtaPeriod(mode=Period.LONG_EXTREME, price=bar.close_price, pre_mode=Period.LONG,
                                                 dt=bar.datetime)
                     self.period_list.append(self.cur_period)
-                    self.write_log(u'{} 角度加速向上,Atan:{}，周期:{}=>{}'.
+                    self.write_log(lambda: u'{} 角度加速向上,Atan:{}，周期:{}=>{}'.
                                    format(bar.datetime, self.cur_atan, self.cur_period.pre_mode,
                                           self.cur_period.mode))
                     if self.cb_on_period:
@@ -3320,7 +3725,7 @@ class CtaLineBar(object):
                 self.cur_period = CtaPeriod(mode=Period.SHORT, price=bar.close_price, pre_mode=Period.SHOCK,
                                             dt=bar.datetime)
                 self.period_list.append(self.cur_period)
-                self.write_log(u'{} 角度向下,Atan:{},周期{}=》{}'.
+                self.write_log(lambda: u'{} 角度向下,Atan:{},周期{}=》{}'.
                                format(bar.datetime, self.cur_atan, self.cur_period.pre_mode, self.cur_period.mode))
                 if self.cb_on_period:
                     self.cb_on_period(self.cur_period)
@@ -3329,7 +3734,7 @@ class CtaLineBar(object):
                 self.cur_period = CtaPeriod(mode=Period.LONG, price=bar.close_price, pre_mode=Period.SHOCK,
                                             dt=bar.datetime)
                 self.period_list.append(self.cur_period)
-                self.write_log(u'{} 角度向上,Atan:{}，周期:{}=>{}'.
+                self.write_log(lambda: u'{} 角度向上,Atan:{}，周期:{}=>{}'.
                                format(bar.datetime, self.cur_atan, self.cur_period.pre_mode,
                                       self.cur_period.mode))
                 if self.cb_on_period:
@@ -3337,7 +3742,7 @@ class CtaLineBar(object):
 
             # 周期维持不变
             else:
-                self.write_log(u'{} 角度维持，Atan:{},周期维持:{}'.
+                self.write_log(lambda: u'{} 角度维持，Atan:{},周期维持:{}'.
                                format(bar.datetime, self.cur_atan, self.cur_period.mode))
 
             return
@@ -3349,7 +3754,7 @@ class CtaLineBar(object):
                 self.cur_period = CtaPeriod(mode=Period.SHORT_EXTREME, price=bar.close_price, pre_mode=Period.SHORT,
                                             dt=bar.datetime)
                 self.period_list.append(self.cur_period)
-                self.write_log(u'{} 角度极端向下,Atan:{}，注意反弹。周期:{}=>{}'.
+                self.write_log(lambda: u'{} 角度极端向下,Atan:{}，注意反弹。周期:{}=>{}'.
                                format(bar.datetime, self.cur_atan, self.cur_period.pre_mode, self.cur_period.mode))
                 if self.cb_on_period:
                     self.cb_on_period(self.cur_period)
@@ -3359,7 +3764,7 @@ class CtaLineBar(object):
                 self.cur_period = CtaPeriod(mode=Period.SHOCK, price=bar.close_price, pre_mode=Period.SHORT,
                                             dt=bar.datetime)
                 self.period_list.append(self.cur_period)
-                self.write_log(u'{} 角度平缓，Atan:{},结束下降趋势。周期:{}=>{}'.
+                self.write_log(lambda: u'{} 角度平缓，Atan:{},结束下降趋势。周期:{}=>{}'.
                                format(bar.datetime, self.cur_atan, self.cur_period.pre_mode, self.cur_period.mode))
                 if self.cb_on_period:
                     self.cb_on_period(self.cur_period)
@@ -3369,14 +3774,14 @@ class CtaLineBar(object):
                 self.cur_period = CtaPeriod(mode=Period.SHOCK, price=bar.close_price, pre_mode=Period.SHORT,
                                             dt=bar.datetime)
                 self.period_list.append(self.cur_period)
-                self.write_log(u'{} 角度平缓，Atan:{},结束下降趋势。周期:{}=>{}'.
+                self.write_log(lambda: u'{} 角度平缓，Atan:{},结束下降趋势。周期:{}=>{}'.
                                format(bar.datetime, self.cur_atan, self.cur_period.pre_mode, self.cur_period.mode))
                 if self.cb_on_period:
                     self.cb_on_period(self.cur_period)
 
             # 周期维持空
             else:
-                self.write_log(u'{} 角度向下{},周期维持:{}'.
+                self.write_log(lambda: u'{} 角度向下{},周期维持:{}'.
                                format(bar.datetime, self.cur_atan, self.cur_period.mode))
 
             return
@@ -3389,7 +3794,7 @@ class CtaLineBar(object):
                                             dt=bar.datetime)
                 self.period_list.append(self.cur_period)
 
-                self.write_log(u'{} 角度加速向上,Atan:{}，周期:{}=>{}'.
+                self.write_log(lambda: u'{} 角度加速向上,Atan:{}，周期:{}=>{}'.
                                format(bar.datetime, self.cur_atan, self.cur_period.pre_mode,
                                       self.cur_period.mode))
                 if self.cb_on_period:
@@ -3400,7 +3805,7 @@ class CtaLineBar(object):
                 self.cur_period = CtaPeriod(mode=Period.SHOCK, price=bar.close_price, pre_mode=Period.LONG,
                                             dt=bar.datetime)
                 self.period_list.append(self.cur_period)
-                self.write_log(u'{} 角度平缓,Atan:{},结束上升趋势。周期:{}=>{}'.
+                self.write_log(lambda: u'{} 角度平缓,Atan:{},结束上升趋势。周期:{}=>{}'.
                                format(bar.datetime, self.cur_atan, self.cur_period.pre_mode, self.cur_period.mode))
                 if self.cb_on_period:
                     self.cb_on_period(self.cur_period)
@@ -3411,14 +3816,14 @@ class CtaLineBar(object):
                 self.cur_period = CtaPeriod(mode=Period.SHOCK, price=bar.close_price, pre_mode=Period.LONG,
                                             dt=bar.datetime)
                 self.period_list.append(self.cur_period)
-                self.write_log(u'{} 角度平缓,Atan:{},结束上升趋势。周期:{}=>{}'.
+                self.write_log(lambda: u'{} 角度平缓,Atan:{},结束上升趋势。周期:{}=>{}'.
                                format(bar.datetime, self.cur_atan, self.cur_period.pre_mode, self.cur_period.mode))
 
                 if self.cb_on_period:
                     self.cb_on_period(self.cur_period)
             # 周期保持多
             else:
-                self.write_log(u'{} 角度向上,Atan:{},周期维持:{}'.
+                self.write_log(lambda: u'{} 角度向上,Atan:{},周期维持:{}'.
                                format(bar.datetime, self.cur_atan, self.cur_period.mode))
             return
 
@@ -3433,7 +3838,7 @@ class CtaLineBar(object):
                                             dt=bar.datetime)
                 self.period_list.append(self.cur_period)
 
-                self.write_log(u'{} 角度高位反弹向下，Atan:{} , RSI {}=》{},{}下穿中轨{},周期：{}=》{}'.
+                self.write_log(lambda: u'{} 角度高位反弹向下，Atan:{} , RSI {}=》{},{}下穿中轨{},周期：{}=》{}'.
                                format(bar.datetime, self.cur_atan, self.line_rsi1[-2], self.line_rsi1[-1],
                                       bar.close_price, lastMid,
                                       self.cur_period.pre_mode, self.cur_period.mode))
@@ -3446,7 +3851,7 @@ class CtaLineBar(object):
                 self.cur_period = CtaPeriod(mode=Period.LONG, price=bar.close_price, pre_mode=Period.LONG_EXTREME,
                                             dt=bar.datetime)
                 self.period_list.append(self.cur_period)
-                self.write_log(u'{} 角度上加速放缓，Atan:{}, & RSI{}=>{}，周期：{}=》{}'.
+                self.write_log(lambda: u'{} 角度上加速放缓，Atan:{}, & RSI{}=>{}，周期：{}=》{}'.
                                format(bar.datetime, self.cur_atan, self.line_rsi1[-2], self.line_rsi1[-1],
                                       self.cur_period.pre_mode, self.cur_period.mode))
                 if self.cb_on_period:
@@ -3454,7 +3859,7 @@ class CtaLineBar(object):
 
             # 当前趋势保持多极端
             else:
-                self.write_log(u'{} 角度向上加速{},周期维持:{}'.
+                self.write_log(lambda: u'{} 角度向上加速{},周期维持:{}'.
                                format(bar.datetime, self.cur_atan, self.cur_period.mode))
 
             return
@@ -3469,7 +3874,7 @@ class CtaLineBar(object):
                                             dt=bar.datetime)
                 self.period_list.append(self.cur_period)
 
-                self.write_log(u'{} 角度下极限低位反弹转折,Atan:{}, RSI:{}=>{},周期:{}=>{}'.
+                self.write_log(lambda: u'{} 角度下极限低位反弹转折,Atan:{}, RSI:{}=>{},周期:{}=>{}'.
                                format(bar.datetime, self.cur_atan, self.line_rsi1[-2], self.line_rsi1[-1],
                                       self.cur_period.pre_mode, self.cur_period.mode))
                 if self.cb_on_period:
@@ -3480,7 +3885,7 @@ class CtaLineBar(object):
                 self.cur_period = CtaPeriod(mode=Period.SHORT, price=bar.close_price, pre_mode=Period.SHORT_EXTREME,
                                             dt=bar.datetime)
                 self.period_list.append(self.cur_period)
-                self.write_log(u'{} 角度下加速放缓，Atan:{},RSI:{}=>{}, ,周期：{}=>{}'.
+                self.write_log(lambda: u'{} 角度下加速放缓，Atan:{},RSI:{}=>{}, ,周期：{}=>{}'.
                                format(bar.datetime, self.cur_atan, self.line_rsi1[-2], self.line_rsi1[-1],
                                       self.cur_period.pre_mode, self.cur_period.mode))
                 if self.cb_on_period:
@@ -3488,7 +3893,7 @@ class CtaLineBar(object):
 
             # 保持空极端趋势
             else:
-                self.write_log(u'{} 角度向下加速,Atan:{},周期维持:{}'.
+                self.write_log(lambda: u'{} 角度向下加速,Atan:{},周期维持:{}'.
                                format(bar.datetime, self.cur_atan, self.cur_period.mode))
 
             return
@@ -3957,7 +4362,7 @@ class CtaLineBar(object):
             return
 
         if self.para_yb_ref < 1:
-            self.write_log(u'参数 self.inputYbRef:{}不能低于1'.format(self.para_yb_ref))
+            self.write_log(lambda: u'参数 self.inputYbRef:{}不能低于1'.format(self.para_yb_ref))
             return
 
         # 1、lineBar满足长度才执行计算
@@ -3968,7 +4373,7 @@ class CtaLineBar(object):
 
         ema_len = min(self.bar_len - 1, self.para_yb_len)
         if ema_len < 3:
-            self.write_log(u'数据未充分,当前Bar数据数量：{0}'.
+            self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}'.
                            format(len(self.line_bar)))
             return
         # 3、获取前InputN周期(不包含当前周期）的K线
@@ -3998,12 +4403,12 @@ class CtaLineBar(object):
         if self.para_yb_len < 1:
             return
         if self.para_yb_ref < 1:
-            self.write_log(u'参数 self.inputYbRef:{}不能低于1'.format(self.para_yb_ref))
+            self.write_log(lambda: u'参数 self.inputYbRef:{}不能低于1'.format(self.para_yb_ref))
             return
 
         ema_len = min(len(self.line_bar), self.para_yb_len)
         if ema_len < 3:
-            self.write_log(u'数据未充分,当前Bar数据数量：{0}'.
+            self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}'.
                            format(len(self.line_bar)))
             return
         # 3、获取前InputN周期(包含当前周期）的K线
@@ -4018,35 +4423,65 @@ class CtaLineBar(object):
             return self.line_yb[-1]
         return self._rt_yb
 
+    def __count_golden_section_pending(self):
+        """bar完结时，只记录黄金分割的观测bar数量，读取cur_p192等属性时才计算"""
+        if self.bar_len < 2:
+            return
+        self.golden_pending_len = min(self.para_golden_n, self.bar_len - 1)
+
     def __count_golden_section(self):
         """
         重新计算黄金分割线
         :return:
         """
-        if self.para_golden_n < 0:
-            return
-        if self.bar_len < 2:
+        bar_len = self.golden_pending_len
+        if bar_len is None:
             return
-        bar_len = min(self.para_golden_n, self.bar_len - 1)
+        self.golden_pending_len = None
 
-        hhv = max(self.high_array[-bar_len:])
-        llv = min(self.low_array[-bar_len:])
+        hhv = self.high_array[-bar_len:].max()
+        llv = self.low_array[-bar_len:].min()
 
         if np.isnan(hhv) or np.isnan(llv):
             return
 
-        self.cur_p192 = hhv - (hhv - llv) * 0.192
-        self.cur_p382 = hhv - (hhv - llv) * 0.382
-        self.cur_p500 = (hhv + llv) / 2
-        self.cur_p618 = hhv - (hhv - llv) * 0.618
-        self.cur_p809 = hhv - (hhv - llv) * 0.809
-
         # 根据最小跳动取整
-        self.cur_p192 = round_to(self.cur_p192, self.price_tick)
-        self.cur_p382 = round_to(self.cur_p382, self.price_tick)
-        self.cur_p500 = round_to(self.cur_p500, self.price_tick)
-        self.cur_p618 = round_to(self.cur_p618, self.price_tick)
-        self.cur_p809 = round_to(self.cur_p809, self.price_tick)
+        self.golden_section = (
+            round_to(hhv - (hhv - llv) * 0.192, self.price_tick),
+            round_to(hhv - (hhv - llv) * 0.382, self.price_tick),
+            round_to((hhv + llv) / 2, self.price_tick),
+            round_to(hhv - (hhv - llv) * 0.618, self.price_tick),
+            round_to(hhv - (hhv - llv) * 0.809, self.price_tick))
+
+    @property
+    def cur_p192(self):
+        """HH-(HH-LL) * 0.192"""
+        self.__count_golden_section()
+        return self.golden_section[0]
+
+    @property
+    def cur_p382(self):
+        """HH-(HH-LL) * 0.382"""
+        self.__count_golden_section()
+        return self.golden_section[1]
+
+    @property
+    def cur_p500(self):
+        """(HH+LL)/2"""
+        self.__count_golden_section()
+        return self.golden_section[2]
+
+    @property
+    def cur_p618(self):
+        """HH-(HH-LL) * 0.618"""
+        self.__count_golden_section()
+        return self.golden_section[3]
+
+    @property
+    def cur_p809(self):
+        """HH-(HH-LL) * 0.809"""
+        self.__count_golden_section()
+        return self.golden_section[4]
 
     def __count_area(self, bar):
         """计算布林和MA的区域"""
@@ -4113,7 +4548,7 @@ class CtaLineBar(object):
 
         if self.para_bias_len > 0:
             if self.bar_len < min(6, self.para_bias_len) + 1:
-                self.write_log(u'数据未充分,当前Bar数据数量：{0}，计算Bias需要：{1}'.
+                self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}，计算Bias需要：{1}'.
                                format(len(self.line_bar), min(14, self.para_bias_len) + 1))
             else:
 
@@ -4130,7 +4565,7 @@ class CtaLineBar(object):
 
         if self.para_bias2_len > 0:
             if self.bar_len < min(6, self.para_bias2_len) + 1:
-                self.write_log(u'数据未充分,当前Bar数据数量：{0}，计算Bias2需要：{1}'.
+                self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}，计算Bias2需要：{1}'.
                                format(len(self.line_bar), min(14, self.para_bias2_len) + 1))
             else:
                 Bias2Len = min(self.bar_len - 1, self.para_bias2_len)
@@ -4144,7 +4579,7 @@ class CtaLineBar(object):
 
         if self.para_bias3_len > 0:
             if self.bar_len < min(6, self.para_bias3_len) + 1:
-                self.write_log(u'数据未充分,当前Bar数据数量：{0}，计算Bias3需要：{1}'.
+                self.write_log(lambda: u'数据未充分,当前Bar数据数量：{0}，计算Bias3需要：{1}'.
                                format(len(self.line_bar), min(14, self.para_bias3_len) + 1))
             else:
                 Bias3Len = min(self.bar_len - 1, self.para_bias3_len)
@@ -4344,8 +4779,14 @@ class CtaLineBar(object):
             self.cur_skdj_d = D[-1]
 
     def write_log(self, content):
-        """记录CTA日志"""
-        self.strategy.write_log(u'[' + self.name + u']' + content)
+        """
+        记录CTA日志
+        :param content: 日志内容，或生成日志内容的函数（策略的日志级别启用时才调用）
+        """
+        is_log_enabled = getattr(self.strategy, 'is_log_enabled', None)
+        if is_log_enabled and not is_log_enabled(INFO):
+            return
+        self.strategy.write_log(u'[' + self.name + u']' + format_log(content))
 
 
     def append_data(self, file_name, dict_data, field_names=None):
@@ -4366,10 +4807,10 @@ class CtaLineBar(object):
             return
         try:
             if not os.path.exists(file_name):
-                self.write_log(u'create csv file:{}'.format(file_name))
+                self.write_log(lambda: u'create csv file:{}'.format(file_name))
                 with open(file_name, 'a', encoding='utf8', newline='') as csvWriteFile:
                     writer = csv.DictWriter(f=csvWriteFile, fieldnames=dict_fieldnames, dialect='excel')
-                    self.write_log(u'write csv header:{}'.format(dict_fieldnames))
+                    self.write_log(lambda: u'write csv header:{}'.format(dict_fieldnames))
                     writer.writeheader()
                     writer.writerow(dict_data)
             else:
@@ -4426,7 +4867,7 @@ class CtaLineBar(object):
         :return:
         """
         if close <= 0 or high <= low or shadow_rate <= 0 or wave_rate <= 0:
-            self.write_log(u'是否上下影线,参数出错.close={}, high={},low={},shadow_rate={},wave_rate={}'
+            self.write_log(lambda: u'是否上下影线,参数出错.close={}, high={},low={},shadow_rate={},wave_rate={}'
                            .format(close, high, low, shadow_rate, wave_rate))
             return False
 
@@ -4872,11 +5313,13 @@ class CtaMinuteBar(CtaLineBar):
     def __setstate__(self, state):
         """Pickle load()"""
         self.__dict__.update(state)
+        self.restore_buffers()
 
     def restore(self, state):
         """从Pickle中恢复数据"""
         for key in state.__dict__.keys():
             self.__dict__[key] = state.__dict__[key]
+        self.restore_buffers()
 
     def init_properties(self):
         """
@@ -4969,7 +5412,7 @@ class CtaMinuteBar(CtaLineBar):
             is_new_bar = True
 
         if is_new_bar:
-            new_bar = copy.deepcopy(bar)
+            new_bar = bar.copy()
             # 添加新的bar
             self.line_bar.append(new_bar)
             # 将上一个Bar推送至OnBar事件
@@ -4986,6 +5429,59 @@ class CtaMinuteBar(CtaLineBar):
             # 实时计算
             self.rt_executed = False
 
+    def count_new_bar_flags(self, data: dict, bar_is_completed: bool, bar_freq: int):
+        """
+        批量计算每根bar是否开启新的K线（判断逻辑与add_bar一致）
+        :param data: bars_to_arrays 生成的数组
+        :return: numpy bool数组
+        """
+        count = len(data['close'])
+        dts = data['datetime']
+        trading_days = data['trading_day']
+        for i in range(count):
+            if trading_days[i] is None:
+                if self.is_7x24:
+                    trading_days[i] = dts[i].strftime('%Y-%m-%d')
+                else:
+                    trading_days[i] = get_trading_date(dts[i])
+                if data['bar'][i] is not None:
+                    data['bar'][i].trading_day = trading_days[i]
+
+        # 当日已过去的分钟数，扣除中场休息
+        minutes_passed = self.get_day_seconds(dts) / 60
+        hhmm = (minutes_passed // 60) * 100 + minutes_passed % 60 // 1
+        if self.underly_symbol in MARKET_ZJ:
+            minutes_passed = np.where((hhmm > 1130) & (hhmm < 1600), minutes_passed - 90, minutes_passed)
+        elif not self.is_7x24:
+            minutes_passed = np.where((hhmm > 1015) & (hhmm <= 1130), minutes_passed - 15, minutes_passed)
+            minutes_passed = np.where((hhmm > 1130) & (hhmm < 1600), minutes_passed - 135, minutes_passed)
+        bars_passed = np.trunc(minutes_passed / self.bar_interval).astype(int)
+        data['bars_passed'] = bars_passed
+
+        # 逐根add_bar后，cur_trading_day、bars_count即为该bar的交易日、当日bar序号，因此只需与前一根bar比较
+        pre_bars_passed = np.concatenate([[self.bars_count], bars_passed[:-1]])
+        pre_trading_days = [self.cur_trading_day] + trading_days[:-1]
+        flags = np.full(count, bar_is_completed, dtype=bool)
+        flags |= bars_passed != pre_bars_passed
+        flags |= np.array([a != b for a, b in zip(trading_days, pre_trading_days)], dtype=bool)
+
+        # 数字货币，如果bar的前后距离，超过周期，重新开启一个新的bar
+        if self.is_7x24:
+            group_dt = self.line_bar[-1].datetime
+            for i, dt in enumerate(dts):
+                if flags[i] or (dt - group_dt).total_seconds() >= 60 * self.bar_interval:
+                    flags[i] = True
+                    group_dt = dt
+
+        return flags
+
+    def update_array_state(self, data: dict, index: int, bar_freq: int):
+        """更新add_bar维护的最新价格、时间、交易日、当日bar序号（第index根bar加入后）"""
+        self.cur_price = float(data['close'][index])
+        self.cur_datetime = data['datetime'][index]
+        self.cur_trading_day = data['trading_day'][index]
+        self.bars_count = int(data['bars_passed'][index])
+
     def generate_bar(self, tick):
         """
         生成 line Bar
@@ -5128,11 +5624,13 @@ class CtaHourBar(CtaLineBar):
     def __setstate__(self, state):
         """Pickle load()"""
         self.__dict__.update(state)
+        self.restore_buffers()
 
     def restore(self, state):
         """从Pickle中恢复数据"""
         for key in state.__dict__.keys():
             self.__dict__[key] = state.__dict__[key]
+        self.restore_buffers()
 
     def init_properties(self):
         """
@@ -5220,6 +5718,10 @@ class CtaHourBar(CtaLineBar):
             # 实时计算
             self.rt_executed = False
 
+    def count_new_bar_flags(self, data: dict, bar_is_completed: bool, bar_freq: int):
+        """K线合成依赖逐根累计的状态，不支持批量计算，add_bars逐根调用add_bar"""
+        return None
+
     def generate_bar(self, tick):
         """
         生成 line Bar
@@ -5365,11 +5867,13 @@ class CtaDayBar(CtaLineBar):
     def __setstate__(self, state):
         """Pickle load()"""
         self.__dict__.update(state)
+        self.restore_buffers()
 
     def restore(self, state):
         """从Pickle中恢复数据"""
         for key in state.__dict__.keys():
             self.__dict__[key] = state.__dict__[key]
+        self.restore_buffers()
 
     def init_properties(self):
         """
@@ -5401,7 +5905,7 @@ class CtaDayBar(CtaLineBar):
         bar_len = len(self.line_bar)
 
         if bar_len == 0:
-            new_bar = copy.deepcopy(bar)
+            new_bar = bar.copy()
             self.line_bar.append(new_bar)
             self.cur_trading_day = bar.trading_day if bar.trading_day is not None else bar.date
             if bar_is_completed:
@@ -5428,7 +5932,7 @@ class CtaDayBar(CtaLineBar):
 
         if is_new_bar:
             # 添加新的bar
-            new_bar = copy.deepcopy(bar)
+            new_bar = bar.copy()
             self.line_bar.append(new_bar)
             # 将上一个Bar推送至OnBar事件
             self.on_bar(lastBar)
@@ -5444,6 +5948,10 @@ class CtaDayBar(CtaLineBar):
             # 实时计算
             self.rt_executed = False
 
+    def count_new_bar_flags(self, data: dict, bar_is_completed: bool, bar_freq: int):
+        """K线合成依赖逐根累计的状态，不支持批量计算，add_bars逐根调用add_bar"""
+        return None
+
     def generate_bar(self, tick):
         """
         生成 line Bar
@@ -5565,11 +6073,13 @@ class CtaWeekBar(CtaLineBar):
     def __setstate__(self, state):
         """Pickle load()"""
         self.__dict__.update(state)
+        self.restore_buffers()
 
     def restore(self, state):
         """从Pickle中恢复数据"""
         for key in state.__dict__.keys():
             self.__dict__[key] = state.__dict__[key]
+        self.restore_buffers()
 
     def init_properties(self):
         """
@@ -5606,9 +6116,9 @@ class CtaWeekBar(CtaLineBar):
         bar_len = len(self.line_bar)
 
         if bar_len == 0:
-            new_bar = copy.deepcopy(bar)
+            new_bar = bar.copy()
             new_bar.datetime = self.get_bar_start_dt(bar.datetime)
-            self.write_log(u'周线开始时间:{}=>{}'.format(bar.datetime, new_bar.datetime))
+            self.write_log(lambda: u'周线开始时间:{}=>{}'.format(bar.datetime, new_bar.datetime))
             self.line_bar.append(new_bar)
             self.cur_trading_day = bar.trading_day
             if bar_is_completed:
@@ -5630,9 +6140,9 @@ class CtaWeekBar(CtaLineBar):
 
         if is_new_bar:
             # 添加新的bar
-            new_bar = copy.deepcopy(bar)
+            new_bar = bar.copy()
             new_bar.datetime = self.get_bar_start_dt(bar.datetime)
-            self.write_log(u'新周线开始时间:{}=>{}'.format(bar.datetime, new_bar.datetime))
+            self.write_log(lambda: u'新周线开始时间:{}=>{}'.format(bar.datetime, new_bar.datetime))
             self.line_bar.append(new_bar)
             # 将上一个Bar推送至OnBar事件
             self.on_bar(lastBar)
@@ -5676,6 +6186,10 @@ class CtaWeekBar(CtaLineBar):
                                                 '%Y-%m-%d %H:%M:%S')
             return friday_night_dt
 
+    def count_new_bar_flags(self, data: dict, bar_is_completed: bool, bar_freq: int):
+        """K线合成依赖逐根累计的状态，不支持批量计算，add_bars逐根调用add_bar"""
+        return None
+
     def generate_bar(self, tick):
         """
         生成 line Bar
@@ -0,0 +1,83 @@
+# encoding: UTF-8
+
+# 回测日志
+# - 日志级别：回测引擎记录生效的日志级别，未启用的级别在格式化日志内容之前返回
+#   write_log 可传入生成日志内容的函数，如 write_log(lambda: f'委托单:{order.__dict__}')，只在级别启用时才调用
+# - 静默模式(silent)：参数优化时不输出日志（write_error 除外），不打印回测过程
+# - 成交流水(TradeJournal)：成交记录写入jsonl文件，文件保持打开，替代逐笔打开、追加csv文件
+# cta_strategy_pro/cta_crypto/cta_stock 的回测引擎、策略模板、CtaLineBar 共用
+
+import json
+import logging
+from datetime import date, datetime
+from enum import Enum
+
+LOG_SILENT = logging.CRITICAL + 10  # 高于所有日志级别，不输出日志
+
+LOG_LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+    'critical': logging.CRITICAL,
+    'silent': LOG_SILENT
+}
+
+# 成交记录方式
+JOURNAL_CSV = 'csv'  # 逐笔追加 {策略}_trade.csv（缺省）
+JOURNAL_JSONL = 'jsonl'  # 写入 {策略}_trade.jsonl 流水
+
+
+def get_log_level(level, default: int = logging.DEBUG):
+    """日志级别: 数值，或名称 debug/info/warning/error/critical/silent"""
+    if level is None:
+        return default
+    if isinstance(level, str):
+        return LOG_LEVELS.get(level.lower(), default)
+    return int(level)
+
+
+def format_log(msg):
+    """日志内容，函数则调用生成"""
+    return msg() if callable(msg) else msg
+
+
+def to_record(obj, fields: list = None):
+    """
+    对象 => 可json序列化的dict
+    枚举取值，日期时间转为字符串
+    :param fields: 字段清单，缺省为对象的所有属性
+    """
+    data = obj if isinstance(obj, dict) else obj.__dict__
+    record = {}
+    for name in fields or list(data.keys()):
+        value = data.get(name, '')
+        if isinstance(value, Enum):
+            value = value.value
+        elif isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        elif not isinstance(value, (str, int, float, bool, type(None))):
+            value = str(value)
+        record[name] = value
+    return record
+
+
+class TradeJournal(object):
+    """
+    成交流水，每行一条json记录
+    文件在第一次写入时以追加方式打开，回测结束时关闭
+    """
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.file = None
+
+    def write(self, record: dict):
+        if self.file is None:
+            self.file = open(self.file_name, 'a', encoding='utf8')
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
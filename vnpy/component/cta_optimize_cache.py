@@ -0,0 +1,118 @@
+# encoding: UTF-8
+
+# 参数优化结果缓存（SQLite）
+# - 指纹：策略类（模块源码hash） + 回测数据范围 + 引擎参数，任一变化即视为不同的优化
+# - 同一指纹下按参数组合保存统计结果，每个结果计算完成即提交，中断后重跑只计算未完成的组合
+# - 扩展参数范围后重跑，已计算过的组合直接读取
+# cta_strategy 回测引擎的穷举优化、遗传算法优化共用
+
+import hashlib
+import inspect
+import json
+import sqlite3
+from datetime import date, datetime
+from enum import Enum
+from threading import Lock
+
+
+def to_json_value(value):
+    """json.dumps 的default：numpy数值、枚举、日期转换为基础类型"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    if callable(value):
+        return f'{value.__module__}.{value.__qualname__}'
+    return str(value)
+
+
+def dumps(value):
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=to_json_value)
+
+
+def get_strategy_hash(strategy_class: type):
+    """策略类所在模块源码的hash，源码修改后缓存失效"""
+    try:
+        source = inspect.getsource(inspect.getmodule(strategy_class))
+    except (OSError, TypeError):
+        source = ''
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+
+def get_fingerprint(strategy_class: type, parameters: dict):
+    """
+    优化指纹
+    :param strategy_class: 策略类
+    :param parameters: 回测引擎参数（合约、周期、开始/结束时间、手续费、滑点、合约乘数等）
+    """
+    content = dumps({
+        'strategy': f'{strategy_class.__module__}.{strategy_class.__qualname__}',
+        'source': get_strategy_hash(strategy_class),
+        'parameters': parameters
+    })
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+class OptimizationCache(object):
+    """
+    参数优化结果缓存
+    cache.get(fingerprint, setting) => statistics/None
+    cache.set(fingerprint, setting, statistics)
+    进程池回调线程写入，连接不限线程，由锁保护
+    """
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.lock = Lock()
+        self.conn = sqlite3.connect(file_name, check_same_thread=False)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS optimization_result ('
+            'fingerprint TEXT NOT NULL, '
+            'setting TEXT NOT NULL, '
+            'statistics TEXT NOT NULL, '
+            'update_time TEXT NOT NULL, '
+            'PRIMARY KEY (fingerprint, setting))'
+        )
+        self.conn.commit()
+
+    def get(self, fingerprint: str, setting: dict):
+        """读取参数组合的统计结果，不存在返回None"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT statistics FROM optimization_result WHERE fingerprint=? AND setting=?',
+                (fingerprint, dumps(setting))
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def set(self, fingerprint: str, setting: dict, statistics: dict):
+        """保存参数组合的统计结果，立即提交"""
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO optimization_result VALUES (?, ?, ?, ?)',
+                (fingerprint, dumps(setting), dumps(statistics), datetime.now().isoformat())
+            )
+            self.conn.commit()
+
+    def count(self, fingerprint: str):
+        """指纹下已缓存的参数组合数量"""
+        with self.lock:
+            return self.conn.execute(
+                'SELECT COUNT(*) FROM optimization_result WHERE fingerprint=?', (fingerprint,)
+            ).fetchone()[0]
+
+    def clear(self, fingerprint: str = None):
+        """清除指纹下（缺省全部）的缓存"""
+        with self.lock:
+            if fingerprint:
+                self.conn.execute('DELETE FROM optimization_result WHERE fingerprint=?', (fingerprint,))
+            else:
+                self.conn.execute('DELETE FROM optimization_result')
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,233 @@
+# encoding: UTF-8
+
+# 按合约、价格索引的委托簿
+# 仍然是 {委托编号: 委托} 的字典（插入顺序），同时按合约、多空方向维护价格索引，
+# 撮合/触发时只取出价格被穿越的委托，不再遍历所有合约的全部委托。
+# - BacktestOrderBook: 回测引擎的 active_limit_orders / active_stop_orders，价格有序列表
+# - StopOrderBook: 实盘CtaEngine的本地停止单 stop_orders，价格堆
+# cta_strategy_pro/cta_crypto/cta_stock 共用
+
+from bisect import bisect_left, bisect_right, insort
+from heapq import heapify, heappop, heappush
+from itertools import count
+
+from vnpy.trader.constant import Direction
+
+INF = float('inf')
+
+
+class BacktestOrderBook(dict):
+    """
+    回测委托簿
+    委托需有 vt_symbol, direction, price 属性（OrderData/StopOrder）
+    字典的增删（[]=, del, pop, popitem, clear, update, setdefault）自动维护索引
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.seq = count()
+        self.order_keys = {}  # 委托编号 => 索引项 (price, seq, 委托编号)
+        self.books = {}  # vt_symbol => {Direction: [索引项], 按价格、委托先后排序}
+        self.update(*args, **kwargs)
+
+    def __add_index(self, key, order):
+        side = self.books.setdefault(order.vt_symbol, {}).setdefault(order.direction, [])
+        item = (order.price, next(self.seq), key)
+        insort(side, item)
+        self.order_keys[key] = (order.vt_symbol, order.direction, item)
+
+    def __remove_index(self, key):
+        vt_symbol, direction, item = self.order_keys.pop(key)
+        side = self.books[vt_symbol][direction]
+        index = bisect_left(side, item)
+        if index < len(side) and side[index] == item:
+            del side[index]
+
+    def __setitem__(self, key, order):
+        if key in self.order_keys:
+            self.__remove_index(key)
+        super().__setitem__(key, order)
+        self.__add_index(key, order)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.__remove_index(key)
+
+    def pop(self, key, *args):
+        if key in self.order_keys:
+            self.__remove_index(key)
+        return super().pop(key, *args)
+
+    def popitem(self):
+        key, order = super().popitem()
+        self.__remove_index(key)
+        return key, order
+
+    def clear(self):
+        super().clear()
+        self.order_keys.clear()
+        self.books.clear()
+
+    def update(self, *args, **kwargs):
+        for key, order in dict(*args, **kwargs).items():
+            self[key] = order
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def copy(self):
+        return BacktestOrderBook(self)
+
+    def __reduce__(self):
+        # pickle/deepcopy时，按字典内容重建索引
+        return self.__class__, (dict(self),)
+
+    @staticmethod
+    def __get_range(side: list, low: float = None, high: float = None):
+        """价格在 [low, high] 之间的索引项"""
+        start = 0 if low is None else bisect_left(side, (low,))
+        end = len(side) if high is None else bisect_right(side, (high, INF))
+        return side[start:end]
+
+    def get_orders(self, vt_symbol: str, direction: Direction, low: float = None, high: float = None):
+        """某合约某方向，价格在 [low, high] 之间的委托编号（价格、委托先后排序）"""
+        side = self.books.get(vt_symbol, {}).get(direction)
+        if not side:
+            return []
+        return [item[2] for item in self.__get_range(side, low, high)]
+
+    def get_crossed(self,
+                    vt_symbol: str,
+                    long_low: float = None,
+                    long_high: float = None,
+                    short_low: float = None,
+                    short_high: float = None):
+        """
+        价格被穿越的委托编号，按委托先后排序（与遍历字典的撮合顺序一致）
+        限价单: 买单价格 >= 买入穿越价(long_low)，卖单价格 <= 卖出穿越价(short_high)
+        停止单: 买单价格 <= 买入触发价(long_high)，卖单价格 >= 卖出触发价(short_low)
+        """
+        side_books = self.books.get(vt_symbol)
+        if not side_books:
+            return []
+        items = []
+        for direction, low, high in [(Direction.LONG, long_low, long_high),
+                                     (Direction.SHORT, short_low, short_high)]:
+            side = side_books.get(direction)
+            if side:
+                items.extend(self.__get_range(side, low, high))
+        if len(items) > 1:
+            items.sort(key=lambda item: item[1])
+        return [item[2] for item in items]
+
+
+class StopOrderBook(dict):
+    """
+    实盘本地停止单簿（CtaEngine.stop_orders）
+    仍然是 {停止单编号: 停止单} 的字典，同时每个合约维护两个堆：
+    - 买入停止单：最新价 >= 价格时触发，按价格的最小堆
+    - 卖出停止单：最新价 <= 价格时触发，按价格的最大堆
+    每个tick只需比较两个堆顶的价格；删除时只从字典移除，堆中的失效项在到达堆顶时丢弃
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.seq = count()
+        self.order_seqs = {}  # 停止单编号 => (vt_symbol, seq)
+        self.live_counts = {}  # vt_symbol => 有效停止单数量
+        self.heaps = {}  # vt_symbol => {Direction: [(堆排序价格, seq, 停止单编号)]}
+        self.update(*args, **kwargs)
+
+    def __add_index(self, key, order):
+        if order.direction not in (Direction.LONG, Direction.SHORT):
+            return
+        seq = next(self.seq)
+        self.order_seqs[key] = (order.vt_symbol, seq)
+        self.live_counts[order.vt_symbol] = self.live_counts.get(order.vt_symbol, 0) + 1
+        heaps = self.heaps.setdefault(order.vt_symbol, {Direction.LONG: [], Direction.SHORT: []})
+        # 卖出停止单使用负价格，转为最大堆
+        price = order.price if order.direction == Direction.LONG else -order.price
+        heappush(heaps[order.direction], (price, seq, key))
+
+    def __remove_index(self, key):
+        if key not in self.order_seqs:
+            return
+        vt_symbol, _ = self.order_seqs.pop(key)
+        self.live_counts[vt_symbol] -= 1
+
+        # 失效项过多时，重建堆
+        heaps = self.heaps[vt_symbol]
+        if len(heaps[Direction.LONG]) + len(heaps[Direction.SHORT]) > 2 * self.live_counts[vt_symbol] + 64:
+            for heap in heaps.values():
+                heap[:] = [item for item in heap if self.__is_live(item)]
+                heapify(heap)
+
+    def __is_live(self, item):
+        return self.order_seqs.get(item[2], (None, None))[1] == item[1]
+
+    def __setitem__(self, key, order):
+        self.__remove_index(key)
+        super().__setitem__(key, order)
+        self.__add_index(key, order)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.__remove_index(key)
+
+    def pop(self, key, *args):
+        self.__remove_index(key)
+        return super().pop(key, *args)
+
+    def popitem(self):
+        key, order = super().popitem()
+        self.__remove_index(key)
+        return key, order
+
+    def clear(self):
+        super().clear()
+        self.order_seqs.clear()
+        self.live_counts.clear()
+        self.heaps.clear()
+
+    def update(self, *args, **kwargs):
+        for key, order in dict(*args, **kwargs).items():
+            self[key] = order
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def copy(self):
+        return StopOrderBook(self)
+
+    def __reduce__(self):
+        return self.__class__, (dict(self),)
+
+    def get_triggered(self, vt_symbol: str, last_price: float):
+        """
+        最新价触发的停止单编号，按委托先后排序（与遍历字典的顺序一致）
+        触发的停止单仍保留在簿中，由调用方在发单成功后移除
+        """
+        heaps = self.heaps.get(vt_symbol)
+        if not heaps:
+            return []
+
+        items = []
+        for direction, heap in heaps.items():
+            # 买入: 价格 <= 最新价；卖出: -价格 <= -最新价
+            limit = last_price if direction == Direction.LONG else -last_price
+            triggered = []
+            while heap and heap[0][0] <= limit:
+                item = heappop(heap)
+                if self.__is_live(item):
+                    triggered.append(item)
+            for item in triggered:
+                heappush(heap, item)
+            items.extend(triggered)
+
+        if len(items) > 1:
+            items.sort(key=lambda item: item[1])
+        return [item[2] for item in items]
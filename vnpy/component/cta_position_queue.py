@@ -0,0 +1,68 @@
+# encoding: UTF-8
+
+# 回测引擎的持仓队列（未平仓的开仓成交单）
+# 替代 long_position_list / short_position_list 的list：
+# - 平仓时不再遍历所有持仓查找同一策略、同一合约的开仓单，按 (策略, 合约) 的队列O(1)取出最早的开仓单
+# - 遍历顺序与原来的list一致：开仓、部分平仓后剩余的开仓单，都放到末尾
+# cta_strategy_pro/cta_crypto/cta_stock 的回测引擎共用
+
+from collections import deque
+from itertools import count
+
+
+class PositionQueue(object):
+    """
+    持仓队列
+    append(trade): 放入开仓单（需有 strategy_name, vt_symbol 属性）
+    popleft(strategy_name, vt_symbol): 取出该策略、该合约最早的开仓单
+    for trade in queue: 按放入顺序遍历所有开仓单
+    """
+
+    def __init__(self, trades: list = None):
+        self.seq = count()
+        self.trades = {}  # seq => 开仓单，字典的插入顺序即遍历顺序
+        self.queues = {}  # (strategy_name, vt_symbol) => deque([seq])
+        for trade in trades or []:
+            self.append(trade)
+
+    def __len__(self):
+        return len(self.trades)
+
+    def __iter__(self):
+        return iter(self.trades.values())
+
+    def append(self, trade):
+        """放入开仓单（队列末尾）"""
+        seq = next(self.seq)
+        self.trades[seq] = trade
+        self.queues.setdefault((trade.strategy_name, trade.vt_symbol), deque()).append(seq)
+
+    def popleft(self, strategy_name: str, vt_symbol: str):
+        """
+        取出该策略、该合约最早的开仓单
+        :return: 开仓单，没有时返回None
+        """
+        key = (strategy_name, vt_symbol)
+        queue = self.queues.get(key)
+        if not queue:
+            return None
+        seq = queue.popleft()
+        if not queue:
+            del self.queues[key]
+        return self.trades.pop(seq)
+
+    def get_trades(self, strategy_name: str, vt_symbol: str):
+        """该策略、该合约的所有开仓单（先后顺序）"""
+        return [self.trades[seq] for seq in self.queues.get((strategy_name, vt_symbol), [])]
+
+    def count(self, strategy_name: str, vt_symbol: str):
+        """该策略、该合约的开仓单数量"""
+        return len(self.queues.get((strategy_name, vt_symbol), ()))
+
+    def get_volumes(self, strategy_name: str, vt_symbol: str):
+        """该策略、该合约的开仓单数量清单（先后顺序）"""
+        return [trade.volume for trade in self.get_trades(strategy_name, vt_symbol)]
+
+    def clear(self):
+        self.trades.clear()
+        self.queues.clear()
@@ -0,0 +1,149 @@
+# encoding: UTF-8
+
+# 参数优化剪枝
+# - Pruner: 回测过程中按交易日更新净值曲线，每隔check_days个交易日记录检查点并检查剪枝规则，
+#   触发规则（净值低于下限、回撤超限、交易次数不足、自定义规则）时回测提前终止
+# - 逐级减半(successive halving): 所有参数组合先回测较短的时间窗口，保留排名靠前的 1/eta，
+#   幸存的参数组合再回测更长的窗口，直至完整回测区间
+# cta_strategy 回测引擎、cta_strategy_pro 组合回测引擎的参数优化共用
+
+import math
+from datetime import datetime
+
+
+class Pruner(object):
+    """
+    回测剪枝器
+    setting:
+        check_days: 检查间隔（交易日数），缺省20
+        min_days: 回测满多少个交易日后才开始检查，缺省0
+        min_capital: 净值低于该值时剪枝
+        max_drawdown: 净值回撤（金额）超过该值时剪枝
+        max_drawdown_rate: 净值回撤率（百分比，如30即30%）超过该值时剪枝
+        min_trade_count: 回测满 trade_count_days 个交易日后，成交次数低于该值时剪枝
+        trade_count_days: 检查成交次数的交易日数，缺省60
+        rules: 自定义规则列表，func(checkpoint: dict) 返回剪枝原因，不剪枝返回None/''
+              （多进程优化时须为模块级函数，可被pickle）
+    """
+
+    def __init__(self, setting: dict):
+        self.check_days = setting.get('check_days', 20)
+        self.min_days = setting.get('min_days', 0)
+        self.min_capital = setting.get('min_capital', None)
+        self.max_drawdown = setting.get('max_drawdown', None)
+        self.max_drawdown_rate = setting.get('max_drawdown_rate', None)
+        self.min_trade_count = setting.get('min_trade_count', None)
+        self.trade_count_days = setting.get('trade_count_days', 60)
+        self.rules = setting.get('rules', [])
+
+        self.days = 0  # 已回测交易日数
+        self.max_balance = None  # 净值高点
+        self.max_drawdown_seen = 0  # 期间最大回撤（金额）
+        self.max_drawdown_rate_seen = 0  # 期间最大回撤率（百分比）
+        self.checkpoints = []  # 净值曲线检查点
+
+        self.pruned = False
+        self.reason = ''
+        self.prune_date = None
+
+    def on_day(self, d, balance: float, trade_count: int = 0):
+        """
+        交易日结束，更新净值
+        :param d: 交易日
+        :param balance: 当日净值（含持仓盈亏）
+        :param trade_count: 累计成交次数
+        :return: True: 剪枝，回测应终止
+        """
+        if self.pruned:
+            return True
+
+        self.days += 1
+        if self.max_balance is None or balance > self.max_balance:
+            self.max_balance = balance
+        drawdown = self.max_balance - balance
+        drawdown_rate = drawdown * 100 / self.max_balance if self.max_balance > 0 else 0
+        self.max_drawdown_seen = max(self.max_drawdown_seen, drawdown)
+        self.max_drawdown_rate_seen = max(self.max_drawdown_rate_seen, drawdown_rate)
+
+        if self.days % self.check_days != 0:
+            return False
+
+        checkpoint = {
+            'date': d,
+            'days': self.days,
+            'balance': balance,
+            'max_balance': self.max_balance,
+            'drawdown': drawdown,
+            'drawdown_rate': drawdown_rate,
+            'max_drawdown': self.max_drawdown_seen,
+            'max_drawdown_rate': self.max_drawdown_rate_seen,
+            'trade_count': trade_count
+        }
+        self.checkpoints.append(checkpoint)
+
+        if self.days < self.min_days:
+            return False
+
+        reason = self.check(checkpoint)
+        if reason:
+            self.pruned = True
+            self.reason = reason
+            self.prune_date = d
+        return self.pruned
+
+    def check(self, checkpoint: dict):
+        """检查剪枝规则，返回剪枝原因"""
+        if self.min_capital is not None and checkpoint['balance'] < self.min_capital:
+            return f'净值{checkpoint["balance"]:.2f}低于{self.min_capital}'
+
+        if self.max_drawdown is not None and checkpoint['max_drawdown'] > self.max_drawdown:
+            return f'回撤{checkpoint["max_drawdown"]:.2f}超过{self.max_drawdown}'
+
+        if self.max_drawdown_rate is not None and checkpoint['max_drawdown_rate'] > self.max_drawdown_rate:
+            return f'回撤率{checkpoint["max_drawdown_rate"]:.2f}%超过{self.max_drawdown_rate}%'
+
+        if self.min_trade_count is not None and checkpoint['days'] >= self.trade_count_days \
+                and checkpoint['trade_count'] < self.min_trade_count:
+            return f'{checkpoint["days"]}个交易日成交{checkpoint["trade_count"]}次，低于{self.min_trade_count}次'
+
+        for rule in self.rules:
+            reason = rule(checkpoint)
+            if reason:
+                return reason
+
+        return ''
+
+    def get_statistics(self):
+        """剪枝结果，合并到回测统计数据"""
+        return {
+            'pruned': self.pruned,
+            'prune_reason': self.reason,
+            'prune_date': self.prune_date,
+            'prune_days': self.days
+        }
+
+
+def get_halving_ends(start: datetime, end: datetime, rungs: int = 3, eta: int = 3):
+    """
+    逐级减半的各级回测结束时间
+    第i级（从0开始）回测 [start, start + (end - start) / eta ** (rungs - 1 - i)]，最后一级为完整区间
+    """
+    ends = [start + (end - start) / eta ** (rungs - 1 - i) for i in range(rungs - 1)]
+    ends.append(end)
+    return ends
+
+
+def get_survivor_count(count: int, eta: int = 3):
+    """每级保留的参数组合数量"""
+    return max(1, math.ceil(count / eta))
+
+
+def is_pruned(result: tuple):
+    """优化结果(参数, 目标值, 统计数据)是否被剪枝"""
+    return bool(result[2].get('pruned', False))
+
+
+def sort_key(result: tuple):
+    """优化结果排序：未剪枝的在前，再按目标值"""
+    target = result[1]
+    return (not is_pruned(result), target is not None, target if target is not None else 0)
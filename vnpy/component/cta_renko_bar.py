@@ -18,6 +18,7 @@ from vnpy.trader.object import RenkoBarData
 from vnpy.trader.utility import round_to
 from vnpy.trader.constant import Direction, Color
 from vnpy.component.cta_period import CtaPeriod, Period
+from vnpy.component.cta_indicator import RollingWindow, EmaKernel, RsiKernel
 
 
 class CtaRenkoBar(object):
@@ -92,6 +93,8 @@ class CtaRenkoBar(object):
 
         self.param_list.append('para_golden_n')  # 黄金分割
 
+        self.param_list.append('use_talib')  # 使用talib全量计算指标（校验模式）
+
         # 输入参数
 
         self.name = u'RenkoBar'
@@ -147,6 +150,11 @@ class CtaRenkoBar(object):
         self.bar_len = 0
         self.max_hold_bars = 3000
 
+        # 增量指标计算核
+        self.use_talib = False  # True: 每根bar使用talib全量计算指标(校验模式)； False: 使用增量计算核
+        self.kernels = {}  # 名称 => 计算核
+        self.kernel_feeds = None  # [(bar字段, 计算核)]，第一根bar时根据参数创建
+
         # K 线的相关计算结果数据
         self.line_pre_high = []  # K线的前para_pre_len的的最高
         self.line_pre_low = []  # K线的前para_pre_len的的最低
@@ -636,6 +644,9 @@ class CtaRenkoBar(object):
 
         self.mid5_array[:-1] = self.mid5_array[1:]
         self.mid5_array[-1] = bar_mid5
+
+        # 更新增量指标计算核
+        self.update_kernels(bar)
         self.line_bar.append(bar)
         self.bar_len = len(self.line_bar)
 
@@ -676,6 +687,9 @@ class CtaRenkoBar(object):
         self.mid5_array[:-1] = self.mid5_array[1:]
         self.mid5_array[-1] = bar_mid5
 
+        # 更新增量指标计算核
+        self.update_kernels(bar)
+
         # 添加bar=>lineBar
         self.line_bar.append(bar)
 
@@ -727,6 +741,46 @@ class CtaRenkoBar(object):
             self.write_log(u'修改:{}砖块高度:{}=>{}'.format(self.name, self.height, height))
             self.height = height
 
+    def init_kernels(self):
+        """根据已设置的指标参数，创建增量指标计算核"""
+        self.kernels = {}
+        self.kernel_feeds = []
+
+        def add_kernel(key, kernel):
+            """添加收盘价计算核，相同的计算核只创建一个"""
+            if key not in self.kernels:
+                self.kernels[key] = kernel
+                self.kernel_feeds.append((('close_price',), kernel))
+
+        for ma_len in [self.para_ma1_len, self.para_ma2_len, self.para_ma3_len, self.para_boll_len]:
+            if ma_len > 0:
+                add_kernel(f'close_window_{ma_len}', RollingWindow(ma_len))
+
+        for ema_len in [self.para_ema1_len, self.para_ema2_len, self.para_ema3_len]:
+            if ema_len > 0:
+                add_kernel(f'ema_{ema_len}', EmaKernel(ema_len, min(ema_len * 4, ema_len + 40)))
+
+        for rsi_len in [self.para_rsi1_len, self.para_rsi2_len]:
+            if rsi_len > 0:
+                add_kernel(f'rsi_{rsi_len}', RsiKernel(rsi_len))
+
+        # 使用已有的收盘价序列预热（例如从pickle恢复的K线）
+        closes = self.close_array[~np.isnan(self.close_array)].tolist()
+        for _, kernel in self.kernel_feeds:
+            for close_price in closes:
+                kernel.append(close_price)
+
+    def update_kernels(self, bar):
+        """bar完结时，推入各个增量计算核"""
+        if self.use_talib:
+            return
+        if self.kernel_feeds is None:
+            # 首次创建时，已包含当前bar
+            self.init_kernels()
+            return
+        for fields, kernel in self.kernel_feeds:
+            kernel.append(*[getattr(bar, field) for field in fields])
+
     def runtime_recount(self):
         """
         根据实时计算得要求，执行实时指标计算
@@ -1479,7 +1533,10 @@ class CtaRenkoBar(object):
         # 计算第一条MA均线
         if self.para_ma1_len > 0:
             count_len = min(self.para_ma1_len, self.bar_len)
-            bar_ma1 = ta.MA(self.close_array[-count_len:], count_len)[-1]
+            if self.use_talib:
+                bar_ma1 = ta.MA(self.close_array[-count_len:], count_len)[-1]
+            else:
+                bar_ma1 = self.kernels[f'close_window_{self.para_ma1_len}'].mean(count_len)
             bar_ma1 = round(float(bar_ma1), self.round_n)
 
             if len(self.line_ma1) > self.max_hold_bars:
@@ -1497,7 +1554,10 @@ class CtaRenkoBar(object):
         # 计算第二条MA均线
         if self.para_ma2_len > 0:
             count_len = min(self.para_ma2_len, self.bar_len)
-            bar_ma2 = ta.MA(self.close_array[-count_len:], count_len)[-1]
+            if self.use_talib:
+                bar_ma2 = ta.MA(self.close_array[-count_len:], count_len)[-1]
+            else:
+                bar_ma2 = self.kernels[f'close_window_{self.para_ma2_len}'].mean(count_len)
             bar_ma2 = round(float(bar_ma2), self.round_n)
 
             if len(self.line_ma2) > self.max_hold_bars:
@@ -1515,7 +1575,10 @@ class CtaRenkoBar(object):
         # 计算第三条MA均线
         if self.para_ma3_len > 0:
             count_len = min(self.para_ma3_len, self.bar_len)
-            bar_ma3 = ta.MA(self.close_array[-count_len:], count_len)[-1]
+            if self.use_talib:
+                bar_ma3 = ta.MA(self.close_array[-count_len:], count_len)[-1]
+            else:
+                bar_ma3 = self.kernels[f'close_window_{self.para_ma3_len}'].mean(count_len)
             bar_ma3 = round(float(bar_ma3), self.round_n)
 
             if len(self.line_ma3) > self.max_hold_bars:
@@ -1712,7 +1775,10 @@ class CtaRenkoBar(object):
             count_len = min(self.para_ema1_len, self.bar_len)
 
             # 3、获取前InputN周期(不包含当前周期）的K线
-            bar_ema1 = ta.EMA(self.close_array[-ema1_data_len:], count_len)[-1]
+            if self.use_talib:
+                bar_ema1 = ta.EMA(self.close_array[-ema1_data_len:], count_len)[-1]
+            else:
+                bar_ema1 = self.kernels[f'ema_{self.para_ema1_len}'].value
             bar_ema1 = round(float(bar_ema1), self.round_n)
 
             if len(self.line_ema1) > self.max_hold_bars:
@@ -1724,7 +1790,10 @@ class CtaRenkoBar(object):
             count_len = min(self.bar_len, self.para_ema2_len)
 
             # 3、获取前InputN周期(不包含当前周期）的自适应均线
-            bar_ema2 = ta.EMA(self.close_array[-ema2_data_len:], count_len)[-1]
+            if self.use_talib:
+                bar_ema2 = ta.EMA(self.close_array[-ema2_data_len:], count_len)[-1]
+            else:
+                bar_ema2 = self.kernels[f'ema_{self.para_ema2_len}'].value
             bar_ema2 = round(float(bar_ema2), self.round_n)
 
             if len(self.line_ema2) > self.max_hold_bars:
@@ -1736,7 +1805,10 @@ class CtaRenkoBar(object):
             count_len = min(self.bar_len, self.para_ema3_len)
 
             # 3、获取前InputN周期(不包含当前周期）的自适应均线
-            bar_ema3 = ta.EMA(self.close_array[-ema3_data_len:], count_len)[-1]
+            if self.use_talib:
+                bar_ema3 = ta.EMA(self.close_array[-ema3_data_len:], count_len)[-1]
+            else:
+                bar_ema3 = self.kernels[f'ema_{self.para_ema3_len}'].value
             bar_ema3 = round(float(bar_ema3), self.round_n)
 
             if len(self.line_ema3) > self.max_hold_bars:
@@ -1888,7 +1960,10 @@ class CtaRenkoBar(object):
 
         # 计算第1根RSI曲线
         # 3、para_rsi1_len(包含当前周期）的相对强弱
-        bar_rsi = ta.RSI(self.close_array[-2 * self.para_rsi1_len:], self.para_rsi1_len)[-1]
+        if self.use_talib:
+            bar_rsi = ta.RSI(self.close_array[-2 * self.para_rsi1_len:], self.para_rsi1_len)[-1]
+        else:
+            bar_rsi = self.kernels[f'rsi_{self.para_rsi1_len}'].value
         bar_rsi = round(float(bar_rsi), self.round_n)
 
         if len(self.line_rsi1) > self.max_hold_bars:
@@ -1927,7 +2002,10 @@ class CtaRenkoBar(object):
             if self.bar_len < self.para_rsi2_len + 2:
                 return
 
-            bar_rsi = ta.RSI(self.close_array[-2 * self.para_rsi2_len:], self.para_rsi2_len)[-1]
+            if self.use_talib:
+                bar_rsi = ta.RSI(self.close_array[-2 * self.para_rsi2_len:], self.para_rsi2_len)[-1]
+            else:
+                bar_rsi = self.kernels[f'rsi_{self.para_rsi2_len}'].value
             bar_rsi = round(float(bar_rsi), self.round_n)
 
             if len(self.line_rsi2) > self.max_hold_bars:
@@ -1984,9 +2062,18 @@ class CtaRenkoBar(object):
                 bollLen = min(self.bar_len, self.para_boll_len)
 
                 # 不包含当前最新的Bar
-                upper_list, middle_list, lower_list = ta.BBANDS(self.close_array,
-                                                                timeperiod=bollLen, nbdevup=self.para_boll_std_rate,
-                                                                nbdevdn=self.para_boll_std_rate, matype=0)
+                if self.use_talib:
+                    upper_list, middle_list, lower_list = ta.BBANDS(self.close_array,
+                                                                    timeperiod=bollLen,
+                                                                    nbdevup=self.para_boll_std_rate,
+                                                                    nbdevdn=self.para_boll_std_rate, matype=0)
+                else:
+                    window = self.kernels[f'close_window_{self.para_boll_len}']
+                    middle_value = window.mean(bollLen)
+                    std_value = window.std(bollLen)
+                    upper_list = [middle_value + self.para_boll_std_rate * std_value]
+                    middle_list = [middle_value]
+                    lower_list = [middle_value - self.para_boll_std_rate * std_value]
                 if len(self.line_boll_upper) > self.max_hold_bars:
                     del self.line_boll_upper[0]
                 if len(self.line_boll_middle) > self.max_hold_bars:
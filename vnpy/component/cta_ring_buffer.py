@@ -0,0 +1,178 @@
+# encoding: UTF-8
+
+# numpy环形缓冲区
+# 用于K线的开高低收序列、指标序列，替代 arr[:-1] = arr[1:] 平移以及 del list[0]，
+# 使每根bar的更新与历史长度无关。
+
+import numpy as np
+
+
+class RingBuffer(object):
+    """
+    numpy环形缓冲区（浮点数）
+    - append / 删除最早数据 均为O(1)
+    - array属性 返回按时间顺序排列的连续数组视图（无拷贝），可直接传入talib
+    - 兼容list的常用操作：len、下标读写、切片(返回list)、迭代、del x[0]、pop(0)
+    实现：每个数据同时写入 buffer[i] 和 buffer[i + capacity]，任意时刻最近size个数据在buffer中连续
+    """
+
+    def __init__(self, capacity: int, fixed: bool = False, fill: float = None):
+        """
+        :param capacity: 容量
+        :param fixed: True: 容量固定，满后追加数据时丢弃最早的数据；False: 满后自动扩容
+        :param fill: 非None时，以该值填满缓冲区（例如nan，与np.zeros + nan的定长数组一致）
+        """
+        self.capacity = max(int(capacity), 1)
+        self.fixed = fixed
+        self.buffer = np.full(self.capacity * 2, np.nan)
+        self.end = 0  # 下一个写入位置，[0, capacity)
+        self.size = 0  # 当前数据数量
+        if fill is not None:
+            self.buffer[:] = fill
+            self.size = self.capacity
+
+    @classmethod
+    def from_array(cls, data, capacity: int = None, fixed: bool = False):
+        """从list/ndarray创建"""
+        data = np.asarray(data, dtype=float)
+        ring = cls(capacity or max(len(data), 1), fixed=fixed)
+        for value in data[-ring.capacity:]:
+            ring.append(value)
+        return ring
+
+    def append(self, value):
+        """追加数据"""
+        if self.size == self.capacity:
+            if self.fixed:
+                self.size -= 1
+            else:
+                self.__grow()
+        end = self.end
+        self.buffer[end] = value
+        self.buffer[end + self.capacity] = value
+        end += 1
+        self.end = 0 if end == self.capacity else end
+        self.size += 1
+
+    def popleft(self):
+        """删除并返回最早的数据"""
+        if self.size == 0:
+            raise IndexError('pop from empty RingBuffer')
+        value = self[0]
+        self.size -= 1
+        return value
+
+    def pop(self, index: int = -1):
+        """删除并返回数据，仅首尾为O(1)"""
+        if self.size == 0:
+            raise IndexError('pop from empty RingBuffer')
+        index = self.__check_index(index)
+        if index == 0:
+            return self.popleft()
+        value = self[index]
+        if index == self.size - 1:
+            self.size -= 1
+            self.end = (self.end - 1) % self.capacity
+        else:
+            data = self.array.tolist()
+            del data[index]
+            self.__reset(data)
+        return value
+
+    def clear(self):
+        """清空"""
+        self.size = 0
+        self.end = 0
+
+    @property
+    def array(self):
+        """按时间顺序排列的连续数组视图"""
+        start = self.end + self.capacity - self.size
+        return self.buffer[start:start + self.size]
+
+    def __grow(self):
+        """容量翻倍"""
+        data = self.array.copy()
+        self.capacity *= 2
+        self.buffer = np.full(self.capacity * 2, np.nan)
+        self.buffer[:self.size] = data
+        self.buffer[self.capacity:self.capacity + self.size] = data
+        self.end = self.size
+
+    def __reset(self, data):
+        """重建数据"""
+        self.clear()
+        for value in data:
+            self.append(value)
+
+    def __check_index(self, index: int):
+        if index < 0:
+            index += self.size
+        if index < 0 or index >= self.size:
+            raise IndexError('RingBuffer index out of range')
+        return index
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.array[key].tolist()
+        size = self.size
+        if key < 0:
+            key += size
+        if key < 0 or key >= size:
+            raise IndexError('RingBuffer index out of range')
+        return self.buffer.item(self.end + self.capacity - size + key)
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            self.array[key] = value
+            # 保持两份数据一致
+            start = self.end + self.capacity - self.size
+            for i in range(start, start + self.size):
+                self.buffer[i % self.capacity] = self.buffer[i]
+                self.buffer[i % self.capacity + self.capacity] = self.buffer[i]
+            return
+        index = (self.end + self.capacity - self.size + self.__check_index(key)) % self.capacity
+        self.buffer[index] = value
+        self.buffer[index + self.capacity] = value
+
+    def __delitem__(self, key):
+        if isinstance(key, slice):
+            # 删除最早的若干数据，O(1)
+            if key.start in (None, 0) and key.step is None and key.stop is not None and key.stop >= 0:
+                self.size -= min(key.stop, self.size)
+                return
+            data = self.array.tolist()
+            del data[key]
+            self.__reset(data)
+            return
+        if key == 0 and self.size > 0:
+            self.size -= 1
+            return
+        self.pop(key)
+
+    def __iter__(self):
+        return iter(self.array.tolist())
+
+    def __reversed__(self):
+        return reversed(self.array.tolist())
+
+    def __contains__(self, value):
+        return value in self.array.tolist()
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(self.array, dtype=dtype)
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f'RingBuffer({self.array.tolist()})'
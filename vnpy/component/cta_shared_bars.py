@@ -0,0 +1,202 @@
+# encoding: UTF-8
+
+# 共享内存的bar数据（参数优化用）
+# - 主进程加载一次历史bar，按列写入一块共享内存(SharedMemory)
+# - 工作进程按名称挂接，numpy数组直接映射共享内存，不复制、不经过pickle
+# - 工作进程内只生成一次BarData列表，常驻进程的多个参数组合回测共用
+# cta_strategy 回测引擎的参数优化使用
+
+from datetime import datetime, timedelta, timezone
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# 列定义：时间为微秒整数（带时区的为UTC时间，不带时区的为原始时间）
+BAR_DTYPE = np.dtype([
+    ('datetime', 'i8'),
+    ('open_price', 'f8'),
+    ('high_price', 'f8'),
+    ('low_price', 'f8'),
+    ('close_price', 'f8'),
+    ('volume', 'f8'),
+    ('open_interest', 'f8'),
+    ('interval_num', 'i4'),
+    ('trading_day', 'S10')
+])
+
+
+def datetime_to_us(dt: datetime, tz=None):
+    """时间 => 微秒整数"""
+    if tz is None:
+        return (dt - EPOCH) // timedelta(microseconds=1)
+    return (dt - EPOCH_UTC) // timedelta(microseconds=1)
+
+
+def us_to_datetime(us: int, tz=None):
+    """微秒整数 => 时间，带时区的转换回原时区"""
+    if tz is None:
+        return EPOCH + timedelta(microseconds=us)
+    return (EPOCH_UTC + timedelta(microseconds=us)).astimezone(tz)
+
+
+class SharedBarData(object):
+    """
+    共享内存中的单合约bar数据
+    主进程: SharedBarData.from_bars(bars) 创建，用完后 unlink()
+    工作进程: 对象经pickle传入后只携带共享内存名称与元数据，首次访问 array/get_bars() 时挂接
+    """
+
+    def __init__(self, name: str, count: int, symbol: str, exchange: Exchange, interval: Interval,
+                 gateway_name: str = '', tz=None):
+        self.name = name
+        self.count = count
+        self.symbol = symbol
+        self.exchange = exchange
+        self.interval = interval
+        self.gateway_name = gateway_name
+        self.tz = tz
+
+        self.shm = None
+        self._array = None
+        self.owner = False  # 共享内存的创建者负责unlink
+        self.bars = None  # 挂接后生成的BarData列表
+
+    @classmethod
+    def from_bars(cls, bars: list):
+        """把bar列表写入新建的共享内存"""
+        if not bars:
+            raise ValueError('bar数据为空，无法创建共享内存')
+
+        first = bars[0]
+        tz = first.datetime.tzinfo
+        count = len(bars)
+        shm = shared_memory.SharedMemory(create=True, size=BAR_DTYPE.itemsize * count)
+
+        shared = cls(shm.name, count, first.symbol, first.exchange, first.interval,
+                     first.gateway_name, tz)
+        shared.shm = shm
+        shared.owner = True
+
+        array = shared.array
+        array['datetime'] = [datetime_to_us(bar.datetime, tz) for bar in bars]
+        array['open_price'] = [bar.open_price for bar in bars]
+        array['high_price'] = [bar.high_price for bar in bars]
+        array['low_price'] = [bar.low_price for bar in bars]
+        array['close_price'] = [bar.close_price for bar in bars]
+        array['volume'] = [bar.volume for bar in bars]
+        array['open_interest'] = [bar.open_interest for bar in bars]
+        array['interval_num'] = [bar.interval_num for bar in bars]
+        array['trading_day'] = [bar.trading_day.encode() for bar in bars]
+        return shared
+
+    def attach(self):
+        """工作进程挂接共享内存"""
+        if self.shm is not None:
+            return
+        # multiprocessing创建的工作进程与主进程共用resource_tracker，由创建者unlink时注销
+        self.shm = shared_memory.SharedMemory(name=self.name)
+
+    @property
+    def array(self):
+        """共享内存上的结构化数组（不复制）"""
+        if self._array is None:
+            self.attach()
+            self._array = np.ndarray((self.count,), dtype=BAR_DTYPE, buffer=self.shm.buf)
+        return self._array
+
+    def get_bars(self, start: datetime = None, end: datetime = None):
+        """
+        生成BarData列表，只生成一次，后续回测共用
+        :param start: 只返回该时间（含）之后的bar（滚动窗口回测）
+        :param end: 只返回该时间（含）之前的bar（逐级减半优化的较短回测窗口）
+        """
+        if self.bars is None:
+            self.bars = self.create_bars()
+
+        start_index = self.get_index(start, side='left') if start else 0
+        end_index = self.get_index(end, side='right') if end else self.count
+        if start_index <= 0 and end_index >= self.count:
+            return self.bars
+        return self.bars[start_index:end_index]
+
+    def get_index(self, dt: datetime, side: str):
+        """时间在数组中的位置"""
+        # 与bar时间的时区保持一致
+        if self.tz is not None and dt.tzinfo is None:
+            dt = self.tz.localize(dt) if hasattr(self.tz, 'localize') else dt.replace(tzinfo=self.tz)
+        elif self.tz is None and dt.tzinfo is not None:
+            dt = dt.replace(tzinfo=None)
+
+        return int(np.searchsorted(self.array['datetime'], datetime_to_us(dt, self.tz), side=side))
+
+    def create_bars(self):
+        """共享内存 => BarData列表"""
+        array = self.array
+        exchange = self.exchange
+        interval = self.interval
+        symbol = self.symbol
+        gateway_name = self.gateway_name
+        tz = self.tz
+
+        return [
+            BarData(
+                gateway_name=gateway_name,
+                symbol=symbol,
+                exchange=exchange,
+                datetime=us_to_datetime(us, tz),
+                trading_day=trading_day.decode(),
+                interval=interval,
+                interval_num=interval_num,
+                volume=volume,
+                open_interest=open_interest,
+                open_price=open_price,
+                high_price=high_price,
+                low_price=low_price,
+                close_price=close_price
+            )
+            for us, open_price, high_price, low_price, close_price, volume, open_interest, interval_num, trading_day
+            in array.tolist()
+        ]
+
+    def __len__(self):
+        return self.count
+
+    def __getstate__(self):
+        """pickle时只传递共享内存名称与元数据"""
+        return {
+            'name': self.name,
+            'count': self.count,
+            'symbol': self.symbol,
+            'exchange': self.exchange,
+            'interval': self.interval,
+            'gateway_name': self.gateway_name,
+            'tz': self.tz
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def close(self):
+        """断开共享内存映射"""
+        self.bars = None
+        self._array = None
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
+
+    def unlink(self):
+        """创建者释放共享内存"""
+        shm = self.shm
+        self.close()
+        if self.owner:
+            if shm is None:
+                shm = shared_memory.SharedMemory(name=self.name)
+                shm.close()
+            shm.unlink()
+            self.owner = False
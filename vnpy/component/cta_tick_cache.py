@@ -0,0 +1,300 @@
+# encoding: UTF-8
+
+# 列式tick缓存
+# 替代按合约/交易日保存的 bz2压缩 pickle(list[dict]) 缓存文件(.pkz2/.pkb2)：
+# - .npy: numpy结构化数组，np.load(mmap_mode='r') 内存映射读取，无需解压、反序列化
+# - .npc: 按列分块压缩的结构化数组（zlib，或已安装时的lz4/zstd），读取时逐列解压
+# 回测引擎直接读取数组/按列构造DataFrame，不再为每个tick生成dict
+# 转换旧缓存: convert_bz2_cache(文件) / convert_cache_folder(目录)
+
+import os
+import bz2
+import json
+import pickle
+import struct
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+NPY_SUFFIX = '.npy'  # 未压缩，可内存映射
+NPC_SUFFIX = '.npc'  # 按列压缩
+BZ2_SUFFIXES = ['.pkb2', '.pkz2']  # 旧的bz2 pickle缓存
+
+NPC_MAGIC = b'VNTC'
+
+
+def get_codecs():
+    """可用的压缩方式 => (压缩函数, 解压函数)"""
+    codecs = {'zlib': (lambda b: zlib.compress(b, 1), zlib.decompress)}
+    if lz4_frame:
+        codecs['lz4'] = (lz4_frame.compress, lz4_frame.decompress)
+    if zstandard:
+        codecs['zstd'] = (lambda b: zstandard.ZstdCompressor(level=3).compress(b),
+                          lambda b: zstandard.ZstdDecompressor().decompress(b))
+    return codecs
+
+
+def get_field_dtype(name, values):
+    """根据字段的所有值，推断结构化数组的字段类型"""
+    sample = next((v for v in values if v is not None), None)
+    if isinstance(sample, datetime):
+        return 'M8[us]'
+    if isinstance(sample, (bool, np.bool_)):
+        return '?'
+    if isinstance(sample, (int, np.integer)):
+        # 同一字段中混有浮点数时，按浮点数保存
+        if all(isinstance(v, (int, np.integer)) for v in values):
+            return 'i8'
+        return 'f8'
+    if isinstance(sample, (float, np.floating)):
+        return 'f8'
+    # 字符串及其他类型，按定长字符串保存
+    return 'U{}'.format(max([len(str(v)) for v in values] + [1]))
+
+
+def ticks_to_array(tick_list: list):
+    """
+    list[dict] => numpy结构化数组
+    字段取第一个tick的字段，datetime保存为datetime64[us]
+    """
+    if not tick_list:
+        return np.zeros(0, dtype=[('datetime', 'M8[us]')])
+
+    names = list(tick_list[0].keys())
+    columns = {name: [tick.get(name) for tick in tick_list] for name in names}
+    dtype = [(name, get_field_dtype(name, columns[name])) for name in names]
+
+    array = np.zeros(len(tick_list), dtype=dtype)
+    for name, field_dtype in dtype:
+        values = columns[name]
+        if field_dtype.startswith('U'):
+            values = ['' if v is None else str(v) for v in values]
+        elif field_dtype != 'M8[us]':
+            values = [0 if v is None else v for v in values]
+        array[name] = values
+    return array
+
+
+def array_to_ticks(array: np.ndarray):
+    """numpy结构化数组 => list[dict]，兼容原有的缓存读取接口"""
+    names = array.dtype.names
+    columns = []
+    for name in names:
+        if array.dtype[name].kind == 'M':
+            columns.append(pd.DatetimeIndex(array[name]).to_pydatetime().tolist())
+        else:
+            columns.append(array[name].tolist())
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def array_to_df(array: np.ndarray, drop_duplicates: bool = True):
+    """
+    numpy结构化数组 => 以datetime为索引的DataFrame（按列构造）
+    :param drop_duplicates: 是否根据时间去重（保留第一个）
+    """
+    df = pd.DataFrame({name: array[name] for name in array.dtype.names})
+    if drop_duplicates:
+        df.drop_duplicates(subset=['datetime'], keep='first', inplace=True)
+    df.set_index('datetime', inplace=True)
+    return df
+
+
+def save_tick_cache(file_path: str, data, compress: str = None):
+    """
+    保存tick缓存
+    :param file_path: 缓存文件，不含后缀时按压缩方式添加 .npy/.npc
+    :param data: list[dict] 或 numpy结构化数组
+    :param compress: None: 不压缩(.npy)；'zlib'/'lz4'/'zstd': 按列压缩(.npc)
+    :return: 实际保存的文件
+    """
+    array = data if isinstance(data, np.ndarray) else ticks_to_array(data)
+    root, suffix = os.path.splitext(file_path)
+    if suffix not in [NPY_SUFFIX, NPC_SUFFIX]:
+        root = file_path
+    if compress:
+        file_path = root + NPC_SUFFIX
+        save_npc(file_path, array, compress)
+    else:
+        file_path = root + NPY_SUFFIX
+        np.save(file_path, np.ascontiguousarray(array), allow_pickle=False)
+    return file_path
+
+
+def save_npc(file_path: str, array: np.ndarray, compress: str):
+    """
+    按列压缩保存
+    文件格式: magic(4) + 头部长度(4) + 头部json + 各列压缩数据
+    """
+    codecs = get_codecs()
+    if compress not in codecs:
+        raise ValueError(f'不支持的压缩方式:{compress}, 可用:{list(codecs.keys())}')
+    compress_func = codecs[compress][0]
+
+    fields = []
+    blocks = []
+    for name in array.dtype.names:
+        block = compress_func(np.ascontiguousarray(array[name]).tobytes())
+        fields.append([name, array.dtype[name].str, len(block)])
+        blocks.append(block)
+
+    header = json.dumps({'codec': compress, 'count': len(array), 'fields': fields}).encode('utf-8')
+    with open(file_path, 'wb') as f:
+        f.write(NPC_MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for block in blocks:
+            f.write(block)
+
+
+def load_npc(file_path: str, fields: list = None):
+    """
+    读取按列压缩的缓存
+    :param fields: 只解压指定的列，None: 全部列
+    """
+    with open(file_path, 'rb') as f:
+        if f.read(4) != NPC_MAGIC:
+            raise ValueError(f'{file_path}不是列式tick缓存文件')
+        header_len = struct.unpack('<I', f.read(4))[0]
+        header = json.loads(f.read(header_len).decode('utf-8'))
+        decompress_func = get_codecs()[header['codec']][1]
+
+        count = header['count']
+        selected = [field for field in header['fields'] if fields is None or field[0] in fields]
+        array = np.zeros(count, dtype=[(name, dtype_str) for name, dtype_str, _ in selected])
+        for name, dtype_str, nbytes in header['fields']:
+            if fields is not None and name not in fields:
+                f.seek(nbytes, os.SEEK_CUR)
+                continue
+            array[name] = np.frombuffer(decompress_func(f.read(nbytes)), dtype=dtype_str, count=count)
+    return array
+
+
+def load_tick_cache(file_path: str, fields: list = None, mmap: bool = True):
+    """
+    读取tick缓存 => numpy结构化数组
+    .npy 缺省内存映射（只读）；.npc 逐列解压
+    """
+    if file_path.endswith(NPC_SUFFIX):
+        return load_npc(file_path, fields)
+    array = np.load(file_path, mmap_mode='r' if mmap else None, allow_pickle=False)
+    if fields is not None:
+        array = array[[name for name in array.dtype.names if name in fields]]
+    return array
+
+
+def get_cache_file(cache_folder: str, cache_symbol: str, cache_date: str, suffixes: list = None):
+    """
+    查找缓存文件: cache_folder/YYYYMM/{symbol}_{date}{suffix}
+    缺省优先列式缓存，其次旧的bz2缓存
+    """
+    suffixes = suffixes or [NPY_SUFFIX, NPC_SUFFIX] + BZ2_SUFFIXES
+    folder = os.path.join(cache_folder, cache_date[:6])
+    for suffix in suffixes:
+        cache_file = os.path.join(folder, '{}_{}{}'.format(cache_symbol, cache_date, suffix))
+        if os.path.isfile(cache_file):
+            return cache_file
+    return None
+
+
+def load_tick_array(cache_folder: str, cache_symbol: str, cache_date: str, fields: list = None):
+    """
+    加载某合约某交易日的tick => numpy结构化数组
+    优先读取列式缓存，不存在时读取旧的bz2缓存并转换
+    :return: 数组，无缓存时返回None
+    """
+    cache_file = get_cache_file(cache_folder, cache_symbol, cache_date)
+    if cache_file is None:
+        return None
+    if cache_file.endswith(NPY_SUFFIX) or cache_file.endswith(NPC_SUFFIX):
+        return load_tick_cache(cache_file, fields=fields)
+
+    with bz2.BZ2File(cache_file, 'rb') as f:
+        array = ticks_to_array(pickle.load(f))
+    if fields is not None and len(array) > 0:
+        array = array[[name for name in array.dtype.names if name in fields]]
+    return array
+
+
+def convert_bz2_cache(cache_file: str, compress: str = None, remove: bool = False):
+    """
+    转换旧的bz2 pickle缓存文件 => 列式缓存（同目录同名）
+    :param remove: 转换后是否删除旧文件
+    :return: 新的缓存文件，空数据时返回None
+    """
+    with bz2.BZ2File(cache_file, 'rb') as f:
+        tick_list = pickle.load(f)
+    if not tick_list:
+        return None
+    new_file = save_tick_cache(os.path.splitext(cache_file)[0], tick_list, compress=compress)
+    if remove:
+        os.remove(cache_file)
+    return new_file
+
+
+def convert_cache_folder(cache_folder: str, compress: str = None, remove: bool = False, overwrite: bool = False):
+    """
+    转换目录（含子目录）下所有的bz2 pickle tick缓存
+    :param overwrite: 已存在列式缓存时，是否重新转换
+    :return: 转换后的文件清单
+    """
+    new_files = []
+    for root, _, files in os.walk(cache_folder):
+        for file_name in sorted(files):
+            name, suffix = os.path.splitext(file_name)
+            if suffix not in BZ2_SUFFIXES:
+                continue
+            if not overwrite and any(os.path.isfile(os.path.join(root, name + s)) for s in [NPY_SUFFIX, NPC_SUFFIX]):
+                continue
+            new_file = convert_bz2_cache(os.path.join(root, file_name), compress=compress, remove=remove)
+            if new_file:
+                new_files.append(new_file)
+    return new_files
+
+
+def load_day_tick_df(cache_folder: str, vt_symbols: list, test_day: datetime, fields: list = None,
+                     missing: bool = False):
+    """
+    加载多个合约某一天的tick，合并为 (datetime, vt_symbol)索引、按时间排序的DataFrame
+    模块级函数，可在进程池中执行（DayPrefetcher）
+    :param missing: True: 同时返回缺失的缓存文件清单（不含后缀），由调用方输出日志
+    :return: DataFrame，无数据时返回None; missing为True时返回 (DataFrame, 缺失文件清单)
+    """
+    tick_data_dict = {}
+    missing_files = []
+    cache_date = test_day.strftime('%Y%m%d')
+    for vt_symbol in vt_symbols:
+        symbol = vt_symbol.split('.')[0]
+        # 优先读取列式缓存(.npy/.npc)，其次bz2缓存(.pkb2/.pkz2)
+        tick_array = load_tick_array(cache_folder=cache_folder,
+                                     cache_symbol=symbol,
+                                     cache_date=cache_date,
+                                     fields=fields)
+        if tick_array is None:
+            missing_files.append(os.path.join(cache_folder, cache_date[:6], '{}_{}'.format(symbol, cache_date)))
+            continue
+        if len(tick_array) == 0:
+            continue
+
+        # 按列构造，暂时根据时间去重，没有汇总volume
+        tick_data_dict.update({vt_symbol: array_to_df(tick_array)})
+
+    if len(tick_data_dict) == 0:
+        tick_df = None
+    else:
+        tick_df = pd.concat(tick_data_dict, axis=0).swaplevel(0, 1).sort_index()
+
+    if missing:
+        return tick_df, missing_files
+    return tick_df
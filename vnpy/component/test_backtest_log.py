@@ -0,0 +1,87 @@
+# flake8: noqa
+
+# 性能测试 回测日志
+# 模拟回测引擎每笔委托/成交的日志（f'{order.__dict__}'），日志级别为ERROR（非debug回测、参数优化）时，
+# 对比 先格式化再交给logger丢弃(原write_log) 与 级别门控+延迟格式化(write_log(lambda: ...)) 的耗时
+
+import os
+import sys
+import logging
+from datetime import datetime
+from timeit import default_timer as timer
+
+vnpy_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if vnpy_root not in sys.path:
+    print(f'sys.path apppend:{vnpy_root}')
+    sys.path.append(vnpy_root)
+
+os.environ["VNPY_TESTING"] = "1"
+
+from vnpy.trader.constant import Direction, Exchange, Offset, Status
+from vnpy.trader.object import OrderData, TradeData
+from vnpy.component.cta_log import format_log
+
+ORDER_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+logger = logging.getLogger('test_backtest_log')
+logger.setLevel(logging.ERROR)
+log_level = logging.ERROR
+
+
+def old_write_log(msg, level=logging.DEBUG):
+    logger.log(msg=msg, level=level)
+
+
+def new_write_log(msg, level=logging.DEBUG):
+    if level < log_level:
+        return
+    logger.log(msg=format_log(msg), level=level)
+
+
+def run(write_log, lazy):
+    dt = datetime(2020, 6, 1, 9)
+    for i in range(ORDER_COUNT):
+        order = OrderData(gateway_name='backtesting', symbol='rb2010', exchange=Exchange.SHFE, orderid=str(i),
+                          direction=Direction.LONG, offset=Offset.OPEN, price=3500.0, volume=1,
+                          status=Status.NOTTRADED, time=str(dt))
+        trade = TradeData(gateway_name='backtesting', symbol='rb2010', exchange=Exchange.SHFE, orderid=str(i),
+                          tradeid=str(i), direction=Direction.LONG, offset=Offset.OPEN, price=3500.0, volume=1,
+                          time=str(dt), datetime=dt)
+        if lazy:
+            write_log(lambda: f'创建限价单:{order.__dict__}')
+            write_log(lambda: f'停止单触发成交:{trade.__dict__}')
+        else:
+            write_log(f'创建限价单:{order.__dict__}')
+            write_log(f'停止单触发成交:{trade.__dict__}')
+
+
+def run_objects():
+    """只创建委托/成交对象，作为基准"""
+    dt = datetime(2020, 6, 1, 9)
+    for i in range(ORDER_COUNT):
+        OrderData(gateway_name='backtesting', symbol='rb2010', exchange=Exchange.SHFE, orderid=str(i),
+                  direction=Direction.LONG, offset=Offset.OPEN, price=3500.0, volume=1,
+                  status=Status.NOTTRADED, time=str(dt))
+        TradeData(gateway_name='backtesting', symbol='rb2010', exchange=Exchange.SHFE, orderid=str(i),
+                  tradeid=str(i), direction=Direction.LONG, offset=Offset.OPEN, price=3500.0, volume=1,
+                  time=str(dt), datetime=dt)
+
+
+start = timer()
+run_objects()
+base_time = timer() - start
+
+start = timer()
+run(old_write_log, lazy=False)
+old_time = timer() - start
+
+start = timer()
+run(new_write_log, lazy=True)
+new_time = timer() - start
+
+print(f'委托/成交数:{ORDER_COUNT}')
+print(f'只创建对象: {base_time:.3f}s')
+print(f'格式化后丢弃: {old_time:.3f}s, 日志开销:{old_time - base_time:.3f}s')
+print(f'级别门控: {new_time:.3f}s, 日志开销:{new_time - base_time:.3f}s')
+print(f'每条日志开销: {(old_time - base_time) / ORDER_COUNT / 2 * 1e6:.2f}us => '
+      f'{max(new_time - base_time, 0) / ORDER_COUNT / 2 * 1e6:.2f}us，总耗时降低: {old_time / new_time:.2f}倍')
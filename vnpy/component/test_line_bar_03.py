@@ -0,0 +1,70 @@
+# flake8: noqa
+
+# 性能测试 CtaLineBar K线合成
+# 生成多年的1分钟随机bar，对比 copy.deepcopy 与 BarData.copy() 的复制耗时，
+# 以及分钟/小时/日K线的add_bar回放吞吐量
+
+import os
+import sys
+import copy
+import random
+import timeit
+from datetime import datetime, timedelta
+
+vnpy_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if vnpy_root not in sys.path:
+    print(f'sys.path apppend:{vnpy_root}')
+    sys.path.append(vnpy_root)
+
+os.environ["VNPY_TESTING"] = "1"
+
+from vnpy.trader.constant import Exchange
+from vnpy.trader.object import BarData
+from vnpy.data.tdx.tdx_common import FakeStrategy
+from vnpy.component.cta_line_bar import CtaMinuteBar, CtaHourBar, CtaDayBar
+
+YEARS = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+
+def create_bars(years: int):
+    """生成 日盘9:00~15:00 的1分钟bar"""
+    rnd = random.Random(0)
+    price = 3000
+    bars = []
+    day = datetime(2017, 1, 2)
+    for _ in range(years * 245):
+        trading_day = day.strftime('%Y-%m-%d')
+        for minute in range(360):
+            dt = day.replace(hour=9) + timedelta(minutes=minute)
+            open_price = price
+            price = price + rnd.randint(-5, 5)
+            bars.append(BarData(gateway_name='', symbol='rb', exchange=Exchange.SHFE, datetime=dt,
+                                trading_day=trading_day, volume=rnd.randint(1, 100),
+                                open_price=open_price, close_price=price,
+                                high_price=max(open_price, price) + 1, low_price=min(open_price, price) - 1))
+        day += timedelta(days=1 if day.weekday() < 4 else 3)
+    return bars
+
+
+bar = create_bars(1)[0]
+number = 100000
+t_deepcopy = timeit.timeit(lambda: copy.deepcopy(bar), number=number) / number * 1e6
+t_copy = timeit.timeit(lambda: bar.copy(), number=number) / number * 1e6
+print(f'copy.deepcopy(bar): {t_deepcopy:.2f} us, bar.copy(): {t_copy:.2f} us, {t_deepcopy / t_copy:.1f}x')
+
+bars = create_bars(YEARS)
+print(f'{YEARS}年1分钟bar数量: {len(bars)}')
+
+klines = [
+    CtaMinuteBar(strategy=FakeStrategy(), cb_on_bar=None, setting={'name': 'M1', 'bar_interval': 1, 'underly_symbol': 'RB'}),
+    CtaMinuteBar(strategy=FakeStrategy(), cb_on_bar=None, setting={'name': 'M5', 'bar_interval': 5, 'underly_symbol': 'RB'}),
+    CtaHourBar(strategy=FakeStrategy(), cb_on_bar=None, setting={'name': 'H1', 'bar_interval': 1, 'underly_symbol': 'RB'}),
+    CtaDayBar(strategy=FakeStrategy(), cb_on_bar=None, setting={'name': 'D1', 'bar_interval': 1, 'underly_symbol': 'RB'})
+]
+for kline in klines:
+    replay_bars = [b.copy() for b in bars]
+    start = datetime.now()
+    for b in replay_bars:
+        kline.add_bar(b)
+    seconds = (datetime.now() - start).total_seconds()
+    print(f'{kline.name}: {len(replay_bars) / seconds:.0f} bars/s, K线数量: {len(kline.line_bar)}')
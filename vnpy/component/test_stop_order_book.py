@@ -0,0 +1,92 @@
+# flake8: noqa
+
+# 性能测试 实盘CtaEngine本地停止单触发
+# 100个合约、数千个本地停止单，生成随机游走的tick流，
+# 对比 遍历所有停止单(原check_stop_order) 与 StopOrderBook按合约价格堆触发 的耗时，并校验触发结果一致
+
+import os
+import sys
+import random
+from datetime import datetime
+
+vnpy_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if vnpy_root not in sys.path:
+    print(f'sys.path apppend:{vnpy_root}')
+    sys.path.append(vnpy_root)
+
+os.environ["VNPY_TESTING"] = "1"
+
+from vnpy.trader.constant import Direction, Offset
+from vnpy.component.cta_order_book import StopOrderBook
+from vnpy.app.cta_strategy_pro.base import StopOrder
+
+SYMBOL_COUNT = 100
+
+
+def make_data(stop_count: int, tick_count: int):
+    """生成网格停止单和随机游走的tick流"""
+    rnd = random.Random(0)
+    vt_symbols = [f'rb{2000 + i}.SHFE' for i in range(SYMBOL_COUNT)]
+    prices = {vt_symbol: 3000.0 for vt_symbol in vt_symbols}
+
+    stop_orders = []
+    for i in range(stop_count):
+        vt_symbol = rnd.choice(vt_symbols)
+        direction = rnd.choice([Direction.LONG, Direction.SHORT])
+        # 网格停止单，价格分布在当前价上下
+        offset = rnd.randint(10, 300)
+        price = 3000.0 + offset if direction == Direction.LONG else 3000.0 - offset
+        stop_orders.append(StopOrder(vt_symbol=vt_symbol, direction=direction, offset=Offset.OPEN, price=price,
+                                     volume=1, stop_orderid=f'STOP.{i}', strategy_name='grid'))
+
+    ticks = []
+    for _ in range(tick_count):
+        vt_symbol = rnd.choice(vt_symbols)
+        prices[vt_symbol] += rnd.randint(-2, 2)
+        ticks.append((vt_symbol, prices[vt_symbol]))
+
+    return stop_orders, ticks
+
+
+def run_scan(stop_orders, ticks):
+    """原check_stop_order: 每个tick遍历所有停止单"""
+    orders = {o.stop_orderid: o for o in stop_orders}
+    triggered = []
+    for vt_symbol, last_price in ticks:
+        for stop_order in list(orders.values()):
+            if stop_order.vt_symbol != vt_symbol:
+                continue
+            if (stop_order.direction == Direction.LONG and last_price >= stop_order.price) \
+                    or (stop_order.direction == Direction.SHORT and last_price <= stop_order.price):
+                orders.pop(stop_order.stop_orderid)
+                triggered.append(stop_order.stop_orderid)
+    return triggered
+
+
+def run_book(stop_orders, ticks):
+    """StopOrderBook: 每个tick只比较该合约的两个堆顶"""
+    orders = StopOrderBook({o.stop_orderid: o for o in stop_orders})
+    triggered = []
+    for vt_symbol, last_price in ticks:
+        for stop_orderid in orders.get_triggered(vt_symbol, last_price):
+            orders.pop(stop_orderid)
+            triggered.append(stop_orderid)
+    return triggered
+
+
+if __name__ == '__main__':
+    # 用法: python test_stop_order_book.py [停止单数量] [tick数量]
+    STOP_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    TICK_COUNT = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    stop_orders, ticks = make_data(STOP_COUNT, TICK_COUNT)
+
+    print(f'{SYMBOL_COUNT}个合约, {STOP_COUNT}个停止单, {TICK_COUNT}个tick')
+    results = {}
+    for name, func in [('遍历停止单', run_scan), ('StopOrderBook', run_book)]:
+        start = datetime.now()
+        results[name] = func(stop_orders, ticks)
+        seconds = (datetime.now() - start).total_seconds()
+        print(f'{name}: {seconds:.3f}s, {TICK_COUNT / seconds:.0f} ticks/s, 触发{len(results[name])}个')
+
+    print(f'触发结果一致: {results["遍历停止单"] == results["StopOrderBook"]}')
@@ -0,0 +1,56 @@
+# flake8: noqa
+
+# 性能测试 CTP系网关行情回调中的时间解析
+# 对比 原 datetime.now().strftime + strptime + strftime + get_trading_date
+# 与 TickTimeDecoder.decode（日期/交易日缓存，UpdateTime算术解析），并校验结果一致
+
+import os
+import sys
+import random
+from datetime import datetime
+from time import perf_counter
+
+vnpy_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if vnpy_root not in sys.path:
+    print(f'sys.path apppend:{vnpy_root}')
+    sys.path.append(vnpy_root)
+
+from vnpy.trader.utility import TickTimeDecoder, get_trading_date
+
+TICK_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+rnd = random.Random(0)
+datas = []
+for i in range(TICK_COUNT):
+    datas.append({
+        'UpdateTime': f'{rnd.choice([9, 10, 13, 14, 21, 22]):02d}:{rnd.randint(0, 59):02d}:{rnd.randint(0, 59):02d}',
+        'UpdateMillisec': rnd.choice([0, 500])
+    })
+
+
+def decode_strptime(data):
+    """原网关代码"""
+    dt = datetime.now()
+    s_date = dt.strftime('%Y-%m-%d')
+    timestamp = f"{s_date} {data['UpdateTime']}.{int(data['UpdateMillisec'] / 100)}"
+    dt = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S.%f")
+    return dt, s_date, dt.strftime('%H:%M:%S.%f'), get_trading_date(dt)
+
+
+decoder = TickTimeDecoder()
+
+
+def decode_fast(data):
+    return decoder.decode(data['UpdateTime'], data['UpdateMillisec'])
+
+
+if __name__ == '__main__':
+    results = {}
+    for func in [decode_strptime, decode_fast]:
+        start = perf_counter()
+        results[func.__name__] = [func(data) for data in datas]
+        elapsed = perf_counter() - start
+        print(f'{func.__name__:16}: {elapsed:.3f}s, {elapsed * 1000000 / TICK_COUNT:.2f}us/tick')
+
+    assert results['decode_strptime'] == results['decode_fast']
+    print('结果一致')
@@ -29,6 +29,13 @@ from vnpy.trader.utility import (
     get_full_symbol,
     get_trading_date,
     get_real_symbol_by_exchange)
+from vnpy.component.cta_tick_cache import (
+    NPY_SUFFIX,
+    NPC_SUFFIX,
+    save_tick_cache,
+    load_tick_cache,
+    get_cache_file,
+    array_to_ticks)
 from vnpy.data.tdx.tdx_common import (
     lru_cache,
     TDX_FUTURE_HOSTS,
@@ -710,7 +717,7 @@ class TdxFutureData(object):
             return False, ret_datas
 
     def save_cache(self, cache_folder, cache_symbol, cache_date, data_list):
-        """保存文件到缓存"""
+        """保存文件到缓存(列式缓存 .npy)"""
 
         os.makedirs(cache_folder, exist_ok=True)
 
@@ -720,16 +727,15 @@ class TdxFutureData(object):
         cache_folder_year_month = os.path.join(cache_folder, cache_date[:6])
         os.makedirs(cache_folder_year_month, exist_ok=True)
 
-        save_file = os.path.join(cache_folder_year_month, '{}_{}.pkz2'.format(cache_symbol, cache_date))
+        save_file = os.path.join(cache_folder_year_month, '{}_{}'.format(cache_symbol, cache_date))
         try:
-            with bz2.BZ2File(save_file, 'wb') as f:
-                pickle.dump(data_list, f)
-                self.write_log(u'缓存成功:{}'.format(save_file))
+            save_file = save_tick_cache(save_file, data_list)
+            self.write_log(u'缓存成功:{}'.format(save_file))
         except Exception as ex:
             self.write_error(u'缓存写入异常:{}'.format(str(ex)))
 
     def load_cache(self, cache_folder, cache_symbol, cache_date):
-        """加载缓存数据"""
+        """加载缓存数据，优先列式缓存(.npy/.npc)，其次bz2缓存(.pkz2)"""
         if not os.path.exists(cache_folder):
             self.write_error('缓存目录:{}不存在,不能读取'.format(cache_folder))
             return None
@@ -738,16 +744,18 @@ class TdxFutureData(object):
             self.write_error('缓存目录:{}不存在,不能读取'.format(cache_folder_year_month))
             return None
 
-        cache_file = os.path.join(cache_folder_year_month, '{}_{}.pkz2'.format(cache_symbol, cache_date))
-        if not os.path.isfile(cache_file):
-            self.write_error('缓存文件:{}不存在,不能读取'.format(cache_file))
+        cache_file = get_cache_file(cache_folder, cache_symbol, cache_date,
+                                    suffixes=[NPY_SUFFIX, NPC_SUFFIX, '.pkz2'])
+        if cache_file is None:
+            self.write_error('缓存文件:{}_{}不存在,不能读取'.format(cache_symbol, cache_date))
             return None
 
-        with bz2.BZ2File(cache_file, 'rb') as f:
-            data = pickle.load(f)
-            return data
+        if cache_file.endswith('.pkz2'):
+            with bz2.BZ2File(cache_file, 'rb') as f:
+                data = pickle.load(f)
+                return data
 
-        return None
+        return array_to_ticks(load_tick_cache(cache_file, mmap=False))
 
     def get_history_transaction_data(self,
                                      symbol: str,
@@ -1 +1,3 @@
-from .engine import Event, EventEngine, EVENT_TIMER
+from .engine import Event, EventEngine, EVENT_TIMER, EVENT_METRICS
+from .lanes import PriorityLanes
+from .metrics import EventMetrics, LatencyHistogram
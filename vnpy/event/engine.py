@@ -3,12 +3,17 @@ Event-driven framework of vn.py framework.
 """
 import sys
 from collections import defaultdict
+from copy import copy
 from queue import Empty, Queue
-from threading import Thread
-from time import sleep, time
-from typing import Any, Callable, List
+from threading import Lock, Thread
+from time import perf_counter, sleep, time
+from typing import Any, Callable, Dict, List
+
+from .lanes import PriorityLanes
+from .metrics import EventMetrics
 
 EVENT_TIMER = "eTimer"
+EVENT_METRICS = "eMetrics"
 
 
 class Event:
@@ -24,6 +29,19 @@ class Event:
         self.data: Any = data
 
 
+class ConflatedEvent(Event):
+    """
+    Placeholder in event queue for the latest unprocessed event of one
+    vt_symbol in conflating lane. The latest event is taken out when
+    the placeholder is processed.
+    """
+
+    def __init__(self, type: str, data: Any, key: tuple):
+        """"""
+        super().__init__(type, data)
+        self.key: tuple = key
+
+
 # Defines handler function to be used in event engine.
 HandlerType = Callable[[Event], None]
 
@@ -37,7 +55,18 @@ class EventEngine:
     which can be used for timing purpose.
     """
 
-    def __init__(self, interval: int = 1, debug: bool = False, over_ms: int = 500):
+    def __init__(
+        self,
+        interval: int = 1,
+        debug: bool = False,
+        over_ms: int = 500,
+        metrics: bool = False,
+        metrics_interval: int = 0,
+        shards: int = 0,
+        shard_types: tuple = ("eTick.", "eBar."),
+        priorities: Dict[str, int] = None,
+        starve_limit: int = 100
+    ):
         """
         Timer event is generated every 1 second by default, if
         interval not specified.
@@ -45,9 +74,28 @@ class EventEngine:
             debug: performance debug
             over_ms: over micro seconds for each handler execution.
             add try catch handel event exception
+            metrics: collect latency/throughput metrics, see enable_metrics
+            metrics_interval: seconds between EVENT_METRICS events, 0 for no publishing
+            shards: number of worker threads for market data events, 0 for single thread.
+                Events with type prefix in shard_types are routed by data.vt_symbol
+                (or type), events of the same symbol keep their order in one worker.
+                Other events (order/trade/account/timer) keep one global ordered lane.
+                Handlers of sharded events must be thread safe.
+            shard_types: type prefixes of events dispatched by shard workers
+            priorities: {type prefix: level}, events of global lane are queued by
+                priority level (0 is the highest) instead of one FIFO, unmatched
+                types get the lowest level, see PriorityLanes.
+                e.g. vnpy.trader.event.EVENT_PRIORITIES
+            starve_limit: times a waiting lower priority lane can be skipped
+                before it is served once
+        Handlers registered with conflate=True only receive the latest unprocessed
+        event of each vt_symbol, see register.
         """
         self._interval: int = interval
-        self._queue: Queue = Queue()
+        if priorities:
+            self._queue: Queue = PriorityLanes(priorities, starve_limit)
+        else:
+            self._queue: Queue = Queue()
         self._active: bool = False
         self._debug: bool = debug
         self._over_ms: int = over_ms
@@ -56,17 +104,76 @@ class EventEngine:
         self._handlers: defaultdict = defaultdict(list)
         self._general_handlers: List = []
 
+        self._conflate_handlers: defaultdict = defaultdict(list)
+        self._conflate_events: Dict[tuple, Event] = {}
+        self._conflate_counts: Dict[str, int] = defaultdict(int)
+        self._conflate_lock: Lock = Lock()
+
+        self._shards: int = shards
+        self._shard_types: tuple = tuple(shard_types)
+        self._shard_queues: List[Queue] = [Queue() for _ in range(shards)]
+        self._shard_threads: List[Thread] = [
+            Thread(target=self._run_queue, args=(queue,)) for queue in self._shard_queues
+        ]
+
+        self._metrics: EventMetrics = None
+        self._metrics_interval: int = 0
+        if metrics:
+            self.enable_metrics(metrics_interval)
+
     def _run(self) -> None:
         """
         Get event from queue and then process it.
         """
+        self._run_queue(self._queue)
+
+    def _run_queue(self, queue: Queue) -> None:
+        """
+        Get event from the global queue or a shard queue and then process it.
+        """
         while self._active:
             try:
-                event = self._queue.get(block=True, timeout=1)
-                self._process(event) if not self._debug else self._process_debug(event)
+                event = queue.get(block=True, timeout=1)
+                if event.__class__ is ConflatedEvent:
+                    self._process_conflated(event)
+                elif self._metrics:
+                    self._process_metrics(event)
+                elif self._debug:
+                    self._process_debug(event)
+                else:
+                    self._process(event)
             except Empty:
                 pass
 
+    def _process_metrics(self, event: Event) -> None:
+        """
+        Process event and record dispatch latency and handler execution time.
+        """
+        metrics = self._metrics
+        start = perf_counter()
+
+        put_time = getattr(event, "put_time", None)
+        latency_us = None
+        if put_time is not None:
+            latency_us = int((start - put_time) * 1000000)
+            if event.type == EVENT_TIMER and latency_us > self._interval * 1000000:
+                metrics.record_timer_late()
+
+        debug = self._debug
+        handler_times = []
+        handlers = self._handlers[event.type] if event.type in self._handlers else []
+        for general, handler_list in ((False, handlers), (True, self._general_handlers)):
+            for handler in handler_list:
+                if debug:
+                    self._process_handler_debug(handler, event, general)
+                else:
+                    handler(event)
+                end = perf_counter()
+                handler_times.append((handler, int((end - start) * 1000000)))
+                start = end
+
+        metrics.record_dispatch(event.type, latency_us, handler_times)
+
     def _process_debug(self, event: Event) -> None:
         """
         process event with debug mode:
@@ -75,31 +182,38 @@ class EventEngine:
 
         """
         for handler in self._handlers[event.type]:
-            t1 = time()
-            handler_name = str(handler.__qualname__)
+            self._process_handler_debug(handler, event)
+
+        if self._general_handlers:
+            for handler in self._general_handlers:
+                self._process_handler_debug(handler, event, general=True)
+
+    def _process_handler_debug(self, handler: HandlerType, event: Event, general: bool = False) -> None:
+        """
+        Run one handler with debug mode, shared by normal, metrics and conflated dispatch.
+        Exception of handler registered to event type is printed instead of raised.
+        """
+        t1 = time()
+        handler_name = str(handler.__qualname__)
+        if general:
+            handler(event)
+        else:
             try:
                 handler(event)
             except Exception as ex:
                 print(f'运行 {event.type} {handler_name} 异常:{str(ex)}',
                       file=sys.stderr)
-                continue
-            t2 = time()
-            execute_ms = (int(round(t2 * 1000))) - (int(round(t1 * 1000)))
-            if execute_ms > self._over_ms:
+                return
+        t2 = time()
+        execute_ms = (int(round(t2 * 1000))) - (int(round(t1 * 1000)))
+        if execute_ms > self._over_ms:
+            if general:
+                print(f'运行 general {event.type} {handler_name} 耗时:{execute_ms}ms > {self._over_ms}ms',
+                      file=sys.stderr)
+            else:
                 print(f'运行{event.type} {handler_name} 耗时:{execute_ms}ms >{self._over_ms}ms',
                       file=sys.stderr)
 
-        if self._general_handlers:
-            for handler in self._general_handlers:
-                t1 = time()
-                handler_name = str(handler.__qualname__)
-                handler(event)
-                t2 = time()
-                execute_ms = (int(round(t2 * 1000))) - (int(round(t1 * 1000)))
-                if execute_ms > self._over_ms:
-                    print(f'运行 general {event.type} {handler_name} 耗时:{execute_ms}ms > {self._over_ms}ms',
-                          file=sys.stderr)
-
     def _process(self, event: Event) -> None:
         """
         First ditribute event to those handlers registered listening
@@ -114,21 +228,65 @@ class EventEngine:
         if self._general_handlers:
             [handler(event) for handler in self._general_handlers]
 
+    def _process_conflated(self, placeholder: ConflatedEvent) -> None:
+        """
+        Take out the latest event of placeholder key and distribute it to
+        conflating handlers.
+        """
+        with self._conflate_lock:
+            event = self._conflate_events.pop(placeholder.key)
+        handlers = self._conflate_handlers.get(event.type, [])
+
+        metrics = self._metrics
+        if metrics:
+            start = perf_counter()
+            latency_us = int((start - placeholder.put_time) * 1000000) if hasattr(placeholder, "put_time") else None
+            handler_times = []
+            for handler in handlers:
+                if self._debug:
+                    self._process_handler_debug(handler, event)
+                else:
+                    handler(event)
+                end = perf_counter()
+                handler_times.append((handler, int((end - start) * 1000000)))
+                start = end
+            metrics.record_dispatch(event.type, latency_us, handler_times)
+        elif self._debug:
+            for handler in handlers:
+                self._process_handler_debug(handler, event)
+        else:
+            [handler(event) for handler in handlers]
+
     def _run_timer(self) -> None:
         """
         Sleep by interval second(s) and then generate a timer event.
         """
+        last_publish = time()
         while self._active:
+            start = perf_counter()
             sleep(self._interval)
             event = Event(EVENT_TIMER)
             self.put(event)
 
+            metrics = self._metrics
+            if metrics:
+                # 线程唤醒过迟，错过的定时事件数量
+                missed = int((perf_counter() - start) / self._interval) - 1
+                if missed > 0:
+                    metrics.record_timer_missed(missed)
+
+                if self._metrics_interval and time() - last_publish >= self._metrics_interval:
+                    last_publish = time()
+                    self.put(Event(EVENT_METRICS, self.get_metrics()))
+
     def start(self) -> None:
         """
         Start event engine to process events and generate timer events.
         """
         self._active = True
         self._thread.start()
+        for thread in self._shard_threads:
+            thread.start()
         self._timer.start()
 
     def stop(self) -> None:
@@ -138,19 +296,128 @@ class EventEngine:
         self._active = False
         self._timer.join()
         self._thread.join()
+        for thread in self._shard_threads:
+            thread.join()
 
     def put(self, event: Event) -> None:
         """
         Put an event object into event queue.
         """
-        self._queue.put(event)
+        if event.type in self._conflate_handlers:
+            placeholder = self._put_conflated(event)
+            if placeholder:
+                self._put_queue(placeholder)
+            # 没有需要逐笔处理的handler
+            if event.type not in self._handlers and not self._general_handlers:
+                return
 
-    def register(self, type: str, handler: HandlerType) -> None:
+        self._put_queue(event)
+
+    def _put_queue(self, event: Event) -> None:
+        """
+        Put event into global queue or its shard queue.
+        """
+        queue = self._queue
+        if self._shards and event.type.startswith(self._shard_types):
+            queue = self._get_shard_queue(event)
+
+        metrics = self._metrics
+        if metrics:
+            event.put_time = perf_counter()
+            metrics.record_queue_size(queue.qsize() + 1)
+        queue.put(event)
+
+    def _put_conflated(self, event: Event) -> ConflatedEvent:
+        """
+        Keep event as the latest one of its vt_symbol in conflating lane.
+        Return placeholder to be put into queue, or None if a placeholder
+        of the same vt_symbol is still waiting in queue.
+        """
+        key = (event.type, getattr(event.data, "vt_symbol", None))
+        with self._conflate_lock:
+            latest = self._conflate_events.get(key)
+            if latest is None:
+                self._conflate_events[key] = event
+                return ConflatedEvent(event.type, event.data, key)
+
+            # 被合并tick的成交量累加到最新tick，数据复制后修改，不影响逐笔处理的handler
+            last_volume = getattr(latest.data, "last_volume", 0)
+            if last_volume:
+                data = copy(event.data)
+                data.last_volume += last_volume
+                event = Event(event.type, data)
+
+            self._conflate_events[key] = event
+            self._conflate_counts[event.type] += 1
+        return None
+
+    def get_conflated_counts(self, reset: bool = False) -> Dict[str, int]:
+        """
+        Number of events dropped by conflating lane of each event type.
+        """
+        with self._conflate_lock:
+            counts = dict(self._conflate_counts)
+            if reset:
+                self._conflate_counts.clear()
+        return counts
+
+    def _get_shard_queue(self, event: Event) -> Queue:
+        """
+        Shard queue of event, selected by hash of data.vt_symbol, or event type.
+        """
+        key = getattr(event.data, "vt_symbol", None) or event.type
+        return self._shard_queues[hash(key) % self._shards]
+
+    def get_queue_size(self) -> int:
+        """
+        Number of events waiting in global queue and shard queues.
+        """
+        return self._queue.qsize() + sum(queue.qsize() for queue in self._shard_queues)
+
+    def enable_metrics(self, interval: int = 0, per_type: bool = False) -> None:
+        """
+        Start collecting metrics.
+        interval: seconds between EVENT_METRICS events carrying get_metrics(),
+            published through the engine (UI, RpcService), 0 for no publishing
+        per_type: keep metrics of every event type (eTick.rb2010.SHFE)
+            instead of grouping them by prefix (eTick.)
+        """
+        self._metrics_interval = interval
+        if not self._metrics:
+            self._metrics = EventMetrics(per_type=per_type)
+
+    def disable_metrics(self) -> None:
+        """
+        Stop collecting metrics.
+        """
+        self._metrics = None
+
+    def get_metrics(self, reset: bool = False) -> Dict[str, Any]:
+        """
+        Snapshot of collected metrics, empty dict if metrics not enabled.
+        """
+        metrics = self._metrics
+        if not metrics:
+            return {}
+        data = metrics.snapshot(queue_size=self.get_queue_size(), reset=reset)
+        data["conflated"] = self.get_conflated_counts(reset=reset)
+        if isinstance(self._queue, PriorityLanes):
+            data["lanes"] = {
+                "size": self._queue.get_lane_sizes(),
+                "starved": list(self._queue.starved)
+            }
+        return data
+
+    def register(self, type: str, handler: HandlerType, conflate: bool = False) -> None:
         """
         Register a new handler function for a specific event type. Every
         function can only be registered once for each event type.
+
+        conflate: handler only receives the latest unprocessed event of each
+            vt_symbol (tick events), events waiting in queue are dropped for it.
+            last_volume of dropped ticks is added to the latest tick.
         """
-        handler_list = self._handlers[type]
+        handler_list = self._conflate_handlers[type] if conflate else self._handlers[type]
         if handler not in handler_list:
             handler_list.append(handler)
 
@@ -158,13 +425,16 @@ class EventEngine:
         """
         Unregister an existing handler function from event engine.
         """
-        handler_list = self._handlers[type]
+        for handlers in [self._handlers, self._conflate_handlers]:
+            if type not in handlers:
+                continue
 
-        if handler in handler_list:
-            handler_list.remove(handler)
+            handler_list = handlers[type]
+            if handler in handler_list:
+                handler_list.remove(handler)
 
-        if not handler_list:
-            self._handlers.pop(type)
+            if not handler_list:
+                handlers.pop(type)
 
     def register_general(self, handler: HandlerType) -> None:
         """
@@ -0,0 +1,113 @@
+"""
+Priority lanes of event engine.
+"""
+from collections import deque
+from queue import Empty
+from threading import Condition
+from time import monotonic
+from typing import Any, Dict, List
+
+
+class PriorityLanes:
+    """
+    Drop-in replacement of the event queue with one FIFO lane per priority
+    level, level 0 is the highest.
+
+    Event type is mapped to level by the longest matching prefix in
+    priorities, unmatched types go to the lowest level.
+
+    get() takes event from the highest non-empty lane. A lower lane skipped
+    starve_limit times while not empty is served next, so that a flood of
+    high priority events does not starve it.
+
+    Events of different lanes are no longer processed in the order they
+    were put.
+    """
+
+    def __init__(self, priorities: Dict[str, int], starve_limit: int = 100):
+        """"""
+        self.priorities: Dict[str, int] = priorities
+        self.starve_limit: int = starve_limit
+        self.default_level: int = max(priorities.values(), default=-1) + 1
+
+        self.lanes: List[deque] = [deque() for _ in range(self.default_level + 1)]
+        self.skips: List[int] = [0] * len(self.lanes)
+        self.starved: List[int] = [0] * len(self.lanes)
+        self.size: int = 0
+        self.condition: Condition = Condition()
+        self.levels: Dict[str, int] = {}
+
+    def get_level(self, type: str) -> int:
+        """
+        Priority level of event type.
+        """
+        level = self.levels.get(type)
+        if level is None:
+            level = self.default_level
+            matched = -1
+            for prefix, prefix_level in self.priorities.items():
+                if type.startswith(prefix) and len(prefix) > matched:
+                    level = prefix_level
+                    matched = len(prefix)
+            self.levels[type] = level
+        return level
+
+    def put(self, event: Any) -> None:
+        """"""
+        lane = self.lanes[self.get_level(event.type)]
+        with self.condition:
+            lane.append(event)
+            self.size += 1
+            self.condition.notify()
+
+    def get(self, block: bool = True, timeout: float = None) -> Any:
+        """
+        Same as Queue.get, raise Empty if no event available.
+        """
+        with self.condition:
+            if not self.size:
+                if not block:
+                    raise Empty
+                if timeout is None:
+                    while not self.size:
+                        self.condition.wait()
+                else:
+                    end = monotonic() + timeout
+                    while not self.size:
+                        remaining = end - monotonic()
+                        if remaining <= 0:
+                            raise Empty
+                        self.condition.wait(remaining)
+
+            selected = -1
+            for level, lane in enumerate(self.lanes):
+                if not lane:
+                    continue
+                if selected < 0:
+                    selected = level
+                    continue
+
+                self.skips[level] += 1
+                if self.skips[level] > self.starve_limit:
+                    selected = level
+                    self.starved[level] += 1
+                    break
+
+            self.skips[selected] = 0
+            self.size -= 1
+            return self.lanes[selected].popleft()
+
+    def qsize(self) -> int:
+        """"""
+        return self.size
+
+    def empty(self) -> bool:
+        """"""
+        return not self.size
+
+    def get_lane_sizes(self) -> List[int]:
+        """
+        Number of events waiting in each lane.
+        """
+        with self.condition:
+            return [len(lane) for lane in self.lanes]
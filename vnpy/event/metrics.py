@@ -0,0 +1,210 @@
+"""
+Metrics collector of event engine.
+
+Records per event type throughput and enqueue-to-dispatch latency,
+per handler execution time, queue high-water mark and late/missed
+timer counts. Latencies are kept in log-linear (HDR-style) histograms
+with fixed relative precision, so recording is O(1) and memory is
+bounded by the number of distinct buckets actually hit.
+"""
+from collections import defaultdict
+from threading import Lock
+from time import time
+from typing import Any, Dict
+
+# 每个2的幂区间划分为 2^SUB_BUCKET_BITS 个子区间，相对误差 < 1/8
+SUB_BUCKET_BITS = 3
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+
+PERCENTILES = [50, 90, 99, 99.9]
+
+
+def get_bucket_index(value: int) -> int:
+    """Bucket index of a non-negative integer value."""
+    if value < SUB_BUCKET_COUNT * 2:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return (shift + 1) * SUB_BUCKET_COUNT + (value >> shift) - SUB_BUCKET_COUNT
+
+
+def get_bucket_upper(index: int) -> int:
+    """Largest value falling into bucket index."""
+    if index < SUB_BUCKET_COUNT * 2:
+        return index
+    shift = index // SUB_BUCKET_COUNT - 1
+    sub = index % SUB_BUCKET_COUNT + SUB_BUCKET_COUNT
+    return ((sub + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of integer values (microseconds).
+    """
+
+    def __init__(self):
+        """"""
+        self.counts: Dict[int, int] = defaultdict(int)
+        self.count: int = 0
+        self.total: int = 0
+        self.min: int = 0
+        self.max: int = 0
+
+    def record(self, value: int) -> None:
+        """
+        Record one value.
+        """
+        if value < 0:
+            value = 0
+        self.counts[get_bucket_index(value)] += 1
+        if self.count == 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def percentile(self, percent: float) -> int:
+        """
+        Value at percentile, within bucket precision.
+        """
+        if self.count == 0:
+            return 0
+        threshold = self.count * percent / 100
+        accumulated = 0
+        for index in sorted(self.counts):
+            accumulated += self.counts[index]
+            if accumulated >= threshold:
+                return min(get_bucket_upper(index), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Count, mean, min, max and percentiles in microseconds.
+        """
+        data = {
+            "count": self.count,
+            "mean_us": self.total / self.count if self.count else 0,
+            "min_us": self.min,
+            "max_us": self.max
+        }
+        for percent in PERCENTILES:
+            data[f"p{percent}_us"] = self.percentile(percent)
+        return data
+
+
+class EventMetrics:
+    """
+    Metrics of one event engine.
+
+    Event types carrying a suffix (eTick.rb2010.SHFE) are grouped by
+    prefix (eTick.) unless per_type is True, to keep the number of
+    histograms bounded.
+    """
+
+    def __init__(self, per_type: bool = False):
+        """"""
+        self.per_type: bool = per_type
+        self.lock: Lock = Lock()
+        self.type_keys: Dict[str, str] = {}
+        self.handler_names: Dict[Any, str] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Clear all recorded data.
+        """
+        self.start_time: float = time()
+        self.event_counts: Dict[str, int] = defaultdict(int)
+        self.latencies: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.handler_times: Dict[str, Dict[str, LatencyHistogram]] = defaultdict(
+            lambda: defaultdict(LatencyHistogram)
+        )
+        self.queue_high_water: int = 0
+        self.timer_late: int = 0
+        self.timer_missed: int = 0
+
+    def get_type_key(self, type: str) -> str:
+        """
+        Key of event type used in metrics.
+        """
+        key = self.type_keys.get(type)
+        if key is None:
+            if self.per_type or "." not in type:
+                key = type
+            else:
+                key = type[:type.index(".") + 1]
+            self.type_keys[type] = key
+        return key
+
+    def get_handler_name(self, handler: Any) -> str:
+        """
+        Qualified name of handler.
+        """
+        name = self.handler_names.get(handler)
+        if name is None:
+            name = getattr(handler, "__qualname__", None) or str(handler)
+            self.handler_names[handler] = name
+        return name
+
+    def record_queue_size(self, size: int) -> None:
+        """
+        Record queue size when an event is put.
+        """
+        if size > self.queue_high_water:
+            self.queue_high_water = size
+
+    def record_dispatch(self, type: str, latency_us: int, handler_times: list) -> None:
+        """
+        Record one dispatched event.
+        handler_times: list of (handler, execution microseconds)
+        """
+        key = self.get_type_key(type)
+        with self.lock:
+            self.event_counts[key] += 1
+            if latency_us is not None:
+                self.latencies[key].record(latency_us)
+            if handler_times:
+                histograms = self.handler_times[key]
+                for handler, elapsed_us in handler_times:
+                    histograms[self.get_handler_name(handler)].record(elapsed_us)
+
+    def record_timer_late(self) -> None:
+        """
+        Timer event dispatched later than timer interval.
+        """
+        self.timer_late += 1
+
+    def record_timer_missed(self, count: int) -> None:
+        """
+        Timer thread woke up too late and missed timer events.
+        """
+        self.timer_missed += count
+
+    def snapshot(self, queue_size: int = 0, reset: bool = False) -> Dict[str, Any]:
+        """
+        Current metrics as plain dict, safe to publish or pickle.
+        """
+        with self.lock:
+            uptime = max(time() - self.start_time, 1e-6)
+            events = {}
+            for key, count in self.event_counts.items():
+                events[key] = {
+                    "count": count,
+                    "rate": count / uptime,
+                    "latency": self.latencies[key].summary() if key in self.latencies else None,
+                    "handlers": {
+                        name: histogram.summary()
+                        for name, histogram in self.handler_times.get(key, {}).items()
+                    }
+                }
+            data = {
+                "uptime": uptime,
+                "queue_size": queue_size,
+                "queue_high_water": self.queue_high_water,
+                "timer_late": self.timer_late,
+                "timer_missed": self.timer_missed,
+                "events": events
+            }
+            if reset:
+                self.reset()
+        return data
@@ -0,0 +1,94 @@
+# flake8: noqa
+
+# 性能测试 EventEngine 单一FIFO 与 优先级通道(priorities)
+# 回放开盘行情洪峰：批量推送tick（处理速度跟不上，队列积压），期间穿插委托/成交回报，
+# 对比 委托/成交事件从put到处理的延迟（p50/p99/max），以及定时事件的最大延迟（防饿死）
+
+import os
+import sys
+import threading
+from time import perf_counter, sleep
+
+vnpy_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if vnpy_root not in sys.path:
+    print(f'sys.path apppend:{vnpy_root}')
+    sys.path.append(vnpy_root)
+
+from vnpy.event import Event, EventEngine, EVENT_TIMER
+from vnpy.trader.event import EVENT_ORDER, EVENT_PRIORITIES, EVENT_TICK, EVENT_TRADE
+
+TICK_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+BURST = 500         # 每批推送的tick数量
+ORDER_EVERY = 1000  # 每多少个tick穿插一个委托+成交
+
+
+class Data:
+
+    def __init__(self, vt_symbol):
+        self.vt_symbol = vt_symbol
+        self.put_time = perf_counter()
+
+
+def on_tick_work():
+    # 约30us的策略计算
+    total = 0
+    for i in range(300):
+        total += i
+    return total
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(int(len(values) * percent / 100), len(values) - 1)] * 1000
+
+
+def run(priorities):
+    event_engine = EventEngine(interval=1, priorities=priorities)
+    latencies = {EVENT_ORDER: [], EVENT_TRADE: [], EVENT_TIMER: []}
+    finished = threading.Event()
+    tick_done = [0]
+
+    def on_tick(event):
+        on_tick_work()
+        tick_done[0] += 1
+        if tick_done[0] == TICK_COUNT:
+            finished.set()
+
+    def on_trading(event):
+        latencies[event.type].append(perf_counter() - event.data.put_time)
+
+    def on_timer(event):
+        latencies[EVENT_TIMER].append(perf_counter() - event.put_time)
+
+    event_engine.register(EVENT_TICK, on_tick)
+    event_engine.register(EVENT_ORDER, on_trading)
+    event_engine.register(EVENT_TRADE, on_trading)
+    event_engine.register(EVENT_TIMER, on_timer)
+    # 定时事件的put时间
+    event_engine.enable_metrics()
+    event_engine.start()
+
+    start = perf_counter()
+    for i in range(TICK_COUNT):
+        event_engine.put(Event(EVENT_TICK, Data(f'rb{i % 50}.SHFE')))
+        if i % ORDER_EVERY == 0:
+            event_engine.put(Event(EVENT_ORDER, Data('rb0.SHFE')))
+            event_engine.put(Event(EVENT_TRADE, Data('rb0.SHFE')))
+        if i % BURST == 0:
+            sleep(0.005)
+    finished.wait()
+    elapsed = perf_counter() - start
+    sleep(0.1)
+    event_engine.stop()
+
+    name = 'priorities' if priorities else 'fifo'
+    trading = latencies[EVENT_ORDER] + latencies[EVENT_TRADE]
+    timer = latencies[EVENT_TIMER]
+    print(f'{name:10}: {elapsed:.2f}s, 委托/成交延迟 p50={percentile(trading, 50):.2f}ms '
+          f'p99={percentile(trading, 99):.2f}ms max={max(trading) * 1000:.2f}ms, '
+          f'定时事件 {len(timer)}个 最大延迟={max(timer) * 1000 if timer else 0:.2f}ms')
+
+
+if __name__ == '__main__':
+    run(None)
+    run(EVENT_PRIORITIES)
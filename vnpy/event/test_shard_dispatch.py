@@ -0,0 +1,91 @@
+# flake8: noqa
+
+# 性能测试 EventEngine 单线程分发 与 按合约分片多线程分发(shards)
+# 50个合约的tick流，其中1个慢合约（处理耗时为其他合约的20倍），对比：
+# 1. 吞吐：处理完所有tick的耗时
+# 2. 延迟：快合约tick从put到处理的p50/p99
+# handler分两类：
+# - io：time.sleep，模拟释放GIL的处理（网络/数据库/numpy大数组计算）
+# - python：纯python计算，受GIL限制，分片只能改善慢合约对快合约的阻塞，不能提升吞吐
+
+import os
+import sys
+import threading
+from time import perf_counter, sleep
+
+vnpy_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if vnpy_root not in sys.path:
+    print(f'sys.path apppend:{vnpy_root}')
+    sys.path.append(vnpy_root)
+
+from vnpy.event import Event, EventEngine
+
+SYMBOL_COUNT = 50
+TICK_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+SHARDS = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+SLOW_SYMBOL = 'rb0.SHFE'
+
+
+class Data:
+
+    def __init__(self, vt_symbol):
+        self.vt_symbol = vt_symbol
+        self.put_time = 0
+
+
+def io_work(vt_symbol):
+    sleep(0.002 if vt_symbol == SLOW_SYMBOL else 0.0001)
+
+
+def python_work(vt_symbol):
+    n = 20000 if vt_symbol == SLOW_SYMBOL else 1000
+    total = 0
+    for i in range(n):
+        total += i
+    return total
+
+
+def run(shards, work):
+    event_engine = EventEngine(shards=shards)
+    vt_symbols = [f'rb{i}.SHFE' for i in range(SYMBOL_COUNT)]
+    latencies = []
+    count = [0]
+    lock = threading.Lock()
+    finished = threading.Event()
+
+    def on_tick(event):
+        latency = perf_counter() - event.data.put_time
+        work(event.data.vt_symbol)
+        with lock:
+            if event.data.vt_symbol != SLOW_SYMBOL:
+                latencies.append(latency)
+            count[0] += 1
+            if count[0] == TICK_COUNT:
+                finished.set()
+
+    event_engine.register('eTick.', on_tick)
+    event_engine.start()
+
+    start = perf_counter()
+    for i in range(TICK_COUNT):
+        data = Data(vt_symbols[i % SYMBOL_COUNT])
+        data.put_time = perf_counter()
+        event_engine.put(Event('eTick.', data))
+        # 模拟行情到达间隔
+        if i % 100 == 0:
+            sleep(0.001)
+    finished.wait()
+    elapsed = perf_counter() - start
+    event_engine.stop()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f'{work.__name__:12} shards={shards}: {elapsed:.2f}s, {TICK_COUNT / elapsed:,.0f} tick/s, '
+          f'快合约延迟 p50={p50:.2f}ms p99={p99:.2f}ms')
+
+
+if __name__ == '__main__':
+    for work in [io_work, python_work]:
+        run(0, work)
+        run(SHARDS, work)
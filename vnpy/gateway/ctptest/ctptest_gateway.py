@@ -58,7 +58,7 @@ from vnpy.trader.object import (
     CancelRequest,
     SubscribeRequest,
 )
-from vnpy.trader.utility import get_folder_path
+from vnpy.trader.utility import get_folder_path, TickTimeDecoder
 from vnpy.trader.event import EVENT_TIMER
 
 
@@ -232,6 +232,7 @@ class CtpMdApi(MdApi):
 
         self.gateway = gateway
         self.gateway_name = gateway.gateway_name
+        self.tick_decoder = TickTimeDecoder()
 
         self.reqid = 0
 
@@ -292,12 +293,12 @@ class CtpMdApi(MdApi):
         if not exchange:
             return
 
-        timestamp = f"{data['ActionDay']} {data['UpdateTime']}.{int(data['UpdateMillisec']/100)}"
+        dt = self.tick_decoder.get_datetime(data['UpdateTime'], data['UpdateMillisec'], data['ActionDay'])
 
         tick = TickData(
             symbol=symbol,
             exchange=exchange,
-            datetime=datetime.strptime(timestamp, "%Y%m%d %H:%M:%S.%f"),
+            datetime=dt,
             name=symbol_name_map[symbol],
             volume=data["Volume"],
             last_price=data["LastPrice"],
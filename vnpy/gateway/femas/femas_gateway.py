@@ -53,7 +53,7 @@ from vnpy.trader.object import (
     TickData,
     TradeData,
 )
-from vnpy.trader.utility import get_folder_path
+from vnpy.trader.utility import get_folder_path, TickTimeDecoder
 
 
 STATUS_FEMAS2VT = {
@@ -209,6 +209,7 @@ class FemasMdApi(MdApi):
 
         self.gateway = gateway
         self.gateway_name = gateway.gateway_name
+        self.tick_decoder = TickTimeDecoder()
 
         self.reqid = 0
 
@@ -272,12 +273,12 @@ class FemasMdApi(MdApi):
         if not exchange:
             return
 
-        timestamp = f"{data['TradingDay']} {data['UpdateTime']}.{int(data['UpdateMillisec'] / 100)}"
+        dt = self.tick_decoder.get_datetime(data['UpdateTime'], data['UpdateMillisec'], data['TradingDay'])
 
         tick = TickData(
             symbol=symbol,
             exchange=exchange,
-            datetime=datetime.strptime(timestamp, "%Y%m%d %H:%M:%S.%f"),
+            datetime=dt,
             name=symbol_name_map[symbol],
             volume=data["Volume"],
             last_price=data["LastPrice"],
@@ -56,7 +56,7 @@ from vnpy.trader.object import (
     CancelRequest,
     SubscribeRequest,
 )
-from vnpy.trader.utility import get_folder_path
+from vnpy.trader.utility import get_folder_path, TickTimeDecoder
 from vnpy.trader.event import EVENT_TIMER
 
 from .vnminimd import MdApi
@@ -224,6 +224,7 @@ class MiniMdApi(MdApi):
 
         self.gateway = gateway
         self.gateway_name = gateway.gateway_name
+        self.tick_decoder = TickTimeDecoder()
 
         self.reqid = 0
 
@@ -284,12 +285,12 @@ class MiniMdApi(MdApi):
         if not exchange:
             return
 
-        timestamp = f"{data['ActionDay']} {data['UpdateTime']}.{int(data['UpdateMillisec']/100)}"
+        dt = self.tick_decoder.get_datetime(data['UpdateTime'], data['UpdateMillisec'], data['ActionDay'])
 
         tick = TickData(
             symbol=symbol,
             exchange=exchange,
-            datetime=datetime.strptime(timestamp, "%Y%m%d %H:%M:%S.%f"),
+            datetime=dt,
             name=symbol_name_map[symbol],
             volume=data["Volume"],
             open_interest=data["OpenInterest"],
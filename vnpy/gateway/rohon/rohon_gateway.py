@@ -71,6 +71,7 @@ from vnpy.trader.utility import (
     extract_vt_symbol,
     get_folder_path,
     get_trading_date,
+    TickTimeDecoder,
     get_underlying_symbol,
     round_to,
     BarGenerator,
@@ -546,6 +547,7 @@ class RohonMdApi(MdApi):
 
         self.gateway = gateway
         self.gateway_name = gateway.gateway_name
+        self.tick_decoder = TickTimeDecoder()
 
         self.reqid = 0
 
@@ -607,11 +609,8 @@ class RohonMdApi(MdApi):
         exchange = symbol_exchange_map.get(symbol, "")
         if not exchange:
             return
-        # 取当前时间
-        dt = datetime.now()
-        s_date = dt.strftime('%Y-%m-%d')
-        timestamp = f"{s_date} {data['UpdateTime']}.{int(data['UpdateMillisec'] / 100)}"
-        dt = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S.%f")
+        # 取当前日期 + 行情时间
+        dt, s_date, s_time, trading_day = self.tick_decoder.decode(data['UpdateTime'], data['UpdateMillisec'])
 
         # 不处理开盘前的tick数据
         if dt.hour in [8, 20] and dt.minute < 59:
@@ -624,8 +623,8 @@ class RohonMdApi(MdApi):
             exchange=exchange,
             datetime=dt,
             date=s_date,
-            time=dt.strftime('%H:%M:%S.%f'),
-            trading_day=get_trading_date(dt),
+            time=s_time,
+            trading_day=trading_day,
             name=symbol_name_map[symbol],
             volume=data["Volume"],
             open_interest=data["OpenInterest"],
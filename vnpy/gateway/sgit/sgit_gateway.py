@@ -61,7 +61,7 @@ from vnpy.trader.object import (
     CancelRequest,
     SubscribeRequest,
 )
-from vnpy.trader.utility import get_folder_path
+from vnpy.trader.utility import get_folder_path, TickTimeDecoder
 from vnpy.trader.event import EVENT_TIMER
 
 
@@ -235,6 +235,7 @@ class SgitMdApi(MdApi):
 
         self.gateway = gateway
         self.gateway_name = gateway.gateway_name
+        self.tick_decoder = TickTimeDecoder()
 
         self.reqid = 0
 
@@ -295,12 +296,12 @@ class SgitMdApi(MdApi):
         if not exchange:
             return
 
-        timestamp = f"{data['TradingDay']} {data['UpdateTime']}.{int(data['UpdateMillisec']/100)}"
+        dt = self.tick_decoder.get_datetime(data['UpdateTime'], data['UpdateMillisec'], data['TradingDay'])
 
         tick = TickData(
             symbol=symbol,
             exchange=exchange,
-            datetime=datetime.strptime(timestamp, "%Y%m%d %H:%M:%S.%f"),
+            datetime=dt,
             name=symbol_name_map[symbol],
             volume=data["Volume"],
             open_interest=data["OpenInterest"],
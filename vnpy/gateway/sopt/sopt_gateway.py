@@ -64,6 +64,7 @@ from vnpy.trader.utility import (
     extract_vt_symbol,
     get_folder_path,
     get_trading_date,
+    TickTimeDecoder,
     get_underlying_symbol,
     round_to,
     BarGenerator,
@@ -325,6 +326,7 @@ class SoptMdApi(MdApi):
 
         self.gateway = gateway
         self.gateway_name = gateway.gateway_name
+        self.tick_decoder = TickTimeDecoder()
 
         self.reqid = 0
 
@@ -386,8 +388,7 @@ class SoptMdApi(MdApi):
         exchange = symbol_exchange_map.get(symbol, "")
         if not exchange:
             return
-        timestamp = f"{data['TradingDay']} {data['UpdateTime']}.{int(data['UpdateMillisec']/100)}"
-        dt = datetime.strptime(timestamp, "%Y%m%d %H:%M:%S.%f")
+        dt = self.tick_decoder.get_datetime(data['UpdateTime'], data['UpdateMillisec'], data['TradingDay'])
         #dt = CHINA_TZ.localize(dt)
 
         tick = TickData(
@@ -10,7 +10,8 @@ from datetime import datetime
 from email.message import EmailMessage
 from queue import Empty, Queue
 from threading import Thread
-from typing import Any, Sequence, Type, Dict, List, Optional
+from types import MappingProxyType
+from typing import Any, Sequence, Type, Dict, List, Mapping, Optional
 
 from vnpy.event import Event, EventEngine
 from .app import BaseApp
@@ -413,6 +414,10 @@ class LogEngine(BaseEngine):
         self.logger.log(log.level, log.msg)
 
 
+# 索引中不存在的键，返回的只读空视图
+EMPTY_DICT: dict = {}
+
+
 class OmsEngine(BaseEngine):
     """
     Provides order management system function for VN Trader.
@@ -439,6 +444,13 @@ class OmsEngine(BaseEngine):
 
         self.active_orders: Dict[str, OrderData] = {}
 
+        # 二级索引，随事件维护
+        self.symbol_active_orders: Dict[str, Dict[str, OrderData]] = {}     # vt_symbol: {vt_orderid: order}
+        self.gateway_active_orders: Dict[str, Dict[str, OrderData]] = {}    # gateway_name: {vt_orderid: order}
+        self.symbol_positions: Dict[tuple, Dict[str, PositionData]] = {}    # (vt_symbol, direction): {gateway_name: position}
+        # 自定义套利合约的腿 => 套利合约持仓计算参数（含预先生成的持仓key）
+        self.spd_position_keys: Dict[tuple, List[tuple]] = {}  # (symbol, direction): [(spd_symbol, ...)]
+
         self.add_function()
         self.register_event()
         self.load_contracts()
@@ -514,6 +526,9 @@ class OmsEngine(BaseEngine):
         self.main_engine.get_all_accounts = self.get_all_accounts
         self.main_engine.get_all_contracts = self.get_all_contracts
         self.main_engine.get_all_active_orders = self.get_all_active_orders
+        self.main_engine.get_active_orders_view = self.get_active_orders_view
+        self.main_engine.get_positions_view = self.get_positions_view
+        self.main_engine.get_symbol_position = self.get_symbol_position
         self.main_engine.get_all_custom_contracts = self.get_all_custom_contracts
         self.main_engine.get_mapping_spd = self.get_mapping_spd
         self.main_engine.save_contracts = self.save_contracts
@@ -538,14 +553,24 @@ class OmsEngine(BaseEngine):
     def process_order_event(self, event: Event) -> None:
         """"""
         order = event.data
-        self.orders[order.vt_orderid] = order
+        vt_orderid = order.vt_orderid
+        self.orders[vt_orderid] = order
 
         # If order is active, then update data in dict.
         if order.is_active():
-            self.active_orders[order.vt_orderid] = order
+            self.active_orders[vt_orderid] = order
+            self.symbol_active_orders.setdefault(order.vt_symbol, {})[vt_orderid] = order
+            self.gateway_active_orders.setdefault(order.gateway_name, {})[vt_orderid] = order
         # Otherwise, pop inactive order from in dict
-        elif order.vt_orderid in self.active_orders:
-            self.active_orders.pop(order.vt_orderid)
+        elif vt_orderid in self.active_orders:
+            self.active_orders.pop(vt_orderid)
+            for index, key in [(self.symbol_active_orders, order.vt_symbol),
+                               (self.gateway_active_orders, order.gateway_name)]:
+                orders = index.get(key)
+                if orders is not None:
+                    orders.pop(vt_orderid, None)
+                    if not orders:
+                        index.pop(key)
 
     def process_trade_event(self, event: Event) -> None:
         """"""
@@ -556,6 +581,9 @@ class OmsEngine(BaseEngine):
         """"""
         position = event.data
         self.positions[position.vt_positionid] = position
+        self.symbol_positions.setdefault(
+            (position.vt_symbol, position.direction), {}
+        )[position.gateway_name] = position
 
         if position.exchange != Exchange.SPD:
             self.create_spd_position_event(position.symbol, position.direction)
@@ -568,12 +596,20 @@ class OmsEngine(BaseEngine):
             return Direction.LONG
         return direction
 
-    def create_spd_position_event(self, symbol, direction ):
-        """创建自定义品种对持仓信息"""
-        spd_symbols = self.symbol_spd_maping.get(symbol, [])
-        if not spd_symbols:
-            return
-        for spd_symbol in spd_symbols:
+    def get_spd_position_keys(self, symbol, direction):
+        """
+        腿合约持仓变化时，需要计算的套利合约及其参数
+        [(spd_symbol, spd_setting, spd_contract, leg1持仓key, leg2持仓key, 套利持仓key, spd_direction)]
+        持仓key只依赖合约，预先生成并缓存，合约更新时清除缓存
+        """
+        key = (symbol, direction)
+        spd_keys = self.spd_position_keys.get(key)
+        if spd_keys is not None:
+            return spd_keys
+
+        spd_keys = []
+        complete = True
+        for spd_symbol in self.symbol_spd_maping.get(symbol, []):
             spd_setting = self.custom_settings.get(spd_symbol, None)
             if not spd_setting:
                 continue
@@ -585,31 +621,50 @@ class OmsEngine(BaseEngine):
             spd_contract = self.contracts.get(spd_symbol)
 
             if leg1_contract is None or leg2_contract is None:
+                # 合约未到齐，不缓存
+                complete = False
                 continue
-            leg1_ratio = spd_setting.get('leg1_ratio', 1)
-            leg2_ratio = spd_setting.get('leg2_ratio', 1)
 
-            # 找出leg1，leg2的持仓，并判断出spd的方向
-            spd_pos = None
+            # 找出leg1，leg2的持仓key，并判断出spd的方向
             if leg1_symbol == symbol:
-                k1 = f"{leg1_contract.gateway_name}.{leg1_contract.vt_symbol}.{direction.value}"
-                leg1_pos = self.positions.get(k1)
-                k2 = f"{leg2_contract.gateway_name}.{leg2_contract.vt_symbol}.{self.reverse_direction(direction).value}"
-                leg2_pos = self.positions.get(k2)
+                leg1_direction = direction
+                leg2_direction = self.reverse_direction(direction)
                 spd_direction = direction
-                k3 = f"{spd_contract.gateway_name}.{spd_symbol}.{Exchange.SPD.value}.{spd_direction.value}"
-                spd_pos = self.positions.get(k3)
             elif leg2_symbol == symbol:
-                k1 = f"{leg1_contract.gateway_name}.{leg1_contract.vt_symbol}.{self.reverse_direction(direction).value}"
-                leg1_pos = self.positions.get(k1)
-                k2 = f"{leg2_contract.gateway_name}.{leg2_contract.vt_symbol}.{direction.value}"
-                leg2_pos = self.positions.get(k2)
+                leg1_direction = self.reverse_direction(direction)
+                leg2_direction = direction
                 spd_direction = self.reverse_direction(direction)
-                k3 = f"{spd_contract.gateway_name}.{spd_symbol}.{Exchange.SPD.value}.{spd_direction.value}"
-                spd_pos = self.positions.get(k3)
             else:
                 continue
 
+            spd_keys.append((
+                spd_symbol,
+                spd_setting,
+                spd_contract,
+                f"{leg1_contract.gateway_name}.{leg1_contract.vt_symbol}.{leg1_direction.value}",
+                f"{leg2_contract.gateway_name}.{leg2_contract.vt_symbol}.{leg2_direction.value}",
+                f"{spd_contract.gateway_name}.{spd_symbol}.{Exchange.SPD.value}.{spd_direction.value}",
+                spd_direction
+            ))
+
+        if complete:
+            self.spd_position_keys[key] = spd_keys
+        return spd_keys
+
+    def create_spd_position_event(self, symbol, direction ):
+        """创建自定义品种对持仓信息"""
+        if symbol not in self.symbol_spd_maping:
+            return
+
+        for spd_symbol, spd_setting, spd_contract, k1, k2, k3, spd_direction in \
+                self.get_spd_position_keys(symbol, direction):
+            leg1_ratio = spd_setting.get('leg1_ratio', 1)
+            leg2_ratio = spd_setting.get('leg2_ratio', 1)
+
+            leg1_pos = self.positions.get(k1)
+            leg2_pos = self.positions.get(k2)
+            spd_pos = self.positions.get(k3)
+
             if leg1_pos is None or leg2_pos is None:  # or leg1_pos.volume ==0 or leg2_pos.volume == 0:
                 continue
 
@@ -650,6 +705,9 @@ class OmsEngine(BaseEngine):
         self.today_contracts[contract.vt_symbol] = contract
         self.today_contracts[contract.symbol] = contract
 
+        if self.spd_position_keys:
+            self.spd_position_keys.clear()
+
     def get_tick(self, vt_symbol: str) -> Optional[TickData]:
         """
         Get latest market tick data by vt_symbol.
@@ -739,12 +797,45 @@ class OmsEngine(BaseEngine):
         if not vt_symbol:
             return list(self.active_orders.values())
         else:
-            active_orders = [
-                order
-                for order in self.active_orders.values()
-                if order.vt_symbol == vt_symbol
-            ]
-            return active_orders
+            return list(self.symbol_active_orders.get(vt_symbol, {}).values())
+
+    def get_active_orders_view(self, vt_symbol: str = "", gateway_name: str = "") -> Mapping[str, OrderData]:
+        """
+        只读视图 {vt_orderid: order}，不复制，随委托事件更新
+        按合约或网关过滤，都为空则返回所有活动委托
+        视图不能跨进程传递（RPC），非事件线程遍历时需先转为list
+        """
+        if vt_symbol:
+            orders = self.symbol_active_orders.get(vt_symbol, EMPTY_DICT)
+            if gateway_name:
+                orders = {k: v for k, v in orders.items() if v.gateway_name == gateway_name}
+        elif gateway_name:
+            orders = self.gateway_active_orders.get(gateway_name, EMPTY_DICT)
+        else:
+            orders = self.active_orders
+        return MappingProxyType(orders)
+
+    def get_positions_view(self, vt_symbol: str, direction: Direction) -> Mapping[str, PositionData]:
+        """
+        合约某方向的持仓只读视图 {gateway_name: position}
+        """
+        return MappingProxyType(self.symbol_positions.get((vt_symbol, direction), EMPTY_DICT))
+
+    def get_symbol_position(
+        self, vt_symbol: str, direction: Direction, gateway_name: str = ""
+    ) -> Optional[PositionData]:
+        """
+        按合约、方向查询持仓，不拼接vt_positionid
+        未指定网关时，只有一个网关持有该合约才返回其持仓，多个账号时返回None，避免取到其他账号的持仓
+        """
+        positions = self.symbol_positions.get((vt_symbol, direction))
+        if not positions:
+            return None
+        if gateway_name:
+            return positions.get(gateway_name)
+        if len(positions) == 1:
+            return next(iter(positions.values()))
+        return None
 
     def get_all_custom_contracts(self, rtn_setting=False):
         """
@@ -2,7 +2,7 @@
 Event type string used in VN Trader.
 """
 
-from vnpy.event import EVENT_TIMER  # noqa
+from vnpy.event import EVENT_TIMER, EVENT_METRICS  # noqa
 
 EVENT_TICK = "eTick."
 EVENT_TRADE = "eTrade."
@@ -27,3 +27,15 @@ EVENT_FUNDS_FLOW = 'eFundsFlow.'
 EVENT_ERROR = 'eError'
 EVENT_WARNING = 'eWarning'
 EVENT_CRITICAL = 'eCritical'
+
+
+# 事件优先级，EventEngine(priorities=EVENT_PRIORITIES)
+# 交易回报 > 行情 > 定时/日志/界面等其他事件
+EVENT_PRIORITIES = {
+    EVENT_ORDER: 0,
+    EVENT_TRADE: 0,
+    EVENT_POSITION: 0,
+    EVENT_ACCOUNT: 0,
+    EVENT_TICK: 1,
+    EVENT_BAR: 1
+}
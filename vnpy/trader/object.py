@@ -2,7 +2,7 @@
 Basic data structure used for general trading function in VN Trader.
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from datetime import datetime
 from logging import INFO
 
@@ -15,6 +15,20 @@ from .constant import (
 
 ACTIVE_STATUSES = set([Status.SUBMITTING, Status.NOTTRADED, Status.PARTTRADED, Status.CANCELLING])
 
+# (symbol, exchange) => vt_symbol, tick/bar of the same contract share one string
+VT_SYMBOLS = {}
+
+
+def get_vt_symbol(symbol: str, exchange: Exchange) -> str:
+    """
+    Cached vt_symbol, avoid formatting a new string for every tick/bar.
+    """
+    vt_symbol = VT_SYMBOLS.get((symbol, exchange))
+    if vt_symbol is None:
+        vt_symbol = f"{symbol}.{exchange.value}"
+        VT_SYMBOLS[(symbol, exchange)] = vt_symbol
+    return vt_symbol
+
 
 @dataclass
 class BaseData:
@@ -25,6 +39,16 @@ class BaseData:
 
     gateway_name: str
 
+    def copy(self):
+        """
+        Field-wise shallow copy.
+        All fields are immutable (str/float/enum/datetime), so this is
+        equivalent to copy.deepcopy but many times faster.
+        """
+        data = self.__class__.__new__(self.__class__)
+        data.__dict__.update(self.__dict__)
+        return data
+
 
 @dataclass
 class TickData(BaseData):
@@ -81,7 +105,7 @@ class TickData(BaseData):
 
     def __post_init__(self):
         """"""
-        self.vt_symbol = f"{self.symbol}.{self.exchange.value}"
+        self.vt_symbol = get_vt_symbol(self.symbol, self.exchange)
 
 
 @dataclass
@@ -106,7 +130,7 @@ class BarData(BaseData):
 
     def __post_init__(self):
         """"""
-        self.vt_symbol = f"{self.symbol}.{self.exchange.value}"
+        self.vt_symbol = get_vt_symbol(self.symbol, self.exchange)
 
 
 @dataclass
@@ -125,6 +149,37 @@ class RenkoBarData(BarData):
     high_time = None  # 最后一次进入高位区域的时间
 
 
+def slotted_dataclass(cls, name: str, extra_slots: tuple = ("vt_symbol",)):
+    """
+    Create a __slots__ version of a dataclass (same as dataclass(slots=True) of python 3.10).
+    Instances have no per-instance __dict__: less memory and faster attribute access,
+    but no extra attributes can be assigned and isinstance(obj, cls) is False.
+    """
+    field_names = tuple(f.name for f in fields(cls))
+    cls_dict = {
+        key: value for key, value in cls.__dict__.items()
+        if key not in field_names and key not in ("__dict__", "__weakref__")
+    }
+    cls_dict["__slots__"] = field_names + tuple(extra_slots)
+    cls_dict["__qualname__"] = name
+
+    def copy(self):
+        """Field-wise shallow copy."""
+        data = self.__class__.__new__(self.__class__)
+        for slot in self.__slots__:
+            setattr(data, slot, getattr(self, slot))
+        return data
+
+    cls_dict["copy"] = copy
+    return type(name, (object,), cls_dict)
+
+
+# Compact tick/bar for tick-level backtesting, recorder cache, etc. which hold millions of objects.
+# Same fields, vt_symbol, __init__/__repr__/__eq__ and pickle support as TickData/BarData.
+CompactTickData = slotted_dataclass(TickData, "CompactTickData")
+CompactBarData = slotted_dataclass(BarData, "CompactBarData")
+
+
 @dataclass
 class OrderData(BaseData):
     """
@@ -163,6 +163,69 @@ def get_trading_date(dt: datetime = None):
     else:
         return dt.strftime('%Y-%m-%d')
 
+
+class TickTimeDecoder(object):
+    """
+    CTP系网关行情时间解析，替代每个tick的 strftime/strptime
+    - 日期部分（本地日期，或行情的ActionDay/TradingDay）按日缓存
+    - UpdateTime('%H:%M:%S')/UpdateMillisec 按位置算术解析，毫秒保留到100ms，与原strptime结果一致
+    - 交易日按 日期+是否夜盘(>=20点) 缓存
+    只在行情回调线程中使用
+    """
+
+    def __init__(self):
+        self.local_date: tuple = None   # (year, month, day, '%Y-%m-%d')
+        self.local_date_expire: float = 0
+        self.dates: Dict[str, tuple] = {}    # '%Y%m%d' => (year, month, day, '%Y-%m-%d')
+        self.trading_days: Dict[tuple, str] = {}    # ('%Y-%m-%d', 夜盘) => trading_day
+
+    def get_local_date(self) -> tuple:
+        """本地日期，到下一个零点前复用"""
+        if time() >= self.local_date_expire:
+            dt = datetime.now()
+            self.local_date = (dt.year, dt.month, dt.day, dt.strftime('%Y-%m-%d'))
+            self.local_date_expire = (datetime(dt.year, dt.month, dt.day) + timedelta(days=1)).timestamp()
+        return self.local_date
+
+    def get_date(self, s_date: str) -> tuple:
+        """行情日期 '%Y%m%d'"""
+        date_parts = self.dates.get(s_date)
+        if date_parts is None:
+            year, month, day = int(s_date[0:4]), int(s_date[4:6]), int(s_date[6:8])
+            date_parts = (year, month, day, f'{year:04d}-{month:02d}-{day:02d}')
+            self.dates[s_date] = date_parts
+        return date_parts
+
+    def get_datetime(self, update_time: str, update_millisec: int, s_date: str = '') -> datetime:
+        """
+        行情时间
+        :param update_time: '%H:%M:%S'
+        :param update_millisec: 毫秒
+        :param s_date: '%Y%m%d'，缺省使用本地日期
+        """
+        year, month, day, _ = self.get_date(s_date) if s_date else self.get_local_date()
+        return datetime(year, month, day,
+                        int(update_time[0:2]), int(update_time[3:5]), int(update_time[6:8]),
+                        int(update_millisec / 100) * 100000)
+
+    def decode(self, update_time: str, update_millisec: int, s_date: str = '') -> tuple:
+        """
+        行情时间，返回 (datetime, date '%Y-%m-%d', time '%H:%M:%S.%f', trading_day '%Y-%m-%d')
+        """
+        year, month, day, date_str = self.get_date(s_date) if s_date else self.get_local_date()
+        hour = int(update_time[0:2])
+        microsecond = int(update_millisec / 100) * 100000
+        dt = datetime(year, month, day, hour, int(update_time[3:5]), int(update_time[6:8]), microsecond)
+
+        key = (date_str, hour >= 20)
+        trading_day = self.trading_days.get(key)
+        if trading_day is None:
+            trading_day = get_trading_date(dt)
+            self.trading_days[key] = trading_day
+
+        return dt, date_str, f'{update_time[0:8]}.{microsecond:06d}', trading_day
+
+
 def extract_vt_symbol(vt_symbol: str) -> Tuple[str, Exchange]:
     """
     :return: (symbol, exchange)